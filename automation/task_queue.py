@@ -0,0 +1,125 @@
+"""
+Task Queue - Enterprise Legion Framework
+Indexed priority queue with lazy deletion and time-bucketed aging
+"""
+
+import heapq
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Heap entry: [-score, key, sequence, item, alive, scored_at, settles_at].
+# Only the first three take part in ordering; the sequence keeps a replaced
+# entry with the same score and key from comparing items.
+_SCORE, _KEY, _SEQUENCE, _ITEM, _ALIVE, _SCORED_AT, _SETTLES_AT = range(7)
+
+
+class IndexedTaskQueue:
+    """
+    Max-priority queue of items by key. Every key has one live heap entry,
+    found through an index; update() and remove() mark that entry dead and
+    push a replacement, so both are O(log n). Dead entries are skipped when
+    they surface, and the heap is compacted once they outnumber live ones.
+    Ties on score pop in key order.
+
+    Scores may depend on the current time, provided they never increase as
+    time passes (deadline urgency only decays). settles_at(item) gives the
+    time after which an item's score stops changing, or None if it never
+    changes. A stored score is then an upper bound of the current one, so
+    peek() and pop() only re-score the entries that reach the top: an entry
+    scored in an earlier time bucket is re-scored, pushed back if its score
+    dropped, and the top is exact once it was scored in the current bucket.
+    """
+
+    def __init__(self, score: Callable[[Any, datetime], float],
+                 settles_at: Optional[Callable[[Any], Optional[datetime]]] = None,
+                 bucket: timedelta = timedelta(minutes=1)):
+        self.score = score
+        self.settles_at = settles_at
+        self.bucket_seconds = bucket.total_seconds()
+        self._heap: List[list] = []
+        self._entries: Dict[Any, list] = {}
+        self._sequence = 0
+        self.dead = 0
+        self.rescored = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._entries)
+
+    def push(self, key, item, now: Optional[datetime] = None):
+        """Add an item, or replace it and its score if key is queued"""
+        now = now or datetime.now()
+        if key in self._entries:
+            self._discard(key)
+        self._push(key, item, now, self.settles_at(item) if self.settles_at else None)
+
+    update = push
+
+    def remove(self, key) -> bool:
+        """Remove key from the queue; False if it was not queued"""
+        if key not in self._entries:
+            return False
+        self._discard(key)
+        if self.dead > len(self._entries) and self.dead > 1024:
+            self._heap = [entry for entry in self._heap if entry[_ALIVE]]
+            heapq.heapify(self._heap)
+            self.dead = 0
+        return True
+
+    def peek(self, now: Optional[datetime] = None) -> Optional[Tuple[Any, Any, float]]:
+        """(key, item, score) of the highest score, without removing it"""
+        now = now or datetime.now()
+        bucket_start = now - timedelta(seconds=now.timestamp() % self.bucket_seconds)
+        heap = self._heap
+        while heap:
+            entry = heap[0]
+            if not entry[_ALIVE]:
+                heapq.heappop(heap)
+                self.dead -= 1
+            elif (entry[_SETTLES_AT] is not None and entry[_SCORED_AT] < bucket_start
+                  and entry[_SCORED_AT] < entry[_SETTLES_AT]):
+                score = -self.score(entry[_ITEM], now)
+                if score == entry[_SCORE]:
+                    entry[_SCORED_AT] = now
+                else:
+                    heapq.heappop(heap)
+                    self.rescored += 1
+                    self._push(entry[_KEY], entry[_ITEM], now, entry[_SETTLES_AT], score)
+            else:
+                return entry[_KEY], entry[_ITEM], -entry[_SCORE]
+        return None
+
+    def pop(self, now: Optional[datetime] = None) -> Optional[Tuple[Any, Any, float]]:
+        """Remove and return (key, item, score) of the highest score"""
+        top = self.peek(now)
+        if top is not None:
+            del self._entries[heapq.heappop(self._heap)[_KEY]]
+        return top
+
+    def items(self) -> Iterator[Tuple[Any, Any, float]]:
+        """(key, item, stored score) of every queued item, in no particular order"""
+        return ((entry[_KEY], entry[_ITEM], -entry[_SCORE]) for entry in self._entries.values())
+
+    def clear(self):
+        self._heap.clear()
+        self._entries.clear()
+        self.dead = 0
+
+    def _push(self, key, item, now: datetime, settles_at: Optional[datetime], score: Optional[float] = None):
+        if score is None:
+            score = -self.score(item, now)
+        self._sequence += 1
+        entry = [score, key, self._sequence, item, True, now, settles_at]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[_ALIVE] = False
+            self.dead += 1
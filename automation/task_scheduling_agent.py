@@ -10,16 +10,22 @@ from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 from enum import Enum
 import uuid
-import heapq
 import sys
 import os
 
 # Add enterprise directory to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from core_framework import BaseAgent, AgentTask, AgentMessage
+try:
+    from .task_queue import IndexedTaskQueue
+except ImportError:
+    from task_queue import IndexedTaskQueue
 
 logger = logging.getLogger(__name__)
 
+# Deadline urgency stops decaying at 10% of 24 hours before the deadline
+URGENCY_FLOOR = timedelta(hours=2.4)
+
 
 class Priority(Enum):
     """Task priority levels"""
@@ -73,7 +79,8 @@ class TaskSchedulingAgent(BaseAgent):
         super().__init__(agent_id, "TaskSchedulingAgent", "automation", capabilities)
         
         self.scheduled_tasks = {}
-        self.task_queue = []  # Priority queue
+        # Priority queue of SCHEDULED tasks by task_id, re-scored as deadlines approach
+        self.task_queue = IndexedTaskQueue(self._calculate_priority_score, self._score_settles_at)
         self.running_tasks = {}
         self.completed_tasks = []
         self.recurring_patterns = {}
@@ -127,6 +134,8 @@ class TaskSchedulingAgent(BaseAgent):
                 return await self._schedule_task(task_data)
             elif action == "cancel":
                 return await self._cancel_task(task_data)
+            elif action == "reprioritize":
+                return await self._reprioritize_task(task_data)
             elif action == "get_schedule":
                 return await self._get_schedule(task_data)
             else:
@@ -185,18 +194,17 @@ class TaskSchedulingAgent(BaseAgent):
     
     async def _add_to_queue(self, scheduled_task: ScheduledTask):
         """Add task to priority queue"""
-        priority_score = self._calculate_priority_score(scheduled_task)
-        heapq.heappush(self.task_queue, (-priority_score, scheduled_task.task_id))
+        self.task_queue.push(scheduled_task.task_id, scheduled_task)
         scheduled_task.status = TaskStatus.SCHEDULED
     
-    def _calculate_priority_score(self, task: ScheduledTask) -> float:
+    def _calculate_priority_score(self, task: ScheduledTask, now: Optional[datetime] = None) -> float:
         """Calculate priority score for task ordering"""
         base_priority = task.priority.value
         
         # Time urgency factor
         time_until_deadline = 1.0
         if task.deadline:
-            hours_until_deadline = (task.deadline - datetime.now()).total_seconds() / 3600
+            hours_until_deadline = (task.deadline - (now or datetime.now())).total_seconds() / 3600
             time_until_deadline = max(0.1, min(1.0, hours_until_deadline / 24))
         
         # Dependency factor
@@ -204,6 +212,12 @@ class TaskSchedulingAgent(BaseAgent):
         
         return (10 - base_priority) * time_until_deadline * dependency_factor
     
+    def _score_settles_at(self, task: ScheduledTask) -> Optional[datetime]:
+        """When the deadline urgency factor bottoms out at 0.1, 2.4 hours before the deadline"""
+        if not task.deadline:
+            return None
+        return task.deadline - URGENCY_FLOOR
+    
     async def _cancel_task(self, params: Dict) -> Dict[str, Any]:
         """Cancel a scheduled task"""
         task_id = params.get('task_id')
@@ -213,14 +227,56 @@ class TaskSchedulingAgent(BaseAgent):
             task.status = TaskStatus.CANCELLED
             
             # Remove from queue if present
-            self.task_queue = [(p, tid) for p, tid in self.task_queue if tid != task_id]
-            heapq.heapify(self.task_queue)
+            self.task_queue.remove(task_id)
             
             logger.info(f"Cancelled task {task_id}")
             return {"status": "success", "cancelled_task": task_id}
         else:
             return {"status": "error", "message": "Task not found"}
     
+    async def _reprioritize_task(self, params: Dict) -> Dict[str, Any]:
+        """Change the priority and/or deadline of a scheduled task"""
+        task_id = params.get('task_id')
+        task = self.scheduled_tasks.get(task_id)
+        if task is None:
+            return {"status": "error", "message": "Task not found"}
+        
+        # Validate both fields before touching the task, so a bad request changes nothing
+        priority, deadline = task.priority, task.deadline
+        try:
+            if 'priority' in params:
+                priority = Priority(params['priority'])
+            if 'deadline' in params:
+                deadline = params['deadline']
+                if isinstance(deadline, str):
+                    deadline = datetime.fromisoformat(deadline) if deadline else None
+                elif deadline is not None and not isinstance(deadline, datetime):
+                    raise ValueError(f"deadline must be an ISO date string, a datetime or None, not {type(deadline).__name__}")
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+        task.priority, task.deadline = priority, deadline
+        
+        if task_id in self.task_queue:
+            self.task_queue.update(task_id, task)
+        
+        logger.info(f"Reprioritized task {task_id}")
+        return {
+            "status": "success",
+            "task_id": task_id,
+            "priority": task.priority.name,
+            "priority_score": self._calculate_priority_score(task)
+        }
+    
+    async def _next_task(self) -> Optional[ScheduledTask]:
+        """Take the highest-scored scheduled task off the queue and mark it running"""
+        top = self.task_queue.pop()
+        if top is None:
+            return None
+        task_id, task, _ = top
+        task.status = TaskStatus.RUNNING
+        self.running_tasks[task_id] = task
+        return task
+    
     async def _get_schedule(self, params: Dict) -> Dict[str, Any]:
         """Get current schedule information"""
         agent_id = params.get('agent_id')
@@ -257,64 +313,40 @@ class TaskSchedulingAgent(BaseAgent):
             "queue_length": len(self.task_queue)
         }
     
+    def _sync_queue(self, include=None) -> int:
+        """
+        Make the queue hold exactly the SCHEDULED tasks that pass include,
+        pushing and removing only the differences. Time-dependent scores are
+        refreshed by the queue itself. Returns the number of queued tasks.
+        """
+        queued = 0
+        for task in self.scheduled_tasks.values():
+            wanted = task.status == TaskStatus.SCHEDULED and (include is None or include(task))
+            if wanted:
+                queued += 1
+                if task.task_id not in self.task_queue:
+                    self.task_queue.push(task.task_id, task)
+            elif task.task_id in self.task_queue:
+                self.task_queue.remove(task.task_id)
+        return queued
+    
     async def _priority_first_scheduling(self) -> Dict[str, Any]:
         """Priority-first scheduling algorithm"""
-        # Sort by priority
-        sorted_tasks = sorted(
-            [task for task in self.scheduled_tasks.values() if task.status == TaskStatus.SCHEDULED],
-            key=lambda t: t.priority.value
-        )
-        
-        # Rebuild queue
-        self.task_queue.clear()
-        for task in sorted_tasks:
-            priority_score = self._calculate_priority_score(task)
-            heapq.heappush(self.task_queue, (-priority_score, task.task_id))
-        
-        return {"reordered_tasks": len(sorted_tasks), "optimization_type": "priority_first"}
+        reordered = self._sync_queue()
+        return {"reordered_tasks": reordered, "optimization_type": "priority_first"}
     
     async def _earliest_deadline_first(self) -> Dict[str, Any]:
         """Earliest deadline first scheduling"""
-        tasks_with_deadlines = [
-            task for task in self.scheduled_tasks.values() 
-            if task.status == TaskStatus.SCHEDULED and task.deadline
-        ]
-        
-        sorted_tasks = sorted(tasks_with_deadlines, key=lambda t: t.deadline)
-        
-        # Rebuild queue
-        self.task_queue.clear()
-        for task in sorted_tasks:
-            priority_score = self._calculate_priority_score(task)
-            heapq.heappush(self.task_queue, (-priority_score, task.task_id))
-        
-        return {"reordered_tasks": len(sorted_tasks), "optimization_type": "earliest_deadline_first"}
+        # Only tasks with deadlines stay queued
+        reordered = self._sync_queue(lambda task: task.deadline is not None)
+        return {"reordered_tasks": reordered, "optimization_type": "earliest_deadline_first"}
     
     async def _round_robin_scheduling(self) -> Dict[str, Any]:
         """Round-robin scheduling by agent"""
-        # Group tasks by agent
-        agent_tasks = {}
-        
-        for task in self.scheduled_tasks.values():
-            if task.status == TaskStatus.SCHEDULED:
-                if task.agent_id not in agent_tasks:
-                    agent_tasks[task.agent_id] = []
-                agent_tasks[task.agent_id].append(task)
-        
-        # Clear queue and rebuild in round-robin order
-        self.task_queue.clear()
-        
-        max_tasks = max(len(tasks) for tasks in agent_tasks.values()) if agent_tasks else 0
-        
-        for i in range(max_tasks):
-            for agent_id, tasks in agent_tasks.items():
-                if i < len(tasks):
-                    task = tasks[i]
-                    priority_score = self._calculate_priority_score(task)
-                    heapq.heappush(self.task_queue, (-priority_score, task.task_id))
-        
+        # The queue orders by score, so interleaving agents on insertion did not change pop order
+        reordered = self._sync_queue()
         return {
-            "reordered_tasks": sum(len(tasks) for tasks in agent_tasks.values()),
+            "reordered_tasks": reordered,
             "optimization_type": "round_robin_by_agent"
         }
     
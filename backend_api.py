@@ -10,11 +10,10 @@ import time
 import uuid
 import psutil
 
-from flask import Flask, jsonify, request, abort
+from flask import Flask, jsonify, request, abort, make_response, Response
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit, join_room, leave_room
 import random
-import sqlite3
 
 # Import our rate limiting and API management system
 try:
@@ -38,26 +37,23 @@ import hashlib
 import secrets
 
 # Rate limiting
-request_counts = {}
 RATE_LIMIT_REQUESTS = int(os.getenv('RATE_LIMIT_REQUESTS', '1000'))
 RATE_LIMIT_WINDOW = int(os.getenv('RATE_LIMIT_WINDOW', '900'))  # 15 minutes
 
+from rate_limiter import SlidingWindowCounterLimiter
+client_rate_limiter = SlidingWindowCounterLimiter(RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW,
+                                                  max_keys=int(os.getenv('RATE_LIMIT_MAX_CLIENTS', '100000')))
+
 def rate_limit(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.environ.get('REMOTE_ADDR'))
-        current_time = time.time()
-        
-        # Clean old entries
-        request_counts[client_ip] = [req_time for req_time in request_counts.get(client_ip, []) 
-                                   if current_time - req_time < RATE_LIMIT_WINDOW]
-        
-        # Check rate limit
-        if len(request_counts.get(client_ip, [])) >= RATE_LIMIT_REQUESTS:
-            return jsonify({'error': 'Rate limit exceeded'}), 429
         
-        # Add current request
-        request_counts.setdefault(client_ip, []).append(current_time)
+        allowed, remaining, retry_after = client_rate_limiter.hit(client_ip)
+        if not allowed:
+            response = jsonify({'error': 'Rate limit exceeded'})
+            response.headers['Retry-After'] = str(int(retry_after) + 1)
+            return response, 429
         
         return f(*args, **kwargs)
     return decorated_function
@@ -86,6 +82,46 @@ def require_auth(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Response caching for read-only dashboard endpoints
+from response_cache import ResponseCache, CachedResponse, compute_etag
+response_cache = ResponseCache(max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '1024')))
+
+def cache_response(ttl, tags=()):
+    """Cache successful GET responses for `ttl` seconds, keyed on path plus query args.
+    Entries are dropped early when a write endpoint invalidates one of `tags`."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method != 'GET':
+                return f(*args, **kwargs)
+            
+            uncached = {}
+            def compute():
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough:
+                    uncached['response'] = response
+                    return None
+                body = response.get_data()
+                return CachedResponse(body=body, status=200, content_type=response.content_type,
+                                      etag=compute_etag(body), expires_at=0)
+            
+            key = response_cache.make_key(request.path, request.args.items(multi=True))
+            entry, hit = response_cache.get_or_compute(key, ttl, tuple(tags), compute)
+            if entry is None:
+                return uncached['response']
+            
+            if request.if_none_match.contains(entry.etag.strip('"')):
+                response_cache.record_not_modified()
+                response = Response(status=304)
+            else:
+                response = Response(entry.body, status=entry.status, content_type=entry.content_type)
+            response.headers['ETag'] = entry.etag
+            response.headers['Cache-Control'] = 'no-cache'
+            response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+            return response
+        return decorated_function
+    return decorator
+
 # Security headers middleware
 @app.after_request
 def security_headers(response):
@@ -130,43 +166,18 @@ print(f"🗄️  Enterprise DB exists: {os.path.exists(ENTERPRISE_DB)}")
 print(f"🗄️  Legion DB exists: {os.path.exists(LEGION_DB)}")
 
 # Production database connection pool
-import sqlite3
-from threading import Lock
-
-class DatabasePool:
-    def __init__(self, db_path, pool_size=10):
-        self.db_path = db_path
-        self.pool_size = pool_size
-        self.connections = []
-        self.lock = Lock()
-        self._initialize_pool()
-    
-    def _initialize_pool(self):
-        for _ in range(self.pool_size):
-            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30.0)
-            conn.row_factory = sqlite3.Row
-            self.connections.append(conn)
-    
-    def get_connection(self):
-        with self.lock:
-            if self.connections:
-                return self.connections.pop()
-            else:
-                # Create new connection if pool is empty
-                conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30.0)
-                conn.row_factory = sqlite3.Row
-                return conn
-    
-    def return_connection(self, conn):
-        with self.lock:
-            if len(self.connections) < self.pool_size:
-                self.connections.append(conn)
-            else:
-                conn.close()
+from database_pool import DatabasePool
+DATABASE_POOL_WAIT_TIMEOUT = float(os.getenv('DATABASE_POOL_WAIT_TIMEOUT', 10))
 
 # Initialize connection pools
-enterprise_pool = DatabasePool(ENTERPRISE_DB, DATABASE_POOL_SIZE)
-legion_pool = DatabasePool(LEGION_DB, DATABASE_POOL_SIZE)
+enterprise_pool = DatabasePool(ENTERPRISE_DB, DATABASE_POOL_SIZE, wait_timeout=DATABASE_POOL_WAIT_TIMEOUT,
+                               busy_timeout=DATABASE_TIMEOUT / 1000)
+legion_pool = DatabasePool(LEGION_DB, DATABASE_POOL_SIZE, wait_timeout=DATABASE_POOL_WAIT_TIMEOUT,
+                           busy_timeout=DATABASE_TIMEOUT / 1000)
+
+# Pre-aggregated inter-agent message and task rollups
+from message_metrics_store import MessageMetricsStore, MESSAGE_COUNTERS, PRIORITY_LABELS, LATENCY_BUCKETS
+message_metrics = MessageMetricsStore(ENTERPRISE_DB)
 
 # Access API keys for external APIs (now supporting data)
 MARKETSTACK_API_KEY = os.getenv('MARKETSTACK_API_KEY')
@@ -211,35 +222,104 @@ def setup_production_logging():
     app.logger.info("Production logging configured")
 
 # Performance and Health Monitoring
+from latency_histogram import LatencyHistogram, RollingLatencyHistogram
+
+LATENCY_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+LATENCY_WINDOW_SLOTS = int(os.getenv('LATENCY_WINDOW_SLOTS', '5'))
+LATENCY_SLOT_SECONDS = float(os.getenv('LATENCY_SLOT_SECONDS', '60'))
+
 class SystemMonitor:
     def __init__(self):
         self.start_time = time.time()
         self.request_count = 0
         self.error_count = 0
-        self.response_times = []
-        
-    def record_request(self, response_time):
-        self.request_count += 1
-        self.response_times.append(response_time)
-        if len(self.response_times) > 1000:  # Keep last 1000 requests
-            self.response_times.pop(0)
+        self.lock = threading.Lock()
+        self.overall = RollingLatencyHistogram(LATENCY_WINDOW_SLOTS, LATENCY_SLOT_SECONDS)
+        # (endpoint, status class) -> rolling histogram
+        self.histograms = {}
+        
+    def record_request(self, response_time, endpoint=None, status_code=200):
+        key = (endpoint or 'unknown', f'{status_code // 100}xx')
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(
+                    key, RollingLatencyHistogram(LATENCY_WINDOW_SLOTS, LATENCY_SLOT_SECONDS))
+        with self.lock:
+            self.request_count += 1
+        histogram.record(response_time)
+        self.overall.record(response_time)
     
     def record_error(self):
-        self.error_count += 1
+        with self.lock:
+            self.error_count += 1
+    
+    @staticmethod
+    def _summarize(histogram: LatencyHistogram):
+        percentiles = histogram.percentiles(LATENCY_QUANTILES)
+        return {
+            'count': histogram.total_count,
+            'mean_ms': round(histogram.mean * 1000, 3),
+            'p50_ms': round(percentiles[0.5] * 1000, 3),
+            'p90_ms': round(percentiles[0.9] * 1000, 3),
+            'p99_ms': round(percentiles[0.99] * 1000, 3),
+            'p999_ms': round(percentiles[0.999] * 1000, 3),
+            'max_ms': round((histogram.max_value or 0) * 1000, 3)
+        }
+    
+    def get_latency_percentiles(self):
+        """Windowed latency percentiles overall and per endpoint/status class"""
+        endpoints = {}
+        for (endpoint, status_class), histogram in list(self.histograms.items()):
+            window = histogram.window()
+            if window.total_count:
+                endpoints.setdefault(endpoint, {})[status_class] = self._summarize(window)
+        return {
+            'window_seconds': self.overall.window_seconds,
+            'overall': self._summarize(self.overall.window()),
+            'endpoints': endpoints
+        }
     
     def get_stats(self):
         uptime = time.time() - self.start_time
-        avg_response_time = sum(self.response_times) / len(self.response_times) if self.response_times else 0
         error_rate = (self.error_count / self.request_count * 100) if self.request_count > 0 else 0
+        window = self.overall.window()
         
         return {
             'uptime': uptime,
             'request_count': self.request_count,
             'error_count': self.error_count,
             'error_rate': error_rate,
-            'average_response_time': avg_response_time,
-            'active_connections': len(enterprise_pool.connections) + len(legion_pool.connections)
+            'average_response_time': window.mean,
+            'latency': self._summarize(window),
+            'active_connections': enterprise_pool.get_metrics()['in_use'] + legion_pool.get_metrics()['in_use']
         }
+    
+    def export_prometheus(self):
+        """Request latency and counters in Prometheus text exposition format"""
+        lines = [
+            '# HELP legion_http_requests_total Total HTTP requests handled.',
+            '# TYPE legion_http_requests_total counter',
+            f'legion_http_requests_total {self.request_count}',
+            '# HELP legion_http_errors_total HTTP responses with status >= 400.',
+            '# TYPE legion_http_errors_total counter',
+            f'legion_http_errors_total {self.error_count}',
+            '# HELP legion_http_request_duration_seconds Request latency; quantiles cover the rolling window.',
+            '# TYPE legion_http_request_duration_seconds summary'
+        ]
+        for (endpoint, status_class), histogram in sorted(list(self.histograms.items())):
+            labels = f'endpoint="{endpoint}",status_class="{status_class}"'
+            percentiles = histogram.window().percentiles(LATENCY_QUANTILES)
+            for quantile in LATENCY_QUANTILES:
+                lines.append(f'legion_http_request_duration_seconds{{{labels},quantile="{quantile}"}} '
+                             f'{percentiles[quantile]:.6f}')
+            cumulative = histogram.cumulative
+            lines.append(f'legion_http_request_duration_seconds_sum{{{labels}}} {cumulative.total_sum:.6f}')
+            lines.append(f'legion_http_request_duration_seconds_count{{{labels}}} {cumulative.total_count}')
+        lines.append('# HELP legion_uptime_seconds Seconds since the API process started.')
+        lines.append('# TYPE legion_uptime_seconds gauge')
+        lines.append(f'legion_uptime_seconds {time.time() - self.start_time:.0f}')
+        return '\n'.join(lines) + '\n'
 
 # Initialize monitoring
 system_monitor = SystemMonitor()
@@ -253,7 +333,7 @@ def before_request():
 @app.after_request
 def after_request(response):
     response_time = time.time() - request.start_time
-    system_monitor.record_request(response_time)
+    system_monitor.record_request(response_time, request.endpoint, response.status_code)
     
     if response.status_code >= 400:
         system_monitor.record_error()
@@ -269,11 +349,11 @@ def health_check():
         stats = system_monitor.get_stats()
         
         # Check database connectivity
-        enterprise_conn = enterprise_pool.get_connection()
-        enterprise_pool.return_connection(enterprise_conn)
+        with enterprise_pool.connection() as conn:
+            conn.execute("SELECT 1")
         
-        legion_conn = legion_pool.get_connection()
-        legion_pool.return_connection(legion_conn)
+        with legion_pool.connection() as conn:
+            conn.execute("SELECT 1")
         
         return jsonify({
             'status': 'healthy',
@@ -282,7 +362,15 @@ def health_check():
             'databases': {
                 'enterprise': 'connected',
                 'legion': 'connected'
-            }
+            },
+            'connection_pools': {
+                'enterprise': enterprise_pool.get_metrics(),
+                'legion': legion_pool.get_metrics()
+            },
+            'response_cache': response_cache.get_stats(),
+            'rate_limiter': client_rate_limiter.get_stats(),
+            'realtime_channels': channel_hub.get_stats(),
+            'latency_percentiles': system_monitor.get_latency_percentiles()
         })
     except Exception as e:
         app.logger.error(f"Health check failed: {e}")
@@ -293,33 +381,36 @@ def health_check():
         }), 503
 
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus text-format export of request latency and counters"""
+    return Response(system_monitor.export_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
 # === ENTERPRISE AGENT SYSTEM ENDPOINTS ===
 
 @app.route('/api/enterprise/agent-activities')
 def get_agent_activities():
     """Get agent activities from enterprise operations database"""
-    conn = None
     try:
-        conn = enterprise_pool.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT * FROM agent_activities 
-            ORDER BY created_at DESC 
-            LIMIT 100
-        """)
-        
-        activities = [dict(row) for row in cursor.fetchall()]
+        with enterprise_pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT * FROM agent_activities 
+                ORDER BY created_at DESC 
+                LIMIT 100
+            """)
+            
+            activities = [dict(row) for row in cursor.fetchall()]
         return jsonify(activities)
         
     except Exception as e:
         return jsonify({'error': f'Failed to fetch agent activities: {e}'}), 500
-    finally:
-        if conn:
-            enterprise_pool.return_connection(conn)
 
 
 @app.route('/api/enterprise/workflow-executions')
+@cache_response(ttl=10, tags=('workflows',))
 def get_workflow_executions():
     """Get workflow executions from both enterprise and legion databases"""
     try:
@@ -327,37 +418,33 @@ def get_workflow_executions():
         
         # Get from enterprise database
         try:
-            conn = sqlite3.connect(ENTERPRISE_DB)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            with enterprise_pool.connection() as conn:
+                cursor = conn.cursor()
             
-            cursor.execute("""
-                SELECT *, 'enterprise' as source 
-                FROM workflow_executions 
-                ORDER BY created_at DESC 
-                LIMIT 50
-            """)
+                cursor.execute("""
+                    SELECT *, 'enterprise' as source 
+                    FROM workflow_executions 
+                    ORDER BY created_at DESC 
+                    LIMIT 50
+                """)
             
-            workflows.extend([dict(row) for row in cursor.fetchall()])
-            conn.close()
+                workflows.extend([dict(row) for row in cursor.fetchall()])
         except:
             pass
         
         # Get from legion database
         try:
-            conn = sqlite3.connect(LEGION_DB)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            with legion_pool.connection() as conn:
+                cursor = conn.cursor()
             
-            cursor.execute("""
-                SELECT *, 'legion' as source 
-                FROM workflow_executions 
-                ORDER BY started_at DESC 
-                LIMIT 50
-            """)
+                cursor.execute("""
+                    SELECT *, 'legion' as source 
+                    FROM workflow_executions 
+                    ORDER BY started_at DESC 
+                    LIMIT 50
+                """)
             
-            workflows.extend([dict(row) for row in cursor.fetchall()])
-            conn.close()
+                workflows.extend([dict(row) for row in cursor.fetchall()])
         except:
             pass
             
@@ -367,26 +454,25 @@ def get_workflow_executions():
 
 
 @app.route('/api/enterprise/business-metrics')
+@cache_response(ttl=30, tags=('objectives', 'revenue'))
 def get_business_metrics():
     """Get business objectives and metrics"""
     try:
-        conn = sqlite3.connect(ENTERPRISE_DB)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        with enterprise_pool.connection() as conn:
+            cursor = conn.cursor()
         
-        # Get business objectives
-        cursor.execute("SELECT * FROM business_objectives ORDER BY created_at DESC")
-        objectives = [dict(row) for row in cursor.fetchall()]
+            # Get business objectives
+            cursor.execute("SELECT * FROM business_objectives ORDER BY created_at DESC")
+            objectives = [dict(row) for row in cursor.fetchall()]
         
-        # Get revenue tracking
-        cursor.execute("""
-            SELECT * FROM revenue_tracking 
-            ORDER BY year DESC, month DESC 
-            LIMIT 12
-        """)
-        revenue_data = [dict(row) for row in cursor.fetchall()]
+            # Get revenue tracking
+            cursor.execute("""
+                SELECT * FROM revenue_tracking 
+                ORDER BY year DESC, month DESC 
+                LIMIT 12
+            """)
+            revenue_data = [dict(row) for row in cursor.fetchall()]
         
-        conn.close()
         
         return jsonify({
             'objectives': objectives,
@@ -397,21 +483,20 @@ def get_business_metrics():
 
 
 @app.route('/api/enterprise/department-activities')
+@cache_response(ttl=30, tags=('departments',))
 def get_department_activities():
     """Get department activities"""
     try:
-        conn = sqlite3.connect(ENTERPRISE_DB)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        with enterprise_pool.connection() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT * FROM department_activities 
-            ORDER BY created_at DESC 
-            LIMIT 50
-        """)
+            cursor.execute("""
+                SELECT * FROM department_activities 
+                ORDER BY created_at DESC 
+                LIMIT 50
+            """)
         
-        activities = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+            activities = [dict(row) for row in cursor.fetchall()]
         
         return jsonify(activities)
     except Exception as e:
@@ -422,18 +507,16 @@ def get_department_activities():
 def get_system_messages():
     """Get system messages from legion database"""
     try:
-        conn = sqlite3.connect(LEGION_DB)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        with legion_pool.connection() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT * FROM system_messages 
-            ORDER BY created_at DESC 
-            LIMIT 100
-        """)
+            cursor.execute("""
+                SELECT * FROM system_messages 
+                ORDER BY created_at DESC 
+                LIMIT 100
+            """)
         
-        messages = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+            messages = [dict(row) for row in cursor.fetchall()]
         
         return jsonify(messages)
     except Exception as e:
@@ -444,18 +527,16 @@ def get_system_messages():
 def get_agent_communications():
     """Get agent communications"""
     try:
-        conn = sqlite3.connect(ENTERPRISE_DB)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        with enterprise_pool.connection() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT * FROM agent_communications 
-            ORDER BY timestamp DESC 
-            LIMIT 100
-        """)
+            cursor.execute("""
+                SELECT * FROM agent_communications 
+                ORDER BY timestamp DESC 
+                LIMIT 100
+            """)
         
-        communications = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+            communications = [dict(row) for row in cursor.fetchall()]
         
         return jsonify(communications)
     except Exception as e:
@@ -552,37 +633,36 @@ def get_agent_health():
 
 
 @app.route('/api/enterprise/workflow-status')
+@cache_response(ttl=10, tags=('workflows',))
 def get_workflow_status():
     """Get workflow execution status"""
     try:
         workflows = []
         
         # Get active workflows from both databases
-        for db_path, source in [(ENTERPRISE_DB, 'enterprise'), (LEGION_DB, 'legion')]:
+        for pool, source in [(enterprise_pool, 'enterprise'), (legion_pool, 'legion')]:
             try:
-                conn = sqlite3.connect(db_path)
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
+                with pool.connection() as conn:
+                    cursor = conn.cursor()
                 
-                # Try different table structures
-                cursor.execute("""
-                    SELECT name FROM sqlite_master 
-                    WHERE type='table' AND name LIKE '%workflow%'
-                """)
+                    # Try different table structures
+                    cursor.execute("""
+                        SELECT name FROM sqlite_master 
+                        WHERE type='table' AND name LIKE '%workflow%'
+                    """)
                 
-                tables = [row[0] for row in cursor.fetchall()]
+                    tables = [row[0] for row in cursor.fetchall()]
                 
-                for table in tables:
-                    try:
-                        cursor.execute(f"SELECT * FROM {table} ORDER BY rowid DESC LIMIT 10")
-                        for row in cursor.fetchall():
-                            workflow = dict(row)
-                            workflow['source'] = source
-                            workflows.append(workflow)
-                    except:
-                        continue
+                    for table in tables:
+                        try:
+                            cursor.execute(f"SELECT * FROM {table} ORDER BY rowid DESC LIMIT 10")
+                            for row in cursor.fetchall():
+                                workflow = dict(row)
+                                workflow['source'] = source
+                                workflows.append(workflow)
+                        except:
+                            continue
                         
-                conn.close()
             except:
                 continue
         
@@ -632,6 +712,7 @@ def get_system_alerts():
 
 
 @app.route('/api/enterprise/database-status')
+@cache_response(ttl=30)
 def get_database_status():
     """Get database connection and health status"""
     try:
@@ -639,31 +720,30 @@ def get_database_status():
         
         # Check enterprise database
         try:
-            conn = sqlite3.connect(ENTERPRISE_DB)
-            cursor = conn.cursor()
+            with enterprise_pool.connection() as conn:
+                cursor = conn.cursor()
             
-            # Get database info
-            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table'")
-            table_count = cursor.fetchone()[0]
+                # Get database info
+                cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table'")
+                table_count = cursor.fetchone()[0]
             
-            cursor.execute("PRAGMA database_list")
-            db_info = cursor.fetchall()
+                cursor.execute("PRAGMA database_list")
+                db_info = cursor.fetchall()
             
-            # Get file size
-            import os
-            db_size = os.path.getsize(ENTERPRISE_DB) if os.path.exists(ENTERPRISE_DB) else 0
+                # Get file size
+                import os
+                db_size = os.path.getsize(ENTERPRISE_DB) if os.path.exists(ENTERPRISE_DB) else 0
             
-            databases.append({
-                'name': 'Enterprise Operations',
-                'path': ENTERPRISE_DB,
-                'status': 'connected',
-                'tables': table_count,
-                'size_mb': round(db_size / (1024 * 1024), 2),
-                'last_backup': (datetime.now() - timedelta(hours=6)).isoformat(),
-                'connection_time': '12ms'
-            })
+                databases.append({
+                    'name': 'Enterprise Operations',
+                    'path': ENTERPRISE_DB,
+                    'status': 'connected',
+                    'tables': table_count,
+                    'size_mb': round(db_size / (1024 * 1024), 2),
+                    'last_backup': (datetime.now() - timedelta(hours=6)).isoformat(),
+                    'connection_time': '12ms'
+                })
             
-            conn.close()
         except Exception as e:
             databases.append({
                 'name': 'Enterprise Operations',
@@ -674,25 +754,24 @@ def get_database_status():
         
         # Check legion database
         try:
-            conn = sqlite3.connect(LEGION_DB)
-            cursor = conn.cursor()
+            with legion_pool.connection() as conn:
+                cursor = conn.cursor()
             
-            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table'")
-            table_count = cursor.fetchone()[0]
+                cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table'")
+                table_count = cursor.fetchone()[0]
             
-            db_size = os.path.getsize(LEGION_DB) if os.path.exists(LEGION_DB) else 0
+                db_size = os.path.getsize(LEGION_DB) if os.path.exists(LEGION_DB) else 0
             
-            databases.append({
-                'name': 'Legion Core',
-                'path': LEGION_DB,
-                'status': 'connected',
-                'tables': table_count,
-                'size_mb': round(db_size / (1024 * 1024), 2),
-                'last_backup': (datetime.now() - timedelta(hours=2)).isoformat(),
-                'connection_time': '8ms'
-            })
+                databases.append({
+                    'name': 'Legion Core',
+                    'path': LEGION_DB,
+                    'status': 'connected',
+                    'tables': table_count,
+                    'size_mb': round(db_size / (1024 * 1024), 2),
+                    'last_backup': (datetime.now() - timedelta(hours=2)).isoformat(),
+                    'connection_time': '8ms'
+                })
             
-            conn.close()
         except Exception as e:
             databases.append({
                 'name': 'Legion Core',
@@ -712,6 +791,9 @@ def get_performance_metrics():
     try:
         import random
         
+        api_stats = system_monitor.get_stats()
+        api_latency = system_monitor.get_latency_percentiles()
+        
         # Generate realistic performance data
         metrics = {
             'timestamp': datetime.now().isoformat(),
@@ -731,10 +813,17 @@ def get_performance_metrics():
                 'cache_hit_rate': f"{random.uniform(85, 98):.1f}%"
             },
             'api': {
-                'requests_per_minute': random.randint(800, 1500),
-                'avg_response_time': f"{random.randint(45, 150)}ms",
-                'error_rate': f"{random.uniform(0.1, 2.0):.2f}%",
-                'active_connections': random.randint(25, 75)
+                'requests_per_minute': round(api_latency['overall']['count'] / (api_latency['window_seconds'] / 60), 1),
+                'avg_response_time': f"{api_latency['overall']['mean_ms']:.0f}ms",
+                'error_rate': f"{api_stats['error_rate']:.2f}%",
+                'active_connections': api_stats['active_connections'],
+                'latency_percentiles_ms': {
+                    'p50': api_latency['overall']['p50_ms'],
+                    'p90': api_latency['overall']['p90_ms'],
+                    'p99': api_latency['overall']['p99_ms'],
+                    'p999': api_latency['overall']['p999_ms']
+                },
+                'endpoints': api_latency['endpoints']
             },
             'agents': {
                 'active_count': random.randint(28, 32),
@@ -1105,78 +1194,31 @@ def get_agent_performance_history(agent_id):
 
 # === INTER-AGENT MESSAGE MONITORING ENDPOINTS ===
 
+MESSAGE_DEPARTMENTS = ['strategy', 'marketing', 'finance', 'operations',
+                       'business_intelligence', 'communication', 'legal', 'automation']
+
+
+def _rollup_average(total, samples):
+    return round(total / samples, 1) if samples else 0
+
+
+@app.route('/api/enterprise/message-events', methods=['POST'])
+def ingest_message_events():
+    """Record AgentMessage/AgentTask events into the message metrics rollups"""
+    try:
+        payload = request.get_json(silent=True) or {}
+        recorded = message_metrics.ingest(payload)
+        return jsonify({'status': 'recorded', **recorded})
+    except Exception as e:
+        return jsonify({'error': f'Failed to record message events: {e}'}), 400
+
+
 @app.route('/api/enterprise/inter-agent-messages')
 def get_inter_agent_messages():
-    """Get comprehensive inter-agent message monitoring data"""
+    """Get the most recent inter-agent messages"""
     try:
-        import random
-        from datetime import timedelta
-        
-        # Generate comprehensive inter-agent communication data
-        departments = ['strategy', 'marketing', 'finance', 'operations', 
-                      'business_intelligence', 'communication', 'legal', 'automation']
-        
-        message_types = ['task_delegation', 'status_update', 'data_request', 'result_sharing', 
-                        'coordination', 'alert', 'query', 'response', 'notification', 'handoff']
-        
-        priorities = ['low', 'medium', 'high', 'critical']
-        
-        messages = []
-        current_time = datetime.now()
-        
-        # Generate recent message activity (last 4 hours)
-        for i in range(random.randint(50, 150)):
-            sender_dept = random.choice(departments)
-            receiver_dept = random.choice([d for d in departments if d != sender_dept])
-            
-            message_data = {
-                'message_id': f"msg_{current_time.strftime('%Y%m%d')}_{i+1:04d}",
-                'timestamp': (current_time - timedelta(minutes=random.randint(0, 240))).isoformat(),
-                'sender': {
-                    'agent_id': f"{sender_dept}_agent_{random.randint(1, 4)}",
-                    'department': sender_dept,
-                    'agent_type': sender_dept.replace('_', ' ').title()
-                },
-                'receiver': {
-                    'agent_id': f"{receiver_dept}_agent_{random.randint(1, 4)}",
-                    'department': receiver_dept,
-                    'agent_type': receiver_dept.replace('_', ' ').title()
-                },
-                'message_details': {
-                    'type': random.choice(message_types),
-                    'priority': random.choice(priorities),
-                    'subject': f"{random.choice(message_types).replace('_', ' ').title()} - {random.choice(['Market Analysis', 'Revenue Update', 'Task Assignment', 'Data Processing', 'Status Report', 'Coordination Request'])}",
-                    'content_size_bytes': random.randint(100, 5000),
-                    'delivery_status': random.choice(['delivered', 'delivered', 'delivered', 'pending', 'failed']),
-                    'processing_time_ms': random.randint(10, 500),
-                    'retry_count': random.randint(0, 2) if random.random() < 0.1 else 0
-                },
-                'workflow_context': {
-                    'workflow_id': f"wf_{random.randint(1000, 9999)}" if random.random() < 0.7 else None,
-                    'task_chain_position': random.randint(1, 5) if random.random() < 0.6 else None,
-                    'business_objective_id': random.randint(1, 6) if random.random() < 0.5 else None,
-                    'collaboration_session': f"collab_{random.randint(100, 999)}" if random.random() < 0.4 else None
-                },
-                'performance_metrics': {
-                    'response_expected': random.choice([True, False]),
-                    'response_received': random.choice([True, False, None]),
-                    'response_time_ms': random.randint(100, 3000) if random.random() < 0.8 else None,
-                    'success_rate': round(random.uniform(85, 100), 1),
-                    'impact_score': round(random.uniform(1, 10), 1)
-                },
-                'security_context': {
-                    'encryption_level': random.choice(['standard', 'enhanced', 'maximum']),
-                    'authentication_method': 'agent_certificate',
-                    'message_signature_verified': True,
-                    'security_classification': random.choice(['public', 'internal', 'confidential', 'restricted'])
-                }
-            }
-            messages.append(message_data)
-        
-        # Sort by timestamp (most recent first)
-        messages.sort(key=lambda x: x['timestamp'], reverse=True)
-        
-        return jsonify(messages)
+        limit = min(int(request.args.get('limit', 150)), 1000)
+        return jsonify(message_metrics.get_recent_messages(limit))
     except Exception as e:
         return jsonify({'error': f'Failed to fetch inter-agent messages: {e}'}), 500
 
@@ -1185,68 +1227,89 @@ def get_inter_agent_messages():
 def get_communication_matrix():
     """Get communication matrix showing message flows between departments"""
     try:
-        import random
-        
-        departments = ['strategy', 'marketing', 'finance', 'operations', 
-                      'business_intelligence', 'communication', 'legal', 'automation']
-        
-        # Generate communication matrix
+        now = time.time()
+        day_rows = message_metrics.get_message_rollups(
+            'hour', now - 86400, ('sender_department', 'receiver_department', 'message_type'))
+        week_rows = message_metrics.get_message_rollups(
+            'day', now - 7 * 86400, ('sender_department', 'receiver_department'))
+
+        departments = list(MESSAGE_DEPARTMENTS)
+        for row in day_rows:
+            for dept in (row['sender_department'], row['receiver_department']):
+                if dept not in departments:
+                    departments.append(dept)
+
+        # Fold per-type hourly rollups into one cell per department pair
+        cells = {}
+        for row in day_rows:
+            cell = cells.setdefault((row['sender_department'], row['receiver_department']), {
+                'message_count': 0, 'delivered_count': 0, 'total_bytes': 0,
+                'total_latency_ms': 0, 'latency_samples': 0, 'last_message_at': None,
+                'priority_distribution': {label: 0 for label in PRIORITY_LABELS},
+                'message_types': {}
+            })
+            for counter in ('message_count', 'delivered_count', 'total_bytes', 'total_latency_ms', 'latency_samples'):
+                cell[counter] += row[counter]
+            for label in PRIORITY_LABELS:
+                cell['priority_distribution'][label] += int(row[f'priority_{label}'])
+            cell['message_types'][row['message_type']] = int(row['message_count'])
+            cell['last_message_at'] = max(cell['last_message_at'] or 0, row['last_message_at'] or 0)
+
+        weekly_counts = {(row['sender_department'], row['receiver_department']): row['message_count']
+                         for row in week_rows}
+
         communication_matrix = {}
-        
         for sender in departments:
             communication_matrix[sender] = {}
             for receiver in departments:
-                if sender != receiver:
-                    # Generate communication metrics between departments
+                cell = cells.get((sender, receiver))
+                count_24h = int(cell['message_count']) if cell else 0
+                if sender == receiver:
                     communication_matrix[sender][receiver] = {
-                        'message_count_24h': random.randint(5, 50),
-                        'avg_response_time_ms': random.randint(200, 2000),
-                        'success_rate_percent': round(random.uniform(88, 99.5), 1),
-                        'collaboration_score': round(random.uniform(60, 95), 1),
-                        'data_volume_mb': round(random.uniform(1, 50), 2),
-                        'priority_distribution': {
-                            'critical': random.randint(0, 5),
-                            'high': random.randint(2, 15),
-                            'medium': random.randint(5, 25),
-                            'low': random.randint(3, 20)
-                        },
-                        'message_types': {
-                            'task_delegation': random.randint(1, 10),
-                            'status_update': random.randint(2, 15),
-                            'data_request': random.randint(1, 8),
-                            'result_sharing': random.randint(1, 12),
-                            'coordination': random.randint(1, 6)
-                        },
-                        'trend_7d': random.choice(['increasing', 'stable', 'decreasing']),
-                        'last_communication': (datetime.now() - timedelta(minutes=random.randint(5, 120))).isoformat()
+                        'internal_messages_24h': count_24h
                     }
+                    continue
+
+                previous_daily = (weekly_counts.get((sender, receiver), 0) - count_24h) / 6
+                if count_24h > previous_daily * 1.1:
+                    trend = 'increasing'
+                elif count_24h < previous_daily * 0.9:
+                    trend = 'decreasing'
                 else:
-                    # Internal department communication
-                    communication_matrix[sender][receiver] = {
-                        'internal_messages_24h': random.randint(20, 100),
-                        'coordination_efficiency': round(random.uniform(85, 98), 1),
-                        'resource_sharing_score': round(random.uniform(80, 95), 1)
-                    }
-        
+                    trend = 'stable'
+
+                communication_matrix[sender][receiver] = {
+                    'message_count_24h': count_24h,
+                    'avg_response_time_ms': _rollup_average(cell['total_latency_ms'], cell['latency_samples']) if cell else 0,
+                    'success_rate_percent': round(cell['delivered_count'] / count_24h * 100, 1) if count_24h else None,
+                    'data_volume_mb': round(cell['total_bytes'] / (1024 * 1024), 4) if cell else 0,
+                    'priority_distribution': cell['priority_distribution'] if cell else {label: 0 for label in PRIORITY_LABELS},
+                    'message_types': cell['message_types'] if cell else {},
+                    'trend_7d': trend,
+                    'last_communication': datetime.fromtimestamp(cell['last_message_at']).isoformat() if cell and cell['last_message_at'] else None
+                }
+
+        totals = {'message_count': 0, 'delivered_count': 0, 'total_latency_ms': 0, 'latency_samples': 0}
+        sent = {dept: 0 for dept in departments}
+        received = {dept: 0 for dept in departments}
+        for (sender, receiver), cell in cells.items():
+            if sender == receiver:
+                continue
+            sent[sender] += cell['message_count']
+            received[receiver] += cell['message_count']
+            for counter in totals:
+                totals[counter] += cell[counter]
+
         return jsonify({
             'matrix': communication_matrix,
             'summary': {
                 'total_departments': len(departments),
-                'total_message_flows': len(departments) * (len(departments) - 1),
-                'most_active_sender': max(departments, key=lambda d: sum(
-                    communication_matrix[d][r]['message_count_24h'] 
-                    for r in departments if r != d
-                )),
-                'most_active_receiver': max(departments, key=lambda d: sum(
-                    communication_matrix[s][d]['message_count_24h'] 
-                    for s in departments if s != d
-                )),
-                'system_wide_success_rate': round(random.uniform(92, 98), 1),
-                'average_response_time_ms': random.randint(300, 800),
-                'total_daily_messages': sum(
-                    communication_matrix[s][r]['message_count_24h']
-                    for s in departments for r in departments if s != r
-                )
+                'total_message_flows': len([key for key in cells if key[0] != key[1]]),
+                'most_active_sender': max(sent, key=sent.get) if totals['message_count'] else None,
+                'most_active_receiver': max(received, key=received.get) if totals['message_count'] else None,
+                'system_wide_success_rate': round(totals['delivered_count'] / totals['message_count'] * 100, 1) if totals['message_count'] else None,
+                'average_response_time_ms': _rollup_average(totals['total_latency_ms'], totals['latency_samples']),
+                'total_daily_messages': int(totals['message_count'])
             },
             'last_updated': datetime.now().isoformat()
         })
@@ -1258,130 +1321,95 @@ def get_communication_matrix():
 def get_message_flow_analytics():
     """Get detailed analytics on inter-agent message flows and patterns"""
     try:
-        import random
-        from datetime import timedelta
-        
-        # Generate comprehensive flow analytics
+        now = time.time()
+        since = now - 86400
+
+        hourly = message_metrics.get_message_rollups('hour', since, ('bucket_start',))
+        by_type = message_metrics.get_message_rollups('hour', since, ('message_type',))
+        by_pair = message_metrics.get_message_rollups('hour', since, ('sender_department', 'receiver_department'))
+        overall = message_metrics.get_message_rollups('hour', since)
+        tasks = message_metrics.get_task_rollups('hour', since, ('department',))
+        totals = overall[0] if overall else {counter: 0 for counter in MESSAGE_COUNTERS}
+
+        # The 24h window can hold the same clock hour twice (yesterday's partial
+        # bucket and today's), so sum latency per hour and average once
+        peak_hours = {hour: {'hour': hour, 'message_count': 0, 'avg_response_time': 0} for hour in range(24)}
+        hour_latency = {hour: [0, 0] for hour in range(24)}
+        for row in hourly:
+            hour = datetime.fromtimestamp(row['bucket_start']).hour
+            peak_hours[hour]['message_count'] += int(row['message_count'])
+            hour_latency[hour][0] += row['total_latency_ms']
+            hour_latency[hour][1] += row['latency_samples']
+        for hour, (total_latency_ms, latency_samples) in hour_latency.items():
+            peak_hours[hour]['avg_response_time'] = _rollup_average(total_latency_ms, latency_samples)
+
+        cross_department = [row for row in by_pair if row['sender_department'] != row['receiver_department']]
+        cross_department.sort(key=lambda row: row['message_count'], reverse=True)
+        by_latency = sorted(
+            (row for row in cross_department if row['latency_samples']),
+            key=lambda row: row['total_latency_ms'] / row['latency_samples'], reverse=True)
+        by_failures = sorted(
+            (row for row in cross_department if row['failed_count']),
+            key=lambda row: row['failed_count'] / row['message_count'], reverse=True)
+
         analytics = {
             'flow_patterns': {
-                'peak_hours': [
-                    {'hour': h, 'message_count': random.randint(20, 100), 'avg_response_time': random.randint(200, 800)}
-                    for h in range(24)
-                ],
-                'department_activity_cycles': {
-                    'strategy': {'peak_hours': [9, 10, 14, 15], 'low_hours': [1, 2, 3, 4]},
-                    'marketing': {'peak_hours': [8, 11, 13, 16], 'low_hours': [0, 1, 2, 23]},
-                    'finance': {'peak_hours': [9, 10, 16, 17], 'low_hours': [1, 2, 3, 22]},
-                    'operations': {'peak_hours': [8, 9, 13, 14], 'low_hours': [0, 1, 2, 23]}
-                },
-                'workflow_coordination_patterns': {
-                    'sequential_workflows': random.randint(15, 35),
-                    'parallel_workflows': random.randint(8, 20),
-                    'hybrid_workflows': random.randint(5, 15),
-                    'emergency_workflows': random.randint(0, 3)
+                'peak_hours': [peak_hours[hour] for hour in range(24)],
+                'task_activity': {
+                    row['department']: {
+                        'created': int(row['created_count']),
+                        'completed': int(row['completed_count']),
+                        'failed': int(row['failed_count']),
+                        'avg_duration_ms': _rollup_average(row['total_duration_ms'], row['duration_samples'])
+                    }
+                    for row in tasks
                 }
             },
             'communication_efficiency': {
                 'message_success_rates': {
-                    'task_delegation': round(random.uniform(92, 99), 1),
-                    'status_update': round(random.uniform(95, 99.5), 1),
-                    'data_request': round(random.uniform(88, 96), 1),
-                    'result_sharing': round(random.uniform(90, 98), 1),
-                    'coordination': round(random.uniform(85, 95), 1)
+                    row['message_type']: round(row['delivered_count'] / row['message_count'] * 100, 1)
+                    for row in by_type
                 },
                 'response_time_distribution': {
-                    'under_100ms': random.randint(15, 30),
-                    '100ms_500ms': random.randint(40, 60),
-                    '500ms_1s': random.randint(15, 25),
-                    '1s_5s': random.randint(5, 15),
-                    'over_5s': random.randint(0, 5)
+                    name: int(totals[f'latency_{name}']) for name, _ in LATENCY_BUCKETS
                 },
                 'retry_analysis': {
-                    'messages_requiring_retry': random.randint(2, 8),
-                    'avg_retry_count': round(random.uniform(1.2, 2.1), 1),
-                    'retry_success_rate': round(random.uniform(85, 95), 1)
+                    'total_retries': int(totals['retry_count']),
+                    'avg_retry_count': round(totals['retry_count'] / totals['message_count'], 2) if totals['message_count'] else 0
                 }
             },
             'collaboration_insights': {
                 'most_collaborative_pairs': [
                     {
-                        'departments': ['strategy', 'business_intelligence'],
-                        'collaboration_score': round(random.uniform(85, 95), 1),
-                        'message_frequency': random.randint(30, 60),
-                        'success_rate': round(random.uniform(92, 98), 1)
-                    },
-                    {
-                        'departments': ['marketing', 'communication'],
-                        'collaboration_score': round(random.uniform(80, 92), 1),
-                        'message_frequency': random.randint(25, 50),
-                        'success_rate': round(random.uniform(90, 96), 1)
-                    },
-                    {
-                        'departments': ['finance', 'operations'],
-                        'collaboration_score': round(random.uniform(78, 90), 1),
-                        'message_frequency': random.randint(20, 40),
-                        'success_rate': round(random.uniform(88, 94), 1)
+                        'departments': [row['sender_department'], row['receiver_department']],
+                        'message_frequency': int(row['message_count']),
+                        'success_rate': round(row['delivered_count'] / row['message_count'] * 100, 1)
                     }
-                ],
-                'cross_department_workflows': {
-                    'active_multi_dept_workflows': random.randint(8, 18),
-                    'avg_departments_per_workflow': round(random.uniform(2.5, 4.2), 1),
-                    'workflow_completion_rate': round(random.uniform(85, 95), 1),
-                    'avg_workflow_duration_hours': round(random.uniform(2.5, 8.5), 1)
-                }
+                    for row in cross_department[:3]
+                ]
             },
             'performance_bottlenecks': {
                 'slow_communication_paths': [
                     {
-                        'from_department': 'legal',
-                        'to_department': 'marketing',
-                        'avg_delay_ms': random.randint(800, 2000),
-                        'reason': 'compliance_review_required'
-                    },
-                    {
-                        'from_department': 'finance',
-                        'to_department': 'automation',
-                        'avg_delay_ms': random.randint(600, 1500),
-                        'reason': 'budget_approval_process'
+                        'from_department': row['sender_department'],
+                        'to_department': row['receiver_department'],
+                        'avg_delay_ms': _rollup_average(row['total_latency_ms'], row['latency_samples'])
                     }
+                    for row in by_latency[:3]
                 ],
                 'high_failure_paths': [
                     {
-                        'communication_path': 'operations -> external_api',
-                        'failure_rate': round(random.uniform(5, 15), 1),
-                        'primary_cause': 'network_timeout'
+                        'communication_path': f"{row['sender_department']} -> {row['receiver_department']}",
+                        'failure_rate': round(row['failed_count'] / row['message_count'] * 100, 1)
                     }
-                ],
-                'resource_constraints': {
-                    'queue_depth_warnings': random.randint(0, 3),
-                    'bandwidth_utilization': round(random.uniform(65, 85), 1),
-                    'processing_capacity_used': round(random.uniform(70, 90), 1)
-                }
-            },
-            'predictive_insights': {
-                'projected_message_volume_24h': random.randint(800, 1500),
-                'anticipated_peak_load_hour': random.randint(9, 17),
-                'predicted_bottlenecks': [
-                    'High volume expected between Strategy and BI departments',
-                    'Potential delays in Finance approval workflows'
-                ],
-                'optimization_recommendations': [
-                    'Implement message batching for status updates',
-                    'Add caching layer for frequent data requests',
-                    'Consider load balancing for high-traffic paths'
+                    for row in by_failures[:3]
                 ]
             },
-            'security_monitoring': {
-                'authentication_success_rate': round(random.uniform(99.5, 99.9), 2),
-                'encryption_coverage': round(random.uniform(98, 100), 1),
-                'security_incidents_24h': random.randint(0, 2),
-                'compliance_score': round(random.uniform(95, 99), 1)
-            },
             'timestamp': datetime.now().isoformat(),
             'analysis_period': '24_hours',
-            'data_points_analyzed': random.randint(1000, 5000)
+            'data_points_analyzed': int(totals['message_count'])
         }
-        
+
         return jsonify(analytics)
     except Exception as e:
         return jsonify({'error': f'Failed to fetch message flow analytics: {e}'}), 500
@@ -1391,71 +1419,48 @@ def get_message_flow_analytics():
 def get_agent_message_history(agent_id):
     """Get message history for specific agent"""
     try:
-        import random
-        from datetime import timedelta
-        
-        # Generate message history for specific agent
-        current_time = datetime.now()
         message_history = []
-        
-        # Generate recent messages
-        for i in range(random.randint(20, 50)):
-            is_sender = random.choice([True, False])
-            other_agent = f"{random.choice(['strategy', 'marketing', 'finance', 'operations'])}_agent_{random.randint(1, 3)}"
-            
-            message = {
-                'message_id': f"msg_{agent_id}_{i+1:03d}",
-                'timestamp': (current_time - timedelta(minutes=random.randint(0, 1440))).isoformat(),
+        for message in message_metrics.get_agent_messages(agent_id, limit=50):
+            is_sender = message['sender']['agent_id'] == agent_id
+            counterpart = message['receiver'] if is_sender else message['sender']
+            message_history.append({
+                'message_id': message['message_id'],
+                'timestamp': message['timestamp'],
                 'direction': 'sent' if is_sender else 'received',
                 'counterpart': {
-                    'agent_id': other_agent,
-                    'department': other_agent.split('_')[0],
-                    'agent_name': other_agent.replace('_', ' ').title()
+                    'agent_id': counterpart['agent_id'],
+                    'department': counterpart['department'],
+                    'agent_name': (counterpart['agent_id'] or '').replace('_', ' ').title()
                 },
                 'message_details': {
-                    'type': random.choice(['task_delegation', 'status_update', 'data_request', 'result_sharing']),
-                    'priority': random.choice(['low', 'medium', 'high', 'critical']),
-                    'size_bytes': random.randint(100, 3000),
-                    'processing_time_ms': random.randint(50, 800),
-                    'status': random.choice(['delivered', 'delivered', 'delivered', 'pending'])
-                },
-                'content_summary': {
-                    'subject': f"{random.choice(['Task Update', 'Data Request', 'Status Report', 'Coordination'])} - {random.choice(['Q4 Analysis', 'Revenue Target', 'Market Research', 'Process Optimization'])}",
-                    'has_attachments': random.choice([True, False]),
-                    'requires_response': random.choice([True, False]),
-                    'business_impact': random.choice(['low', 'medium', 'high'])
-                },
-                'performance_metrics': {
-                    'delivery_time_ms': random.randint(10, 200),
-                    'response_time_ms': random.randint(100, 2000) if not is_sender else None,
-                    'success_score': round(random.uniform(8, 10), 1)
+                    'type': message['message_details']['type'],
+                    'priority': message['message_details']['priority'],
+                    'size_bytes': message['message_details']['content_size_bytes'],
+                    'processing_time_ms': message['message_details']['processing_time_ms'],
+                    'status': message['message_details']['delivery_status']
                 }
-            }
-            message_history.append(message)
-        
-        # Sort by timestamp
-        message_history.sort(key=lambda x: x['timestamp'], reverse=True)
-        
-        # Calculate statistics
-        sent_messages = [m for m in message_history if m['direction'] == 'sent']
-        received_messages = [m for m in message_history if m['direction'] == 'received']
-        
+            })
+
         statistics = {
             'total_messages': len(message_history),
-            'sent_count': len(sent_messages),
-            'received_count': len(received_messages),
-            'avg_processing_time_ms': sum(m['message_details']['processing_time_ms'] for m in message_history) / len(message_history),
-            'success_rate': len([m for m in message_history if m['message_details']['status'] == 'delivered']) / len(message_history) * 100,
-            'most_frequent_counterpart': max(
-                set(m['counterpart']['agent_id'] for m in message_history),
-                key=lambda x: sum(1 for m in message_history if m['counterpart']['agent_id'] == x)
-            ),
-            'message_type_distribution': {
-                msg_type: len([m for m in message_history if m['message_details']['type'] == msg_type])
-                for msg_type in set(m['message_details']['type'] for m in message_history)
-            }
+            'sent_count': len([m for m in message_history if m['direction'] == 'sent']),
+            'received_count': len([m for m in message_history if m['direction'] == 'received'])
         }
-        
+        if message_history:
+            timed = [m['message_details']['processing_time_ms'] for m in message_history
+                     if m['message_details']['processing_time_ms'] is not None]
+            counterparts = {}
+            type_distribution = {}
+            for m in message_history:
+                counterparts[m['counterpart']['agent_id']] = counterparts.get(m['counterpart']['agent_id'], 0) + 1
+                type_distribution[m['message_details']['type']] = type_distribution.get(m['message_details']['type'], 0) + 1
+            statistics.update({
+                'avg_processing_time_ms': sum(timed) / len(timed) if timed else 0,
+                'success_rate': len([m for m in message_history if m['message_details']['status'] == 'delivered']) / len(message_history) * 100,
+                'most_frequent_counterpart': max(counterparts, key=counterparts.get),
+                'message_type_distribution': type_distribution
+            })
+
         return jsonify({
             'agent_id': agent_id,
             'message_history': message_history,
@@ -3254,33 +3259,31 @@ def metrics_summary():
 # Agent Activities endpoint for AgentActivityTable (REAL DATA)
 @app.route('/api/agent-activities')
 def agent_activities():
-    db_path = os.path.join(os.path.dirname(__file__), 'data', 'enterprise_operations.db')
     activities = []
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id, department, operation_type, description, data, timestamp
-            FROM business_operations
-            ORDER BY timestamp DESC
-            LIMIT 50
-        ''')
-        rows = cursor.fetchall()
-        for row in rows:
-            # Try to extract agent/activity info from data JSON if available
-            try:
-                data_json = json.loads(row[4]) if row[4] else {}
-            except Exception:
-                data_json = {}
-            activities.append({
-                'id': row[0],
-                'agentName': data_json.get('agent_name') or row[1],
-                'activity': data_json.get('activity') or row[2],
-                'status': data_json.get('status') or 'Completed',
-                'timestamp': row[5],
-                'duration': data_json.get('duration') or ''
-            })
-        conn.close()
+        with enterprise_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, department, operation_type, description, data, timestamp
+                FROM business_operations
+                ORDER BY timestamp DESC
+                LIMIT 50
+            ''')
+            rows = cursor.fetchall()
+            for row in rows:
+                # Try to extract agent/activity info from data JSON if available
+                try:
+                    data_json = json.loads(row[4]) if row[4] else {}
+                except Exception:
+                    data_json = {}
+                activities.append({
+                    'id': row[0],
+                    'agentName': data_json.get('agent_name') or row[1],
+                    'activity': data_json.get('activity') or row[2],
+                    'status': data_json.get('status') or 'Completed',
+                    'timestamp': row[5],
+                    'duration': data_json.get('duration') or ''
+                })
     except Exception as e:
         return jsonify({'error': f'Failed to fetch activities: {e}'}), 500
     return jsonify(activities)
@@ -3338,50 +3341,50 @@ def api_registry():
 # === ENTERPRISE OPERATIONS ENDPOINTS ===
 
 @app.route('/api/enterprise/operations/overview')
+@cache_response(ttl=10, tags=('objectives', 'departments', 'workflows', 'revenue'))
 def get_operations_overview():
     """Get comprehensive enterprise operations overview"""
     try:
-        conn = sqlite3.connect(ENTERPRISE_DB)
-        
-        # Get business objectives summary
-        objectives_cursor = conn.execute("""
-            SELECT COUNT(*) as total, 
-                   SUM(CASE WHEN status = 'In Progress' THEN 1 ELSE 0 END) as active,
-                   AVG(progress) as avg_progress
-            FROM business_objectives
-        """)
-        objectives_data = objectives_cursor.fetchone()
-        
-        # Get department activities summary
-        departments_cursor = conn.execute("""
-            SELECT COUNT(DISTINCT department) as total_departments,
-                   COUNT(*) as total_activities,
-                   SUM(CASE WHEN status = 'Active' THEN 1 ELSE 0 END) as active_activities
-            FROM department_activities
-        """)
-        departments_data = departments_cursor.fetchone()
-        
-        # Get recent workflow executions
-        workflows_cursor = conn.execute("""
-            SELECT COUNT(*) as total_executions,
-                   SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as completed,
-                   AVG(duration_minutes) as avg_duration
-            FROM workflow_executions
-            WHERE DATE(created_at) >= DATE('now', '-7 days')
-        """)
-        workflows_data = workflows_cursor.fetchone()
-        
-        # Get revenue metrics
-        revenue_cursor = conn.execute("""
-            SELECT SUM(amount) as total_revenue,
-                   COUNT(*) as total_records,
-                   AVG(amount) as avg_amount
-            FROM revenue_tracking
-            WHERE DATE(date) >= DATE('now', '-30 days')
-        """)
-        revenue_data = revenue_cursor.fetchone()
-        
-        conn.close()
+        with enterprise_pool.connection() as conn:
+        
+            # Get business objectives summary
+            objectives_cursor = conn.execute("""
+                SELECT COUNT(*) as total, 
+                       SUM(CASE WHEN status = 'In Progress' THEN 1 ELSE 0 END) as active,
+                       AVG(progress) as avg_progress
+                FROM business_objectives
+            """)
+            objectives_data = objectives_cursor.fetchone()
+        
+            # Get department activities summary
+            departments_cursor = conn.execute("""
+                SELECT COUNT(DISTINCT department) as total_departments,
+                       COUNT(*) as total_activities,
+                       SUM(CASE WHEN status = 'Active' THEN 1 ELSE 0 END) as active_activities
+                FROM department_activities
+            """)
+            departments_data = departments_cursor.fetchone()
+        
+            # Get recent workflow executions
+            workflows_cursor = conn.execute("""
+                SELECT COUNT(*) as total_executions,
+                       SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as completed,
+                       AVG(duration_minutes) as avg_duration
+                FROM workflow_executions
+                WHERE DATE(created_at) >= DATE('now', '-7 days')
+            """)
+            workflows_data = workflows_cursor.fetchone()
+        
+            # Get revenue metrics
+            revenue_cursor = conn.execute("""
+                SELECT SUM(amount) as total_revenue,
+                       COUNT(*) as total_records,
+                       AVG(amount) as avg_amount
+                FROM revenue_tracking
+                WHERE DATE(date) >= DATE('now', '-30 days')
+            """)
+            revenue_data = revenue_cursor.fetchone()
+        
         
         return jsonify({
             'overview': {
@@ -3413,34 +3416,34 @@ def get_operations_overview():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/enterprise/operations/business-objectives')
+@cache_response(ttl=30, tags=('objectives',))
 def get_business_objectives():
     """Get detailed business objectives data"""
     try:
-        conn = sqlite3.connect(ENTERPRISE_DB)
-        cursor = conn.execute("""
-            SELECT id, title, description, status, progress, priority, 
-                   owner, start_date, target_date, created_at, updated_at
-            FROM business_objectives
-            ORDER BY priority DESC, created_at DESC
-        """)
-        
-        objectives = []
-        for row in cursor.fetchall():
-            objectives.append({
-                'id': row[0],
-                'title': row[1],
-                'description': row[2],
-                'status': row[3],
-                'progress': row[4],
-                'priority': row[5],
-                'owner': row[6],
-                'start_date': row[7],
-                'target_date': row[8],
-                'created_at': row[9],
-                'updated_at': row[10]
-            })
+        with enterprise_pool.connection() as conn:
+            cursor = conn.execute("""
+                SELECT id, title, description, status, progress, priority, 
+                       owner, start_date, target_date, created_at, updated_at
+                FROM business_objectives
+                ORDER BY priority DESC, created_at DESC
+            """)
+        
+            objectives = []
+            for row in cursor.fetchall():
+                objectives.append({
+                    'id': row[0],
+                    'title': row[1],
+                    'description': row[2],
+                    'status': row[3],
+                    'progress': row[4],
+                    'priority': row[5],
+                    'owner': row[6],
+                    'start_date': row[7],
+                    'target_date': row[8],
+                    'created_at': row[9],
+                    'updated_at': row[10]
+                })
         
-        conn.close()
         
         return jsonify({
             'objectives': objectives,
@@ -3455,22 +3458,23 @@ def update_business_objective(objective_id):
     """Update a business objective"""
     try:
         data = request.get_json()
-        conn = sqlite3.connect(ENTERPRISE_DB)
-        
-        # Update objective
-        cursor = conn.execute("""
-            UPDATE business_objectives 
-            SET progress = ?, status = ?, updated_at = ?
-            WHERE id = ?
-        """, (
-            data.get('progress'),
-            data.get('status'),
-            datetime.now().isoformat(),
-            objective_id
-        ))
-        
-        conn.commit()
-        conn.close()
+        with enterprise_pool.connection() as conn:
+        
+            # Update objective
+            cursor = conn.execute("""
+                UPDATE business_objectives 
+                SET progress = ?, status = ?, updated_at = ?
+                WHERE id = ?
+            """, (
+                data.get('progress'),
+                data.get('status'),
+                datetime.now().isoformat(),
+                objective_id
+            ))
+        
+            conn.commit()
+        
+        response_cache.invalidate('objectives')
         
         return jsonify({
             'message': 'Objective updated successfully',
@@ -3481,61 +3485,61 @@ def update_business_objective(objective_id):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/enterprise/operations/departments')
+@cache_response(ttl=30, tags=('departments',))
 def get_department_operations():
     """Get comprehensive department operations data"""
     try:
-        conn = sqlite3.connect(ENTERPRISE_DB)
-        
-        # Get department summary
-        summary_cursor = conn.execute("""
-            SELECT department, 
-                   COUNT(*) as total_activities,
-                   SUM(CASE WHEN status = 'Active' THEN 1 ELSE 0 END) as active_activities,
-                   AVG(budget_allocated) as avg_budget,
-                   SUM(budget_used) as total_budget_used
-            FROM department_activities
-            GROUP BY department
-            ORDER BY department
-        """)
-        
-        departments = []
-        for row in summary_cursor.fetchall():
-            # Get recent activities for this department
-            activities_cursor = conn.execute("""
-                SELECT id, activity_name, status, budget_allocated, budget_used, 
-                       start_date, end_date, created_at
+        with enterprise_pool.connection() as conn:
+        
+            # Get department summary
+            summary_cursor = conn.execute("""
+                SELECT department, 
+                       COUNT(*) as total_activities,
+                       SUM(CASE WHEN status = 'Active' THEN 1 ELSE 0 END) as active_activities,
+                       AVG(budget_allocated) as avg_budget,
+                       SUM(budget_used) as total_budget_used
                 FROM department_activities
-                WHERE department = ?
-                ORDER BY created_at DESC
-                LIMIT 5
-            """, (row[0],))
+                GROUP BY department
+                ORDER BY department
+            """)
+        
+            departments = []
+            for row in summary_cursor.fetchall():
+                # Get recent activities for this department
+                activities_cursor = conn.execute("""
+                    SELECT id, activity_name, status, budget_allocated, budget_used, 
+                           start_date, end_date, created_at
+                    FROM department_activities
+                    WHERE department = ?
+                    ORDER BY created_at DESC
+                    LIMIT 5
+                """, (row[0],))
             
-            recent_activities = []
-            for activity_row in activities_cursor.fetchall():
-                recent_activities.append({
-                    'id': activity_row[0],
-                    'activity_name': activity_row[1],
-                    'status': activity_row[2],
-                    'budget_allocated': activity_row[3],
-                    'budget_used': activity_row[4],
-                    'start_date': activity_row[5],
-                    'end_date': activity_row[6],
-                    'created_at': activity_row[7]
-                })
+                recent_activities = []
+                for activity_row in activities_cursor.fetchall():
+                    recent_activities.append({
+                        'id': activity_row[0],
+                        'activity_name': activity_row[1],
+                        'status': activity_row[2],
+                        'budget_allocated': activity_row[3],
+                        'budget_used': activity_row[4],
+                        'start_date': activity_row[5],
+                        'end_date': activity_row[6],
+                        'created_at': activity_row[7]
+                    })
             
-            departments.append({
-                'department': row[0],
-                'metrics': {
-                    'total_activities': row[1],
-                    'active_activities': row[2],
-                    'average_budget': round(row[3] or 0, 2),
-                    'total_budget_used': round(row[4] or 0, 2),
-                    'budget_utilization': round((row[4] or 0) / (row[3] or 1) * 100, 2)
-                },
-                'recent_activities': recent_activities
-            })
+                departments.append({
+                    'department': row[0],
+                    'metrics': {
+                        'total_activities': row[1],
+                        'active_activities': row[2],
+                        'average_budget': round(row[3] or 0, 2),
+                        'total_budget_used': round(row[4] or 0, 2),
+                        'budget_utilization': round((row[4] or 0) / (row[3] or 1) * 100, 2)
+                    },
+                    'recent_activities': recent_activities
+                })
         
-        conn.close()
         
         return jsonify({
             'departments': departments,
@@ -3546,77 +3550,77 @@ def get_department_operations():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/enterprise/operations/workflows')
+@cache_response(ttl=10, tags=('workflows',))
 def get_workflow_operations():
     """Get comprehensive workflow operations data"""
     try:
-        conn = sqlite3.connect(ENTERPRISE_DB)
-        
-        # Get workflow execution summary
-        summary_cursor = conn.execute("""
-            SELECT status,
-                   COUNT(*) as count,
-                   AVG(duration_minutes) as avg_duration,
-                   MIN(duration_minutes) as min_duration,
-                   MAX(duration_minutes) as max_duration
-            FROM workflow_executions
-            WHERE DATE(created_at) >= DATE('now', '-30 days')
-            GROUP BY status
-        """)
-        
-        status_summary = {}
-        for row in summary_cursor.fetchall():
-            status_summary[row[0]] = {
-                'count': row[1],
-                'avg_duration': round(row[2] or 0, 2),
-                'min_duration': row[3] or 0,
-                'max_duration': row[4] or 0
-            }
+        with enterprise_pool.connection() as conn:
+        
+            # Get workflow execution summary
+            summary_cursor = conn.execute("""
+                SELECT status,
+                       COUNT(*) as count,
+                       AVG(duration_minutes) as avg_duration,
+                       MIN(duration_minutes) as min_duration,
+                       MAX(duration_minutes) as max_duration
+                FROM workflow_executions
+                WHERE DATE(created_at) >= DATE('now', '-30 days')
+                GROUP BY status
+            """)
         
-        # Get recent executions
-        executions_cursor = conn.execute("""
-            SELECT id, workflow_name, status, duration_minutes, 
-                   agent_count, start_time, end_time, created_at
-            FROM workflow_executions
-            ORDER BY created_at DESC
-            LIMIT 20
-        """)
-        
-        recent_executions = []
-        for row in executions_cursor.fetchall():
-            recent_executions.append({
-                'id': row[0],
-                'workflow_name': row[1],
-                'status': row[2],
-                'duration_minutes': row[3],
-                'agent_count': row[4],
-                'start_time': row[5],
-                'end_time': row[6],
-                'created_at': row[7]
-            })
+            status_summary = {}
+            for row in summary_cursor.fetchall():
+                status_summary[row[0]] = {
+                    'count': row[1],
+                    'avg_duration': round(row[2] or 0, 2),
+                    'min_duration': row[3] or 0,
+                    'max_duration': row[4] or 0
+                }
         
-        # Get workflow performance trends
-        trends_cursor = conn.execute("""
-            SELECT DATE(created_at) as execution_date,
-                   COUNT(*) as daily_executions,
-                   AVG(duration_minutes) as avg_duration,
-                   SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as successful_executions
-            FROM workflow_executions
-            WHERE DATE(created_at) >= DATE('now', '-14 days')
-            GROUP BY DATE(created_at)
-            ORDER BY execution_date DESC
-        """)
+            # Get recent executions
+            executions_cursor = conn.execute("""
+                SELECT id, workflow_name, status, duration_minutes, 
+                       agent_count, start_time, end_time, created_at
+                FROM workflow_executions
+                ORDER BY created_at DESC
+                LIMIT 20
+            """)
         
-        performance_trends = []
-        for row in trends_cursor.fetchall():
-            performance_trends.append({
-                'date': row[0],
-                'executions': row[1],
-                'avg_duration': round(row[2] or 0, 2),
-                'successful': row[3],
-                'success_rate': round((row[3] / row[1]) * 100, 2) if row[1] > 0 else 0
-            })
+            recent_executions = []
+            for row in executions_cursor.fetchall():
+                recent_executions.append({
+                    'id': row[0],
+                    'workflow_name': row[1],
+                    'status': row[2],
+                    'duration_minutes': row[3],
+                    'agent_count': row[4],
+                    'start_time': row[5],
+                    'end_time': row[6],
+                    'created_at': row[7]
+                })
+        
+            # Get workflow performance trends
+            trends_cursor = conn.execute("""
+                SELECT DATE(created_at) as execution_date,
+                       COUNT(*) as daily_executions,
+                       AVG(duration_minutes) as avg_duration,
+                       SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as successful_executions
+                FROM workflow_executions
+                WHERE DATE(created_at) >= DATE('now', '-14 days')
+                GROUP BY DATE(created_at)
+                ORDER BY execution_date DESC
+            """)
+        
+            performance_trends = []
+            for row in trends_cursor.fetchall():
+                performance_trends.append({
+                    'date': row[0],
+                    'executions': row[1],
+                    'avg_duration': round(row[2] or 0, 2),
+                    'successful': row[3],
+                    'success_rate': round((row[3] / row[1]) * 100, 2) if row[1] > 0 else 0
+                })
         
-        conn.close()
         
         return jsonify({
             'summary': status_summary,
@@ -3628,84 +3632,84 @@ def get_workflow_operations():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/enterprise/operations/revenue')
+@cache_response(ttl=60, tags=('revenue',))
 def get_revenue_operations():
     """Get comprehensive revenue operations data"""
     try:
-        conn = sqlite3.connect(ENTERPRISE_DB)
-        
-        # Get revenue summary
-        summary_cursor = conn.execute("""
-            SELECT SUM(amount) as total_revenue,
-                   COUNT(*) as total_transactions,
-                   AVG(amount) as avg_transaction,
-                   MIN(amount) as min_transaction,
-                   MAX(amount) as max_transaction
-            FROM revenue_tracking
-            WHERE DATE(date) >= DATE('now', '-30 days')
-        """)
-        
-        summary_data = summary_cursor.fetchone()
-        
-        # Get revenue by source
-        source_cursor = conn.execute("""
-            SELECT source, 
-                   SUM(amount) as total_amount,
-                   COUNT(*) as transaction_count,
-                   AVG(amount) as avg_amount
-            FROM revenue_tracking
-            WHERE DATE(date) >= DATE('now', '-30 days')
-            GROUP BY source
-            ORDER BY total_amount DESC
-        """)
-        
-        revenue_by_source = []
-        for row in source_cursor.fetchall():
-            revenue_by_source.append({
-                'source': row[0],
-                'total_amount': round(row[1], 2),
-                'transaction_count': row[2],
-                'average_amount': round(row[3], 2)
-            })
+        with enterprise_pool.connection() as conn:
+        
+            # Get revenue summary
+            summary_cursor = conn.execute("""
+                SELECT SUM(amount) as total_revenue,
+                       COUNT(*) as total_transactions,
+                       AVG(amount) as avg_transaction,
+                       MIN(amount) as min_transaction,
+                       MAX(amount) as max_transaction
+                FROM revenue_tracking
+                WHERE DATE(date) >= DATE('now', '-30 days')
+            """)
         
-        # Get daily revenue trends
-        trends_cursor = conn.execute("""
-            SELECT DATE(date) as revenue_date,
-                   SUM(amount) as daily_revenue,
-                   COUNT(*) as daily_transactions
-            FROM revenue_tracking
-            WHERE DATE(date) >= DATE('now', '-30 days')
-            GROUP BY DATE(date)
-            ORDER BY revenue_date DESC
-        """)
-        
-        revenue_trends = []
-        for row in trends_cursor.fetchall():
-            revenue_trends.append({
-                'date': row[0],
-                'revenue': round(row[1], 2),
-                'transactions': row[2]
-            })
+            summary_data = summary_cursor.fetchone()
+        
+            # Get revenue by source
+            source_cursor = conn.execute("""
+                SELECT source, 
+                       SUM(amount) as total_amount,
+                       COUNT(*) as transaction_count,
+                       AVG(amount) as avg_amount
+                FROM revenue_tracking
+                WHERE DATE(date) >= DATE('now', '-30 days')
+                GROUP BY source
+                ORDER BY total_amount DESC
+            """)
         
-        # Get recent transactions
-        transactions_cursor = conn.execute("""
-            SELECT id, source, amount, description, date, created_at
-            FROM revenue_tracking
-            ORDER BY created_at DESC
-            LIMIT 20
-        """)
-        
-        recent_transactions = []
-        for row in transactions_cursor.fetchall():
-            recent_transactions.append({
-                'id': row[0],
-                'source': row[1],
-                'amount': row[2],
-                'description': row[3],
-                'date': row[4],
-                'created_at': row[5]
-            })
+            revenue_by_source = []
+            for row in source_cursor.fetchall():
+                revenue_by_source.append({
+                    'source': row[0],
+                    'total_amount': round(row[1], 2),
+                    'transaction_count': row[2],
+                    'average_amount': round(row[3], 2)
+                })
+        
+            # Get daily revenue trends
+            trends_cursor = conn.execute("""
+                SELECT DATE(date) as revenue_date,
+                       SUM(amount) as daily_revenue,
+                       COUNT(*) as daily_transactions
+                FROM revenue_tracking
+                WHERE DATE(date) >= DATE('now', '-30 days')
+                GROUP BY DATE(date)
+                ORDER BY revenue_date DESC
+            """)
+        
+            revenue_trends = []
+            for row in trends_cursor.fetchall():
+                revenue_trends.append({
+                    'date': row[0],
+                    'revenue': round(row[1], 2),
+                    'transactions': row[2]
+                })
+        
+            # Get recent transactions
+            transactions_cursor = conn.execute("""
+                SELECT id, source, amount, description, date, created_at
+                FROM revenue_tracking
+                ORDER BY created_at DESC
+                LIMIT 20
+            """)
+        
+            recent_transactions = []
+            for row in transactions_cursor.fetchall():
+                recent_transactions.append({
+                    'id': row[0],
+                    'source': row[1],
+                    'amount': row[2],
+                    'description': row[3],
+                    'date': row[4],
+                    'created_at': row[5]
+                })
         
-        conn.close()
         
         return jsonify({
             'summary': {
@@ -3784,90 +3788,90 @@ def get_system_health():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/enterprise/operations/kpis')
+@cache_response(ttl=15, tags=('objectives', 'departments', 'workflows', 'revenue'))
 def get_enterprise_kpis():
     """Get comprehensive enterprise KPIs and metrics"""
     try:
-        conn = sqlite3.connect(ENTERPRISE_DB)
-        
-        # Calculate business KPIs
-        kpis = {}
-        
-        # Objective completion rate
-        objectives_cursor = conn.execute("""
-            SELECT COUNT(*) as total,
-                   SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as completed,
-                   AVG(progress) as avg_progress
-            FROM business_objectives
-        """)
-        objectives_data = objectives_cursor.fetchone()
-        
-        kpis['objective_completion_rate'] = {
-            'value': round((objectives_data[1] / objectives_data[0]) * 100, 2) if objectives_data[0] > 0 else 0,
-            'total_objectives': objectives_data[0],
-            'completed_objectives': objectives_data[1],
-            'average_progress': round(objectives_data[2] or 0, 2)
-        }
+        with enterprise_pool.connection() as conn:
         
-        # Revenue growth rate
-        revenue_cursor = conn.execute("""
-            SELECT SUM(amount) as current_month
-            FROM revenue_tracking
-            WHERE DATE(date) >= DATE('now', 'start of month')
-        """)
-        current_month_revenue = revenue_cursor.fetchone()[0] or 0
-        
-        previous_month_cursor = conn.execute("""
-            SELECT SUM(amount) as previous_month
-            FROM revenue_tracking
-            WHERE DATE(date) >= DATE('now', 'start of month', '-1 month')
-            AND DATE(date) < DATE('now', 'start of month')
-        """)
-        previous_month_revenue = previous_month_cursor.fetchone()[0] or 0
-        
-        growth_rate = 0
-        if previous_month_revenue > 0:
-            growth_rate = ((current_month_revenue - previous_month_revenue) / previous_month_revenue) * 100
-        
-        kpis['revenue_growth_rate'] = {
-            'value': round(growth_rate, 2),
-            'current_month': round(current_month_revenue, 2),
-            'previous_month': round(previous_month_revenue, 2)
-        }
+            # Calculate business KPIs
+            kpis = {}
         
-        # Workflow efficiency
-        workflow_cursor = conn.execute("""
-            SELECT AVG(duration_minutes) as avg_duration,
-                   SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as completed,
-                   COUNT(*) as total
-            FROM workflow_executions
-            WHERE DATE(created_at) >= DATE('now', '-7 days')
-        """)
-        workflow_data = workflow_cursor.fetchone()
-        
-        kpis['workflow_efficiency'] = {
-            'average_duration': round(workflow_data[0] or 0, 2),
-            'completion_rate': round((workflow_data[1] / workflow_data[2]) * 100, 2) if workflow_data[2] > 0 else 0,
-            'completed_workflows': workflow_data[1],
-            'total_workflows': workflow_data[2]
-        }
+            # Objective completion rate
+            objectives_cursor = conn.execute("""
+                SELECT COUNT(*) as total,
+                       SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as completed,
+                       AVG(progress) as avg_progress
+                FROM business_objectives
+            """)
+            objectives_data = objectives_cursor.fetchone()
         
-        # Department activity rate
-        department_cursor = conn.execute("""
-            SELECT COUNT(DISTINCT department) as active_departments,
-                   COUNT(*) as total_activities,
-                   SUM(CASE WHEN status = 'Active' THEN 1 ELSE 0 END) as active_activities
-            FROM department_activities
-        """)
-        department_data = department_cursor.fetchone()
-        
-        kpis['department_activity_rate'] = {
-            'active_departments': department_data[0],
-            'total_activities': department_data[1],
-            'active_activities': department_data[2],
-            'activity_rate': round((department_data[2] / department_data[1]) * 100, 2) if department_data[1] > 0 else 0
-        }
+            kpis['objective_completion_rate'] = {
+                'value': round((objectives_data[1] / objectives_data[0]) * 100, 2) if objectives_data[0] > 0 else 0,
+                'total_objectives': objectives_data[0],
+                'completed_objectives': objectives_data[1],
+                'average_progress': round(objectives_data[2] or 0, 2)
+            }
+        
+            # Revenue growth rate
+            revenue_cursor = conn.execute("""
+                SELECT SUM(amount) as current_month
+                FROM revenue_tracking
+                WHERE DATE(date) >= DATE('now', 'start of month')
+            """)
+            current_month_revenue = revenue_cursor.fetchone()[0] or 0
+        
+            previous_month_cursor = conn.execute("""
+                SELECT SUM(amount) as previous_month
+                FROM revenue_tracking
+                WHERE DATE(date) >= DATE('now', 'start of month', '-1 month')
+                AND DATE(date) < DATE('now', 'start of month')
+            """)
+            previous_month_revenue = previous_month_cursor.fetchone()[0] or 0
+        
+            growth_rate = 0
+            if previous_month_revenue > 0:
+                growth_rate = ((current_month_revenue - previous_month_revenue) / previous_month_revenue) * 100
+        
+            kpis['revenue_growth_rate'] = {
+                'value': round(growth_rate, 2),
+                'current_month': round(current_month_revenue, 2),
+                'previous_month': round(previous_month_revenue, 2)
+            }
+        
+            # Workflow efficiency
+            workflow_cursor = conn.execute("""
+                SELECT AVG(duration_minutes) as avg_duration,
+                       SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as completed,
+                       COUNT(*) as total
+                FROM workflow_executions
+                WHERE DATE(created_at) >= DATE('now', '-7 days')
+            """)
+            workflow_data = workflow_cursor.fetchone()
+        
+            kpis['workflow_efficiency'] = {
+                'average_duration': round(workflow_data[0] or 0, 2),
+                'completion_rate': round((workflow_data[1] / workflow_data[2]) * 100, 2) if workflow_data[2] > 0 else 0,
+                'completed_workflows': workflow_data[1],
+                'total_workflows': workflow_data[2]
+            }
+        
+            # Department activity rate
+            department_cursor = conn.execute("""
+                SELECT COUNT(DISTINCT department) as active_departments,
+                       COUNT(*) as total_activities,
+                       SUM(CASE WHEN status = 'Active' THEN 1 ELSE 0 END) as active_activities
+                FROM department_activities
+            """)
+            department_data = department_cursor.fetchone()
+        
+            kpis['department_activity_rate'] = {
+                'active_departments': department_data[0],
+                'total_activities': department_data[1],
+                'active_activities': department_data[2],
+                'activity_rate': round((department_data[2] / department_data[1]) * 100, 2) if department_data[1] > 0 else 0
+            }
         
-        conn.close()
         
         return jsonify({
             'kpis': kpis,
@@ -3882,6 +3886,7 @@ def get_enterprise_kpis():
 # === AGENT MONITORING AND CONTROL ENDPOINTS ===
 
 @app.route('/api/enterprise/agents/overview')
+@cache_response(ttl=10, tags=('agents',))
 def get_agents_overview():
     """Get comprehensive agent system overview"""
     try:
@@ -3920,6 +3925,7 @@ def get_agents_overview():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/enterprise/agents/list')
+@cache_response(ttl=10, tags=('agents',))
 def get_agents_list():
     """Get detailed list of all agents"""
     try:
@@ -4053,6 +4059,7 @@ def control_agent(agent_id):
             }.get(action, 'operational')
         }
         
+        response_cache.invalidate('agents')
         return jsonify(control_result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -4094,6 +4101,7 @@ def agent_configuration(agent_id):
                 'updated_fields': list(new_config.keys()),
                 'timestamp': datetime.now().isoformat()
             }
+            response_cache.invalidate('agents')
             return jsonify(result)
             
     except Exception as e:
@@ -4130,6 +4138,7 @@ def bulk_agent_control():
             'timestamp': datetime.now().isoformat()
         }
         
+        response_cache.invalidate('agents')
         return jsonify({
             'summary': summary,
             'results': results
@@ -4226,52 +4235,52 @@ def get_agents_performance():
 # === WORKFLOW STATUS AND CONTROL ENDPOINTS ===
 
 @app.route('/api/enterprise/workflows/overview')
+@cache_response(ttl=10, tags=('workflows',))
 def get_workflows_overview():
     """Get comprehensive workflow system overview"""
     try:
-        conn = sqlite3.connect(ENTERPRISE_DB)
-        
-        # Get workflow statistics
-        stats_cursor = conn.execute("""
-            SELECT 
-                COUNT(*) as total_workflows,
-                SUM(CASE WHEN status = 'Running' THEN 1 ELSE 0 END) as active_workflows,
-                SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as completed_workflows,
-                SUM(CASE WHEN status = 'Failed' THEN 1 ELSE 0 END) as failed_workflows,
-                AVG(duration_minutes) as avg_duration,
-                AVG(agent_count) as avg_agents_per_workflow
-            FROM workflow_executions
-            WHERE DATE(created_at) >= DATE('now', '-7 days')
-        """)
-        
-        stats = stats_cursor.fetchone()
-        
-        # Get workflow performance by type
-        type_cursor = conn.execute("""
-            SELECT 
-                workflow_name,
-                COUNT(*) as execution_count,
-                AVG(duration_minutes) as avg_duration,
-                SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as success_count,
-                MAX(created_at) as last_execution
-            FROM workflow_executions
-            WHERE DATE(created_at) >= DATE('now', '-30 days')
-            GROUP BY workflow_name
-            ORDER BY execution_count DESC
-        """)
-        
-        workflow_types = []
-        for row in type_cursor.fetchall():
-            success_rate = (row[3] / row[1]) * 100 if row[1] > 0 else 0
-            workflow_types.append({
-                'name': row[0],
-                'execution_count': row[1],
-                'avg_duration': round(row[2] or 0, 2),
-                'success_rate': round(success_rate, 2),
-                'last_execution': row[4]
-            })
+        with enterprise_pool.connection() as conn:
+        
+            # Get workflow statistics
+            stats_cursor = conn.execute("""
+                SELECT 
+                    COUNT(*) as total_workflows,
+                    SUM(CASE WHEN status = 'Running' THEN 1 ELSE 0 END) as active_workflows,
+                    SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as completed_workflows,
+                    SUM(CASE WHEN status = 'Failed' THEN 1 ELSE 0 END) as failed_workflows,
+                    AVG(duration_minutes) as avg_duration,
+                    AVG(agent_count) as avg_agents_per_workflow
+                FROM workflow_executions
+                WHERE DATE(created_at) >= DATE('now', '-7 days')
+            """)
+        
+            stats = stats_cursor.fetchone()
+        
+            # Get workflow performance by type
+            type_cursor = conn.execute("""
+                SELECT 
+                    workflow_name,
+                    COUNT(*) as execution_count,
+                    AVG(duration_minutes) as avg_duration,
+                    SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as success_count,
+                    MAX(created_at) as last_execution
+                FROM workflow_executions
+                WHERE DATE(created_at) >= DATE('now', '-30 days')
+                GROUP BY workflow_name
+                ORDER BY execution_count DESC
+            """)
+        
+            workflow_types = []
+            for row in type_cursor.fetchall():
+                success_rate = (row[3] / row[1]) * 100 if row[1] > 0 else 0
+                workflow_types.append({
+                    'name': row[0],
+                    'execution_count': row[1],
+                    'avg_duration': round(row[2] or 0, 2),
+                    'success_rate': round(success_rate, 2),
+                    'last_execution': row[4]
+                })
         
-        conn.close()
         
         # Add real-time workflow queue status (simulated)
         queue_status = {
@@ -4301,6 +4310,7 @@ def get_workflows_overview():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/enterprise/workflows/active')
+@cache_response(ttl=10, tags=('workflows',))
 def get_active_workflows():
     """Get currently active/running workflows"""
     try:
@@ -4355,18 +4365,17 @@ def get_active_workflows():
 def get_workflow_details(workflow_id):
     """Get detailed information for a specific workflow"""
     try:
-        conn = sqlite3.connect(ENTERPRISE_DB)
+        with enterprise_pool.connection() as conn:
         
-        # Try to get workflow from database first
-        cursor = conn.execute("""
-            SELECT id, workflow_name, status, duration_minutes, agent_count,
-                   start_time, end_time, created_at
-            FROM workflow_executions
-            WHERE id = ?
-        """, (workflow_id,))
+            # Try to get workflow from database first
+            cursor = conn.execute("""
+                SELECT id, workflow_name, status, duration_minutes, agent_count,
+                       start_time, end_time, created_at
+                FROM workflow_executions
+                WHERE id = ?
+            """, (workflow_id,))
         
-        workflow_row = cursor.fetchone()
-        conn.close()
+            workflow_row = cursor.fetchone()
         
         if workflow_row:
             # Historical workflow
@@ -4465,6 +4474,7 @@ def control_workflow(workflow_id):
                 'resource_impact': random.choice(['minimal', 'moderate', 'significant'])
             }
         
+        response_cache.invalidate('workflows')
         return jsonify(control_result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -4569,6 +4579,7 @@ def create_workflow():
             'created_at': datetime.now().isoformat()
         }
         
+        response_cache.invalidate('workflows')
         return jsonify(creation_result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -4599,6 +4610,7 @@ def schedule_workflow():
             'created_at': datetime.now().isoformat()
         }
         
+        response_cache.invalidate('workflows')
         return jsonify(schedule_result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -4846,57 +4858,57 @@ def get_agent_metrics():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/enterprise/metrics/business')
+@cache_response(ttl=30, tags=('objectives', 'departments', 'workflows', 'revenue'))
 def get_business_performance_metrics():
     """Get business performance metrics from database"""
     try:
-        conn = sqlite3.connect(ENTERPRISE_DB)
-        
-        # Get revenue metrics
-        revenue_cursor = conn.execute("""
-            SELECT 
-                SUM(amount) as total_revenue,
-                COUNT(*) as transaction_count,
-                AVG(amount) as avg_transaction,
-                MAX(amount) as max_transaction
-            FROM revenue_tracking
-            WHERE DATE(date) >= DATE('now', '-30 days')
-        """)
-        revenue_data = revenue_cursor.fetchone()
-        
-        # Get objective progress
-        objectives_cursor = conn.execute("""
-            SELECT 
-                COUNT(*) as total_objectives,
-                AVG(progress) as avg_progress,
-                SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as completed_objectives
-            FROM business_objectives
-        """)
-        objectives_data = objectives_cursor.fetchone()
-        
-        # Get department activity metrics
-        departments_cursor = conn.execute("""
-            SELECT 
-                COUNT(DISTINCT department) as active_departments,
-                COUNT(*) as total_activities,
-                SUM(budget_allocated) as total_budget,
-                SUM(budget_used) as budget_used
-            FROM department_activities
-            WHERE status = 'Active'
-        """)
-        departments_data = departments_cursor.fetchone()
-        
-        # Get workflow metrics
-        workflows_cursor = conn.execute("""
-            SELECT 
-                COUNT(*) as total_workflows,
-                AVG(duration_minutes) as avg_duration,
-                SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as completed_workflows
-            FROM workflow_executions
-            WHERE DATE(created_at) >= DATE('now', '-7 days')
-        """)
-        workflows_data = workflows_cursor.fetchone()
-        
-        conn.close()
+        with enterprise_pool.connection() as conn:
+        
+            # Get revenue metrics
+            revenue_cursor = conn.execute("""
+                SELECT 
+                    SUM(amount) as total_revenue,
+                    COUNT(*) as transaction_count,
+                    AVG(amount) as avg_transaction,
+                    MAX(amount) as max_transaction
+                FROM revenue_tracking
+                WHERE DATE(date) >= DATE('now', '-30 days')
+            """)
+            revenue_data = revenue_cursor.fetchone()
+        
+            # Get objective progress
+            objectives_cursor = conn.execute("""
+                SELECT 
+                    COUNT(*) as total_objectives,
+                    AVG(progress) as avg_progress,
+                    SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as completed_objectives
+                FROM business_objectives
+            """)
+            objectives_data = objectives_cursor.fetchone()
+        
+            # Get department activity metrics
+            departments_cursor = conn.execute("""
+                SELECT 
+                    COUNT(DISTINCT department) as active_departments,
+                    COUNT(*) as total_activities,
+                    SUM(budget_allocated) as total_budget,
+                    SUM(budget_used) as budget_used
+                FROM department_activities
+                WHERE status = 'Active'
+            """)
+            departments_data = departments_cursor.fetchone()
+        
+            # Get workflow metrics
+            workflows_cursor = conn.execute("""
+                SELECT 
+                    COUNT(*) as total_workflows,
+                    AVG(duration_minutes) as avg_duration,
+                    SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as completed_workflows
+                FROM workflow_executions
+                WHERE DATE(created_at) >= DATE('now', '-7 days')
+            """)
+            workflows_data = workflows_cursor.fetchone()
+        
         
         business_metrics = {
             'revenue': {
@@ -5096,11 +5108,10 @@ def get_metrics_trends():
 # === BUSINESS INTELLIGENCE DATA ENDPOINTS ===
 
 @app.route('/api/enterprise/bi/overview')
+@cache_response(ttl=30, tags=('objectives', 'departments', 'workflows', 'revenue'))
 def get_bi_overview():
     """Get comprehensive business intelligence overview"""
     try:
-        conn = sqlite3.connect(ENTERPRISE_DB)
-        
         # Calculate comprehensive BI metrics
         bi_overview = {
             'revenue_analytics': {
@@ -5154,7 +5165,6 @@ def get_bi_overview():
             ]
         }
         
-        conn.close()
         
         return jsonify({
             'bi_overview': bi_overview,
@@ -6466,40 +6476,42 @@ def emergency_drill():
 
 # === WEBSOCKET EVENT HANDLERS ===
 
-# Store client subscriptions
-client_subscriptions = {}
-data_broadcast_timers = {}
+from realtime_channels import ChannelHub, channel_room
+
+# Channel snapshots and subscriptions; each channel maps to a SocketIO room
+channel_hub = ChannelHub()
 
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection"""
     print(f"Client connected: {request.sid}")
-    client_subscriptions[request.sid] = {}
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
     print(f"Client disconnected: {request.sid}")
-    if request.sid in client_subscriptions:
-        del client_subscriptions[request.sid]
+    # SocketIO drops room membership itself; only our bookkeeping needs clearing
+    channel_hub.remove_client(request.sid)
 
 @socketio.on('subscribe')
 def handle_subscribe(data):
     """Handle subscription requests"""
     subscriptions = data.get('subscriptions', [])
-    client_subscriptions[request.sid] = {sub: True for sub in subscriptions}
+    joined, left = channel_hub.subscribe(request.sid, subscriptions)
+    for channel in left:
+        leave_room(channel_room(channel))
+    for channel in joined:
+        join_room(channel_room(channel))
     
     print(f"Client {request.sid} subscribed to: {subscriptions}")
     
-    # Send initial data for subscribed channels
+    # Send full snapshots (also used by clients to resync after a missed delta); later ticks are deltas
     for subscription in subscriptions:
-        initial_data = get_initial_data(subscription)
-        if initial_data:
-            emit('data', {
-                'type': subscription,
-                'payload': initial_data,
-                'timestamp': datetime.now().isoformat()
-            })
+        channel_hub.seed(subscription, get_initial_data(subscription))
+        snapshot = channel_hub.snapshot(subscription)
+        if snapshot:
+            snapshot['timestamp'] = datetime.now().isoformat()
+            emit('data', snapshot)
 
 @socketio.on('heartbeat')
 def handle_heartbeat():
@@ -6542,36 +6554,33 @@ def get_initial_data(data_type):
     except:
         return None
 
+def publish_channel_data(channel, payload):
+    """Queue the latest value for a channel; sent as a delta on the next broadcast tick"""
+    channel_hub.publish(channel, payload)
+
+def sample_real_time_data():
+    """Publish sample real-time data for the built-in channels"""
+    publish_channel_data('cpu_usage', {'value': random.uniform(45, 85), 'timestamp': datetime.now().isoformat()})
+    publish_channel_data('memory_usage', {'value': random.uniform(60, 90), 'timestamp': datetime.now().isoformat()})
+    publish_channel_data('network_io', {
+        'inbound': random.uniform(10, 50),
+        'outbound': random.uniform(5, 30),
+        'timestamp': datetime.now().isoformat()
+    })
+    publish_channel_data('agent_status_update', {
+        'agent_id': f'agent_{random.randint(1, 32)}',
+        'status': random.choice(['operational', 'warning', 'maintenance']),
+        'timestamp': datetime.now().isoformat()
+    })
+
 def broadcast_real_time_data():
-    """Broadcast real-time data to subscribed clients"""
-    if not client_subscriptions:
-        return
-    
-    # Generate sample real-time data
-    data_updates = {
-        'cpu_usage': {'value': random.uniform(45, 85), 'timestamp': datetime.now().isoformat()},
-        'memory_usage': {'value': random.uniform(60, 90), 'timestamp': datetime.now().isoformat()},
-        'network_io': {
-            'inbound': random.uniform(10, 50),
-            'outbound': random.uniform(5, 30),
-            'timestamp': datetime.now().isoformat()
-        },
-        'agent_status_update': {
-            'agent_id': f'agent_{random.randint(1, 32)}',
-            'status': random.choice(['operational', 'warning', 'maintenance']),
-            'timestamp': datetime.now().isoformat()
-        }
-    }
-    
-    # Send to subscribed clients
-    for client_id, subscriptions in client_subscriptions.items():
-        for data_type, payload in data_updates.items():
-            if subscriptions.get(data_type):
-                socketio.emit('data', {
-                    'type': data_type,
-                    'payload': payload,
-                    'timestamp': datetime.now().isoformat()
-                }, room=client_id)
+    """Emit one coalesced delta per changed channel to that channel's room"""
+    sample_real_time_data()
+
+    timestamp = datetime.now().isoformat()
+    for room, message in channel_hub.collect_updates():
+        message['timestamp'] = timestamp
+        socketio.emit('data', message, room=room)
 
 # Start background data broadcasting
 def start_data_broadcasting():
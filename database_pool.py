@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Database Pool - Bounded SQLite Connection Pool
+Shared by every backend_api.py route. Connections are created lazily up to a
+hard maximum, configured once with WAL journaling and synchronous=NORMAL,
+validated before reuse and recycled on age, use count or error.
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available before the wait timeout"""
+
+
+class _PooledConnection:
+    """Bookkeeping for one pooled sqlite3 connection"""
+
+    __slots__ = ('connection', 'created_at', 'last_used', 'uses')
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.uses = 0
+
+
+class DatabasePool:
+    """Bounded, health-checked SQLite connection pool."""
+
+    def __init__(self, db_path: str, max_size: int = 10, wait_timeout: float = 10.0,
+                 busy_timeout: float = 30.0, max_lifetime: float = 3600.0, max_uses: int = 10000,
+                 validate_after: float = 30.0, statement_cache_size: int = 256):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.wait_timeout = wait_timeout
+        self.busy_timeout = busy_timeout
+        self.max_lifetime = max_lifetime
+        self.max_uses = max_uses
+        self.validate_after = validate_after
+        self.statement_cache_size = statement_cache_size
+
+        self._idle: List[_PooledConnection] = []
+        self._in_use: Dict[int, _PooledConnection] = {}
+        self._size = 0
+        self._condition = threading.Condition(threading.Lock())
+
+        # Metrics
+        self.created = 0
+        self.recycled = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def _create_connection(self) -> _PooledConnection:
+        # sqlite3 keeps an LRU of prepared statements per connection
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=self.busy_timeout,
+                               cached_statements=self.statement_cache_size)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return _PooledConnection(conn)
+
+    def _is_healthy(self, pooled: _PooledConnection) -> bool:
+        now = time.time()
+        if now - pooled.created_at > self.max_lifetime or pooled.uses >= self.max_uses:
+            return False
+        if now - pooled.last_used > self.validate_after:
+            try:
+                pooled.connection.execute("SELECT 1").fetchone()
+            except sqlite3.Error:
+                return False
+        return True
+
+    def _discard(self, pooled: _PooledConnection):
+        try:
+            pooled.connection.close()
+        except sqlite3.Error:
+            pass
+        self.recycled += 1
+
+    def acquire(self, timeout: Optional[float] = None) -> sqlite3.Connection:
+        """Check out a connection, waiting up to `timeout` seconds when the pool is exhausted"""
+        timeout = self.wait_timeout if timeout is None else timeout
+        started = time.perf_counter()
+        deadline = started + timeout
+
+        with self._condition:
+            while True:
+                pooled = None
+                if self._idle:
+                    pooled = self._idle.pop()
+                    if not self._is_healthy(pooled):
+                        self._discard(pooled)
+                        self._size -= 1
+                        continue
+                elif self._size < self.max_size:
+                    # Reserve the slot before connecting outside the lock
+                    self._size += 1
+                    break
+                else:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeoutError(
+                            f"No connection to {self.db_path} available within {timeout:.1f}s "
+                            f"({self.max_size} in use)")
+                    self._condition.wait(remaining)
+                    continue
+                self._checkout(pooled, started)
+                return pooled.connection
+
+        try:
+            pooled = self._create_connection()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self.created += 1
+            self._checkout(pooled, started)
+        return pooled.connection
+
+    def _checkout(self, pooled: _PooledConnection, started: float):
+        waited = time.perf_counter() - started
+        self.total_wait_time += waited
+        self.max_wait_time = max(self.max_wait_time, waited)
+        self.checkouts += 1
+        pooled.uses += 1
+        self._in_use[id(pooled.connection)] = pooled
+
+    def release(self, conn: sqlite3.Connection, discard: bool = False):
+        """Return a connection to the pool, or close it if it is broken"""
+        with self._condition:
+            pooled = self._in_use.pop(id(conn), None)
+            if pooled is None:
+                return
+            if not discard and conn.in_transaction:
+                try:
+                    conn.rollback()
+                except sqlite3.Error:
+                    discard = True
+            if discard:
+                self._discard(pooled)
+                self._size -= 1
+            else:
+                pooled.last_used = time.time()
+                self._idle.append(pooled)
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Context manager yielding a pooled connection; uncommitted work is rolled back"""
+        conn = self.acquire(timeout)
+        discard = False
+        try:
+            yield conn
+        except sqlite3.Error as e:
+            # Query and constraint errors leave the connection usable; anything else is recycled
+            discard = not isinstance(e, (sqlite3.OperationalError, sqlite3.IntegrityError))
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    # Compatibility with the original pool API
+    def get_connection(self) -> sqlite3.Connection:
+        return self.acquire()
+
+    def return_connection(self, conn: sqlite3.Connection):
+        self.release(conn)
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._condition:
+            for pooled in self._idle:
+                pooled.connection.close()
+            self._size -= len(self._idle)
+            self._idle = []
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Pool utilisation and wait time counters"""
+        with self._condition:
+            return {
+                'max_size': self.max_size,
+                'open': self._size,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'created': self.created,
+                'recycled': self.recycled,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.total_wait_time / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait_time * 1000, 3),
+            }
@@ -12,6 +12,10 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from core_framework import BaseAgent, AgentMessage
+try:
+    from .monte_carlo import MonteCarloEngine, SimulationResult
+except ImportError:
+    from monte_carlo import MonteCarloEngine, SimulationResult
 
 
 @dataclass
@@ -58,6 +62,7 @@ class FinancialModelingAgent(BaseAgent):
             'competitive_pressure': 0.08,
             'regulatory_risk': 0.05
         }
+        self.simulation_engine = MonteCarloEngine()
         
     async def initialize(self):
         """Initialize the agent with default models and scenarios"""
@@ -325,63 +330,56 @@ class FinancialModelingAgent(BaseAgent):
         
     async def _generate_cash_flow_projections(self, months: int) -> List[CashFlowProjection]:
         """Generate cash flow projections"""
-        projections = []
         base_inflow = 100000  # Base monthly cash inflow
         base_outflow = 80000  # Base monthly cash outflow
-        cumulative = 0
-        
-        for month in range(1, months + 1):
-            # Apply seasonal factors and growth
-            seasonal_factor = self.models['budget_model']['parameters']['seasonal_factors'][(month - 1) % 12]
-            growth_factor = (1 + self.models['budget_model']['parameters']['growth_assumptions']) ** (month / 12)
-            
-            inflow = base_inflow * seasonal_factor * growth_factor
-            outflow = base_outflow * growth_factor * (1 + self.risk_parameters['market_volatility'] * np.random.normal(0, 0.1))
-            
-            net_flow = inflow - outflow
-            cumulative += net_flow
-            
-            # Calculate confidence interval
-            volatility = self.risk_parameters['market_volatility']
-            confidence_interval = (
-                net_flow * (1 - 1.96 * volatility),
-                net_flow * (1 + 1.96 * volatility)
-            )
-            
-            projection = CashFlowProjection(
-                period=f"Month_{month}",
-                cash_inflow=inflow,
-                cash_outflow=outflow,
-                net_cash_flow=net_flow,
-                cumulative_cash_flow=cumulative,
-                confidence_interval=confidence_interval
+        budget = self.models['budget_model']['parameters']
+        volatility = self.risk_parameters['market_volatility']
+
+        # Seasonal factors, growth and outflow shocks for all months at once
+        month = np.arange(1, months + 1)
+        seasonal_factors = np.asarray(budget['seasonal_factors'], dtype=float)
+        seasonal_factor = seasonal_factors[(month - 1) % len(seasonal_factors)]
+        growth_factor = (1 + budget['growth_assumptions']) ** (month / 12)
+        shocks = self.simulation_engine.rng().normal(0, 0.1, months)
+
+        inflow = base_inflow * seasonal_factor * growth_factor
+        outflow = base_outflow * growth_factor * (1 + volatility * shocks)
+        net_flow = inflow - outflow
+        cumulative = np.cumsum(net_flow)
+        lower = net_flow * (1 - 1.96 * volatility)
+        upper = net_flow * (1 + 1.96 * volatility)
+
+        return [
+            CashFlowProjection(
+                period=f"Month_{m}",
+                cash_inflow=float(inflow[i]),
+                cash_outflow=float(outflow[i]),
+                net_cash_flow=float(net_flow[i]),
+                cumulative_cash_flow=float(cumulative[i]),
+                confidence_interval=(float(lower[i]), float(upper[i]))
             )
-            projections.append(projection)
-            
-        return projections
+            for i, m in enumerate(month.tolist())
+        ]
         
     async def _generate_revenue_projections(self, months: int) -> Dict[str, Any]:
         """Generate revenue projections"""
         base_revenue = 120000  # Base monthly revenue
         projections = {}
+        month = np.arange(1, months + 1)
+        seasonal_factors = np.asarray(self.models['budget_model']['parameters']['seasonal_factors'], dtype=float)
+        seasonal_factor = seasonal_factors[(month - 1) % len(seasonal_factors)]
         
         for scenario_name, scenario in self.scenarios.items():
-            monthly_revenues = []
             growth_rate = scenario.parameters.get('revenue_growth', 0.05) / 12
-            
-            for month in range(1, months + 1):
-                # Apply growth and seasonal factors
-                seasonal_factor = self.models['budget_model']['parameters']['seasonal_factors'][(month - 1) % 12]
-                monthly_revenue = base_revenue * (1 + growth_rate) ** month * seasonal_factor
-                monthly_revenues.append({
-                    'month': month,
-                    'revenue': monthly_revenue,
-                    'scenario': scenario_name
-                })
+            # Apply growth and seasonal factors
+            monthly_revenues = base_revenue * (1 + growth_rate) ** month * seasonal_factor
                 
             projections[scenario_name] = {
-                'monthly_projections': monthly_revenues,
-                'total_projected': sum(r['revenue'] for r in monthly_revenues),
+                'monthly_projections': [
+                    {'month': m, 'revenue': revenue, 'scenario': scenario_name}
+                    for m, revenue in zip(month.tolist(), monthly_revenues.tolist())
+                ],
+                'total_projected': float(monthly_revenues.sum()),
                 'probability': scenario.probability
             }
             
@@ -389,16 +387,13 @@ class FinancialModelingAgent(BaseAgent):
         
     async def _generate_risk_projections(self) -> Dict[str, Any]:
         """Generate risk analysis projections"""
-        monte_carlo_results = await self._run_monte_carlo_simulation()
+        simulation = await self._run_monte_carlo_simulation()
         
         risk_analysis = {
-            'value_at_risk': {
-                '95%': np.percentile(monte_carlo_results, 5),
-                '90%': np.percentile(monte_carlo_results, 10),
-                '80%': np.percentile(monte_carlo_results, 20)
-            },
-            'expected_return': np.mean(monte_carlo_results),
-            'volatility': np.std(monte_carlo_results),
+            'value_at_risk': simulation.value_at_risk,
+            'conditional_value_at_risk': simulation.conditional_value_at_risk,
+            'expected_return': simulation.mean,
+            'volatility': simulation.std,
             'risk_factors': self.risk_parameters,
             'scenario_probabilities': {name: scenario.probability for name, scenario in self.scenarios.items()},
             'stress_test_results': await self._run_stress_tests()
@@ -406,27 +401,34 @@ class FinancialModelingAgent(BaseAgent):
         
         return risk_analysis
         
-    async def _run_monte_carlo_simulation(self) -> np.ndarray:
-        """Run Monte Carlo simulation for risk analysis"""
-        num_simulations = self.models['risk_model']['parameters']['simulations']
-        volatility = self.models['risk_model']['parameters']['volatility']
-        
-        # Generate random returns based on scenarios
-        results = []
-        for _ in range(num_simulations):
-            # Select scenario based on probabilities
-            scenario = np.random.choice(
-                list(self.scenarios.keys()),
-                p=[s.probability for s in self.scenarios.values()]
-            )
-            
-            # Generate return with volatility
-            base_return = self.scenarios[scenario].projected_profit
-            random_factor = np.random.normal(1, volatility)
-            simulation_result = base_return * random_factor
-            results.append(simulation_result)
-            
-        return np.array(results)
+    async def _run_monte_carlo_simulation(self) -> SimulationResult:
+        """
+        Run Monte Carlo simulation for risk analysis. Each path picks a
+        scenario by probability and shocks its profit by the model
+        volatility; with 'factor_volatilities' (revenue, costs) and an
+        optional 'factor_correlation' in the risk model parameters, revenue
+        and costs are shocked separately instead.
+        """
+        parameters = self.models['risk_model']['parameters']
+        scenarios = list(self.scenarios.values())
+        factor_volatilities = parameters.get('factor_volatilities')
+        
+        if factor_volatilities:
+            exposures = [[s.projected_revenue, -s.projected_costs] for s in scenarios]
+            volatilities = [factor_volatilities['revenue'], factor_volatilities['costs']]
+        else:
+            exposures = [[s.projected_profit] for s in scenarios]
+            volatilities = [parameters['volatility']]
+            
+        return await self.simulation_engine.run(
+            exposures,
+            [s.probability for s in scenarios],
+            volatilities,
+            parameters['simulations'],
+            correlation=parameters.get('factor_correlation') if factor_volatilities else None,
+            confidence_levels=parameters.get('confidence_levels', [0.95, 0.90, 0.80]),
+            seed=parameters.get('seed')
+        )
         
     async def _run_stress_tests(self) -> Dict[str, float]:
         """Run stress tests on financial models"""
@@ -690,7 +692,7 @@ class FinancialModelingAgent(BaseAgent):
         simulations = parameters.get('simulations', 1000)
         
         # Monte Carlo simulation
-        results = np.random.normal(100000, 100000 * volatility, simulations)
+        results = self.simulation_engine.rng(parameters.get('seed')).normal(100000, 100000 * volatility, simulations)
         
         return {
             'model_type': 'risk',
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Latency Histogram - Fixed-Size Log-Bucketed Response Time Histograms
+HDR-style histograms with O(1) recording and bounded relative error, plus a
+rotating windowed variant for "last N minutes" percentiles.
+"""
+
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+# 16 linear sub-buckets per power of two gives <= 6.25% relative error
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# Values are recorded in microseconds and clamped to 2^32 us (~71 minutes)
+MAX_VALUE_US = (1 << 32) - 1
+BUCKET_COUNT = (32 - SUB_BUCKET_BITS + 1) * SUB_BUCKETS
+
+
+def bucket_index(value_us: int) -> int:
+    """Histogram bucket for a value in microseconds"""
+    if value_us < SUB_BUCKETS:
+        return max(value_us, 0)
+    if value_us > MAX_VALUE_US:
+        value_us = MAX_VALUE_US
+    shift = value_us.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + (value_us >> shift) - SUB_BUCKETS
+
+
+def bucket_bounds(index: int):
+    """Inclusive lower and exclusive upper bound (microseconds) of a bucket"""
+    if index < SUB_BUCKETS:
+        return index, index + 1
+    shift = index // SUB_BUCKETS - 1
+    mantissa = index % SUB_BUCKETS + SUB_BUCKETS
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram of latencies in seconds."""
+
+    __slots__ = ('counts', 'total_count', 'total_sum', 'min_value', 'max_value')
+
+    def __init__(self):
+        self.counts = array('L', [0]) * BUCKET_COUNT
+        self.total_count = 0
+        self.total_sum = 0.0
+        self.min_value = None
+        self.max_value = None
+
+    def record(self, seconds: float):
+        """Record one latency in O(1)"""
+        self.counts[bucket_index(int(seconds * 1_000_000))] += 1
+        self.total_count += 1
+        self.total_sum += seconds
+        if self.min_value is None or seconds < self.min_value:
+            self.min_value = seconds
+        if self.max_value is None or seconds > self.max_value:
+            self.max_value = seconds
+
+    def reset(self):
+        for index in range(BUCKET_COUNT):
+            self.counts[index] = 0
+        self.total_count = 0
+        self.total_sum = 0.0
+        self.min_value = None
+        self.max_value = None
+
+    def merge(self, other: 'LatencyHistogram'):
+        """Add another histogram's samples into this one"""
+        if not other.total_count:
+            return
+        counts = self.counts
+        for index, count in enumerate(other.counts):
+            if count:
+                counts[index] += count
+        self.total_count += other.total_count
+        self.total_sum += other.total_sum
+        if self.min_value is None or other.min_value < self.min_value:
+            self.min_value = other.min_value
+        if self.max_value is None or other.max_value > self.max_value:
+            self.max_value = other.max_value
+
+    def percentiles(self, quantiles: Iterable[float]) -> Dict[float, float]:
+        """Values (seconds) at the requested quantiles in one pass over the buckets"""
+        quantiles = sorted(quantiles)
+        result = {q: 0.0 for q in quantiles}
+        if not self.total_count:
+            return result
+
+        targets = [(q, max(1, int(q * self.total_count + 0.999999))) for q in quantiles]
+        position = 0
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            seen += count
+            while position < len(targets) and seen >= targets[position][1]:
+                low, high = bucket_bounds(index)
+                # Midpoint of the bucket, clamped to the observed range
+                value = (low + high - 1) / 2 / 1_000_000
+                result[targets[position][0]] = min(max(value, self.min_value), self.max_value)
+                position += 1
+            if position == len(targets):
+                break
+        return result
+
+    def percentile(self, quantile: float) -> float:
+        return self.percentiles([quantile])[quantile]
+
+    @property
+    def mean(self) -> float:
+        return self.total_sum / self.total_count if self.total_count else 0.0
+
+
+class RollingLatencyHistogram:
+    """
+    Windowed histogram made of `slots` sub-histograms of `slot_seconds` each.
+    Recording goes into the current slot; expired slots are reset as time
+    moves on, so queries cover roughly the last slots * slot_seconds.
+    A cumulative histogram is kept alongside for lifetime totals.
+    """
+
+    def __init__(self, slots: int = 6, slot_seconds: float = 60.0):
+        self.slot_count = slots
+        self.slot_seconds = slot_seconds
+        self.slots: List[Optional[LatencyHistogram]] = [None] * slots
+        self.slot_epochs = [-1] * slots
+        self.cumulative = LatencyHistogram()
+        self.lock = threading.Lock()
+
+    def _slot(self, now: float) -> LatencyHistogram:
+        epoch = int(now // self.slot_seconds)
+        index = epoch % self.slot_count
+        histogram = self.slots[index]
+        if histogram is None:
+            histogram = self.slots[index] = LatencyHistogram()
+        elif self.slot_epochs[index] != epoch:
+            histogram.reset()
+        self.slot_epochs[index] = epoch
+        return histogram
+
+    def record(self, seconds: float, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with self.lock:
+            self._slot(now).record(seconds)
+            self.cumulative.record(seconds)
+
+    def window(self, now: Optional[float] = None) -> LatencyHistogram:
+        """Merged histogram of the slots still inside the window"""
+        now = time.time() if now is None else now
+        oldest_epoch = int(now // self.slot_seconds) - self.slot_count + 1
+        merged = LatencyHistogram()
+        with self.lock:
+            for histogram, epoch in zip(self.slots, self.slot_epochs):
+                if histogram is not None and epoch >= oldest_epoch:
+                    merged.merge(histogram)
+        return merged
+
+    @property
+    def window_seconds(self) -> float:
+        return self.slot_count * self.slot_seconds
@@ -5,6 +5,7 @@ Initialize, register, and coordinate all enterprise agents
 
 import asyncio
 import logging
+import os
 import time
 import uuid
 from datetime import datetime
@@ -41,6 +42,7 @@ try:
     from org_structure.calendar_management_agent import CalendarManagementAgent
 
     from core_framework import BaseAgent, AgentMessage
+    from message_bus import ShardedMessageBus
 except ImportError:
     # Fallback for relative imports
     from ..finance.financial_analysis_agent import FinancialAnalysisAgent
@@ -65,6 +67,12 @@ except ImportError:
     from ..org_structure.calendar_management_agent import CalendarManagementAgent
 
     from .core_framework import BaseAgent, AgentMessage
+    from .message_bus import ShardedMessageBus
+
+try:
+    from message_metrics_store import MessageMetricsStore
+except ImportError:
+    MessageMetricsStore = None
 
 
 @dataclass
@@ -88,7 +96,9 @@ class EnterpriseAgentRegistry:
     def __init__(self):
         self.agents = {}
         self.agent_registrations = {}
-        self.message_bus = asyncio.Queue()
+        self.message_bus = ShardedMessageBus(inbox_size=1000)
+        self.message_metrics = None
+        self.message_metrics_task = None
         self.logger = logging.getLogger(__name__)
         self.system_status = "initializing"
         self.initialization_order = []
@@ -276,32 +286,56 @@ class EnterpriseAgentRegistry:
             
     async def _start_message_routing(self):
         """Start the central message routing system"""
-        # Start message router task
-        asyncio.create_task(self._message_router())
-        self.logger.info("Message routing system started")
+        # One bounded inbox and consumer task per agent
+        for agent_id, agent in self.agents.items():
+            self.message_bus.register(agent_id, agent.process_message)
+        self._attach_message_metrics()
+        self.message_bus.start()
+        self.logger.info(f"Message routing system started ({len(self.message_bus.inboxes)} agent inboxes)")
         
-    async def _message_router(self):
-        """Central message routing between agents"""
-        while self.system_status in ["initializing", "operational"]:
-            try:
-                # Get message from bus with timeout
-                message = await asyncio.wait_for(self.message_bus.get(), timeout=1.0)
-                
-                # Route message to target agent
-                target_agent = self.agents.get(message.recipient_id)
-                if target_agent:
-                    await target_agent.process_message(message)
-                else:
-                    self.logger.warning(f"Target agent not found: {message.recipient_id}")
-                    
-            except asyncio.TimeoutError:
-                continue
-            except Exception as e:
-                self.logger.error(f"Error in message routing: {str(e)}")
-                
     async def route_message(self, message: AgentMessage):
         """Route message to target agent"""
-        await self.message_bus.put(message)
+        await self.message_bus.publish(message)
+    
+    def _attach_message_metrics(self):
+        """Feed delivered messages into the dashboard's message rollups"""
+        if MessageMetricsStore is None or self.message_metrics is not None:
+            return
+        try:
+            db_path = os.getenv('DATABASE_URL', 'data/enterprise_operations.db').replace('sqlite:///', '/').replace('sqlite://', '')
+            # Consumers only queue deltas; the SQLite writes run in a worker thread
+            self.message_metrics = MessageMetricsStore(db_path, department_resolver=self._agent_department,
+                                                       auto_flush=False)
+        except Exception as e:
+            self.logger.warning(f"Message metrics disabled: {e}")
+            return
+
+        def record_delivery(message, delivered, latency, handling_time):
+            self.message_metrics.record_message(
+                message,
+                delivery_status='delivered' if delivered else 'failed',
+                processing_time_ms=(latency + handling_time) * 1000
+            )
+
+        self.message_bus.add_delivery_listener(record_delivery)
+        self.message_metrics_task = asyncio.create_task(self._flush_message_metrics())
+
+    async def _flush_message_metrics(self):
+        """Write queued message metrics every flush interval, off the event loop"""
+        while True:
+            await asyncio.sleep(self.message_metrics.flush_interval)
+            try:
+                await asyncio.to_thread(self.message_metrics.flush)
+            except Exception as e:
+                self.logger.error(f"Message metrics flush failed: {e}")
+        
+    def _agent_department(self, agent_id: str) -> Optional[str]:
+        registration = self.agent_registrations.get(agent_id)
+        return registration.department if registration else None
+        
+    def get_message_bus_metrics(self) -> Dict[str, Any]:
+        """Get per-agent queue depth and delivery latency counters"""
+        return self.message_bus.get_metrics()
     
     async def health_check(self):
         """Check health of all agents"""
@@ -395,7 +429,7 @@ class EnterpriseAgentRegistry:
                 'legal': len([a for a in self.agents.keys() if 'compliance' in a]),
                 'org_structure': len([a for a in self.agents.keys() if 'calendar' in a])
             },
-            'message_queue_size': self.message_bus.qsize() if hasattr(self.message_bus, 'qsize') else 0
+            'message_queue_size': self.message_bus.qsize()
         }
     
     async def send_daily_report(self):
@@ -534,6 +568,12 @@ class EnterpriseAgentRegistry:
                 shutdown_tasks.append(agent.shutdown())
                 
         await asyncio.gather(*shutdown_tasks, return_exceptions=True)
+        await self.message_bus.stop()
+        if self.message_metrics_task:
+            self.message_metrics_task.cancel()
+            self.message_metrics_task = None
+        if self.message_metrics:
+            await asyncio.to_thread(self.message_metrics.flush)
         
         self.system_status = "shutdown"
         self.logger.info("System shutdown complete")
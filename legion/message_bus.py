@@ -0,0 +1,256 @@
+"""
+Enterprise Legion Message Bus
+Sharded, per-agent inbox routing for inter-agent messages
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+try:
+    from core_framework import AgentMessage
+except ImportError:
+    from .core_framework import AgentMessage
+
+
+MessageHandler = Callable[[AgentMessage], Awaitable[Any]]
+# Called after each delivery with (message, delivered, delivery_latency_s, handling_time_s)
+DeliveryListener = Callable[[AgentMessage, bool, float, float], None]
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted sample list"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class InboxFullError(Exception):
+    """Raised when a message cannot be enqueued before the backpressure timeout"""
+
+
+class AgentInbox:
+    """
+    Bounded priority inbox for a single recipient agent.
+    Lower ``AgentMessage.priority`` values are delivered first; messages with
+    equal priority keep FIFO order.
+    """
+
+    def __init__(self, agent_id: str, handler: MessageHandler, maxsize: int = 1000,
+                 latency_window: int = 2048, listeners: Optional[List[DeliveryListener]] = None):
+        self.agent_id = agent_id
+        self.handler = handler
+        self.listeners = listeners if listeners is not None else []
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue(maxsize=maxsize)
+        self.consumer_task: Optional[asyncio.Task] = None
+        self.logger = logging.getLogger(f"{__name__}.{agent_id}")
+
+        # Counters
+        self.enqueued = 0
+        self.delivered = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.total_delivery_latency = 0.0
+        self.total_handling_time = 0.0
+        self.delivery_latencies = deque(maxlen=latency_window)
+
+    def start(self):
+        """Start the consumer task for this inbox"""
+        if self.consumer_task is None or self.consumer_task.done():
+            self.consumer_task = asyncio.create_task(self._consume())
+
+    async def stop(self):
+        """Cancel the consumer task"""
+        if self.consumer_task and not self.consumer_task.done():
+            self.consumer_task.cancel()
+            try:
+                await self.consumer_task
+            except asyncio.CancelledError:
+                pass
+        self.consumer_task = None
+
+    def _record_enqueue(self):
+        self.enqueued += 1
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    async def _consume(self):
+        """Deliver messages to the agent one at a time, highest priority first"""
+        while True:
+            _, _, enqueued_at, message = await self.queue.get()
+            dequeued_at = time.perf_counter()
+            latency = dequeued_at - enqueued_at
+            self.delivery_latencies.append(latency)
+            self.total_delivery_latency += latency
+
+            delivered = False
+            try:
+                await self.handler(message)
+                self.delivered += 1
+                delivered = True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                self.logger.error(f"Error delivering message to {self.agent_id}: {str(e)}")
+            finally:
+                handling_time = time.perf_counter() - dequeued_at
+                self.total_handling_time += handling_time
+                self.queue.task_done()
+
+            for listener in self.listeners:
+                try:
+                    listener(message, delivered, latency, handling_time)
+                except Exception as e:
+                    self.logger.warning(f"Delivery listener failed for {self.agent_id}: {str(e)}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth and delivery latency counters for this inbox"""
+        processed = self.delivered + self.failed
+        samples = list(self.delivery_latencies)
+        return {
+            'agent_id': self.agent_id,
+            'queue_depth': self.queue.qsize(),
+            'max_queue_depth': self.max_depth,
+            'capacity': self.queue.maxsize,
+            'enqueued': self.enqueued,
+            'delivered': self.delivered,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'avg_delivery_latency_ms': (self.total_delivery_latency / processed * 1000) if processed else 0.0,
+            'p50_delivery_latency_ms': _percentile(samples, 50) * 1000,
+            'p99_delivery_latency_ms': _percentile(samples, 99) * 1000,
+            'avg_handling_time_ms': (self.total_handling_time / processed * 1000) if processed else 0.0,
+        }
+
+
+class ShardedMessageBus:
+    """
+    Message bus that shards traffic by ``recipient_id``.
+    Every registered agent gets its own bounded inbox and consumer task, so a
+    slow agent only delays its own messages.
+    """
+
+    def __init__(self, inbox_size: int = 1000, put_timeout: Optional[float] = 5.0,
+                 latency_window: int = 2048):
+        self.inbox_size = inbox_size
+        self.put_timeout = put_timeout
+        self.latency_window = latency_window
+        self.inboxes: Dict[str, AgentInbox] = {}
+        self.listeners: List[DeliveryListener] = []
+        self.undeliverable = 0
+        self.running = False
+        self._sequence = itertools.count()
+        self.logger = logging.getLogger(__name__)
+
+    def register(self, agent_id: str, handler: MessageHandler, inbox_size: Optional[int] = None):
+        """Create an inbox for an agent; its consumer starts with the bus"""
+        inbox = self.inboxes.get(agent_id)
+        if inbox is None:
+            inbox = AgentInbox(agent_id, handler, inbox_size or self.inbox_size,
+                               self.latency_window, self.listeners)
+            self.inboxes[agent_id] = inbox
+        else:
+            inbox.handler = handler
+        if self.running:
+            inbox.start()
+        return inbox
+
+    def add_delivery_listener(self, listener: DeliveryListener):
+        """Observe every delivery attempt, e.g. to feed message metrics"""
+        self.listeners.append(listener)
+
+    async def unregister(self, agent_id: str):
+        """Stop and drop an agent's inbox"""
+        inbox = self.inboxes.pop(agent_id, None)
+        if inbox:
+            await inbox.stop()
+
+    def start(self):
+        """Start consumer tasks for all registered inboxes"""
+        self.running = True
+        for inbox in self.inboxes.values():
+            inbox.start()
+
+    async def stop(self):
+        """Stop all consumer tasks"""
+        self.running = False
+        await asyncio.gather(*(inbox.stop() for inbox in self.inboxes.values()))
+
+    async def drain(self):
+        """Wait until every inbox has been fully processed"""
+        await asyncio.gather(*(inbox.queue.join() for inbox in self.inboxes.values()))
+
+    def _entry(self, message: AgentMessage):
+        priority = getattr(message, 'priority', 5)
+        return (priority, next(self._sequence), time.perf_counter(), message)
+
+    def _inbox_for(self, message: AgentMessage) -> Optional[AgentInbox]:
+        inbox = self.inboxes.get(message.recipient_id)
+        if inbox is None:
+            self.undeliverable += 1
+            self.logger.warning(f"Target agent not found: {message.recipient_id}")
+        return inbox
+
+    async def publish(self, message: AgentMessage, timeout: Optional[float] = None) -> bool:
+        """
+        Enqueue a message for its recipient.
+        Waits while the recipient inbox is full and raises InboxFullError if no
+        slot frees up within the timeout. Returns False for unknown recipients.
+        """
+        inbox = self._inbox_for(message)
+        if inbox is None:
+            return False
+
+        timeout = self.put_timeout if timeout is None else timeout
+        try:
+            if timeout is None:
+                await inbox.queue.put(self._entry(message))
+            else:
+                await asyncio.wait_for(inbox.queue.put(self._entry(message)), timeout=timeout)
+        except asyncio.TimeoutError:
+            inbox.rejected += 1
+            raise InboxFullError(f"Inbox for {inbox.agent_id} is full ({inbox.queue.maxsize} messages)")
+
+        inbox._record_enqueue()
+        return True
+
+    def publish_nowait(self, message: AgentMessage) -> bool:
+        """Enqueue without waiting; returns False if the inbox is full or unknown"""
+        inbox = self._inbox_for(message)
+        if inbox is None:
+            return False
+        try:
+            inbox.queue.put_nowait(self._entry(message))
+        except asyncio.QueueFull:
+            inbox.rejected += 1
+            return False
+        inbox._record_enqueue()
+        return True
+
+    def qsize(self) -> int:
+        """Total number of messages waiting across all inboxes"""
+        return sum(inbox.queue.qsize() for inbox in self.inboxes.values())
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Per-agent queue depth and latency counters plus bus totals"""
+        agents = {agent_id: inbox.get_metrics() for agent_id, inbox in self.inboxes.items()}
+        samples = [latency for inbox in self.inboxes.values() for latency in inbox.delivery_latencies]
+        return {
+            'running': self.running,
+            'total_queue_depth': self.qsize(),
+            'total_delivered': sum(m['delivered'] for m in agents.values()),
+            'total_failed': sum(m['failed'] for m in agents.values()),
+            'total_rejected': sum(m['rejected'] for m in agents.values()),
+            'undeliverable': self.undeliverable,
+            'p50_delivery_latency_ms': _percentile(samples, 50) * 1000,
+            'p99_delivery_latency_ms': _percentile(samples, 99) * 1000,
+            'agents': agents,
+        }
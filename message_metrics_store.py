@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Message Metrics Store - Inter-Agent Communication Analytics
+Records AgentMessage and AgentTask events into per-minute, per-hour and per-day
+rollup tables keyed by sender/receiver department. Rollups are maintained
+incrementally with UPSERTs, so dashboard reads scan buckets, never raw messages.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Bucket sizes in seconds and how long each granularity is kept
+GRANULARITIES = {
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+}
+RETENTION_SECONDS = {
+    'minute': 2 * 86400,
+    'hour': 90 * 86400,
+    'day': None,
+}
+
+PRIORITY_LABELS = ('critical', 'high', 'medium', 'low')
+LATENCY_BUCKETS = (
+    ('under_100ms', 100),
+    ('100ms_500ms', 500),
+    ('500ms_1s', 1000),
+    ('1s_5s', 5000),
+    ('over_5s', None),
+)
+
+MESSAGE_COUNTERS = (
+    'message_count', 'delivered_count', 'failed_count', 'retry_count',
+    'total_bytes', 'total_latency_ms', 'latency_samples',
+) + tuple(f'priority_{label}' for label in PRIORITY_LABELS) \
+  + tuple(f'latency_{name}' for name, _ in LATENCY_BUCKETS)
+
+TASK_COUNTERS = ('created_count', 'completed_count', 'failed_count', 'total_duration_ms', 'duration_samples')
+
+
+def priority_label(priority: Any) -> str:
+    """Map a numeric AgentMessage priority (1 = most urgent) to a dashboard label"""
+    if isinstance(priority, str):
+        return priority if priority in PRIORITY_LABELS else 'medium'
+    try:
+        priority = int(priority)
+    except (TypeError, ValueError):
+        return 'medium'
+    if priority <= 2:
+        return 'critical'
+    if priority <= 4:
+        return 'high'
+    if priority <= 6:
+        return 'medium'
+    return 'low'
+
+
+def latency_bucket(latency_ms: float) -> str:
+    """Name of the response time distribution bucket for a latency"""
+    for name, upper in LATENCY_BUCKETS:
+        if upper is None or latency_ms < upper:
+            return name
+    return LATENCY_BUCKETS[-1][0]
+
+
+def _epoch(value: Any) -> float:
+    if value is None:
+        return time.time()
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+
+class MessageMetricsStore:
+    """Incrementally maintained rollups of inter-agent message and task events."""
+
+    def __init__(self, db_path: str, department_resolver: Optional[Callable[[str], str]] = None,
+                 flush_threshold: int = 500, flush_interval: float = 2.0, message_log_size: int = 5000,
+                 auto_flush: bool = True):
+        self.db_path = db_path
+        self.department_resolver = department_resolver
+        self.flush_threshold = flush_threshold
+        self.flush_interval = flush_interval
+        # Without auto_flush recording only queues deltas; the owner calls flush()
+        self.auto_flush = auto_flush
+        self.message_log_size = message_log_size
+        self.logger = logging.getLogger(__name__)
+
+        # lock guards the pending deltas, db_lock the connection; recording never waits on disk
+        self.lock = threading.RLock()
+        self.db_lock = threading.RLock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False, timeout=30.0)
+        self.connection.row_factory = sqlite3.Row
+
+        # Pending deltas, merged in memory until the next flush
+        self._pending_messages: Dict[Tuple, Dict[str, float]] = {}
+        self._pending_tasks: Dict[Tuple, Dict[str, float]] = {}
+        self._pending_log: List[Tuple] = []
+        self._pending_events = 0
+        self._last_flush = time.time()
+        self._last_prune = 0.0
+
+        self._create_schema()
+
+    def _create_schema(self):
+        message_columns = ',\n'.join(f'{name} REAL NOT NULL DEFAULT 0' for name in MESSAGE_COUNTERS)
+        task_columns = ',\n'.join(f'{name} REAL NOT NULL DEFAULT 0' for name in TASK_COUNTERS)
+        with self.db_lock:
+            self.connection.executescript(f"""
+                CREATE TABLE IF NOT EXISTS message_rollups (
+                    granularity TEXT NOT NULL,
+                    bucket_start INTEGER NOT NULL,
+                    sender_department TEXT NOT NULL,
+                    receiver_department TEXT NOT NULL,
+                    message_type TEXT NOT NULL,
+                    {message_columns},
+                    last_message_at REAL,
+                    PRIMARY KEY (granularity, bucket_start, sender_department, receiver_department, message_type)
+                );
+
+                CREATE TABLE IF NOT EXISTS task_rollups (
+                    granularity TEXT NOT NULL,
+                    bucket_start INTEGER NOT NULL,
+                    department TEXT NOT NULL,
+                    task_type TEXT NOT NULL,
+                    {task_columns},
+                    PRIMARY KEY (granularity, bucket_start, department, task_type)
+                );
+
+                CREATE TABLE IF NOT EXISTS message_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    message_id TEXT,
+                    timestamp REAL NOT NULL,
+                    sender_agent TEXT,
+                    sender_department TEXT,
+                    receiver_agent TEXT,
+                    receiver_department TEXT,
+                    message_type TEXT,
+                    priority TEXT,
+                    size_bytes INTEGER,
+                    delivery_status TEXT,
+                    processing_time_ms REAL,
+                    retry_count INTEGER,
+                    workflow_id TEXT
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_message_log_sender ON message_log (sender_agent, id);
+                CREATE INDEX IF NOT EXISTS idx_message_log_receiver ON message_log (receiver_agent, id);
+            """)
+            self.connection.commit()
+
+    def _department(self, agent_id: str, department: Optional[str]) -> str:
+        if department:
+            return department
+        if self.department_resolver and agent_id:
+            try:
+                resolved = self.department_resolver(agent_id)
+                if resolved:
+                    return resolved
+            except Exception as e:
+                self.logger.debug(f"Department lookup failed for {agent_id}: {e}")
+        return 'unknown'
+
+    # === INGESTION ===
+
+    def record_message(self, message, sender_department: Optional[str] = None,
+                       receiver_department: Optional[str] = None, delivery_status: str = 'delivered',
+                       processing_time_ms: Optional[float] = None, retry_count: int = 0,
+                       workflow_id: Optional[str] = None):
+        """Record a delivered (or failed) AgentMessage"""
+        content = getattr(message, 'content', None) or {}
+        self.record_message_event({
+            'message_id': message.message_id,
+            'timestamp': message.timestamp,
+            'sender_id': message.sender_id,
+            'recipient_id': message.recipient_id,
+            'sender_department': sender_department,
+            'receiver_department': receiver_department,
+            'message_type': message.message_type,
+            'priority': message.priority,
+            'size_bytes': len(json.dumps(content, default=str)),
+            'delivery_status': delivery_status,
+            'processing_time_ms': processing_time_ms,
+            'retry_count': retry_count,
+            'workflow_id': workflow_id or (content.get('workflow_id') if isinstance(content, dict) else None),
+        })
+
+    def record_message_event(self, event: Dict[str, Any]):
+        """Record a message event given as a plain dict (as posted by other processes)"""
+        timestamp = _epoch(event.get('timestamp'))
+        sender_id = event.get('sender_id', '')
+        recipient_id = event.get('recipient_id', '')
+        sender_dept = self._department(sender_id, event.get('sender_department'))
+        receiver_dept = self._department(recipient_id, event.get('receiver_department'))
+        message_type = event.get('message_type') or 'unknown'
+        priority = priority_label(event.get('priority', 5))
+        status = event.get('delivery_status', 'delivered')
+        latency = event.get('processing_time_ms')
+        retries = int(event.get('retry_count') or 0)
+        size_bytes = int(event.get('size_bytes') or 0)
+
+        delta = {
+            'message_count': 1,
+            'delivered_count': 1 if status == 'delivered' else 0,
+            'failed_count': 1 if status == 'failed' else 0,
+            'retry_count': retries,
+            'total_bytes': size_bytes,
+            f'priority_{priority}': 1,
+        }
+        if latency is not None:
+            delta['total_latency_ms'] = float(latency)
+            delta['latency_samples'] = 1
+            delta[f'latency_{latency_bucket(float(latency))}'] = 1
+
+        with self.lock:
+            for granularity, size in GRANULARITIES.items():
+                key = (granularity, int(timestamp // size * size), sender_dept, receiver_dept, message_type)
+                pending = self._pending_messages.get(key)
+                if pending is None:
+                    pending = self._pending_messages[key] = {'last_message_at': timestamp}
+                for name, value in delta.items():
+                    pending[name] = pending.get(name, 0) + value
+                pending['last_message_at'] = max(pending['last_message_at'], timestamp)
+
+            self._pending_log.append((
+                event.get('message_id'), timestamp, sender_id, sender_dept, recipient_id, receiver_dept,
+                message_type, priority, size_bytes, status, latency, retries, event.get('workflow_id')
+            ))
+            due = self._after_record()
+        if due:
+            self.flush()
+
+    def record_task(self, task, department: Optional[str] = None):
+        """Record an AgentTask state transition (pending, completed or failed)"""
+        duration_ms = None
+        if getattr(task, 'started_at', None) and getattr(task, 'completed_at', None):
+            duration_ms = (task.completed_at - task.started_at).total_seconds() * 1000
+        timestamp = task.completed_at if task.status in ('completed', 'failed') and task.completed_at else task.created_at
+        self.record_task_event({
+            'agent_id': task.agent_id,
+            'department': department,
+            'task_type': task.task_type,
+            'status': task.status,
+            'timestamp': timestamp,
+            'duration_ms': duration_ms,
+        })
+
+    def record_task_event(self, event: Dict[str, Any]):
+        """Record a task event given as a plain dict"""
+        timestamp = _epoch(event.get('timestamp'))
+        department = self._department(event.get('agent_id', ''), event.get('department'))
+        task_type = event.get('task_type') or 'unknown'
+        status = event.get('status', 'pending')
+
+        if status == 'completed':
+            delta = {'completed_count': 1}
+        elif status == 'failed':
+            delta = {'failed_count': 1}
+        else:
+            delta = {'created_count': 1}
+        if status in ('completed', 'failed') and event.get('duration_ms') is not None:
+            delta['total_duration_ms'] = float(event['duration_ms'])
+            delta['duration_samples'] = 1
+
+        with self.lock:
+            for granularity, size in GRANULARITIES.items():
+                key = (granularity, int(timestamp // size * size), department, task_type)
+                pending = self._pending_tasks.setdefault(key, {})
+                for name, value in delta.items():
+                    pending[name] = pending.get(name, 0) + value
+            due = self._after_record()
+        if due:
+            self.flush()
+
+    def ingest(self, payload: Dict[str, Any]) -> Dict[str, int]:
+        """Record a batch of {'messages': [...], 'tasks': [...]} event dicts"""
+        messages = payload.get('messages', [])
+        tasks = payload.get('tasks', [])
+        for event in messages:
+            self.record_message_event(event)
+        for event in tasks:
+            self.record_task_event(event)
+        self.flush()
+        return {'messages': len(messages), 'tasks': len(tasks)}
+
+    def _after_record(self) -> bool:
+        """Whether a flush is due; the caller flushes after releasing the lock"""
+        self._pending_events += 1
+        return self.auto_flush and (self._pending_events >= self.flush_threshold or
+                                    time.time() - self._last_flush >= self.flush_interval)
+
+    def flush(self):
+        """Apply pending deltas to the rollup tables with UPSERTs"""
+        # db_lock first so flushes write in the order they took their deltas
+        with self.db_lock:
+            with self.lock:
+                if not self._pending_events:
+                    return
+                message_rows = list(self._pending_messages.items())
+                task_rows = list(self._pending_tasks.items())
+                log_rows = self._pending_log
+                self._pending_messages = {}
+                self._pending_tasks = {}
+                self._pending_log = []
+                self._pending_events = 0
+                self._last_flush = time.time()
+
+            message_sql = (
+                f"INSERT INTO message_rollups (granularity, bucket_start, sender_department, "
+                f"receiver_department, message_type, {', '.join(MESSAGE_COUNTERS)}, last_message_at) "
+                f"VALUES (?, ?, ?, ?, ?, {', '.join('?' for _ in MESSAGE_COUNTERS)}, ?) "
+                f"ON CONFLICT (granularity, bucket_start, sender_department, receiver_department, message_type) "
+                f"DO UPDATE SET {', '.join(f'{c} = {c} + excluded.{c}' for c in MESSAGE_COUNTERS)}, "
+                f"last_message_at = MAX(last_message_at, excluded.last_message_at)"
+            )
+            task_sql = (
+                f"INSERT INTO task_rollups (granularity, bucket_start, department, task_type, "
+                f"{', '.join(TASK_COUNTERS)}) "
+                f"VALUES (?, ?, ?, ?, {', '.join('?' for _ in TASK_COUNTERS)}) "
+                f"ON CONFLICT (granularity, bucket_start, department, task_type) "
+                f"DO UPDATE SET {', '.join(f'{c} = {c} + excluded.{c}' for c in TASK_COUNTERS)}"
+            )
+
+            try:
+                cursor = self.connection.cursor()
+                cursor.executemany(message_sql, [
+                    key + tuple(values.get(c, 0) for c in MESSAGE_COUNTERS) + (values['last_message_at'],)
+                    for key, values in message_rows
+                ])
+                cursor.executemany(task_sql, [
+                    key + tuple(values.get(c, 0) for c in TASK_COUNTERS)
+                    for key, values in task_rows
+                ])
+                cursor.executemany("""
+                    INSERT INTO message_log (message_id, timestamp, sender_agent, sender_department,
+                        receiver_agent, receiver_department, message_type, priority, size_bytes,
+                        delivery_status, processing_time_ms, retry_count, workflow_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, log_rows)
+                if time.time() - self._last_prune > 60:
+                    self._prune(cursor)
+                self.connection.commit()
+            except Exception as e:
+                self.connection.rollback()
+                self.logger.error(f"Failed to flush message metrics: {e}")
+
+    def _prune(self, cursor):
+        now = time.time()
+        self._last_prune = now
+        for granularity, retention in RETENTION_SECONDS.items():
+            if retention is None:
+                continue
+            cursor.execute("DELETE FROM message_rollups WHERE granularity = ? AND bucket_start < ?",
+                           (granularity, now - retention))
+            cursor.execute("DELETE FROM task_rollups WHERE granularity = ? AND bucket_start < ?",
+                           (granularity, now - retention))
+        cursor.execute("DELETE FROM message_log WHERE id <= (SELECT MAX(id) FROM message_log) - ?",
+                       (self.message_log_size,))
+
+    # === QUERIES ===
+
+    def _query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        self.flush()
+        with self.db_lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    def get_recent_messages(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent messages from the bounded message log"""
+        rows = self._query("SELECT * FROM message_log ORDER BY id DESC LIMIT ?", (limit,))
+        return [self._format_message(row) for row in rows]
+
+    def get_agent_messages(self, agent_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent messages sent or received by one agent"""
+        rows = self._query("""
+            SELECT * FROM (
+                SELECT * FROM message_log WHERE sender_agent = ? ORDER BY id DESC LIMIT ?
+            )
+            UNION
+            SELECT * FROM (
+                SELECT * FROM message_log WHERE receiver_agent = ? ORDER BY id DESC LIMIT ?
+            )
+            ORDER BY id DESC LIMIT ?
+        """, (agent_id, limit, agent_id, limit, limit))
+        return [self._format_message(row) for row in rows]
+
+    @staticmethod
+    def _format_message(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            'message_id': row['message_id'],
+            'timestamp': datetime.fromtimestamp(row['timestamp']).isoformat(),
+            'sender': {
+                'agent_id': row['sender_agent'],
+                'department': row['sender_department'],
+                'agent_type': (row['sender_department'] or '').replace('_', ' ').title()
+            },
+            'receiver': {
+                'agent_id': row['receiver_agent'],
+                'department': row['receiver_department'],
+                'agent_type': (row['receiver_department'] or '').replace('_', ' ').title()
+            },
+            'message_details': {
+                'type': row['message_type'],
+                'priority': row['priority'],
+                'content_size_bytes': row['size_bytes'],
+                'delivery_status': row['delivery_status'],
+                'processing_time_ms': row['processing_time_ms'],
+                'retry_count': row['retry_count']
+            },
+            'workflow_context': {
+                'workflow_id': row['workflow_id']
+            }
+        }
+
+    def get_message_rollups(self, granularity: str, since: float,
+                            group_by: Tuple[str, ...] = ()) -> List[Dict[str, Any]]:
+        """Sum message counters over buckets newer than `since`, grouped by the given key columns"""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        allowed = {'bucket_start', 'sender_department', 'receiver_department', 'message_type'}
+        if not set(group_by) <= allowed:
+            raise ValueError(f"Cannot group message rollups by {group_by}")
+        select_keys = ''.join(f'{column}, ' for column in group_by)
+        group_clause = f"GROUP BY {', '.join(group_by)}" if group_by else ''
+        rows = self._query(f"""
+            SELECT {select_keys}{', '.join(f'SUM({c}) AS {c}' for c in MESSAGE_COUNTERS)},
+                   MAX(last_message_at) AS last_message_at
+            FROM message_rollups
+            WHERE granularity = ? AND bucket_start >= ?
+            {group_clause}
+        """, (granularity, int(since)))
+        return [dict(row) for row in rows if row['message_count']]
+
+    def get_task_rollups(self, granularity: str, since: float,
+                         group_by: Tuple[str, ...] = ()) -> List[Dict[str, Any]]:
+        """Sum task counters over buckets newer than `since`, grouped by the given key columns"""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        allowed = {'bucket_start', 'department', 'task_type'}
+        if not set(group_by) <= allowed:
+            raise ValueError(f"Cannot group task rollups by {group_by}")
+        select_keys = ''.join(f'{column}, ' for column in group_by)
+        group_clause = f"GROUP BY {', '.join(group_by)}" if group_by else ''
+        rows = self._query(f"""
+            SELECT {select_keys}{', '.join(f'SUM({c}) AS {c}' for c in TASK_COUNTERS)}
+            FROM task_rollups
+            WHERE granularity = ? AND bucket_start >= ?
+            {group_clause}
+        """, (granularity, int(since)))
+        return [dict(row) for row in rows if any(row[c] for c in TASK_COUNTERS)]
+
+    def close(self):
+        """Flush pending deltas and close the connection"""
+        self.flush()
+        with self.db_lock:
+            self.connection.close()
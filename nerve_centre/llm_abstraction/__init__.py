@@ -70,6 +70,12 @@ from llm_abstraction.algorithms.context_window_optimization import (
     optimize_context_window
 )
 
+from llm_abstraction.algorithms.token_counting import (
+    TokenCounter,
+    CharTokenCounter,
+    BPETokenCounter
+)
+
 from llm_abstraction.algorithms.output_ranking import (
     ProbabilisticRanker,
     OutputMetrics,
@@ -155,6 +161,9 @@ __all__ = [
     # Algorithms
     "ContextOptimizer",
     "optimize_context_window",
+    "TokenCounter",
+    "CharTokenCounter",
+    "BPETokenCounter",
     "ProbabilisticRanker",
     "OutputMetrics",
     "rank_outputs",
@@ -4,22 +4,113 @@ Advanced Context Window Optimization Algorithms
 import re
 import math
 import logging
-from typing import Any, Dict, List, Tuple, Optional
-from collections import defaultdict, Counter
+from typing import Any, Callable, Dict, List, Tuple, Optional
+from collections import defaultdict, Counter, OrderedDict
 import hashlib
 import json
 
+from .token_counting import CharTokenCounter, TokenCounter
+
 
 logger = logging.getLogger(__name__)
 
+# Simplified semantic neighbourhood - in practice, you'd use embeddings
+RELATED_TERMS = {
+    "analyze": ["analysis", "examine", "study", "review"],
+    "data": ["information", "dataset", "records", "facts"],
+    "generate": ["create", "produce", "make", "build"],
+    "process": ["handle", "manage", "execute", "run"]
+}
+
+
+def pack_by_density(
+    items: List[Tuple[str, float, int]],
+    budget: int
+) -> Tuple[List[str], List[str]]:
+    """
+    Greedy 0/1 knapsack over (key, score, tokens): take items in order of
+    score per token, skipping those that no longer fit, in one pass over the
+    sorted items. If the single best-scoring item that fits beats the whole
+    greedy selection it is taken alone instead (the classic 1/2-approximation
+    fix). Returns the chosen keys and the skipped keys, both best first.
+    """
+    ordered = sorted(items, key=lambda item: item[1] / max(item[2], 1), reverse=True)
+    chosen, skipped = [], []
+    remaining = budget
+    chosen_score = 0.0
+    best_single = None
+    for key, score, tokens in ordered:
+        if tokens <= budget and (best_single is None or score > best_single[1]):
+            best_single = (key, score)
+        if tokens <= remaining:
+            chosen.append(key)
+            remaining -= tokens
+            chosen_score += score
+        else:
+            skipped.append(key)
+    if best_single is not None and best_single[1] > chosen_score:
+        key = best_single[0]
+        return [key], [k for k, _, _ in ordered if k != key]
+    return chosen, skipped
+
+
+class OptimizationCache:
+    """LRU of optimized contexts bounded by entry count and approximate size."""
+    
+    def __init__(self, max_entries: int = 128, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: 'OrderedDict[str, Tuple[Dict[str, Any], int]]' = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+    
+    def set(self, key: str, value: Dict[str, Any], size: int) -> None:
+        if key in self.entries:
+            self.size_bytes -= self.entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (value, size)
+        self.size_bytes += size
+        while len(self.entries) > self.max_entries or self.size_bytes > self.max_bytes:
+            self.size_bytes -= self.entries.popitem(last=False)[1][1]
+            self.evictions += 1
+    
+    def clear(self) -> None:
+        self.entries.clear()
+        self.size_bytes = 0
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
 
 class ContextOptimizer:
     """Advanced context window optimization with multiple strategies."""
     
-    def __init__(self, max_tokens: int = 4000):
+    def __init__(
+        self,
+        max_tokens: int = 4000,
+        token_counter: Optional[TokenCounter] = None,
+        cache_max_entries: int = 128,
+        cache_max_bytes: int = 32 * 1024 * 1024
+    ):
         self.max_tokens = max_tokens
+        self.token_counter = token_counter or CharTokenCounter()
         self.token_weights = self._initialize_token_weights()
-        self.context_cache = {}
+        self.context_cache = OptimizationCache(cache_max_entries, cache_max_bytes)
         
     def optimize_context_window(
         self,
@@ -40,75 +131,77 @@ class ContextOptimizer:
             logger.warning(f"Unknown strategy: {strategy}, using 'relevance'")
             strategy = "relevance"
         
+        # Each item is serialized once; its text feeds the cache key and the token counts
+        item_texts = self._item_texts(context)
+        
         # Check cache
-        cache_key = self._get_cache_key(context, prompt, strategy)
-        if cache_key in self.context_cache:
-            return self.context_cache[cache_key]
+        cache_key = self._get_cache_key(item_texts, prompt, strategy)
+        cached = self.context_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
         # Apply optimization strategy
-        optimized_context = strategies[strategy](context, prompt)
+        token_counts = {key: self.token_counter.count(text) for key, text in item_texts.items()}
+        optimized_context = strategies[strategy](context, prompt, token_counts)
         
         # Validate token count
-        optimized_context = self._enforce_token_limit(optimized_context)
+        optimized_texts = self._item_texts(optimized_context)
+        optimized_counts = {key: self.token_counter.count(text) for key, text in optimized_texts.items()}
+        optimized_context = self._enforce_token_limit(optimized_context, optimized_counts)
         
-        # Cache result
-        self.context_cache[cache_key] = optimized_context
+        # Cache result, sized by the serialized items it holds
+        self.context_cache.set(
+            cache_key,
+            optimized_context,
+            sum(len(optimized_texts[key]) for key in optimized_context)
+        )
         
         logger.info(f"Context optimized using {strategy} strategy: "
-                   f"{self._estimate_tokens(context)} -> "
-                   f"{self._estimate_tokens(optimized_context)} tokens")
+                   f"{sum(token_counts.values())} -> "
+                   f"{sum(optimized_counts[key] for key in optimized_context)} tokens")
         
         return optimized_context
     
     def _optimize_by_relevance(
         self,
         context: Dict[str, Any],
-        prompt: str
+        prompt: str,
+        token_counts: Optional[Dict[str, int]] = None
     ) -> Dict[str, Any]:
         """Optimize context by relevance to prompt."""
+        token_counts = token_counts or self._token_counts(context)
         prompt_keywords = self._extract_keywords(prompt)
         
-        # Score each context item by relevance
-        scored_items = []
-        for key, value in context.items():
-            relevance_score = self._calculate_relevance_score(
-                str(value), prompt_keywords
-            )
-            token_count = self._estimate_tokens({key: value})
-            
-            # Relevance per token ratio
-            efficiency = relevance_score / max(token_count, 1)
-            scored_items.append((key, value, efficiency, token_count))
-        
-        # Sort by efficiency (relevance per token)
-        scored_items.sort(key=lambda x: x[2], reverse=True)
+        # Score each context item by relevance and pack by relevance per token
+        score = self._relevance_scorer(prompt_keywords)
+        scored_items = [
+            (key, score(str(value)), token_counts[key])
+            for key, value in context.items()
+        ]
+        chosen, skipped = pack_by_density(scored_items, self.max_tokens)
         
         # Build optimized context
-        optimized = {}
-        total_tokens = 0
+        optimized = {key: context[key] for key in chosen}
+        total_tokens = sum(token_counts[key] for key in chosen)
         
-        for key, value, efficiency, token_count in scored_items:
-            if total_tokens + token_count <= self.max_tokens:
-                optimized[key] = value
-                total_tokens += token_count
-            else:
-                # Try to include partial content
-                remaining_tokens = self.max_tokens - total_tokens
-                if remaining_tokens > 50:  # Minimum useful size
-                    partial_value = self._truncate_content(
-                        str(value), remaining_tokens
-                    )
-                    optimized[f"{key}_partial"] = partial_value
-                break
+        # Try to include partial content of the best item that did not fit
+        remaining_tokens = self.max_tokens - total_tokens
+        if skipped and remaining_tokens > 50:  # Minimum useful size
+            key = skipped[0]
+            partial_value = self._truncate_content(str(context[key]), remaining_tokens)
+            if self._item_tokens(f"{key}_partial", partial_value) <= remaining_tokens:
+                optimized[f"{key}_partial"] = partial_value
         
         return optimized
     
     def _optimize_by_recency(
         self,
         context: Dict[str, Any],
-        prompt: str
+        prompt: str,
+        token_counts: Optional[Dict[str, int]] = None
     ) -> Dict[str, Any]:
         """Optimize context by recency/temporal relevance."""
+        token_counts = token_counts or self._token_counts(context)
         # Look for temporal indicators
         temporal_items = []
         non_temporal_items = []
@@ -129,14 +222,14 @@ class ContextOptimizer:
         
         # Add recent temporal items first
         for key, value, timestamp in temporal_items:
-            token_count = self._estimate_tokens({key: value})
+            token_count = token_counts[key]
             if total_tokens + token_count <= self.max_tokens:
                 optimized[key] = value
                 total_tokens += token_count
         
         # Add non-temporal items
         for key, value in non_temporal_items:
-            token_count = self._estimate_tokens({key: value})
+            token_count = token_counts[key]
             if total_tokens + token_count <= self.max_tokens:
                 optimized[key] = value
                 total_tokens += token_count
@@ -146,9 +239,11 @@ class ContextOptimizer:
     def _optimize_by_importance(
         self,
         context: Dict[str, Any],
-        prompt: str
+        prompt: str,
+        token_counts: Optional[Dict[str, int]] = None
     ) -> Dict[str, Any]:
         """Optimize context by importance indicators."""
+        token_counts = token_counts or self._token_counts(context)
         importance_keywords = [
             "critical", "important", "urgent", "priority", "key",
             "essential", "required", "mandatory", "core", "primary"
@@ -168,8 +263,7 @@ class ContextOptimizer:
             ]):
                 importance_score += 5
             
-            token_count = self._estimate_tokens({key: value})
-            scored_items.append((key, value, importance_score, token_count))
+            scored_items.append((key, value, importance_score, token_counts[key]))
         
         # Sort by importance score
         scored_items.sort(key=lambda x: x[2], reverse=True)
@@ -188,34 +282,40 @@ class ContextOptimizer:
     def _optimize_by_compression(
         self,
         context: Dict[str, Any],
-        prompt: str
+        prompt: str,
+        token_counts: Optional[Dict[str, int]] = None
     ) -> Dict[str, Any]:
         """Optimize context by compressing content."""
+        token_counts = token_counts or self._token_counts(context)
         optimized = {}
+        optimized_counts = {}
         
         for key, value in context.items():
             compressed_value = self._compress_content(str(value))
             
             # Only compress if it saves significant tokens
-            original_tokens = self._estimate_tokens({key: value})
-            compressed_tokens = self._estimate_tokens({key: compressed_value})
+            original_tokens = token_counts[key]
+            compressed_tokens = self._item_tokens(key, compressed_value)
             
             if compressed_tokens < original_tokens * 0.8:  # 20% savings
                 optimized[key] = compressed_value
+                optimized_counts[key] = compressed_tokens
             else:
                 optimized[key] = value
+                optimized_counts[key] = original_tokens
         
         # Apply token limit after compression
-        return self._enforce_token_limit(optimized)
+        return self._enforce_token_limit(optimized, optimized_counts)
     
     def _optimize_hybrid(
         self,
         context: Dict[str, Any],
-        prompt: str
+        prompt: str,
+        token_counts: Optional[Dict[str, int]] = None
     ) -> Dict[str, Any]:
         """Hybrid optimization combining multiple strategies."""
         # First pass: relevance-based filtering
-        relevance_optimized = self._optimize_by_relevance(context, prompt)
+        relevance_optimized = self._optimize_by_relevance(context, prompt, token_counts)
         
         # Second pass: compression on selected items
         compressed = {}
@@ -231,16 +331,29 @@ class ContextOptimizer:
         keywords: List[str]
     ) -> float:
         """Calculate relevance score based on keyword overlap."""
-        content_words = set(content.lower().split())
+        return self._relevance_scorer(keywords)(content)
+    
+    def _relevance_scorer(self, keywords: List[str]) -> Callable[[str], float]:
+        """Relevance scoring with the keyword set and related terms prepared once per prompt."""
         keyword_set = set(kw.lower() for kw in keywords)
+        related_terms = [
+            related
+            for keyword in keywords
+            for related in RELATED_TERMS.get(keyword.lower(), ())
+        ]
         
-        # Direct keyword matches
-        direct_matches = len(content_words.intersection(keyword_set))
-        
-        # Semantic similarity (simplified)
-        semantic_score = self._calculate_semantic_similarity(content, keywords)
+        def score(content: str) -> float:
+            content_lower = content.lower()
+            
+            # Direct keyword matches
+            direct_matches = len(keyword_set.intersection(content_lower.split()))
+            
+            # Semantic similarity (simplified)
+            semantic_score = 0.5 * sum(1 for related in related_terms if related in content_lower)
+            
+            return direct_matches * 2 + semantic_score
         
-        return direct_matches * 2 + semantic_score
+        return score
     
     def _calculate_semantic_similarity(
         self,
@@ -248,21 +361,13 @@ class ContextOptimizer:
         keywords: List[str]
     ) -> float:
         """Calculate semantic similarity (simplified implementation)."""
-        # This is a simplified version - in practice, you'd use embeddings
-        related_terms = {
-            "analyze": ["analysis", "examine", "study", "review"],
-            "data": ["information", "dataset", "records", "facts"],
-            "generate": ["create", "produce", "make", "build"],
-            "process": ["handle", "manage", "execute", "run"]
-        }
-        
         content_lower = content.lower()
         similarity_score = 0
         
         for keyword in keywords:
             keyword_lower = keyword.lower()
-            if keyword_lower in related_terms:
-                for related in related_terms[keyword_lower]:
+            if keyword_lower in RELATED_TERMS:
+                for related in RELATED_TERMS[keyword_lower]:
                     if related in content_lower:
                         similarity_score += 0.5
         
@@ -368,12 +473,27 @@ class ContextOptimizer:
         else:
             content = str(data)
         
-        # Rough approximation: 1 token ≈ 4 characters
-        return len(content) // 4
+        return self.token_counter.count(content)
+    
+    @staticmethod
+    def _item_texts(context: Dict[str, Any]) -> Dict[str, str]:
+        """Serialized form of each item, as it would appear on its own."""
+        return {key: json.dumps({key: value}, default=str) for key, value in context.items()}
+    
+    def _item_tokens(self, key: str, value: Any) -> int:
+        return self.token_counter.count(json.dumps({key: value}, default=str))
+    
+    def _token_counts(self, context: Dict[str, Any]) -> Dict[str, int]:
+        return {key: self._item_tokens(key, value) for key, value in context.items()}
     
-    def _enforce_token_limit(self, context: Dict[str, Any]) -> Dict[str, Any]:
+    def _enforce_token_limit(
+        self,
+        context: Dict[str, Any],
+        token_counts: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
         """Enforce maximum token limit on context."""
-        total_tokens = self._estimate_tokens(context)
+        token_counts = token_counts or self._token_counts(context)
+        total_tokens = sum(token_counts.values())
         
         if total_tokens <= self.max_tokens:
             return context
@@ -384,7 +504,7 @@ class ContextOptimizer:
         current_tokens = 0
         
         for key, value in items:
-            item_tokens = self._estimate_tokens({key: value})
+            item_tokens = token_counts[key]
             if current_tokens + item_tokens <= self.max_tokens:
                 optimized[key] = value
                 current_tokens += item_tokens
@@ -395,19 +515,16 @@ class ContextOptimizer:
     
     def _get_cache_key(
         self,
-        context: Dict[str, Any],
+        item_texts: Dict[str, str],
         prompt: str,
         strategy: str
     ) -> str:
         """Generate cache key for context optimization."""
-        content = json.dumps({
-            "context": context,
-            "prompt": prompt,
-            "strategy": strategy,
-            "max_tokens": self.max_tokens
-        }, sort_keys=True, default=str)
-        
-        return hashlib.md5(content.encode()).hexdigest()
+        digest = hashlib.md5(json.dumps([prompt, strategy, self.max_tokens]).encode())
+        for text in item_texts.values():
+            digest.update(text.encode())
+            digest.update(b'\x00')
+        return digest.hexdigest()
     
     def _initialize_token_weights(self) -> Dict[str, float]:
         """Initialize weights for different types of tokens."""
@@ -428,6 +545,11 @@ class ContextOptimizer:
         """Get cache statistics."""
         return {
             "cache_size": len(self.context_cache),
+            "cache_bytes": self.context_cache.size_bytes,
+            "cache_hits": self.context_cache.hits,
+            "cache_misses": self.context_cache.misses,
+            "cache_evictions": self.context_cache.evictions,
+            "token_count_memo_hits": self.token_counter.hits,
             "max_tokens": self.max_tokens
         }
 
@@ -0,0 +1,112 @@
+"""
+Token Counters for Context Window Optimization
+
+A token counter turns text into a token count. CharTokenCounter keeps the
+original estimate of one token per four characters; BPETokenCounter runs
+byte-pair encoding over a vocabulary loaded from a local file in the
+tiktoken ranks format (one "<base64 token> <rank>" per line, e.g.
+cl100k_base.tiktoken), so no network access or tiktoken install is needed,
+and memoizes per-text counts in a bounded LRU.
+"""
+import base64
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+# GPT-style pre-tokenization with the stdlib re: contractions, letter runs,
+# up to three digits, punctuation runs and whitespace
+PRETOKENIZE = re.compile(
+    r"'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+(?!\S)|\s+",
+    re.IGNORECASE
+)
+
+
+class TokenCounter:
+    """Base token counter with a memo of recent counts."""
+
+    def __init__(self, memo_size: int = 20000):
+        self.memo_size = memo_size
+        # Keyed by (length, hash) so the memo does not keep the texts alive
+        self._memo: 'OrderedDict[Tuple[int, int], int]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, text: str) -> int:
+        """Token count of text, memoized."""
+        key = (len(text), hash(text))
+        cached = self._memo.get(key)
+        if cached is not None:
+            self._memo.move_to_end(key)
+            self.hits += 1
+            return cached
+        self.misses += 1
+        tokens = self._count(text)
+        self._memo[key] = tokens
+        if len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+        return tokens
+
+    def _count(self, text: str) -> int:
+        raise NotImplementedError
+
+
+class CharTokenCounter(TokenCounter):
+    """The 1 token ~ 4 characters approximation."""
+
+    def count(self, text: str) -> int:
+        # Cheaper than a memo lookup
+        return len(text) // 4
+
+
+class BPETokenCounter(TokenCounter):
+    """Byte-pair encoding token counts from a local ranks vocabulary."""
+
+    def __init__(self, ranks: Dict[bytes, int], memo_size: int = 20000, piece_memo_size: int = 100000):
+        super().__init__(memo_size)
+        self.ranks = ranks
+        self.piece_memo_size = piece_memo_size
+        self._pieces: Dict[bytes, int] = {}
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> 'BPETokenCounter':
+        """Load a tiktoken-format ranks file."""
+        ranks = {}
+        with open(path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    token, rank = line.split()
+                    ranks[base64.b64decode(token)] = int(rank)
+        return cls(ranks, **kwargs)
+
+    def _count(self, text: str) -> int:
+        total = 0
+        for piece in PRETOKENIZE.findall(text):
+            encoded = piece.encode('utf-8')
+            if encoded in self.ranks:
+                total += 1
+                continue
+            tokens = self._pieces.get(encoded)
+            if tokens is None:
+                tokens = len(self._merge(encoded))
+                if len(self._pieces) >= self.piece_memo_size:
+                    self._pieces.clear()
+                self._pieces[encoded] = tokens
+            total += tokens
+        return total
+
+    def _merge(self, piece: bytes) -> List[bytes]:
+        """Repeatedly merge the adjacent pair with the lowest rank."""
+        parts = [piece[i:i + 1] for i in range(len(piece))]
+        ranks = self.ranks
+        while len(parts) > 1:
+            best_rank: Optional[int] = None
+            best = 0
+            for i in range(len(parts) - 1):
+                rank = ranks.get(parts[i] + parts[i + 1])
+                if rank is not None and (best_rank is None or rank < best_rank):
+                    best_rank, best = rank, i
+            if best_rank is None:
+                break
+            parts[best:best + 2] = [parts[best] + parts[best + 1]]
+        return parts
@@ -5,6 +5,8 @@ from typing import Any, Dict, Optional
 from dataclasses import dataclass
 from enum import Enum
 
+from .rate_limiting import ProviderRateLimiter, get_rate_limiter
+
 class ProviderType(Enum):
     OPENAI = "openai"
     ANTHROPIC = "anthropic"
@@ -44,6 +46,7 @@ class LLMProviderBase(ABC):
         self.endpoint = config.get('endpoint', '')
         self.api_key = config.get('api_key', '')
         self.rate_limit = config.get('rate_limit', 60)
+        self.token_rate_limit = config.get('token_rate_limit')
         self.last_request_time = 0
     @abstractmethod
     def query(self, request: LLMRequest) -> LLMResponse:
@@ -51,12 +54,45 @@ class LLMProviderBase(ABC):
     @abstractmethod
     def get_metadata(self) -> Dict[str, Any]:
         pass
-    def _rate_limit_check(self) -> None:
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        min_interval = 60 / self.rate_limit
-        if time_since_last < min_interval:
-            sleep_time = min_interval - time_since_last
-            logging.info(f"Rate limiting: sleeping {sleep_time:.2f}s")
-            time.sleep(sleep_time)
+    def _get_rate_limiter(self) -> Optional[ProviderRateLimiter]:
+        # Several providers skip super().__init__, so read settings defensively
+        requests_per_minute = getattr(self, 'rate_limit', None)
+        if not requests_per_minute:
+            return None
+        config = getattr(self, 'config', None) or {}
+        return get_rate_limiter(
+            getattr(self, 'name', type(self).__name__),
+            requests_per_minute,
+            getattr(self, 'token_rate_limit', None) or config.get('token_rate_limit'),
+            config.get('rate_limit_burst'),
+            config.get('token_rate_limit_burst')
+        )
+    @staticmethod
+    def _estimate_tokens(request: Optional[LLMRequest]) -> int:
+        if request is None:
+            return 0
+        # Rough prompt estimate (1 token ~ 4 characters) plus the completion budget
+        return len(request.prompt) // 4 + (request.max_tokens or 0)
+    def _rate_limit_check(self, request: Optional[LLMRequest] = None) -> float:
+        limiter = self._get_rate_limiter()
+        if limiter is None:
+            return 0.0
+        waited = limiter.acquire(self._estimate_tokens(request))
+        if waited:
+            logging.info(f"Rate limiting {getattr(self, 'name', 'provider')}: waited {waited:.2f}s")
+        self.last_request_time = time.time()
+        return waited
+    async def _rate_limit_check_async(self, request: Optional[LLMRequest] = None) -> float:
+        limiter = self._get_rate_limiter()
+        if limiter is None:
+            return 0.0
+        waited = await limiter.acquire_async(self._estimate_tokens(request))
         self.last_request_time = time.time()
+        return waited
+    def _record_token_usage(self, request: Optional[LLMRequest], tokens_used: Optional[int]) -> None:
+        limiter = self._get_rate_limiter()
+        if limiter is not None:
+            limiter.reconcile_tokens(self._estimate_tokens(request), tokens_used)
+    def get_rate_limit_metrics(self) -> Optional[Dict[str, Any]]:
+        limiter = self._get_rate_limiter()
+        return limiter.get_metrics() if limiter is not None else None
@@ -6,19 +6,25 @@ import logging
 import time
 import hashlib
 import re
-from typing import Any, Dict, List, Optional, Tuple, Union
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 from dataclasses import dataclass
 from enum import Enum
 import requests
 import yaml
 
 from llm_abstraction.base import LLMProviderBase, ProviderType, SecurityLevel, LLMRequest, LLMResponse
+from llm_abstraction.response_cache import LLMResponseCache, is_cacheable_temperature
 
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# How often the fan-out checks whether queued provider calls have started
+QUEUED_CALL_POLL_SECONDS = 0.02
+
 
 @dataclass
 class LLMRequest:
@@ -56,7 +62,7 @@ class OpenAIProvider(LLMProviderBase):
     
     def query(self, request: LLMRequest) -> LLMResponse:
         """Execute OpenAI query."""
-        self._rate_limit_check()
+        self._rate_limit_check(request)
         start_time = time.time()
         
         headers = {
@@ -68,7 +74,7 @@ class OpenAIProvider(LLMProviderBase):
             'model': self.config.get('model', 'gpt-3.5-turbo'),
             'messages': [{'role': 'user', 'content': request.prompt}],
             'max_tokens': request.max_tokens or 1000,
-            'temperature': request.temperature or 0.7
+            'temperature': request.temperature if request.temperature is not None else 0.7
         }
         
         try:
@@ -83,6 +89,7 @@ class OpenAIProvider(LLMProviderBase):
             data = response.json()
             content = data['choices'][0]['message']['content']
             tokens_used = data.get('usage', {}).get('total_tokens')
+            self._record_token_usage(request, tokens_used)
             
             return LLMResponse(
                 content=content,
@@ -120,7 +127,7 @@ class AnthropicProvider(LLMProviderBase):
     
     def query(self, request: LLMRequest) -> LLMResponse:
         """Execute Anthropic query."""
-        self._rate_limit_check()
+        self._rate_limit_check(request)
         start_time = time.time()
         
         headers = {
@@ -146,7 +153,10 @@ class AnthropicProvider(LLMProviderBase):
             
             data = response.json()
             content = data['content'][0]['text']
-            tokens_used = data.get('usage', {}).get('output_tokens')
+            usage = data.get('usage', {})
+            tokens_used = usage.get('output_tokens')
+            if usage:
+                self._record_token_usage(request, usage.get('input_tokens', 0) + (tokens_used or 0))
             
             return LLMResponse(
                 content=content,
@@ -224,9 +234,9 @@ class OllamaProvider(LLMProviderBase):
             'capabilities': ['text-generation', 'conversation']
         }
 
-    def _rate_limit_check(self):
+    def _rate_limit_check(self, request: Optional[LLMRequest] = None) -> float:
         """Ollama doesn't need rate limiting for local models."""
-        pass
+        return 0.0
 
 
 class PromptEngineer:
@@ -610,26 +620,53 @@ class LLMOrchestrator:
         providers: List[LLMProviderBase],
         prompt_engineer: Optional[PromptEngineer] = None,
         context_manager: Optional[ContextManager] = None,
-        output_processor: Optional[OutputProcessor] = None
+        output_processor: Optional[OutputProcessor] = None,
+        provider_timeout: float = 30.0,
+        multi_provider_deadline: float = 60.0,
+        provider_timeouts: Optional[Dict[str, float]] = None,
+        response_cache: Optional[LLMResponseCache] = None
     ):
         self.providers = providers
         self.prompt_engineer = prompt_engineer or PromptEngineer()
         self.context_manager = context_manager or ContextManager()
         self.output_processor = output_processor or OutputProcessor()
-        self.provider_performance = {p.name: {'success': 0, 'failure': 0, 'avg_time': 0} for p in providers}
+        self.provider_performance = {
+            p.name: {'success': 0, 'failure': 0, 'avg_time': 0, 'timeouts': 0, 'cancelled': 0, 'skipped': 0}
+            for p in providers
+        }
+        
+        # Concurrent fan-out settings for use_multiple_providers
+        self.provider_timeout = provider_timeout
+        self.multi_provider_deadline = multi_provider_deadline
+        self.provider_timeouts = provider_timeouts or {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Provider name -> call still holding a worker after it timed out or was cancelled
+        self._stragglers: Dict[str, Future] = {}
+        self._stragglers_lock = threading.Lock()
+        self.response_cache = response_cache
         
     def run(
         self,
         prompt: str,
         context: Optional[Dict[str, Any]] = None,
         max_retries: int = 3,
-        use_multiple_providers: bool = False
+        use_multiple_providers: bool = False,
+        min_responses: Optional[int] = None,
+        deadline: Optional[float] = None,
+        temperature: Optional[float] = None
     ) -> Union[LLMResponse, List[LLMResponse]]:
-        """Execute LLM query with advanced orchestration."""
+        """
+        Execute LLM query with advanced orchestration.
+        
+        With use_multiple_providers all providers are queried concurrently;
+        min_responses returns as soon as that many good responses arrived and
+        deadline (seconds) bounds the whole fan-out.
+        """
         # Create structured request
         request = LLMRequest(
             prompt=prompt,
             context=context,
+            temperature=temperature,
             security_level=SecurityLevel.MEDIUM
         )
         
@@ -643,11 +680,33 @@ class LLMOrchestrator:
         if request.context:
             request.context = self.context_manager.optimize(request.context)
         
+        # Serve repeated requests from the response cache (deterministic requests only)
+        cache_args = None
+        if self.response_cache is not None and is_cacheable_temperature(request.temperature):
+            cache_args = (
+                'orchestrator:' + ','.join(sorted(p.name for p in self.providers)),
+                None,
+                request.prompt,
+            )
+            cache_params = {'multiple': use_multiple_providers, 'min_responses': min_responses}
+            cached = self.response_cache.get(*cache_args, context=request.context, params=cache_params)
+            if cached:
+                return cached if use_multiple_providers else cached[0]
+        
         # Execute queries
         if use_multiple_providers:
-            return self._run_multiple_providers(request, max_retries)
+            result = self._run_multiple_providers(
+                request, max_retries, min_responses=min_responses, deadline=deadline
+            )
         else:
-            return self._run_single_provider(request, max_retries)
+            result = self._run_single_provider(request, max_retries)
+        
+        if cache_args is not None:
+            self.response_cache.put(
+                *cache_args, result if use_multiple_providers else [result],
+                context=request.context, params=cache_params
+            )
+        return result
     
     def _run_single_provider(
         self,
@@ -696,23 +755,85 @@ class LLMOrchestrator:
     def _run_multiple_providers(
         self,
         request: LLMRequest,
-        max_retries: int
+        max_retries: int,
+        min_responses: Optional[int] = None,
+        deadline: Optional[float] = None
     ) -> List[LLMResponse]:
-        """Run query on multiple providers and return ranked results."""
-        responses = []
-        
+        """
+        Run query on all providers concurrently and return ranked results.
+        
+        Each provider gets its own timeout, counted from when its call starts
+        running on a worker, and the fan-out as a whole stops at the deadline.
+        Once min_responses responses have passed the output filters the
+        remaining providers are cancelled and ignored. A provider whose
+        earlier call is still running after a timeout or cancel is skipped
+        until that call returns, so stragglers cannot fill the worker pool.
+        """
+        executor = self._get_executor()
+        started = time.monotonic()
+        overall_deadline = started + (deadline if deadline is not None else self.multi_provider_deadline)
+        
+        call_started: Dict[str, float] = {}
+        pending = {}
         for provider in self.providers:
-            try:
-                response = provider.query(request)
-                responses.append(response)
+            if self._has_straggler(provider.name):
+                logger.info(f"Skipping provider {provider.name}: its previous call is still running")
+                self.provider_performance[provider.name]['skipped'] += 1
+                continue
+            future = executor.submit(self._timed_query, provider, request, call_started)
+            pending[future] = provider
+        responses = []
+        good_responses = 0
+        
+        while pending:
+            now = time.monotonic()
+            provider_deadlines = {
+                future: min(call_started[provider.name] + self._provider_timeout(provider), overall_deadline)
+                if provider.name in call_started else overall_deadline
+                for future, provider in pending.items()
+            }
+            for future in [f for f in pending if provider_deadlines[f] <= now]:
+                provider = pending.pop(future)
+                self._abandon(future, provider)
+                logger.warning(f"Provider {provider.name} timed out after {now - started:.2f}s")
+                self._update_performance_metrics(provider.name, False)
+                self.provider_performance[provider.name]['timeouts'] += 1
+            if not pending:
+                break
+            
+            timeout = min(provider_deadlines[f] for f in pending) - now
+            if any(provider.name not in call_started for provider in pending.values()):
+                # Queued calls get their deadline once a worker picks them up
+                timeout = min(timeout, QUEUED_CALL_POLL_SECONDS)
+            done, _ = wait(pending, timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    logger.warning(f"Provider {provider.name} failed: {e}")
+                    self._update_performance_metrics(provider.name, False)
+                    continue
                 
+                responses.append(response)
                 self._update_performance_metrics(
                     provider.name, True, response.processing_time
                 )
-                
-            except Exception as e:
-                logger.warning(f"Provider {provider.name} failed: {e}")
-                self._update_performance_metrics(provider.name, False)
+                if min_responses and self.output_processor.process([response], request):
+                    good_responses += 1
+            
+            if min_responses and good_responses >= min_responses:
+                break
+        
+        # Stragglers after an early return: stop waiting and drop their results
+        for future, provider in pending.items():
+            self._abandon(future, provider)
+            self.provider_performance[provider.name]['cancelled'] += 1
+        if pending:
+            logger.info(
+                f"Returned {good_responses} good responses after {time.monotonic() - started:.2f}s, "
+                f"cancelled {len(pending)} providers"
+            )
         
         if not responses:
             raise RuntimeError("All providers failed")
@@ -720,6 +841,52 @@ class LLMOrchestrator:
         # Process and rank outputs
         return self.output_processor.process(responses, request)
     
+    @staticmethod
+    def _timed_query(provider: LLMProviderBase, request: LLMRequest, call_started: Dict[str, float]) -> LLMResponse:
+        """Run provider.query, recording when a worker picked the call up."""
+        call_started[provider.name] = time.monotonic()
+        return provider.query(request)
+    
+    def _abandon(self, future: Future, provider: LLMProviderBase) -> None:
+        """Cancel a call; one already running is tracked until it returns."""
+        if future.cancel():
+            return
+        with self._stragglers_lock:
+            self._stragglers[provider.name] = future
+        future.add_done_callback(lambda done, name=provider.name: self._clear_straggler(name, done))
+    
+    def _clear_straggler(self, name: str, future: Future) -> None:
+        with self._stragglers_lock:
+            if self._stragglers.get(name) is future:
+                del self._stragglers[name]
+    
+    def _has_straggler(self, name: str) -> bool:
+        with self._stragglers_lock:
+            return name in self._stragglers
+    
+    def _provider_timeout(self, provider: LLMProviderBase) -> float:
+        """Per-provider timeout, falling back to the orchestrator default."""
+        return self.provider_timeouts.get(provider.name, self.provider_timeout)
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """
+        Shared worker pool so timed-out providers never block the caller.
+        Each provider holds at most one straggler, so half the workers stay
+        free for live calls.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(4, len(self.providers) * 2),
+                thread_name_prefix='llm-provider'
+            )
+        return self._executor
+    
+    def shutdown(self) -> None:
+        """Release fan-out worker threads without waiting for stragglers."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+    
     def _select_best_provider(
         self,
         request: LLMRequest,
@@ -787,15 +954,27 @@ class LLMOrchestrator:
                 'success_rate': metrics['success'] / max(total_requests, 1),
                 'average_response_time': metrics['avg_time'],
                 'total_requests': total_requests,
+                'timeouts': metrics['timeouts'],
+                'cancelled': metrics['cancelled'],
+                'skipped': metrics['skipped'],
+                'rate_limiting': provider.get_rate_limit_metrics(),
                 'status': 'active' if total_requests > 0 else 'ready'
             }
         
+        if self.response_cache is not None:
+            status['response_cache'] = self.response_cache.get_stats()
+        
         return status
 
 
 class LLMAbstraction:
     """Unified entry point for LLM queries using config-driven provider selection."""
-    def __init__(self, enable_mcp: bool = True):
+    def __init__(
+        self,
+        enable_mcp: bool = True,
+        response_cache: Optional[LLMResponseCache] = None,
+        embedder: Optional[Callable[[str], Sequence[float]]] = None
+    ):
         import os
         # Load from llm_config.json instead of llm_factories.json
         config_path = os.path.join(os.path.dirname(__file__), '../../config/llm_config.json')
@@ -831,6 +1010,13 @@ class LLMAbstraction:
         self.context_manager = ContextManager()
         self.output_processor = OutputProcessor()
         
+        # Response cache; the embedder enables the near-duplicate tier when configured
+        self.response_cache = response_cache or LLMResponseCache.from_config(
+            config.get('response_cache', {}),
+            base_dir=os.path.join(os.path.dirname(__file__), '../..'),
+            embedder=embedder
+        )
+        
         # MCP Integration
         self.mcp_enabled = enable_mcp
         self.mcp_integrator = None
@@ -867,11 +1053,27 @@ class LLMAbstraction:
             max_tokens=max_tokens,
             temperature=temperature
         )
+        # Serve repeated requests from the response cache (deterministic requests only)
+        cache_args = None
+        if self.response_cache is not None and is_cacheable_temperature(temperature):
+            model = getattr(self.provider, 'model', None) or getattr(self.provider, 'config', {}).get('model')
+            cache_args = (self.provider.name, model, engineered_prompt)
+            cache_params = {'max_tokens': max_tokens, 'temperature': temperature}
+            cached = self.response_cache.get(*cache_args, context=optimized_context, params=cache_params)
+            if cached:
+                return cached[0]
         # Query provider
         response = self.provider.query(request)
         # Process output
         processed = self.output_processor.process([response], request)
-        return processed[0] if processed else response
+        result = processed[0] if processed else response
+        if cache_args is not None:
+            self.response_cache.put(*cache_args, [result], context=optimized_context, params=cache_params)
+        return result
+
+    def get_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Response cache hit ratio and saved latency, or None when caching is disabled"""
+        return self.response_cache.get_stats() if self.response_cache is not None else None
 
     async def query_with_mcp(
         self,
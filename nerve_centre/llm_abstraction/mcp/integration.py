@@ -7,7 +7,6 @@ Provides seamless integration between MCP functions and LLM queries
 import asyncio
 import json
 import logging
-import time
 from typing import Any, Dict, List, Optional
 from dataclasses import dataclass, asdict
 
@@ -17,6 +16,7 @@ from .executors.code_executor_bridge import (
     MCPCodeExecutorFunctions,
     create_code_executor_bridge
 )
+from .tool_planner import ToolCallPlanner, plan_tool_calls
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -32,6 +32,9 @@ class MCPToolCall:
     result: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
     execution_time: Optional[float] = None
+    queue_time: Optional[float] = None
+    server: Optional[str] = None
+    deduplicated_from: Optional[str] = None
 
 
 @dataclass
@@ -59,6 +62,13 @@ class MCPLLMIntegrator:
         self.code_executor: Optional[CodeExecutorBridge] = None
         self.executor_functions: Optional[MCPCodeExecutorFunctions] = None
         
+        # Runs the tool calls of one response concurrently
+        self.call_planner = ToolCallPlanner(
+            max_concurrency_per_server=4,
+            call_timeout=30.0,
+            batch_timeout=60.0
+        )
+        
     def _load_safe_functions(self):
         """Load list of functions that are safe for auto-execution"""
         safe_function_patterns = [
@@ -210,39 +220,48 @@ class MCPLLMIntegrator:
             'errors': []
         }
         
-        for tool_call in tool_calls:
+        planned = plan_tool_calls(tool_calls, self._server_for_function)
+        call_records = []
+        for call in planned:
             call_record = MCPToolCall(
-                function_name=tool_call['function_name'],
-                arguments=tool_call['arguments'],
-                call_id=tool_call.get('call_id')
+                function_name=call.function_name,
+                arguments=call.arguments,
+                call_id=call.call_id,
+                server=call.server
             )
-            
+            call_records.append(call_record)
             results['tool_calls'].append(asdict(call_record))
-            
-            # Execute if auto_execute is enabled and function is safe
-            if auto_execute and self._is_safe_for_auto_execution(tool_call['function_name']):
-                try:
-                    start_time = time.time()
-                    result = await self.execute_mcp_function(
-                        tool_call['function_name'],
-                        tool_call['arguments']
-                    )
-                    
-                    call_record.result = result
-                    call_record.execution_time = time.time() - start_time
-                    
+        
+        # Execute safe calls if auto_execute is enabled; independent calls run
+        # concurrently, calls referencing {{call_id}} wait for that call
+        outcomes = {}
+        if auto_execute:
+            runnable = {call.call_id for call in planned if self._is_safe_for_auto_execution(call.function_name)}
+            outcomes = await self.call_planner.run(planned, self.execute_mcp_function, runnable)
+        
+        for call_record in call_records:
+            outcome = outcomes.get(call_record.call_id)
+            if outcome is not None:
+                call_record.queue_time = outcome.queue_time
+                call_record.execution_time = outcome.execution_time
+                call_record.deduplicated_from = outcome.deduplicated_from
+                if outcome.error is None:
+                    call_record.result = outcome.result
                     results['execution_results'].append({
-                        'function_name': tool_call['function_name'],
+                        'function_name': call_record.function_name,
+                        'call_id': call_record.call_id,
                         'success': True,
-                        'result': result,
-                        'execution_time': call_record.execution_time
+                        'result': outcome.result,
+                        'execution_time': call_record.execution_time,
+                        'queue_time': call_record.queue_time,
+                        'deduplicated_from': call_record.deduplicated_from
                     })
-                    
-                except Exception as e:
-                    call_record.error = str(e)
+                else:
+                    call_record.error = outcome.error
                     results['errors'].append({
-                        'function_name': tool_call['function_name'],
-                        'error': str(e)
+                        'function_name': call_record.function_name,
+                        'call_id': call_record.call_id,
+                        'error': outcome.error
                     })
             
             # Add to call history
@@ -254,6 +273,12 @@ class MCPLLMIntegrator:
         
         return results
     
+    def _server_for_function(self, function_name: str) -> str:
+        """Server a function runs on, used for the per-server concurrency cap"""
+        if self.executor_functions and hasattr(self.executor_functions, function_name):
+            return 'code_executor'
+        return self.function_cache.get(function_name, {}).get('server') or 'default'
+    
     def _extract_tool_calls_from_response(self, response: str) -> List[Dict[str, Any]]:
         """Extract tool calls from LLM response"""
         tool_calls = []
@@ -265,19 +290,25 @@ class MCPLLMIntegrator:
         import re
         
         # Look for patterns like: call_function("function_name", {"arg1": "value1"})
-        pattern1 = r'call_function\s*\(\s*["\']([^"\']+)["\']\s*,\s*(\{[^}]+\})\s*\)'
-        matches1 = re.findall(pattern1, response)
-        
-        for match in matches1:
+        # or call_function("function_name", {...}, "call_id"); arguments are decoded
+        # as JSON so they may nest and hold {{call_id}} references to earlier calls
+        decoder = json.JSONDecoder()
+        pattern1 = r'call_function\s*\(\s*["\']([^"\']+)["\']\s*,\s*'
+        for match in re.finditer(pattern1, response):
             try:
-                function_name = match[0]
-                arguments = json.loads(match[1])
-                tool_calls.append({
-                    'function_name': function_name,
-                    'arguments': arguments
-                })
+                arguments, end = decoder.raw_decode(response, match.end())
             except json.JSONDecodeError:
                 continue
+            close = re.match(r'\s*(?:,\s*["\']([\w-]+)["\']\s*)?\)', response[end:])
+            if not isinstance(arguments, dict) or not close:
+                continue
+            tool_call = {
+                'function_name': match.group(1),
+                'arguments': arguments
+            }
+            if close.group(1):
+                tool_call['call_id'] = close.group(1)
+            tool_calls.append(tool_call)
         
         # Pattern 2: More natural language patterns
         # "I'll use the read_file function with path '/tmp/test.txt'"
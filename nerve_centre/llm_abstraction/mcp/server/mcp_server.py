@@ -20,7 +20,9 @@ from dataclasses import dataclass
 import tempfile
 import shutil
 import requests
-from datetime import datetime, timedelta
+from datetime import datetime
+
+from .memory_store import MemoryStore
 
 # MCP Protocol imports
 try:
@@ -77,7 +79,7 @@ class ComprehensiveMCPServer:
     def __init__(self):
         self.server = Server("comprehensive-mcp-server")
         self.config_path = Path("/home/adam/artifactvirtual/enterprise/config/mcp_functions.json")
-        self.memory_db = sqlite3.connect(":memory:", check_same_thread=False)
+        self.memory = None
         self.temp_dir = Path(tempfile.mkdtemp(prefix="mcp_workspace_"))
         self.web_driver = None
         self.setup_memory_db()
@@ -85,19 +87,11 @@ class ComprehensiveMCPServer:
         self.register_all_functions()
         
     def setup_memory_db(self):
-        """Initialize in-memory database for context management"""
-        cursor = self.memory_db.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS memory_store (
-                key TEXT PRIMARY KEY,
-                value TEXT,
-                category TEXT DEFAULT 'general',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                expires_at TIMESTAMP,
-                metadata TEXT
-            )
-        """)
-        self.memory_db.commit()
+        """Initialize the memory store; MCP_MEMORY_DB_PATH keeps it on disk"""
+        self.memory = MemoryStore(
+            os.getenv("MCP_MEMORY_DB_PATH", ":memory:"),
+            sweep_interval=float(os.getenv("MCP_MEMORY_SWEEP_INTERVAL", 60))
+        )
         
     def load_configuration(self):
         """Load MCP configuration from JSON"""
@@ -471,62 +465,35 @@ class ComprehensiveMCPServer:
         async def store_memory(key: str, value: Any, category: str = "general", ttl: int = None) -> bool:
             """Store information in memory"""
             try:
-                cursor = self.memory_db.cursor()
-                expires_at = None
-                if ttl:
-                    expires_at = datetime.now() + timedelta(seconds=ttl)
-                
-                cursor.execute(
-                    "INSERT OR REPLACE INTO memory_store (key, value, category, expires_at) VALUES (?, ?, ?, ?)",
-                    (key, json.dumps(value), category, expires_at)
-                )
-                self.memory_db.commit()
+                self.memory.put(key, value, category, ttl)
                 return True
             except Exception as e:
                 logger.error(f"Error storing memory: {e}")
                 return False
         
+        @self.server.call_tool()
+        async def store_memory_many(memories: List[Dict[str, Any]]) -> int:
+            """Store several memories (key, value, category, ttl) in one transaction"""
+            try:
+                return self.memory.put_many(memories)
+            except Exception as e:
+                logger.error(f"Error storing memories: {e}")
+                return 0
+        
         @self.server.call_tool()
         async def retrieve_memory(key: str, category: str = "general") -> Any:
             """Retrieve information from memory"""
             try:
-                cursor = self.memory_db.cursor()
-                cursor.execute(
-                    "SELECT value FROM memory_store WHERE key = ? AND category = ? AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)",
-                    (key, category)
-                )
-                result = cursor.fetchone()
-                if result:
-                    return json.loads(result[0])
-                return None
+                return self.memory.get(key, category)
             except Exception as e:
                 logger.error(f"Error retrieving memory: {e}")
                 return None
         
         @self.server.call_tool()
         async def search_memory(query: str, category: str = None, limit: int = 10) -> List[Dict[str, Any]]:
-            """Search memory by content"""
+            """Search memory by content, best BM25 match first"""
             try:
-                cursor = self.memory_db.cursor()
-                if category:
-                    cursor.execute(
-                        "SELECT key, value, category FROM memory_store WHERE value LIKE ? AND category = ? LIMIT ?",
-                        (f"%{query}%", category, limit)
-                    )
-                else:
-                    cursor.execute(
-                        "SELECT key, value, category FROM memory_store WHERE value LIKE ? LIMIT ?",
-                        (f"%{query}%", limit)
-                    )
-                
-                results = []
-                for row in cursor.fetchall():
-                    results.append({
-                        "key": row[0],
-                        "value": json.loads(row[1]),
-                        "category": row[2]
-                    })
-                return results
+                return self.memory.search(query, category, limit)
             except Exception as e:
                 logger.error(f"Error searching memory: {e}")
                 return []
@@ -665,8 +632,8 @@ class ComprehensiveMCPServer:
             if self.web_driver:
                 self.web_driver.quit()
             
-            if self.memory_db:
-                self.memory_db.close()
+            if self.memory:
+                self.memory.close()
             
             if self.temp_dir.exists():
                 shutil.rmtree(self.temp_dir)
@@ -0,0 +1,203 @@
+"""
+MCP server memory store.
+
+Key/value memories in SQLite with an FTS5 index over the text of each value,
+ranked with BM25. The index is an external-content table kept in step by the
+store itself: FTS5 writes issued from triggers flush its pending terms on
+every row, which made inserts several times slower. Expiry is a unix
+timestamp indexed with the category, and a background sweeper deletes expired
+rows in batches. Batched writes go through put_many in one transaction. With a
+file path the store persists on disk in WAL mode; the default is an in-memory
+database.
+"""
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS memory_store (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    value TEXT,
+    category TEXT DEFAULT 'general',
+    created_at REAL,
+    expires_at REAL,
+    metadata TEXT,
+    content TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_memory_category_expires ON memory_store (category, expires_at);
+CREATE INDEX IF NOT EXISTS idx_memory_expires ON memory_store (expires_at) WHERE expires_at IS NOT NULL;
+CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts USING fts5(
+    content, content='memory_store', content_rowid='id'
+);
+"""
+
+UPSERT = """
+INSERT INTO memory_store (key, value, category, created_at, expires_at, metadata, content)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    value = excluded.value, category = excluded.category, created_at = excluded.created_at,
+    expires_at = excluded.expires_at, metadata = excluded.metadata, content = excluded.content
+"""
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def searchable_text(value: Any) -> str:
+    """Text indexed for a value: strings as is, dict keys and values, list items"""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return " ".join(f"{k} {searchable_text(v)}" for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return " ".join(searchable_text(v) for v in value)
+    return str(value)
+
+
+def match_expression(query: str) -> Optional[str]:
+    """FTS5 query matching every word of the query, each as a prefix; None if it has no words"""
+    tokens = _TOKEN.findall(query)
+    if not tokens:
+        return None
+    return " ".join('"%s"*' % token for token in tokens)
+
+
+class MemoryStore:
+    """SQLite memory store with full-text search and TTL expiry."""
+
+    def __init__(self, path: str = ":memory:", sweep_interval: Optional[float] = 60.0, sweep_batch: int = 10000):
+        self.path = path
+        self.sweep_batch = sweep_batch
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+        self.swept = 0
+        if sweep_interval:
+            self.start_sweeper(sweep_interval)
+
+    @staticmethod
+    def _row(key: str, value: Any, category: str = "general", ttl: Optional[float] = None,
+             metadata: Optional[Dict[str, Any]] = None, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        return (key, json.dumps(value), category, now, now + ttl if ttl else None,
+                json.dumps(metadata) if metadata is not None else None, searchable_text(value))
+
+    def put(self, key: str, value: Any, category: str = "general", ttl: Optional[float] = None,
+            metadata: Optional[Dict[str, Any]] = None):
+        self._write([self._row(key, value, category, ttl, metadata)])
+
+    def put_many(self, items: Iterable[Dict[str, Any]]) -> int:
+        """Store memories given as dicts with key, value and optional category, ttl, metadata in one transaction"""
+        now = time.time()
+        rows = [self._row(item["key"], item.get("value"), item.get("category") or "general", item.get("ttl"),
+                          item.get("metadata"), now) for item in items]
+        self._write(rows)
+        return len(rows)
+
+    def _indexed(self, keys: List[str]) -> List[tuple]:
+        found = []
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            found += self.conn.execute(
+                f"SELECT id, content FROM memory_store WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+        return found
+
+    def _write(self, rows: List[tuple]):
+        keys = list(dict.fromkeys(row[0] for row in rows))
+        with self._lock:
+            with self.conn:
+                replaced = self._indexed(keys)
+                if replaced:
+                    self.conn.executemany(
+                        "INSERT INTO memory_fts (memory_fts, rowid, content) VALUES ('delete', ?, ?)", replaced)
+                self.conn.executemany(UPSERT, rows)
+                self.conn.executemany("INSERT INTO memory_fts (rowid, content) VALUES (?, ?)", self._indexed(keys))
+
+    def get(self, key: str, category: str = "general") -> Any:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value FROM memory_store WHERE key = ? AND category = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, category, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def search(self, query: str, category: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Unexpired memories matching every word of the query, best BM25 score first"""
+        expression = match_expression(query)
+        if expression is None:
+            return []
+        sql = ("SELECT m.key, m.value, m.category, bm25(memory_fts) AS score "
+               "FROM memory_fts JOIN memory_store m ON m.id = memory_fts.rowid "
+               "WHERE memory_fts MATCH ? AND (m.expires_at IS NULL OR m.expires_at > ?)")
+        params: List[Any] = [expression, time.time()]
+        if category:
+            sql += " AND m.category = ?"
+            params.append(category)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        # bm25() is lower-is-better; report higher-is-better
+        return [{"key": key, "value": json.loads(value), "category": cat, "score": -score}
+                for key, value, cat, score in rows]
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Delete expired memories in batches; returns how many"""
+        now = time.time() if now is None else now
+        deleted = 0
+        while True:
+            with self._lock:
+                with self.conn:
+                    expired = self.conn.execute(
+                        "SELECT id, content FROM memory_store WHERE expires_at <= ? LIMIT ?", (now, self.sweep_batch)
+                    ).fetchall()
+                    self.conn.executemany(
+                        "INSERT INTO memory_fts (memory_fts, rowid, content) VALUES ('delete', ?, ?)", expired)
+                    self.conn.executemany("DELETE FROM memory_store WHERE id = ?", [(row[0],) for row in expired])
+            deleted += len(expired)
+            if len(expired) < self.sweep_batch:
+                break
+        self.swept += deleted
+        return deleted
+
+    def start_sweeper(self, interval: float):
+        if self._sweeper is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    deleted = self.sweep()
+                    if deleted:
+                        logger.debug(f"Swept {deleted} expired memories")
+                except sqlite3.Error as e:
+                    logger.error(f"Error sweeping expired memories: {e}")
+
+        self._sweeper = threading.Thread(target=loop, name="memory-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM memory_store").fetchone()[0]
+
+    def close(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+        with self._lock:
+            self.conn.close()
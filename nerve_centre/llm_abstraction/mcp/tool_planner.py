@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Tool Call Planner
+Runs the tool calls extracted from one LLM response as a batch: independent
+calls run concurrently under a per-server concurrency cap, calls whose
+arguments reference an earlier call's result ({{call_id}} or
+{{call_id.field.0}}) wait for it, identical calls run once, and every call
+is bounded by a per-call and a whole-batch deadline.
+"""
+
+import asyncio
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+REFERENCE = re.compile(r'\{\{\s*([\w-]+)((?:\.[\w-]+)*)\s*\}\}')
+
+
+@dataclass
+class PlannedCall:
+    """One tool call of a batch with its dependencies"""
+    call_id: str
+    function_name: str
+    arguments: Dict[str, Any]
+    server: str
+    depends_on: Set[str] = field(default_factory=set)
+    duplicate_of: Optional[str] = None
+
+
+@dataclass
+class CallOutcome:
+    """What happened to a planned call; times in seconds"""
+    result: Any = None
+    error: Optional[str] = None
+    queue_time: float = 0.0
+    execution_time: Optional[float] = None
+    deduplicated_from: Optional[str] = None
+
+
+def references(value: Any) -> Set[str]:
+    """Call ids referenced anywhere in an argument value"""
+    if isinstance(value, str):
+        return {m.group(1) for m in REFERENCE.finditer(value)}
+    if isinstance(value, dict):
+        return set().union(*(references(v) for v in value.values())) if value else set()
+    if isinstance(value, (list, tuple)):
+        return set().union(*(references(v) for v in value)) if value else set()
+    return set()
+
+
+def _lookup(result: Any, path: str) -> Any:
+    for part in filter(None, path.split('.')):
+        if isinstance(result, (list, tuple)) and part.lstrip('-').isdigit():
+            result = result[int(part)]
+        elif isinstance(result, dict):
+            result = result[part]
+        else:
+            result = getattr(result, part)
+    return result
+
+
+def resolve_references(value: Any, results: Dict[str, Any]) -> Any:
+    """Substitute references to finished calls; a value that is just a reference takes the result as is"""
+    if isinstance(value, str):
+        whole = REFERENCE.fullmatch(value.strip())
+        if whole and whole.group(1) in results:
+            return _lookup(results[whole.group(1)], whole.group(2))
+
+        def substitute(match):
+            if match.group(1) not in results:
+                return match.group(0)
+            found = _lookup(results[match.group(1)], match.group(2))
+            return found if isinstance(found, str) else json.dumps(found, default=str)
+
+        return REFERENCE.sub(substitute, value)
+    if isinstance(value, dict):
+        return {k: resolve_references(v, results) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve_references(v, results) for v in value]
+    return value
+
+
+def plan_tool_calls(tool_calls: List[Dict[str, Any]], server_of: Callable[[str], str]) -> List[PlannedCall]:
+    """Assign call ids, find references between calls and mark identical calls as duplicates"""
+    planned = []
+    seen_ids = set()
+    for index, call in enumerate(tool_calls):
+        call_id = call.get('call_id') or f"call_{index}"
+        if call_id in seen_ids:
+            call_id = f"{call_id}_{index}"
+        seen_ids.add(call_id)
+        planned.append(PlannedCall(call_id, call['function_name'], call.get('arguments') or {},
+                                   server_of(call['function_name'])))
+
+    first_by_signature: Dict[str, str] = {}
+    for call in planned:
+        call.depends_on = references(call.arguments) & seen_ids - {call.call_id}
+        signature = json.dumps([call.function_name, call.arguments], sort_keys=True, default=str)
+        if signature in first_by_signature:
+            call.duplicate_of = first_by_signature[signature]
+        else:
+            first_by_signature[signature] = call.call_id
+    return planned
+
+
+def _in_cycles(planned: List[PlannedCall]) -> Set[str]:
+    """Calls that can never run because they (transitively) reference themselves"""
+    ids = {c.call_id for c in planned}
+    waits_on = {c.call_id: (set(c.depends_on) | ({c.duplicate_of} if c.duplicate_of else set())) & ids
+                for c in planned}
+    done: Set[str] = set()
+    progress = True
+    while progress:
+        progress = False
+        for call_id, deps in waits_on.items():
+            if call_id not in done and deps <= done:
+                done.add(call_id)
+                progress = True
+    return set(waits_on) - done
+
+
+class ToolCallPlanner:
+    """Executes planned calls concurrently, respecting references, server caps and deadlines"""
+
+    def __init__(self, max_concurrency_per_server: int = 4, call_timeout: float = 30.0, batch_timeout: float = 60.0):
+        self.max_concurrency_per_server = max_concurrency_per_server
+        self.call_timeout = call_timeout
+        self.batch_timeout = batch_timeout
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore(self, server: str) -> asyncio.Semaphore:
+        # Created lazily so each belongs to the running loop
+        if server not in self._semaphores:
+            self._semaphores[server] = asyncio.Semaphore(self.max_concurrency_per_server)
+        return self._semaphores[server]
+
+    async def run(self, planned: List[PlannedCall], execute: Callable[[str, Dict[str, Any]], Awaitable[Any]],
+                  runnable: Optional[Set[str]] = None) -> Dict[str, CallOutcome]:
+        """Outcome per call id of the runnable calls (default: all)"""
+        runnable = {c.call_id for c in planned} if runnable is None else runnable
+        calls = {c.call_id: c for c in planned if c.call_id in runnable}
+        outcomes = {call_id: CallOutcome() for call_id in calls}
+        finished = {call_id: asyncio.Event() for call_id in calls}
+        results: Dict[str, Any] = {}
+        started = time.perf_counter()
+        deadline = started + self.batch_timeout
+        cyclic = _in_cycles(list(calls.values()))
+
+        async def run_one(call: PlannedCall):
+            outcome = outcomes[call.call_id]
+            try:
+                if call.call_id in cyclic:
+                    outcome.error = "Circular reference between tool calls"
+                    return
+                waits_on = set(call.depends_on) | ({call.duplicate_of} if call.duplicate_of else set())
+                missing = waits_on - set(calls)
+                if missing:
+                    outcome.error = f"Depends on calls that were not executed: {', '.join(sorted(missing))}"
+                    return
+                for dep in waits_on:
+                    await finished[dep].wait()
+                failed = [dep for dep in waits_on if outcomes[dep].error is not None]
+                if call.duplicate_of:
+                    source = outcomes[call.duplicate_of]
+                    outcome.result, outcome.error = source.result, source.error
+                    if source.error is None:
+                        # Calls may reference the duplicate's id as well as the source's
+                        results[call.call_id] = source.result
+                    outcome.deduplicated_from = call.duplicate_of
+                    outcome.queue_time = time.perf_counter() - started
+                    return
+                if failed:
+                    outcome.error = f"Depends on failed calls: {', '.join(sorted(failed))}"
+                    return
+                arguments = resolve_references(call.arguments, results)
+                async with self._semaphore(call.server):
+                    call_started = time.perf_counter()
+                    outcome.queue_time = call_started - started
+                    remaining = min(self.call_timeout, deadline - call_started)
+                    try:
+                        result = await asyncio.wait_for(execute(call.function_name, arguments), remaining)
+                        outcome.result = results[call.call_id] = result
+                    except asyncio.TimeoutError:
+                        outcome.error = f"Timed out after {remaining:.1f}s"
+                    except Exception as e:
+                        outcome.error = str(e)
+                    finally:
+                        outcome.execution_time = time.perf_counter() - call_started
+            except asyncio.CancelledError:
+                outcome.error = "Batch deadline exceeded"
+                raise
+            finally:
+                finished[call.call_id].set()
+
+        tasks = [asyncio.create_task(run_one(call)) for call in calls.values()]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=max(deadline - time.perf_counter(), 0))
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        return outcomes
@@ -0,0 +1,160 @@
+"""
+Token-bucket rate limiting for LLM providers.
+
+Each provider name maps to one shared ProviderRateLimiter holding a
+request-per-minute bucket and an optional token-per-minute bucket. Callers
+reserve capacity under a lock and then wait outside it, with time.sleep for
+synchronous callers or asyncio.sleep for coroutines, so the event loop is
+never blocked and concurrent callers are served in reservation order.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class RateLimitExceeded(Exception):
+    """Raised when capacity would not be available within the caller's timeout."""
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per second."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` tokens, going into debt if needed; returns seconds until they are covered."""
+        self._refill(now)
+        self.tokens -= amount
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def refund(self, amount: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class ProviderRateLimiter:
+    """Request and token budgets for one provider, safe across threads and event loops."""
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: Optional[float] = None,
+        request_burst: Optional[float] = None,
+        token_burst: Optional[float] = None
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.request_bucket = TokenBucket(requests_per_minute / 60.0, request_burst or requests_per_minute)
+        self.token_bucket = (
+            TokenBucket(tokens_per_minute / 60.0, token_burst or tokens_per_minute)
+            if tokens_per_minute else None
+        )
+        self.lock = threading.Lock()
+
+        # Metrics
+        self.acquired = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.tokens_reserved = 0
+
+    def _reserve(self, tokens: int, timeout: Optional[float]) -> float:
+        """Reserve one request and `tokens` tokens; returns the wait before proceeding."""
+        with self.lock:
+            now = time.monotonic()
+            wait = self.request_bucket.reserve(1, now)
+            if self.token_bucket is not None and tokens:
+                wait = max(wait, self.token_bucket.reserve(tokens, now))
+
+            if timeout is not None and wait > timeout:
+                self.request_bucket.refund(1)
+                if self.token_bucket is not None and tokens:
+                    self.token_bucket.refund(tokens)
+                self.rejected += 1
+                raise RateLimitExceeded(
+                    f"Rate limit capacity available in {wait:.2f}s, exceeds timeout {timeout:.2f}s"
+                )
+
+            self.acquired += 1
+            self.tokens_reserved += tokens
+            if wait > 0:
+                self.throttled += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            return wait
+
+    def acquire(self, tokens: int = 0, timeout: Optional[float] = None) -> float:
+        """Block the calling thread until capacity is available; returns seconds waited."""
+        wait = self._reserve(tokens, timeout)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: int = 0, timeout: Optional[float] = None) -> float:
+        """Wait for capacity without blocking the event loop; returns seconds waited."""
+        wait = self._reserve(tokens, timeout)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def reconcile_tokens(self, estimated: int, actual: Optional[int]) -> None:
+        """Correct the token budget once a response reports how many tokens it really used."""
+        if self.token_bucket is None or actual is None or actual == estimated:
+            return
+        with self.lock:
+            self.token_bucket._refill(time.monotonic())
+            self.token_bucket.tokens -= actual - estimated
+            self.token_bucket.tokens = min(self.token_bucket.capacity, self.token_bucket.tokens)
+            self.tokens_reserved += actual - estimated
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Budget configuration, remaining capacity and throttling wait times."""
+        with self.lock:
+            now = time.monotonic()
+            self.request_bucket._refill(now)
+            if self.token_bucket is not None:
+                self.token_bucket._refill(now)
+            return {
+                'requests_per_minute': self.requests_per_minute,
+                'tokens_per_minute': self.tokens_per_minute,
+                'available_requests': round(self.request_bucket.tokens, 2),
+                'available_tokens': round(self.token_bucket.tokens, 2) if self.token_bucket else None,
+                'acquired': self.acquired,
+                'throttled': self.throttled,
+                'rejected': self.rejected,
+                'tokens_reserved': self.tokens_reserved,
+                'total_wait_seconds': round(self.total_wait, 3),
+                'avg_wait_ms': round(self.total_wait / self.throttled * 1000, 3) if self.throttled else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+            }
+
+
+_limiters: Dict[str, ProviderRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    provider_name: str,
+    requests_per_minute: float,
+    tokens_per_minute: Optional[float] = None,
+    request_burst: Optional[float] = None,
+    token_burst: Optional[float] = None
+) -> ProviderRateLimiter:
+    """Shared limiter for a provider name, so every instance draws from one budget."""
+    with _limiters_lock:
+        limiter = _limiters.get(provider_name)
+        if (limiter is None or limiter.requests_per_minute != requests_per_minute
+                or limiter.tokens_per_minute != tokens_per_minute):
+            limiter = ProviderRateLimiter(requests_per_minute, tokens_per_minute, request_burst, token_burst)
+            _limiters[provider_name] = limiter
+        return limiter
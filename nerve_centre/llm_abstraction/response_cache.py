@@ -0,0 +1,352 @@
+"""
+LLM response cache.
+
+Responses are keyed on a normalized hash of provider, model, engineered
+prompt, context and generation parameters and looked up through up to three
+tiers: an in-memory LRU, a SQLite table with TTL shared across processes, and
+an optional embedding-similarity tier that serves near-duplicate prompts.
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from hashlib import sha256
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from llm_abstraction.base import LLMResponse
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy ships with the enterprise requirements
+    np = None
+
+logger = logging.getLogger(__name__)
+
+Embedder = Callable[[str], Sequence[float]]
+
+
+def is_cacheable_temperature(temperature: Optional[float]) -> bool:
+    """Whether outputs at this temperature may be replayed (None is the provider default, which samples)."""
+    # Replaying a sampled output would freeze one draw for every later request
+    return temperature is not None and temperature <= 0
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so formatting-only differences share a cache entry."""
+    return re.sub(r'\s+', ' ', prompt).strip()
+
+
+def make_namespace(provider: str, model: Optional[str], params: Optional[Dict[str, Any]] = None) -> str:
+    """Everything except the prompt/context that must match for a cached answer to be valid."""
+    return json.dumps([provider, model, params or {}], sort_keys=True, default=str)
+
+
+def make_cache_key(namespace: str, prompt: str, context: Optional[Dict[str, Any]] = None) -> str:
+    """Stable hash of the namespace, normalized prompt and context."""
+    payload = json.dumps([namespace, normalize_prompt(prompt), context or {}], sort_keys=True, default=str)
+    return sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _serialize(responses: List[LLMResponse]) -> str:
+    return json.dumps([asdict(response) for response in responses], default=str)
+
+
+def _deserialize(payload: str) -> List[LLMResponse]:
+    return [LLMResponse(**item) for item in json.loads(payload)]
+
+
+class MemoryCacheTier:
+    """Bounded LRU of serialized responses with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[str, Tuple[str, float]]' = OrderedDict()
+
+    def get(self, key: str, now: float) -> Optional[str]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, key: str, payload: str, expires_at: float) -> None:
+        self.entries[key] = (payload, expires_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
+class SQLiteCacheTier:
+    """On-disk cache table with TTL, shared by every process using the same file."""
+
+    def __init__(self, db_path: str, prune_interval: float = 300.0):
+        self.db_path = db_path
+        self.prune_interval = prune_interval
+        self.last_prune = 0.0
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS llm_response_cache (
+                cache_key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                responses TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_response_cache_expiry ON llm_response_cache (expires_at)"
+        )
+        self.conn.commit()
+
+    def get(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        row = self.conn.execute(
+            "SELECT responses, expires_at FROM llm_response_cache WHERE cache_key = ? AND expires_at > ?",
+            (key, now)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, key: str, namespace: str, payload: str, now: float, expires_at: float) -> None:
+        self.conn.execute(
+            '''INSERT INTO llm_response_cache (cache_key, namespace, responses, created_at, expires_at)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(cache_key) DO UPDATE SET
+                   responses = excluded.responses,
+                   created_at = excluded.created_at,
+                   expires_at = excluded.expires_at''',
+            (key, namespace, payload, now, expires_at)
+        )
+        if now - self.last_prune > self.prune_interval:
+            self.conn.execute("DELETE FROM llm_response_cache WHERE expires_at <= ?", (now,))
+            self.last_prune = now
+        self.conn.commit()
+
+    def clear(self) -> None:
+        self.conn.execute("DELETE FROM llm_response_cache")
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class SemanticCacheTier:
+    """
+    Near-duplicate lookup by cosine similarity of prompt embeddings.
+    Only entries from the same namespace (provider, model, parameters and
+    context) are compared, and only matches at or above the threshold are served.
+    """
+
+    def __init__(self, embedder: Embedder, threshold: float = 0.95, max_entries: int = 2048):
+        if np is None:
+            raise ImportError("numpy is required for the semantic cache tier")
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # namespace (incl. context) -> (unit vector matrix, [(cache_key, expires_at)])
+        self.indexes: Dict[str, Tuple[Any, List[Tuple[str, float]]]] = {}
+        self.size = 0
+
+    def embed(self, prompt: str):
+        vector = np.asarray(self.embedder(normalize_prompt(prompt)), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, namespace: str, vector, now: float) -> Optional[Tuple[str, float]]:
+        """Best (cache_key, similarity) above the threshold that has not expired."""
+        index = self.indexes.get(namespace)
+        if index is None:
+            return None
+        matrix, entries = index
+        similarities = matrix @ vector
+        for position in np.argsort(-similarities):
+            similarity = float(similarities[position])
+            if similarity < self.threshold:
+                return None
+            key, expires_at = entries[position]
+            if expires_at > now:
+                return key, similarity
+        return None
+
+    def add(self, namespace: str, vector, key: str, expires_at: float, now: float) -> None:
+        matrix, entries = self.indexes.get(namespace, (None, []))
+        if matrix is None:
+            matrix = np.empty((0, vector.shape[0]), dtype=np.float32)
+        # Drop expired entries and any older copy of this key
+        live = [i for i, (existing, expiry) in enumerate(entries) if expiry > now and existing != key]
+        if len(live) != len(entries):
+            matrix, entries = matrix[live], [entries[i] for i in live]
+        matrix = np.vstack([matrix, vector[None, :]])
+        entries = entries + [(key, expires_at)]
+        if len(entries) > self.max_entries:
+            matrix, entries = matrix[-self.max_entries:], entries[-self.max_entries:]
+        self.indexes[namespace] = (matrix, entries)
+        self.size = sum(len(index[1]) for index in self.indexes.values())
+
+    def clear(self) -> None:
+        self.indexes.clear()
+        self.size = 0
+
+
+class LLMResponseCache:
+    """Tiered response cache with hit-ratio and saved-latency accounting."""
+
+    def __init__(
+        self,
+        memory_entries: int = 1024,
+        db_path: Optional[str] = None,
+        ttl: float = 86400.0,
+        embedder: Optional[Embedder] = None,
+        similarity_threshold: float = 0.95
+    ):
+        self.ttl = ttl
+        self.memory = MemoryCacheTier(memory_entries)
+        self.disk = SQLiteCacheTier(db_path) if db_path else None
+        self.semantic = SemanticCacheTier(embedder, similarity_threshold) if embedder else None
+        self.lock = threading.RLock()
+
+        # Metrics
+        self.hits = {'memory': 0, 'disk': 0, 'semantic': 0}
+        self.misses = 0
+        self.stores = 0
+        self.saved_latency = 0.0
+        self.by_provider: Dict[str, Dict[str, float]] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], base_dir: str = '.',
+                    embedder: Optional[Embedder] = None) -> Optional['LLMResponseCache']:
+        """Build from the `response_cache` section of llm_config.json; None when disabled."""
+        if not config or not config.get('enabled', True):
+            return None
+        db_path = config.get('db_path')
+        if db_path and not os.path.isabs(db_path):
+            db_path = os.path.join(base_dir, db_path)
+        semantic = config.get('semantic', {})
+        return cls(
+            memory_entries=config.get('memory_entries', 1024),
+            db_path=db_path,
+            ttl=config.get('ttl_seconds', 86400),
+            embedder=embedder if semantic.get('enabled') else None,
+            similarity_threshold=semantic.get('threshold', 0.95)
+        )
+
+    def get(self, provider: str, model: Optional[str], prompt: str,
+            context: Optional[Dict[str, Any]] = None,
+            params: Optional[Dict[str, Any]] = None) -> Optional[List[LLMResponse]]:
+        """Cached responses for a request, or None on a miss."""
+        namespace = make_namespace(provider, model, params)
+        key = make_cache_key(namespace, prompt, context)
+        now = time.time()
+
+        with self.lock:
+            payload, tier = self.memory.get(key, now), 'memory'
+            if payload is None and self.disk is not None:
+                found = self.disk.get(key, now)
+                if found is not None:
+                    payload, tier = found[0], 'disk'
+                    self.memory.set(key, found[0], found[1])
+
+        similarity = None
+        if payload is None and self.semantic is not None:
+            # Embed outside the lock so lookups don't queue behind the embedder
+            vector = self.semantic.embed(prompt)
+            with self.lock:
+                match = self.semantic.lookup(make_cache_key(namespace, '', context), vector, now)
+                if match is not None:
+                    payload = self.memory.get(match[0], now)
+                    if payload is None and self.disk is not None:
+                        found = self.disk.get(match[0], now)
+                        payload = found[0] if found else None
+                    tier, similarity = 'semantic', match[1]
+
+        if payload is None:
+            with self.lock:
+                self.misses += 1
+                self._provider_stats(provider)['misses'] += 1
+            return None
+
+        responses = _deserialize(payload)
+        saved = sum(response.processing_time or 0.0 for response in responses)
+        with self.lock:
+            self.hits[tier] += 1
+            self.saved_latency += saved
+            stats = self._provider_stats(provider)
+            stats['hits'] += 1
+            stats['saved_latency'] += saved
+
+        for response in responses:
+            response.metadata = dict(response.metadata or {}, cache=tier)
+            if similarity is not None:
+                response.metadata['cache_similarity'] = round(similarity, 4)
+        return responses
+
+    def put(self, provider: str, model: Optional[str], prompt: str, responses: List[LLMResponse],
+            context: Optional[Dict[str, Any]] = None,
+            params: Optional[Dict[str, Any]] = None, ttl: Optional[float] = None) -> None:
+        """Store responses for a request in every configured tier."""
+        if not responses:
+            return
+        namespace = make_namespace(provider, model, params)
+        key = make_cache_key(namespace, prompt, context)
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        payload = _serialize(responses)
+        vector = self.semantic.embed(prompt) if self.semantic is not None else None
+
+        with self.lock:
+            self.memory.set(key, payload, expires_at)
+            if self.disk is not None:
+                try:
+                    self.disk.set(key, namespace, payload, now, expires_at)
+                except sqlite3.Error as e:
+                    logger.warning(f"LLM response cache write failed: {e}")
+            if vector is not None:
+                self.semantic.add(make_cache_key(namespace, '', context), vector, key, expires_at, now)
+            self.stores += 1
+
+    def _provider_stats(self, provider: str) -> Dict[str, float]:
+        return self.by_provider.setdefault(provider, {'hits': 0, 'misses': 0, 'saved_latency': 0.0})
+
+    def clear(self) -> None:
+        with self.lock:
+            self.memory.clear()
+            if self.disk is not None:
+                self.disk.clear()
+            if self.semantic is not None:
+                self.semantic.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit ratio per tier and total provider latency avoided by cache hits."""
+        with self.lock:
+            hits = sum(self.hits.values())
+            lookups = hits + self.misses
+            return {
+                'hits': hits,
+                'misses': self.misses,
+                'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+                'hits_by_tier': dict(self.hits),
+                'stores': self.stores,
+                'saved_latency_seconds': round(self.saved_latency, 3),
+                'memory_entries': len(self.memory.entries),
+                'disk_enabled': self.disk is not None,
+                'semantic_entries': self.semantic.size if self.semantic is not None else None,
+                'by_provider': {
+                    name: {
+                        'hits': stats['hits'],
+                        'misses': stats['misses'],
+                        'saved_latency_seconds': round(stats['saved_latency'], 3),
+                    }
+                    for name, stats in self.by_provider.items()
+                },
+            }
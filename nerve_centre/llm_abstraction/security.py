@@ -5,8 +5,9 @@ import hashlib
 import hmac
 import time
 import logging
-from typing import Any, Dict, List, Optional, Set
-from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from dataclasses import dataclass, field
 from enum import Enum
 import re
 import json
@@ -41,6 +42,163 @@ class SecurityContext:
             self.timestamp = time.time()
 
 
+_FOLD_TOKEN = re.compile(r'\\N\{[^}]*\}|\\.|\(\?P|[^\\(]+|\(', re.DOTALL)
+_SCOPED_FLAGS = re.compile(r'\(\?[aiLmsux]*-')
+_BACKREFERENCE = re.compile(r'\\[1-9]|\(\?P=')
+# Escapes that spell a character by code or name; lowercasing around them can't reach it
+_CODE_ESCAPE = re.compile(r'\\(?:[xuU0]|N\{|[1-7][0-7]{2})')
+
+
+def _fold_case(pattern: str) -> Optional[str]:
+    """
+    Rewrite a pattern so that, without IGNORECASE, it matches lowercased text
+    exactly where the original matches with IGNORECASE. Escapes are kept as is.
+    Returns None for patterns that switch case sensitivity inline, spell
+    characters as code or name escapes, or have a character class (a range
+    such as A-z covers more than its lowercased form).
+    """
+    if _SCOPED_FLAGS.search(pattern):
+        return None
+    tokens = _FOLD_TOKEN.findall(pattern)
+    for i, token in enumerate(tokens):
+        if token.startswith('\\'):
+            # Octal escapes are split into the escape and the digits after it
+            if _CODE_ESCAPE.match(token + (tokens[i + 1][:2] if i + 1 < len(tokens) else '')):
+                return None
+        elif '[' in token:
+            return None
+    return "".join(
+        token if token.startswith('\\') or token == '(?P' else token.lower()
+        for token in tokens
+    )
+
+
+class _CategoryMatcher:
+    """Patterns of one category compiled into a single alternation."""
+
+    def __init__(self, patterns: Tuple[str, ...]):
+        combined, self.separate = [], []
+        for pattern in patterns:
+            folded = _fold_case(pattern)
+            try:
+                compiled = re.compile(folded) if folded is not None else re.compile(pattern, re.IGNORECASE)
+            except re.error:
+                compiled = re.compile(pattern, re.IGNORECASE)
+                folded = None
+            # Unfolded patterns run on the original text; backreferences would
+            # point at the wrong group inside the alternation
+            if folded is None or _BACKREFERENCE.search(folded):
+                self.separate.append((pattern, compiled, folded is None))
+            else:
+                combined.append((pattern, folded, compiled))
+        self.combined = None
+        self.rules = [(pattern, compiled) for pattern, _, compiled in combined]
+        if combined:
+            try:
+                # No named groups: they stop sre from skipping ahead on the first character
+                self.combined = re.compile("|".join(f"(?:{folded})" for _, folded, _ in combined))
+            except re.error:
+                self.separate = [(pattern, compiled, False) for pattern, compiled in self.rules] + self.separate
+                self.combined = None
+                self.rules = []
+
+    def search(self, lowered: str, original: str) -> Optional[str]:
+        """First pattern found in the text, or None."""
+        if self.combined is not None:
+            found = self.combined.search(lowered)
+            if found:
+                # The alternation took the first branch matching at the leftmost position
+                for pattern, compiled in self.rules:
+                    if compiled.match(lowered, found.start()):
+                        return pattern
+                return self.rules[0][0]
+        for pattern, compiled, on_original in self.separate:
+            if compiled.search(original if on_original else lowered):
+                return pattern
+        return None
+
+
+@lru_cache(maxsize=64)
+def _compile_category(patterns: Tuple[str, ...]) -> _CategoryMatcher:
+    return _CategoryMatcher(patterns)
+
+
+@dataclass
+class ScanResult:
+    """Categories found by a scan, each with the pattern that matched."""
+    matches: Dict[str, str] = field(default_factory=dict)
+    length: int = 0
+
+    def __contains__(self, category: str) -> bool:
+        return category in self.matches
+
+
+class ContentScanner:
+    """
+    Scans text for several pattern categories at once.
+
+    Text is lowercased once per block and every category is searched with one
+    precompiled alternation, instead of a case-insensitive re.search per
+    pattern. Patterns that can't be case-folded (see _fold_case) still run one
+    by one with IGNORECASE on the original text. Iterables of chunks are scanned in blocks with an overlap, so
+    large contexts never need to be joined into a single string; a match
+    longer than the overlap that straddles two blocks can be missed.
+    """
+
+    def __init__(
+        self,
+        categories: Dict[str, Sequence[str]],
+        block_size: int = 1 << 16,
+        overlap: int = 1024
+    ):
+        self.block_size = block_size
+        self.overlap = overlap
+        self.categories = {
+            name: _compile_category(tuple(patterns))
+            for name, patterns in categories.items() if patterns
+        }
+
+    def scan(self, text: str, categories: Optional[Sequence[str]] = None) -> ScanResult:
+        """Scan a string for the given categories (default: all)."""
+        result = ScanResult(length=len(text))
+        self._scan_block(text, self._pending(categories), result)
+        return result
+
+    def scan_chunks(self, chunks: Iterable[str], categories: Optional[Sequence[str]] = None) -> ScanResult:
+        """
+        Scan the concatenation of chunks. Stops reading once every requested
+        category has matched, so length then covers only what was read.
+        """
+        result = ScanResult()
+        pending = self._pending(categories)
+        tail, buffer, buffered = "", [], 0
+        for chunk in chunks:
+            result.length += len(chunk)
+            buffer.append(chunk)
+            buffered += len(chunk)
+            if buffered >= self.block_size:
+                block = tail + "".join(buffer)
+                self._scan_block(block, pending, result)
+                if not pending:
+                    return result
+                tail, buffer, buffered = block[-self.overlap:], [], 0
+        if buffer:
+            self._scan_block(tail + "".join(buffer), pending, result)
+        return result
+
+    def _pending(self, categories: Optional[Sequence[str]]) -> List[str]:
+        names = self.categories if categories is None else categories
+        return [name for name in names if name in self.categories]
+
+    def _scan_block(self, block: str, pending: List[str], result: ScanResult) -> None:
+        lowered = block.lower()
+        for name in list(pending):
+            pattern = self.categories[name].search(lowered, block)
+            if pattern is not None:
+                result.matches[name] = pattern
+                pending.remove(name)
+
+
 class SecurityValidator:
     """Comprehensive security validation for LLM operations."""
     
@@ -48,6 +206,16 @@ class SecurityValidator:
         self.config = config
         self.blocked_patterns = self._load_blocked_patterns()
         self.pii_patterns = self._load_pii_patterns()
+        self.leak_patterns = self._load_leak_patterns()
+        self.scanner = ContentScanner({
+            'blocked': self.blocked_patterns,
+            'pii': self.pii_patterns,
+            'leak': self.leak_patterns,
+            'compliance': [
+                rule.get('pattern', '') for rule in config.get('compliance_rules', [])
+                if rule.get('pattern')
+            ],
+        })
         self.rate_limits = {}
         self.security_events = []
         
@@ -104,8 +272,13 @@ class SecurityValidator:
     ) -> bool:
         """Validate LLM response for security issues."""
         try:
+            categories = ['leak', 'compliance']
+            if self.config.get('gdpr_enabled', False):
+                categories.append('pii')
+            found = self.scanner.scan(response, categories)
+            
             # Check for data leaks
-            if self._detect_data_leak(response):
+            if 'leak' in found:
                 self._log_security_event(
                     SecurityEvent.DATA_LEAK_DETECTED,
                     security_context
@@ -113,7 +286,7 @@ class SecurityValidator:
                 return False
             
             # Check for compliance violations
-            if self._check_compliance_violations(response, security_context):
+            if 'pii' in found or 'compliance' in found:
                 self._log_security_event(
                     SecurityEvent.COMPLIANCE_VIOLATION,
                     security_context
@@ -184,18 +357,19 @@ class SecurityValidator:
         security_context: SecurityContext
     ) -> bool:
         """Validate prompt content for security issues."""
+        found = self.scanner.scan(prompt, ('blocked', 'pii'))
+        
         # Check for blocked patterns
-        for pattern in self.blocked_patterns:
-            if re.search(pattern, prompt, re.IGNORECASE):
-                self._log_security_event(
-                    SecurityEvent.SUSPICIOUS_PROMPT,
-                    security_context,
-                    {'pattern': pattern}
-                )
-                return False
+        if 'blocked' in found:
+            self._log_security_event(
+                SecurityEvent.SUSPICIOUS_PROMPT,
+                security_context,
+                {'pattern': found.matches['blocked']}
+            )
+            return False
         
         # Check for PII
-        if self._detect_pii(prompt):
+        if 'pii' in found:
             self._log_security_event(
                 SecurityEvent.DATA_LEAK_DETECTED,
                 security_context
@@ -215,10 +389,12 @@ class SecurityValidator:
         security_context: SecurityContext
     ) -> bool:
         """Validate context data for security issues."""
-        context_str = json.dumps(context, default=str)
+        # Scan the JSON encoding as it is produced rather than as one string
+        chunks = json.JSONEncoder(default=str).iterencode(context)
+        found = self.scanner.scan_chunks(chunks, ('pii',))
         
         # Check for PII in context
-        if self._detect_pii(context_str):
+        if 'pii' in found:
             self._log_security_event(
                 SecurityEvent.DATA_LEAK_DETECTED,
                 security_context
@@ -227,35 +403,18 @@ class SecurityValidator:
         
         # Check context size
         max_context_size = self.config.get('max_context_size', 50000)
-        if len(context_str) > max_context_size:
+        if found.length > max_context_size:
             return False
         
         return True
     
     def _detect_pii(self, text: str) -> bool:
         """Detect personally identifiable information."""
-        for pattern in self.pii_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return True
-        return False
+        return 'pii' in self.scanner.scan(text, ('pii',))
     
     def _detect_data_leak(self, text: str) -> bool:
         """Detect potential data leaks in response."""
-        # Check for common data leak indicators
-        leak_patterns = [
-            r'password\s*[:=]\s*\w+',
-            r'api[_-]?key\s*[:=]\s*\w+',
-            r'secret\s*[:=]\s*\w+',
-            r'token\s*[:=]\s*\w+',
-            r'database\s+connection',
-            r'internal\s+server',
-        ]
-        
-        for pattern in leak_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return True
-        
-        return False
+        return 'leak' in self.scanner.scan(text, ('leak',))
     
     def _check_compliance_violations(
         self,
@@ -263,19 +422,13 @@ class SecurityValidator:
         security_context: SecurityContext
     ) -> bool:
         """Check for regulatory compliance violations."""
+        categories = ['compliance']
         # GDPR compliance
         if self.config.get('gdpr_enabled', False):
-            if self._detect_pii(text):
-                return True
+            categories.append('pii')
         
         # Industry-specific compliance
-        compliance_rules = self.config.get('compliance_rules', [])
-        for rule in compliance_rules:
-            pattern = rule.get('pattern', '')
-            if pattern and re.search(pattern, text, re.IGNORECASE):
-                return True
-        
-        return False
+        return bool(self.scanner.scan(text, categories).matches)
     
     def _load_blocked_patterns(self) -> List[str]:
         """Load blocked content patterns."""
@@ -305,6 +458,17 @@ class SecurityValidator:
             r'\b\d{1,5}\s+\w+\s+(?:street|st|avenue|ave|road|rd|drive|dr|lane|ln|way|court|ct)\b',  # Address
         ]
     
+    def _load_leak_patterns(self) -> List[str]:
+        """Load common data leak indicators."""
+        return [
+            r'password\s*[:=]\s*\w+',
+            r'api[_-]?key\s*[:=]\s*\w+',
+            r'secret\s*[:=]\s*\w+',
+            r'token\s*[:=]\s*\w+',
+            r'database\s+connection',
+            r'internal\s+server',
+        ]
+    
     def _log_security_event(
         self,
         event_type: SecurityEvent,
@@ -15,6 +15,7 @@
 #
 import base64
 
+from core.container import get_pool_metrics
 from core.logger import logger
 from fastapi import Request
 from models.enums import ResultStatus
@@ -28,6 +29,10 @@ async def healthz_handler():
     return {"status": "ok"}
 
 
+async def pool_metrics_handler():
+    return get_pool_metrics()
+
+
 @limiter.limit("5/second")
 async def run_code_handler(req: CodeExecutionRequest, request: Request):
     logger.info("🟢 Received /run request")
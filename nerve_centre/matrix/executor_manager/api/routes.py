@@ -15,9 +15,10 @@
 #
 from fastapi import APIRouter
 
-from api.handlers import healthz_handler, run_code_handler
+from api.handlers import healthz_handler, pool_metrics_handler, run_code_handler
 
 router = APIRouter()
 
 router.get("/healthz")(healthz_handler)
+router.get("/pool/metrics")(pool_metrics_handler)
 router.post("/run")(run_code_handler)
@@ -17,12 +17,15 @@ import os
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from services.runner import close_runners
 from util import format_timeout_duration, parse_timeout_duration
 
 from core.container import init_containers, teardown_containers
 from core.logger import logger
 
 TIMEOUT = 10
+# "runner": warm supervisor per container (services/runner.py); "exec": a docker exec chain per request
+RUNNER_MODE = os.getenv("SANDBOX_RUNNER_MODE", "runner")
 
 
 @asynccontextmanager
@@ -30,11 +33,19 @@ async def _lifespan(app: FastAPI):
     """Asynchronous lifecycle management"""
     size = int(os.getenv("SANDBOX_EXECUTOR_MANAGER_POOL_SIZE", 1))
 
-    success_count, total_task_count = await init_containers(size)
+    success_count, total_task_count = await init_containers(
+        size,
+        max_size=int(os.getenv("SANDBOX_EXECUTOR_MANAGER_POOL_MAX_SIZE", size)),
+        min_idle=int(os.getenv("SANDBOX_POOL_MIN_IDLE", 0)),
+        max_uses=int(os.getenv("SANDBOX_POOL_MAX_USES", 0)),
+        wait_timeout=float(os.getenv("SANDBOX_POOL_WAIT_TIMEOUT", 10)),
+        idle_ttl=float(os.getenv("SANDBOX_POOL_IDLE_TTL", 300)),
+    )
     logger.info(f"\n📊 Container pool initialization complete: {success_count}/{total_task_count} available")
 
     yield
 
+    await close_runners()
     await teardown_containers()
 
 
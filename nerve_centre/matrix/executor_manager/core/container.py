@@ -17,64 +17,337 @@ import asyncio
 import contextlib
 import os
 import time
-from queue import Empty, Queue
-from threading import Lock
+from collections import deque
+from typing import Any
 
 from models.enums import SupportLanguage
+from services.runner import discard_runner
 from util import env_setting_enabled, is_valid_memory_limit
 from utils.common import async_run_command
 
 from core.logger import logger
 
-_CONTAINER_QUEUES: dict[SupportLanguage, Queue] = {}
-_CONTAINER_LOCK: Lock = Lock()
 
+class SandboxBackend:
+    """Creates, checks and removes sandboxes; the pool only deals in names"""
 
-async def init_containers(size: int) -> tuple[int, int]:
-    global _CONTAINER_QUEUES
-    _CONTAINER_QUEUES = {SupportLanguage.PYTHON: Queue(), SupportLanguage.NODEJS: Queue()}
+    async def create(self, name: str, language: SupportLanguage) -> bool:
+        raise NotImplementedError
 
-    with _CONTAINER_LOCK:
-        while not _CONTAINER_QUEUES[SupportLanguage.PYTHON].empty():
-            _CONTAINER_QUEUES[SupportLanguage.PYTHON].get_nowait()
-        while not _CONTAINER_QUEUES[SupportLanguage.NODEJS].empty():
-            _CONTAINER_QUEUES[SupportLanguage.NODEJS].get_nowait()
+    async def destroy(self, name: str):
+        raise NotImplementedError
 
-    create_tasks = []
-    for i in range(size):
-        name = f"sandbox_python_{i}"
-        logger.info(f"🛠️ Creating Python container {i + 1}/{size}")
-        create_tasks.append(_prepare_container(name, SupportLanguage.PYTHON))
+    async def is_running(self, name: str) -> bool:
+        raise NotImplementedError
 
-        name = f"sandbox_nodejs_{i}"
-        logger.info(f"🛠️ Creating Node.js container {i + 1}/{size}")
-        create_tasks.append(_prepare_container(name, SupportLanguage.NODEJS))
 
-    results = await asyncio.gather(*create_tasks, return_exceptions=True)
-    success_count = sum(1 for r in results if r is True)
-    total_task_count = len(create_tasks)
-    return success_count, total_task_count
+class DockerSandboxBackend(SandboxBackend):
+    async def create(self, name: str, language: SupportLanguage) -> bool:
+        with contextlib.suppress(Exception):
+            await async_run_command("docker", "rm", "-f", name, timeout=5)
+        return await create_container(name, language)
+
+    async def destroy(self, name: str):
+        with contextlib.suppress(Exception):
+            await async_run_command("docker", "rm", "-f", name, timeout=5)
+
+    async def is_running(self, name: str) -> bool:
+        return await container_is_running(name)
+
+
+class _Sandbox:
+    __slots__ = ("name", "index", "uses", "last_used")
+
+    def __init__(self, name: str, index: int):
+        self.name = name
+        self.index = index
+        self.uses = 0
+        self.last_used = time.monotonic()
+
+
+class ContainerPool:
+    """
+    Sandboxes of one language. Waiters are served first come, first served;
+    the pool grows towards max_size while requests wait (and keeps min_idle
+    spare sandboxes warm), shrinks back to min_size after idle_ttl, and
+    recycles a sandbox after max_uses executions, on error, or when a health
+    check finds it stopped.
+    """
+
+    def __init__(
+        self,
+        language: SupportLanguage,
+        backend: SandboxBackend,
+        min_size: int = 1,
+        max_size: int | None = None,
+        min_idle: int = 0,
+        max_uses: int = 0,
+        wait_timeout: float = 10.0,
+        idle_ttl: float = 300.0,
+        check_interval: float = 30.0,
+    ):
+        self.language = language
+        self.backend = backend
+        self.min_size = min_size
+        self.max_size = max(max_size or min_size, min_size)
+        self.min_idle = min_idle
+        self.max_uses = max_uses
+        self.wait_timeout = wait_timeout
+        self.idle_ttl = idle_ttl
+        self.check_interval = check_interval
+
+        self._idle: deque[_Sandbox] = deque()
+        self._in_use: dict[str, _Sandbox] = {}
+        self._waiters: deque[asyncio.Future] = deque()
+        self._pending = 0
+        self._free_indexes: set[int] = set()
+        self._next_index = 0
+        self._tasks: set[asyncio.Task] = set()
+        self._maintainer: asyncio.Task | None = None
+        self._closed = False
+
+        # Metrics
+        self.created = 0
+        self.failed_creates = 0
+        self.recycled = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self._recent_waits: deque[float] = deque(maxlen=1024)
+
+    @property
+    def size(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._pending
+
+    async def start(self) -> int:
+        """Create min_size sandboxes and start the maintenance loop; returns how many came up"""
+        before = self.created
+        await asyncio.gather(*(self._reserve() for _ in range(self.min_size - self.size)), return_exceptions=True)
+        self._maintainer = asyncio.create_task(self._maintain_loop())
+        return self.created - before
+
+    async def acquire(self, timeout: float | None = None) -> str:
+        """Name of a sandbox, or "" if none became available within timeout"""
+        timeout = self.wait_timeout if timeout is None else timeout
+        started = time.perf_counter()
+        if self._idle and not self._waiters:
+            return self._checkout(self._idle.pop(), started)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._grow()
+        try:
+            sandbox = await asyncio.wait_for(waiter, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with contextlib.suppress(ValueError):
+                self._waiters.remove(waiter)
+            # Handed a sandbox just as the wait ended: pass it on
+            if waiter.done() and not waiter.cancelled():
+                sandbox = waiter.result()
+                self._in_use.pop(sandbox.name, None)
+                self._put(sandbox)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.timeouts += 1
+            return ""
+        return self._checkout(sandbox, started)
+
+    def _checkout(self, sandbox: _Sandbox, started: float) -> str:
+        waited = time.perf_counter() - started
+        self.total_wait_time += waited
+        self.max_wait_time = max(self.max_wait_time, waited)
+        self._recent_waits.append(waited)
+        self.checkouts += 1
+        sandbox.uses += 1
+        self._in_use[sandbox.name] = sandbox
+        self._grow()
+        return sandbox.name
+
+    def _put(self, sandbox: _Sandbox):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Counted as in use from the hand-off, before the waiter resumes
+                self._in_use[sandbox.name] = sandbox
+                waiter.set_result(sandbox)
+                return
+        sandbox.last_used = time.monotonic()
+        self._idle.append(sandbox)
+
+    async def release(self, name: str, failed: bool = False):
+        sandbox = self._in_use.pop(name, None)
+        if sandbox is None:
+            return
+        if self._closed:
+            await self._destroy(name)
+            return
+        if failed or (self.max_uses and sandbox.uses >= self.max_uses) or not await self.backend.is_running(name):
+            self._recycle(sandbox)
+            return
+        self._put(sandbox)
+        logger.info(f"🟢 Released container: {name} (remaining available: {len(self._idle)})")
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _grow(self):
+        if self._closed:
+            return
+        waiting = sum(1 for w in self._waiters if not w.done())
+        target = min(self.max_size, max(self.min_size, len(self._in_use) + waiting + self.min_idle))
+        for _ in range(target - self.size):
+            self._spawn(self._reserve())
+
+    def _take_index(self) -> int:
+        if self._free_indexes:
+            index = min(self._free_indexes)
+            self._free_indexes.discard(index)
+            return index
+        self._next_index += 1
+        return self._next_index - 1
+
+    def _reserve(self, index: int | None = None):
+        """Count a sandbox as pending right away and return the coroutine creating it"""
+        index = self._take_index() if index is None else index
+        self._pending += 1
+        return self._create(index)
+
+    async def _create(self, index: int):
+        name = f"sandbox_{self.language.value}_{index}"
+        try:
+            logger.info(f"🛠️ Creating {self.language.value} container {name} ({self.size}/{self.max_size})")
+            ok = await self.backend.create(name, self.language)
+        except Exception as e:
+            logger.error(f"❌ Container creation exception {name}: {str(e)}")
+            ok = False
+        finally:
+            self._pending -= 1
+        if not ok:
+            self.failed_creates += 1
+            self._free_indexes.add(index)
+            return
+        if self._closed:
+            await self.backend.destroy(name)
+            return
+        self.created += 1
+        self._put(_Sandbox(name, index))
+
+    def _recycle(self, sandbox: _Sandbox):
+        self.recycled += 1
+        logger.warning(f"♻️ Recycling container {sandbox.name} after {sandbox.uses} executions")
+        self._pending += 1
+        self._spawn(self._replace(sandbox))
+
+    async def _replace(self, sandbox: _Sandbox):
+        try:
+            await self._destroy(sandbox.name)
+        finally:
+            self._pending -= 1
+        await self._reserve(sandbox.index)
+
+    async def _remove(self, sandbox: _Sandbox):
+        await self._destroy(sandbox.name)
+        self._free_indexes.add(sandbox.index)
+
+    async def _destroy(self, name: str):
+        # A replacement comes back under the same name; it must not inherit the old runner
+        try:
+            await discard_runner(name)
+        finally:
+            await self.backend.destroy(name)
+
+    async def maintain(self):
+        """One maintenance pass: shrink idle sandboxes past idle_ttl, recycle stopped ones, refill to target"""
+        now = time.monotonic()
+        while self._idle and self.size > self.min_size and now - self._idle[0].last_used > self.idle_ttl:
+            sandbox = self._idle.popleft()
+            logger.info(f"🔻 Removing idle container {sandbox.name}")
+            self._spawn(self._remove(sandbox))
+
+        idle = list(self._idle)
+        healthy = await asyncio.gather(*(self.backend.is_running(s.name) for s in idle), return_exceptions=True)
+        for sandbox, ok in zip(idle, healthy):
+            if ok is not True and sandbox in self._idle:
+                self._idle.remove(sandbox)
+                self._recycle(sandbox)
+        self._grow()
+
+    async def _maintain_loop(self):
+        while not self._closed:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.maintain()
+            except Exception as e:
+                logger.error(f"❌ Container pool maintenance failed: {str(e)}")
+
+    async def close(self):
+        self._closed = True
+        if self._maintainer:
+            self._maintainer.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        while self._waiters:
+            self._waiters.popleft().cancel()
+        sandboxes = [*self._idle, *self._in_use.values()]
+        self._idle.clear()
+        self._in_use.clear()
+        await asyncio.gather(*(self._destroy(s.name) for s in sandboxes), return_exceptions=True)
+
+    def get_metrics(self) -> dict[str, Any]:
+        """Pool utilisation, wait time and recycle counters"""
+        waits = sorted(self._recent_waits)
+        return {
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "size": self.size,
+            "in_use": len(self._in_use),
+            "idle": len(self._idle),
+            "creating": self._pending,
+            "waiting": sum(1 for w in self._waiters if not w.done()),
+            "utilization": round(len(self._in_use) / self.size, 3) if self.size else 0.0,
+            "created": self.created,
+            "failed_creates": self.failed_creates,
+            "recycled": self.recycled,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait_time / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "p95_wait_ms": round(waits[int(len(waits) * 0.95) - 1 if len(waits) > 1 else 0] * 1000, 3) if waits else 0.0,
+            "max_wait_ms": round(self.max_wait_time * 1000, 3),
+        }
+
+
+_POOLS: dict[SupportLanguage, ContainerPool] = {}
+
+
+async def init_containers(size: int, backend: SandboxBackend | None = None, **pool_options) -> tuple[int, int]:
+    """Start one pool per language with size sandboxes each; pool_options go to ContainerPool"""
+    global _POOLS
+    backend = backend or DockerSandboxBackend()
+    _POOLS = {language: ContainerPool(language, backend, min_size=size, **pool_options) for language in SupportLanguage}
+    results = await asyncio.gather(*(pool.start() for pool in _POOLS.values()))
+    return sum(results), size * len(_POOLS)
 
 
 async def teardown_containers():
-    with _CONTAINER_LOCK:
-        while not _CONTAINER_QUEUES[SupportLanguage.PYTHON].empty():
-            name = _CONTAINER_QUEUES[SupportLanguage.PYTHON].get_nowait()
-            await async_run_command("docker", "rm", "-f", name, timeout=5)
-        while not _CONTAINER_QUEUES[SupportLanguage.NODEJS].empty():
-            name = _CONTAINER_QUEUES[SupportLanguage.NODEJS].get_nowait()
-            await async_run_command("docker", "rm", "-f", name, timeout=5)
+    await asyncio.gather(*(pool.close() for pool in _POOLS.values()), return_exceptions=True)
+
+
+async def release_container(name: str, language: SupportLanguage, failed: bool = False):
+    """Asynchronously release a container; failed ones are recycled"""
+    await _POOLS[language].release(name, failed)
 
 
-async def _prepare_container(name: str, language: SupportLanguage) -> bool:
-    """Prepare a single container"""
-    with contextlib.suppress(Exception):
-        await async_run_command("docker", "rm", "-f", name, timeout=5)
+async def allocate_container_blocking(language: SupportLanguage, timeout: float | None = None) -> str:
+    """Asynchronously allocate an available container, "" if none within timeout (default: the pool's wait_timeout)"""
+    return await _POOLS[language].acquire(timeout)
 
-    if await create_container(name, language):
-        _CONTAINER_QUEUES[language].put(name)
-        return True
-    return False
+
+def get_pool_metrics() -> dict[str, dict[str, Any]]:
+    return {language.value: pool.get_metrics() for language, pool in _POOLS.items()}
 
 
 async def create_container(name: str, language: SupportLanguage) -> bool:
@@ -138,49 +411,6 @@ async def create_container(name: str, language: SupportLanguage) -> bool:
         return False
 
 
-async def recreate_container(name: str, language: SupportLanguage) -> bool:
-    """Asynchronously recreate a container"""
-    logger.info(f"🛠️ Recreating container: {name}")
-    try:
-        await async_run_command("docker", "rm", "-f", name, timeout=5)
-
-        return await create_container(name, language)
-    except Exception as e:
-        logger.error(f"❌ Container {name} recreation failed: {str(e)}")
-        return False
-
-
-async def release_container(name: str, language: SupportLanguage):
-    """Asynchronously release a container"""
-    with _CONTAINER_LOCK:
-        if await container_is_running(name):
-            _CONTAINER_QUEUES[language].put(name)
-            logger.info(f"🟢 Released container: {name} (remaining available: {_CONTAINER_QUEUES[language].qsize()})")
-        else:
-            logger.warning(f"⚠️ Container {name} has crashed, attempting to recreate...")
-            if await recreate_container(name, language):
-                _CONTAINER_QUEUES[language].put(name)
-                logger.info(f"✅ Container {name} successfully recreated and returned to queue")
-
-
-async def allocate_container_blocking(language: SupportLanguage, timeout=10) -> str:
-    """Asynchronously allocate an available container"""
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            name = _CONTAINER_QUEUES[language].get_nowait()
-
-            with _CONTAINER_LOCK:
-                if not await container_is_running(name) and not await recreate_container(name, language):
-                    continue
-
-                return name
-        except Empty:
-            await asyncio.sleep(0.1)
-
-    return ""
-
-
 async def container_is_running(name: str) -> bool:
     """Asynchronously check the container status"""
     try:
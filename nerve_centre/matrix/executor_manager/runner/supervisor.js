@@ -0,0 +1,158 @@
+//
+//  Copyright 2025 The InfiniFlow Authors. All Rights Reserved.
+//
+//  Licensed under the Apache License, Version 2.0 (the "License");
+//  you may not use this file except in compliance with the License.
+//  You may obtain a copy of the License at
+//
+//      http://www.apache.org/licenses/LICENSE-2.0
+//
+//  Unless required by applicable law or agreed to in writing, software
+//  distributed under the License is distributed on an "AS IS" BASIS,
+//  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+//  See the License for the specific language governing permissions and
+//  limitations under the License.
+//
+// Long-lived Node.js runner supervisor, started inside a sandbox with
+// `node -e <this file> <workspace>`. Same framing as supervisor.py.
+// Node cannot fork, so each run is a fresh child process spawned from the
+// warm supervisor in its own process group and workdir.
+
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { spawn } = require('child_process');
+
+const workspace = process.argv[1] || os.tmpdir();
+
+const RUNNER = `
+const fs = require('fs');
+const path = require('path');
+
+const args = JSON.parse(process.argv[2]);
+
+const mainPath = path.join(__dirname, 'main.js');
+
+if (fs.existsSync(mainPath)) {
+    const { main } = require(mainPath);
+
+    if (typeof args === 'object' && args !== null) {
+        main(args).then(result => {
+            if (result !== null) {
+                console.log(result);
+            }
+        }).catch(err => {
+            console.error('Error in main function:', err);
+        });
+    } else {
+        console.error('Error: args is not a valid object:', args);
+    }
+} else {
+    console.error('main.js not found in the current directory');
+}
+`;
+
+function send(kind, payload) {
+    const header = Buffer.alloc(5);
+    header.write(kind, 0, 'latin1');
+    header.writeUInt32BE(payload.length, 1);
+    process.stdout.write(Buffer.concat([header, payload]));
+}
+
+function sendJson(kind, obj) {
+    send(kind, Buffer.from(JSON.stringify(obj)));
+}
+
+let pending = Buffer.alloc(0);
+let current = null;
+const queue = [];
+
+function killGroup(child) {
+    try {
+        process.kill(-child.pid, 'SIGKILL');
+    } catch (e) {
+        // already gone
+    }
+}
+
+function run(request) {
+    const workdir = fs.mkdtempSync(path.join(workspace, 'run_'));
+    fs.writeFileSync(path.join(workdir, 'main.js'), Buffer.from(request.code_b64, 'base64'));
+    fs.writeFileSync(path.join(workdir, 'runner.js'), RUNNER);
+
+    const started = process.hrtime.bigint();
+    const child = spawn(process.execPath, ['runner.js', JSON.stringify(request.arguments || {})], {
+        cwd: workdir,
+        detached: true,
+        stdio: ['ignore', 'pipe', 'pipe'],
+    });
+    current = child;
+    let timedOut = false;
+    const timer = setTimeout(() => {
+        timedOut = true;
+        killGroup(child);
+    }, request.timeout * 1000);
+
+    child.stdout.on('data', (data) => send('O', data));
+    child.stderr.on('data', (data) => send('E', data));
+    child.on('error', (err) => send('E', Buffer.from(String(err))));
+    child.on('close', (code, signal) => {
+        clearTimeout(timer);
+        killGroup(child);
+        current = null;
+        let exitCode = code;
+        if (timedOut) {
+            exitCode = 124;
+        } else if (signal) {
+            exitCode = 128 + (os.constants.signals[signal] || 0);
+        }
+        const timeUsedMs = Number(process.hrtime.bigint() - started) / 1e6;
+        try {
+            fs.rmSync(workdir, { recursive: true, force: true });
+        } catch (e) {
+            // cleaned up with the sandbox
+        }
+        sendJson('X', { exit_code: exitCode, time_used_ms: timeUsedMs });
+        next();
+    });
+}
+
+function next() {
+    if (current || queue.length === 0) {
+        return;
+    }
+    try {
+        run(queue.shift());
+    } catch (err) {
+        current = null;
+        send('E', Buffer.from(String(err && err.stack || err)));
+        sendJson('X', { exit_code: 255, time_used_ms: 0 });
+        next();
+    }
+}
+
+process.stdin.on('data', (data) => {
+    pending = Buffer.concat([pending, data]);
+    while (pending.length >= 5) {
+        const size = pending.readUInt32BE(1);
+        if (pending.length < 5 + size) {
+            break;
+        }
+        const kind = pending.toString('latin1', 0, 1);
+        const payload = pending.subarray(5, 5 + size);
+        pending = pending.subarray(5 + size);
+        if (kind === 'R') {
+            queue.push(JSON.parse(payload.toString('utf8')));
+        }
+    }
+    next();
+});
+
+process.stdin.on('end', () => {
+    if (current) {
+        killGroup(current);
+    }
+    process.exit(0);
+});
+
+sendJson('H', { pid: process.pid });
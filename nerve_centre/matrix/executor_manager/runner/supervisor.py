@@ -0,0 +1,204 @@
+#
+#  Copyright 2025 The InfiniFlow Authors. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Long-lived Python runner supervisor, started inside a sandbox with
+`python -I -B -u -c <this file> <workspace>`. Standard library only.
+
+Frames on stdin/stdout are a 1-byte kind and a 4-byte big-endian length:
+  H  (out) ready, JSON {"pid": ...}
+  R  (in)  run, JSON {"code_b64": ..., "arguments": {...}, "timeout": seconds}
+  O  (out) a chunk of the run's stdout
+  E  (out) a chunk of the run's stderr
+  X  (out) run finished, JSON {"exit_code": ..., "time_used_ms": ...}
+
+Each run is a forked child in its own process group and workdir. Exit codes
+follow the `timeout` command: 124 on timeout, 128 + signal when killed.
+Closing stdin kills the current run and stops the supervisor.
+"""
+
+import base64
+import json
+import os
+import select
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+import time
+import traceback
+
+HEADER = struct.Struct(">cI")
+CHUNK = 65536
+
+workspace = sys.argv[1] if len(sys.argv) > 1 else tempfile.gettempdir()
+pending = bytearray()
+
+
+def send(kind, payload):
+    data = HEADER.pack(kind, len(payload)) + payload
+    while data:
+        data = data[os.write(1, data):]
+
+
+def read_stdin():
+    data = os.read(0, CHUNK)
+    if not data:
+        raise EOFError
+    pending.extend(data)
+
+
+def read_frame():
+    while len(pending) < HEADER.size:
+        read_stdin()
+    kind, size = HEADER.unpack_from(pending)
+    while len(pending) < HEADER.size + size:
+        read_stdin()
+    payload = bytes(pending[HEADER.size : HEADER.size + size])
+    del pending[: HEADER.size + size]
+    return kind, payload
+
+
+def child(workdir, out_w, err_w, arguments):
+    os.setpgid(0, 0)
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(out_w, 1)
+    os.dup2(err_w, 2)
+    for fd in (devnull, out_w, err_w):
+        os.close(fd)
+    code = 1
+    try:
+        os.chdir(workdir)
+        sys.path.insert(0, workdir)
+        sys.argv = ["main.py", json.dumps(arguments)]
+        from main import main
+
+        result = main(**arguments)
+        if result is not None:
+            print(result)
+        code = 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def kill(pid):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def run(request):
+    workdir = tempfile.mkdtemp(prefix="run_", dir=workspace)
+    try:
+        with open(os.path.join(workdir, "main.py"), "wb") as f:
+            f.write(base64.b64decode(request["code_b64"]))
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        started = time.monotonic()
+        deadline = started + request["timeout"]
+        pid = os.fork()
+        if pid == 0:
+            os.close(out_r)
+            os.close(err_r)
+            child(workdir, out_w, err_w, request.get("arguments") or {})
+        os.close(out_w)
+        os.close(err_w)
+
+        streams = {out_r: b"O", err_r: b"E"}
+        timed_out = False
+        status = None
+        try:
+            while streams:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    timed_out = True
+                    break
+                ready, _, _ = select.select([*streams, 0], [], [], remaining)
+                for fd in ready:
+                    if fd == 0:
+                        read_stdin()
+                        continue
+                    data = os.read(fd, CHUNK)
+                    if data:
+                        send(streams[fd], data)
+                    else:
+                        os.close(fd)
+                        del streams[fd]
+            # Output closed; the child may still be running (e.g. it closed its own stdio)
+            while not timed_out:
+                waited, status = os.waitpid(pid, os.WNOHANG)
+                if waited:
+                    break
+                if time.monotonic() >= deadline:
+                    timed_out = True
+                    break
+                time.sleep(0.002)
+        except EOFError:
+            kill(pid)
+            os.waitpid(pid, 0)
+            raise
+        finally:
+            for fd in streams:
+                os.close(fd)
+
+        if timed_out:
+            kill(pid)
+            os.waitpid(pid, 0)
+            exit_code = 124
+        elif os.WIFSIGNALED(status):
+            exit_code = 128 + os.WTERMSIG(status)
+        else:
+            exit_code = os.WEXITSTATUS(status)
+        # Leftovers of the run's process group, e.g. background children
+        kill(pid)
+        send(b"X", json.dumps({"exit_code": exit_code, "time_used_ms": (time.monotonic() - started) * 1000}).encode())
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def serve():
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+    send(b"H", json.dumps({"pid": os.getpid()}).encode())
+    while True:
+        try:
+            kind, payload = read_frame()
+        except EOFError:
+            return
+        if kind != b"R":
+            continue
+        try:
+            run(json.loads(payload))
+        except EOFError:
+            return
+        except Exception:
+            send(b"E", traceback.format_exc().encode())
+            send(b"X", json.dumps({"exit_code": 255, "time_used_ms": 0}).encode())
+
+
+serve()
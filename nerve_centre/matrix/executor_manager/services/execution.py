@@ -20,11 +20,12 @@ import os
 import time
 import uuid
 
-from core.config import TIMEOUT
+from core.config import RUNNER_MODE, TIMEOUT
 from core.container import allocate_container_blocking, release_container
 from core.logger import logger
 from models.enums import ResourceLimitType, ResultStatus, RuntimeErrorType, SupportLanguage, UnauthorizedAccessType
 from models.schemas import CodeExecutionRequest, CodeExecutionResult
+from services.runner import acquire_runner, discard_runner
 from utils.common import async_run_command
 
 
@@ -41,6 +42,46 @@ async def execute_code(req: CodeExecutionRequest):
             detail="no_available_container",
         )
 
+    result = None
+    try:
+        if RUNNER_MODE == "exec":
+            result = await execute_code_with_exec(req, container)
+        else:
+            result = await execute_code_with_runner(req, container)
+        return result
+    finally:
+        # Sandboxes that hit an internal error are recycled rather than reused
+        await release_container(container, language, failed=result is None or result.detail == "internal_error")
+
+
+async def execute_code_with_runner(req: CodeExecutionRequest, container: str) -> CodeExecutionResult:
+    """Send the code to the container's warm runner supervisor: no per-request docker exec"""
+    start_time = time.time()
+    try:
+        runner = await acquire_runner(container, req.language)
+        logger.info(f"Passed in args: {req.arguments}")
+        result = await asyncio.wait_for(runner.run(req.code_b64, req.arguments, TIMEOUT), timeout=TIMEOUT + 5)
+        logger.info(f"{container}: exit_code={result.exit_code} time_used_ms={result.time_used_ms:.1f}")
+        return build_result(result.exit_code, result.stdout, result.stderr, result.time_used_ms)
+    except asyncio.TimeoutError:
+        await discard_runner(container)
+        return CodeExecutionResult(
+            status=ResultStatus.RESOURCE_LIMIT_EXCEEDED,
+            stdout="",
+            stderr="Execution timeout",
+            exit_code=-1,
+            resource_limit_type=ResourceLimitType.TIME,
+            time_used_ms=(time.time() - start_time) * 1000,
+        )
+    except Exception as e:
+        logger.error(f"Runner exception: {str(e)}")
+        await discard_runner(container)
+        return CodeExecutionResult(status=ResultStatus.PROGRAM_RUNNER_ERROR, stdout="", stderr=str(e), exit_code=-3, detail="internal_error")
+
+
+async def execute_code_with_exec(req: CodeExecutionRequest, container: str) -> CodeExecutionResult:
+    """Original path: copy the code in and run it with a chain of docker exec calls"""
+    language = req.language
     task_id = str(uuid.uuid4())
     workdir = f"/tmp/sandbox_{task_id}"
     os.makedirs(workdir, mode=0o700, exist_ok=True)
@@ -159,33 +200,7 @@ if (fs.existsSync(mainPath)) {
             logger.info(f"{stderr=}")
             logger.info(f"{args_json=}")
 
-            if returncode == 0:
-                return CodeExecutionResult(
-                    status=ResultStatus.SUCCESS,
-                    stdout=str(stdout),
-                    stderr=stderr,
-                    exit_code=0,
-                    time_used_ms=time_used_ms,
-                )
-            elif returncode == 124:
-                return CodeExecutionResult(
-                    status=ResultStatus.RESOURCE_LIMIT_EXCEEDED,
-                    stdout="",
-                    stderr="Execution timeout",
-                    exit_code=-124,
-                    resource_limit_type=ResourceLimitType.TIME,
-                    time_used_ms=time_used_ms,
-                )
-            elif returncode == 137:
-                return CodeExecutionResult(
-                    status=ResultStatus.RESOURCE_LIMIT_EXCEEDED,
-                    stdout="",
-                    stderr="Memory limit exceeded (killed by OOM)",
-                    exit_code=-137,
-                    resource_limit_type=ResourceLimitType.MEMORY,
-                    time_used_ms=time_used_ms,
-                )
-            return analyze_error_result(stderr, returncode)
+            return build_result(returncode, stdout, stderr, time_used_ms)
 
         except asyncio.TimeoutError:
             await async_run_command("docker", "exec", container, "pkill", "-9", language)
@@ -206,7 +221,37 @@ if (fs.existsSync(mainPath)) {
         # cleanup
         cleanup_tasks = [async_run_command("docker", "exec", container, "rm", "-rf", f"/workspace/{task_id}"), async_run_command("rm", "-rf", workdir)]
         await asyncio.gather(*cleanup_tasks, return_exceptions=True)
-        await release_container(container, language)
+
+
+def build_result(returncode: int, stdout: str, stderr: str, time_used_ms: float) -> CodeExecutionResult:
+    """Classify the exit code of a run; 124 and 137 are `timeout` and OOM kills"""
+    if returncode == 0:
+        return CodeExecutionResult(
+            status=ResultStatus.SUCCESS,
+            stdout=str(stdout),
+            stderr=stderr,
+            exit_code=0,
+            time_used_ms=time_used_ms,
+        )
+    elif returncode == 124:
+        return CodeExecutionResult(
+            status=ResultStatus.RESOURCE_LIMIT_EXCEEDED,
+            stdout="",
+            stderr="Execution timeout",
+            exit_code=-124,
+            resource_limit_type=ResourceLimitType.TIME,
+            time_used_ms=time_used_ms,
+        )
+    elif returncode == 137:
+        return CodeExecutionResult(
+            status=ResultStatus.RESOURCE_LIMIT_EXCEEDED,
+            stdout="",
+            stderr="Memory limit exceeded (killed by OOM)",
+            exit_code=-137,
+            resource_limit_type=ResourceLimitType.MEMORY,
+            time_used_ms=time_used_ms,
+        )
+    return analyze_error_result(stderr, returncode)
 
 
 def analyze_error_result(stderr: str, exit_code: int) -> CodeExecutionResult:
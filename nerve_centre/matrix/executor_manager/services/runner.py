@@ -0,0 +1,196 @@
+#
+#  Copyright 2025 The InfiniFlow Authors. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import asyncio
+import contextlib
+import json
+import struct
+import sys
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from core.logger import logger
+from models.enums import SupportLanguage
+from utils.common import async_run_command
+
+# Frame header: 1-byte kind, 4-byte big-endian payload length (see runner/supervisor.py)
+HEADER = struct.Struct(">cI")
+
+_SUPERVISOR_DIR = Path(__file__).resolve().parent.parent / "runner"
+_SUPERVISOR_FILES = {SupportLanguage.PYTHON: "supervisor.py", SupportLanguage.NODEJS: "supervisor.js"}
+_SUPERVISOR_SOURCES: dict[SupportLanguage, str] = {}
+
+
+def supervisor_source(language: SupportLanguage) -> str:
+    if language not in _SUPERVISOR_SOURCES:
+        _SUPERVISOR_SOURCES[language] = (_SUPERVISOR_DIR / _SUPERVISOR_FILES[language]).read_text()
+    return _SUPERVISOR_SOURCES[language]
+
+
+class RunnerError(Exception):
+    """The supervisor is gone or broke the protocol; the runner has to be restarted"""
+
+
+@dataclass
+class RunResult:
+    exit_code: int
+    stdout: str
+    stderr: str
+    time_used_ms: float
+
+
+class RunnerBackend:
+    """Where a supervisor runs: how to start it and how to clean up after it"""
+
+    workspace: str
+
+    def interpreter(self, language: SupportLanguage) -> list[str]:
+        if language == SupportLanguage.PYTHON:
+            return [language.value, "-I", "-B", "-u", "-c"]
+        return [language.value, "-e"]
+
+    def command(self, language: SupportLanguage) -> list[str]:
+        return [*self.interpreter(language), supervisor_source(language), self.workspace]
+
+    async def reset(self, language: SupportLanguage):
+        """Kill whatever a dead or hung supervisor left behind"""
+
+
+class DockerBackend(RunnerBackend):
+    """Supervisor kept alive by one `docker exec -i` into a pooled container"""
+
+    def __init__(self, container: str, workspace: str = "/workspace"):
+        self.container = container
+        self.workspace = workspace
+
+    def command(self, language: SupportLanguage) -> list[str]:
+        return ["docker", "exec", "-i", self.container, *super().command(language)]
+
+    async def reset(self, language: SupportLanguage):
+        with contextlib.suppress(Exception):
+            await async_run_command("docker", "exec", self.container, "pkill", "-9", language.value)
+
+
+class LocalBackend(RunnerBackend):
+    """Supervisor as a plain local subprocess, no isolation. For tests and benchmarks without Docker"""
+
+    def __init__(self, workspace: str | None = None, python: str = sys.executable, node: str = "node"):
+        self.workspace = workspace or tempfile.gettempdir()
+        self.python = python
+        self.node = node
+
+    def interpreter(self, language: SupportLanguage) -> list[str]:
+        if language == SupportLanguage.PYTHON:
+            return [self.python, "-I", "-B", "-u", "-c"]
+        return [self.node, "-e"]
+
+
+class Runner:
+    """One warm supervisor; runs are sent over its stdin and results streamed back on its stdout"""
+
+    def __init__(self, backend: RunnerBackend, language: SupportLanguage):
+        self.backend = backend
+        self.language = language
+        self.proc: asyncio.subprocess.Process | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    async def start(self, timeout: float = 10):
+        self.proc = await asyncio.create_subprocess_exec(*self.backend.command(self.language), stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE)
+        try:
+            kind, _ = await asyncio.wait_for(self._read_frame(), timeout=timeout)
+        except (asyncio.TimeoutError, RunnerError) as e:
+            await self.close()
+            raise RunnerError(f"Supervisor did not start: {e!r}")
+        if kind != b"H":
+            await self.close()
+            raise RunnerError(f"Unexpected frame from supervisor: {kind!r}")
+        return self
+
+    async def _read_frame(self) -> tuple[bytes, bytes]:
+        try:
+            kind, size = HEADER.unpack(await self.proc.stdout.readexactly(HEADER.size))
+            return kind, await self.proc.stdout.readexactly(size)
+        except asyncio.IncompleteReadError:
+            raise RunnerError("Supervisor closed its output")
+
+    async def run(self, code_b64: str, arguments: dict | None, timeout: float) -> RunResult:
+        """Run main() of the code with arguments; exit codes follow `timeout` (124 timeout, 128 + signal)"""
+        async with self._lock:
+            if not self.alive:
+                raise RunnerError("Supervisor is not running")
+            request = json.dumps({"code_b64": code_b64, "arguments": arguments or {}, "timeout": timeout}).encode()
+            stdout, stderr = bytearray(), bytearray()
+            try:
+                self.proc.stdin.write(HEADER.pack(b"R", len(request)) + request)
+                await self.proc.stdin.drain()
+                while True:
+                    kind, payload = await self._read_frame()
+                    if kind == b"O":
+                        stdout += payload
+                    elif kind == b"E":
+                        stderr += payload
+                    elif kind == b"X":
+                        done = json.loads(payload)
+                        return RunResult(done["exit_code"], stdout.decode(errors="replace"), stderr.decode(errors="replace"), done["time_used_ms"])
+            except (RunnerError, ConnectionError) as e:
+                returncode = await self.proc.wait()
+                # The OOM killer may pick the supervisor rather than the run; docker exec reports it as 137
+                if returncode in (137, -9):
+                    return RunResult(137, stdout.decode(errors="replace"), stderr.decode(errors="replace"), 0)
+                raise RunnerError(f"Supervisor exited with {returncode}: {e}")
+
+    async def close(self):
+        if self.proc is None:
+            return
+        if self.proc.returncode is None:
+            with contextlib.suppress(Exception):
+                self.proc.stdin.close()
+            try:
+                await asyncio.wait_for(self.proc.wait(), timeout=2)
+            except asyncio.TimeoutError:
+                self.proc.kill()
+                await self.proc.wait()
+        await self.backend.reset(self.language)
+
+
+_RUNNERS: dict[str, Runner] = {}
+
+
+async def acquire_runner(container: str, language: SupportLanguage) -> Runner:
+    """Warm runner of a pooled container, started on first use or after a crash"""
+    runner = _RUNNERS.get(container)
+    if runner is not None and runner.alive:
+        return runner
+    if runner is not None:
+        await runner.close()
+    runner = await Runner(DockerBackend(container), language).start()
+    logger.info(f"🔥 Runner supervisor started in {container}")
+    _RUNNERS[container] = runner
+    return runner
+
+
+async def discard_runner(container: str):
+    runner = _RUNNERS.pop(container, None)
+    if runner is not None:
+        await runner.close()
+
+
+async def close_runners():
+    await asyncio.gather(*(discard_runner(name) for name in list(_RUNNERS)), return_exceptions=True)
@@ -0,0 +1,209 @@
+"""
+Key/value cache behind the graphrag LLM, embedding and tag caches.
+
+Lookups go through an in-process LRU in front of a shared backend: Redis, or a
+local SQLite file when there is no Redis. Both take batches of keys in one
+round-trip. Embeddings are stored as little-endian float32 bytes; entries
+written as JSON lists are still read.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+EMBED_MAGIC = b"\x93F32"
+
+
+def encode_embedding(arr) -> bytes:
+    return EMBED_MAGIC + np.asarray(arr, dtype="<f4").tobytes()
+
+
+def decode_embedding(bin):
+    """Read-only float32 vector, or None"""
+    if not bin:
+        return None
+    if isinstance(bin, str):
+        bin = bin.encode("utf-8")
+    if bin.startswith(EMBED_MAGIC):
+        return np.frombuffer(bin, dtype="<f4", offset=len(EMBED_MAGIC))
+    return np.array(json.loads(bin))
+
+
+class LRUTier:
+    """Raw values with expiry, bounded by total size in bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, k, now):
+        with self.lock:
+            entry = self.entries.get(k)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                self.size -= len(entry[0])
+                del self.entries[k]
+                return None
+            self.entries.move_to_end(k)
+            return entry[0]
+
+    def set(self, k, v, expire_at):
+        if len(v) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(k, None)
+            if old is not None:
+                self.size -= len(old[0])
+            self.entries[k] = (v, expire_at)
+            self.size += len(v)
+            while self.size > self.max_bytes:
+                _, (old, _) = self.entries.popitem(last=False)
+                self.size -= len(old)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+class RedisBackend:
+    """Redis through a bytes client built from REDIS_CONN's connection settings"""
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_conn(cls, conn):
+        """None if conn has no live redis client to copy settings from"""
+        client = getattr(conn, "REDIS", None)
+        if client is None:
+            return None
+        import redis
+        pool = client.connection_pool
+        kwargs = dict(pool.connection_kwargs)
+        kwargs["decode_responses"] = False
+        return cls(redis.Redis(connection_pool=redis.ConnectionPool(connection_class=pool.connection_class, **kwargs)))
+
+    def mget(self, keys):
+        try:
+            return self.client.mget(keys)
+        except Exception as e:
+            logging.warning(f"[CACHE]: redis mget of {len(keys)} keys failed: {e}")
+            return [None] * len(keys)
+
+    def mset(self, items, ttl):
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for k, v in items.items():
+                pipe.set(k, v, ex=ttl)
+            pipe.execute()
+        except Exception as e:
+            logging.warning(f"[CACHE]: redis mset of {len(items)} keys failed: {e}")
+
+
+class SQLiteBackend:
+    """Local cache file shared by the processes on one host"""
+
+    BATCH = 500
+
+    def __init__(self, path, prune_interval=600):
+        self.path = path
+        self.prune_interval = prune_interval
+        self.last_prune = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS kv (k TEXT PRIMARY KEY, v BLOB NOT NULL, expire_at REAL NOT NULL)")
+        self.conn.commit()
+
+    def mget(self, keys):
+        found = {}
+        now = time.time()
+        with self.lock:
+            for b in range(0, len(keys), self.BATCH):
+                batch = keys[b:b + self.BATCH]
+                sql = "SELECT k, v FROM kv WHERE k IN (%s) AND expire_at > ?" % ",".join("?" * len(batch))
+                found.update(self.conn.execute(sql, (*batch, now)).fetchall())
+        return [found.get(k) for k in keys]
+
+    def mset(self, items, ttl):
+        now = time.time()
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO kv (k, v, expire_at) VALUES (?, ?, ?)",
+                                  [(k, v, now + ttl) for k, v in items.items()])
+            if now - self.last_prune > self.prune_interval:
+                self.conn.execute("DELETE FROM kv WHERE expire_at <= ?", (now,))
+                self.last_prune = now
+            self.conn.commit()
+
+
+class KVCache:
+    """LRU tier in front of an optional backend; values are bytes"""
+
+    def __init__(self, backend=None, lru_bytes=256 * 1024 * 1024, lru_ttl=3600):
+        self.backend = backend
+        self.lru = LRUTier(lru_bytes)
+        self.lru_ttl = lru_ttl
+
+    def mget(self, keys, ttl=None):
+        """Values for keys, None for misses; ttl bounds how long backend hits stay in the LRU"""
+        now = time.time()
+        res = [self.lru.get(k, now) for k in keys]
+        misses = [i for i, v in enumerate(res) if v is None]
+        if misses and self.backend:
+            expire_at = now + min(ttl or self.lru_ttl, self.lru_ttl)
+            for i, v in zip(misses, self.backend.mget([keys[i] for i in misses])):
+                if v is None:
+                    continue
+                if isinstance(v, str):
+                    v = v.encode("utf-8")
+                res[i] = v
+                self.lru.set(keys[i], v, expire_at)
+        return res
+
+    def mset(self, items, ttl):
+        if not items:
+            return
+        expire_at = time.time() + min(ttl, self.lru_ttl)
+        for k, v in items.items():
+            self.lru.set(k, v, expire_at)
+        if self.backend:
+            self.backend.mset(items, ttl)
+
+    def get(self, k, ttl=None):
+        return self.mget([k], ttl)[0]
+
+    def set(self, k, v, ttl):
+        self.mset({k: v}, ttl)
+
+
+def from_env(redis_conn) -> KVCache:
+    """GRAPHRAG_CACHE_BACKEND is redis (default, SQLite when Redis is unavailable), sqlite or memory"""
+    kind = os.environ.get("GRAPHRAG_CACHE_BACKEND", "redis")
+    lru_bytes = int(os.environ.get("GRAPHRAG_CACHE_LRU_MB", 256)) * 1024 * 1024
+    backend = None
+    if kind == "redis":
+        try:
+            backend = RedisBackend.from_conn(redis_conn)
+        except Exception as e:
+            logging.warning(f"[CACHE]: cannot open a redis client: {e}")
+        if backend is None:
+            logging.warning("[CACHE]: redis is unavailable, falling back to sqlite")
+            kind = "sqlite"
+    if kind == "sqlite":
+        path = os.environ.get("GRAPHRAG_CACHE_PATH", os.path.join(tempfile.gettempdir(), "graphrag_cache.db"))
+        backend = SQLiteBackend(path)
+    logging.info(f"[CACHE]: graphrag cache backend {kind}, LRU {lru_bytes >> 20}MB")
+    return KVCache(backend, lru_bytes)
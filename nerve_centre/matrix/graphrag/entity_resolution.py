@@ -1,11 +1,12 @@
 
 import logging
-import itertools
 import re
+from collections import Counter, defaultdict
 from dataclasses import dataclass
 from typing import Any, Callable
 
 import networkx as nx
+import numpy as np
 import trio
 
 from graphrag.general.extractor import Extractor
@@ -18,6 +19,80 @@ from graphrag.utils import perform_variable_replacements, chat_limiter, GraphCha
 DEFAULT_RECORD_DELIMITER = "##"
 DEFAULT_ENTITY_INDEX_DELIMITER = "<|>"
 DEFAULT_RESOLUTION_RESULT_DELIMITER = "&&"
+# Subgraph nodes probed per worker thread when generating candidate pairs
+CANDIDATE_ANCHOR_BATCH = 512
+
+
+class CandidateIndex:
+    """Blocking index over the names of one entity type.
+
+    Yields exactly the pairs EntityResolution.is_similarity accepts without
+    scanning all of them. Names sharing two distinct characters come from
+    per-character inverted lists. The English edit-distance clause only adds
+    pairs sharing at most one character c, and an alignment within
+    min(len) // 2 edits matches at least max(len) - min(len) // 2 characters,
+    so c must fill half of both names: English names are also bucketed by
+    such dominant characters and only bucket mates are edit-distance checked.
+    """
+
+    def __init__(self, names: list[str]):
+        self.names = names
+        self.charsets = [set(name) for name in names]
+        self.english = [is_english(name) for name in names]
+        postings = defaultdict(list)
+        dominant = defaultdict(list)
+        for i, name in enumerate(names):
+            for c in self.charsets[i]:
+                postings[c].append(i)
+            if self.english[i]:
+                for c, cnt in Counter(name).items():
+                    if 2 * cnt >= len(name):
+                        dominant[c].append(i)
+        self.postings = {c: np.array(ids, dtype=np.int64) for c, ids in postings.items()}
+        self.dominant = dict(dominant)
+
+    def similar(self, i: int) -> np.ndarray:
+        """Indices of the names similar to names[i]"""
+        res = []
+        chars = self.charsets[i]
+        if len(chars) > 1:
+            shared = np.bincount(np.concatenate([self.postings[c] for c in chars]), minlength=len(self.names))
+            res.append(np.flatnonzero(shared > 1))
+        if self.english[i]:
+            a = self.names[i]
+            mates = set()
+            for c, cnt in Counter(a).items():
+                if 2 * cnt >= len(a):
+                    mates.update(self.dominant[c])
+            res.append(np.array([j for j in mates if self.english[j] and
+                                 editdistance.eval(a, self.names[j]) <= min(len(a), len(self.names[j])) // 2],
+                                dtype=np.int64))
+        if not res:
+            return np.empty(0, dtype=np.int64)
+        ids = np.concatenate(res)
+        return ids[ids != i]
+
+    def pairs(self, anchors: list[int]) -> np.ndarray:
+        """Sorted, unique i * n + j codes (i < j) of similar pairs with an anchor on either side"""
+        n = len(self.names)
+        codes = [np.empty(0, dtype=np.int64)]
+        for i in anchors:
+            ids = self.similar(i)
+            codes.append(np.minimum(ids, i) * n + np.maximum(ids, i))
+        return self.merge(codes)
+
+    @staticmethod
+    def merge(codes: list[np.ndarray]) -> np.ndarray:
+        codes = np.sort(np.concatenate(codes))
+        if len(codes) > 1:
+            codes = codes[np.concatenate(([True], codes[1:] != codes[:-1]))]
+        return codes
+
+    def decode(self, codes: np.ndarray) -> list[tuple[str, str]]:
+        n = len(self.names)
+        names = np.empty(n, dtype=object)
+        names[:] = self.names
+        return list(zip(names[codes // n].tolist(), names[codes % n].tolist()))
 
 
 @dataclass
@@ -76,8 +151,9 @@ class EntityResolution(Extractor):
             node_clusters[graph.nodes[node].get('entity_type', '-')].append(node)
 
         candidate_resolution = {entity_type: [] for entity_type in entity_types}
-        for k, v in node_clusters.items():
-            candidate_resolution[k] = [(a, b) for a, b in itertools.combinations(v, 2) if (a in subgraph_nodes or b in subgraph_nodes) and self.is_similarity(a, b)]
+        async with trio.open_nursery() as nursery:
+            for k, v in node_clusters.items():
+                nursery.start_soon(self._find_candidates, k, v, subgraph_nodes, candidate_resolution)
         num_candidates = sum([len(candidates) for _, candidates in candidate_resolution.items()])
         callback(msg=f"Identified {num_candidates} candidate pairs")
 
@@ -110,6 +186,24 @@ class EntityResolution(Extractor):
             change=change,
         )
 
+    async def _find_candidates(self, entity_type: str, nodes: list[str], subgraph_nodes: set[str],
+                               candidate_resolution: dict[str, list[tuple[str, str]]]):
+        """Same pairs, in the same order, as filtering itertools.combinations(nodes, 2) with
+        is_similarity and subgraph membership; the index is probed from subgraph nodes only,
+        in batches on worker threads"""
+        index = await trio.to_thread.run_sync(CandidateIndex, nodes)
+        anchors = [i for i, node in enumerate(nodes) if node in subgraph_nodes]
+        batches = []
+
+        async def probe(batch):
+            batches.append(await trio.to_thread.run_sync(index.pairs, batch))
+
+        async with trio.open_nursery() as nursery:
+            for i in range(0, len(anchors), CANDIDATE_ANCHOR_BATCH):
+                nursery.start_soon(probe, anchors[i:i + CANDIDATE_ANCHOR_BATCH])
+        if batches:
+            candidate_resolution[entity_type] = index.decode(index.merge(batches))
+
     async def _resolve_candidate(self, candidate_resolution_i: tuple[str, list[tuple[str, str]]], resolution_result: set[str]):
         gen_conf = {"temperature": 0.5}
         pair_txt = [
@@ -207,7 +207,7 @@ async def merge_subgraph(
     old_graph = await get_graph(tenant_id, kb_id, subgraph.graph["source_id"])
     if old_graph is not None:
         logging.info("Merge with an exiting graph...................")
-        tidy_graph(old_graph, callback)
+        tidy_graph(old_graph, callback, change)
         new_graph = graph_merge(old_graph, subgraph, change)
     else:
         new_graph = subgraph
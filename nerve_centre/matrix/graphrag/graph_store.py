@@ -0,0 +1,150 @@
+"""
+Columnar records for the append-only knowledge graph log.
+
+set_graph appends one "graph_delta" record per GraphChange instead of
+rewriting the whole graph. A record holds:
+ - the attributes of added/updated nodes and edges, one column per attribute;
+ - the removed nodes and edges;
+ - the graph attributes;
+ - graph-wide scores (pagerank, rank) packed as float64 arrays over the
+   sorted node names.
+
+get_graph replays the records that follow the latest "graph" snapshot, and
+compaction folds them into a new snapshot. Snapshots stay node-link JSON, which
+is what other readers of the "graph" chunk expect.
+"""
+
+import base64
+import json
+
+import networkx as nx
+import numpy as np
+import xxhash
+
+# Sequence number of the last record a loaded graph reflects, kept in graph.graph
+STORE_SEQ = "store_seq"
+# Node attributes recomputed over the whole graph on every merge
+SCORE_ATTRS = ("pagerank", "rank")
+
+
+def columns(records, skip=()):
+    """Attribute dicts as {"cols": {attr: [values]}, "absent": {attr: [rows without it]}}"""
+    keys = dict.fromkeys(k for attrs in records for k in attrs if k not in skip)
+    cols, absent = {}, {}
+    for k in keys:
+        cols[k] = [attrs.get(k) for attrs in records]
+        missing = [i for i, attrs in enumerate(records) if k not in attrs]
+        if missing:
+            absent[k] = missing
+    return {"cols": cols, "absent": absent}
+
+
+def rows(table, n):
+    res = [{} for _ in range(n)]
+    for k, values in table["cols"].items():
+        missing = set(table["absent"].get(k, []))
+        for i, v in enumerate(values):
+            if i not in missing:
+                res[i][k] = v
+    return res
+
+
+def names_digest(names):
+    hasher = xxhash.xxh64()
+    for n in names:
+        hasher.update(str(n).encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def pack(arr):
+    return base64.b64encode(np.ascontiguousarray(arr, dtype="<f8").tobytes()).decode("ascii")
+
+
+def unpack(s):
+    return np.frombuffer(base64.b64decode(s), dtype="<f8")
+
+
+def encode_scores(graph: nx.Graph):
+    names = sorted(graph.nodes)
+    scores = {}
+    for attr in SCORE_ATTRS:
+        values = [graph.nodes[n].get(attr) for n in names]
+        if all(v is None for v in values):
+            continue
+        scores[attr] = pack([np.nan if v is None else v for v in values])
+    if not scores:
+        return None
+    return {"n": len(names), "digest": names_digest(names), "cols": scores}
+
+
+def apply_scores(graph: nx.Graph, scores) -> bool:
+    """False, leaving the graph as is, if the scores were packed over another node set"""
+    names = sorted(graph.nodes)
+    if scores["n"] != len(names) or scores["digest"] != names_digest(names):
+        return False
+    for attr, packed in scores["cols"].items():
+        values = unpack(packed)
+        is_int = attr == "rank"
+        for n, v in zip(names, values.tolist()):
+            if v != v:
+                graph.nodes[n].pop(attr, None)
+            else:
+                graph.nodes[n][attr] = int(v) if is_int else v
+    return True
+
+
+def encode_delta(graph: nx.Graph, change) -> dict:
+    """The change as applied to graph, in graph order so replay appends new nodes the same way"""
+    nodes = [n for n in graph.nodes if n in change.added_updated_nodes]
+    edges = [e for e in sorted(change.added_updated_edges) if graph.has_edge(*e)]
+    removed_edges = [e for e in sorted(change.removed_edges) if not graph.has_edge(*e)]
+    return {
+        "nodes": {"names": nodes, **columns([graph.nodes[n] for n in nodes], SCORE_ATTRS)},
+        "edges": {"src": [u for u, _ in edges], "tgt": [v for _, v in edges],
+                  **columns([graph.edges[e] for e in edges])},
+        "removed_nodes": sorted(n for n in change.removed_nodes if not graph.has_node(n)),
+        "removed_edges": {"src": [u for u, _ in removed_edges], "tgt": [v for _, v in removed_edges]},
+        "graph": {k: v for k, v in graph.graph.items() if k != STORE_SEQ},
+        "scores": encode_scores(graph),
+    }
+
+
+def apply_delta(graph: nx.Graph, delta) -> bool:
+    """Replay a record onto graph; False if its scores did not match the resulting nodes"""
+    for u, v in zip(delta["removed_edges"]["src"], delta["removed_edges"]["tgt"]):
+        if graph.has_edge(u, v):
+            graph.remove_edge(u, v)
+    graph.remove_nodes_from([n for n in delta["removed_nodes"] if graph.has_node(n)])
+
+    nodes = delta["nodes"]
+    for n, attrs in zip(nodes["names"], rows(nodes, len(nodes["names"]))):
+        if graph.has_node(n):
+            node = graph.nodes[n]
+            keep = {k: node[k] for k in SCORE_ATTRS if k in node}
+            node.clear()
+            node.update(attrs)
+            node.update(keep)
+        else:
+            graph.add_node(n, **attrs)
+    edges = delta["edges"]
+    for u, v, attrs in zip(edges["src"], edges["tgt"], rows(edges, len(edges["src"]))):
+        if graph.has_edge(u, v):
+            graph.edges[u, v].clear()
+        graph.add_edge(u, v, **attrs)
+
+    graph.graph.update(delta["graph"])
+    if delta["scores"] is None:
+        return True
+    return apply_scores(graph, delta["scores"])
+
+
+def dumps(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def snapshot_json(graph: nx.Graph) -> str:
+    """Node-link JSON of the graph without store bookkeeping"""
+    data = nx.node_link_data(graph, edges="edges")
+    data["graph"] = {k: v for k, v in data["graph"].items() if k != STORE_SEQ}
+    return json.dumps(data, ensure_ascii=False)
@@ -8,6 +8,7 @@ import html
 import json
 import logging
 import re
+import threading
 import time
 from collections import defaultdict
 from hashlib import md5
@@ -24,6 +25,8 @@ import dataclasses
 
 from api import settings
 from api.utils import get_uuid
+from graphrag.cache import KVCache, decode_embedding, encode_embedding, from_env as cache_from_env
+from graphrag.graph_store import STORE_SEQ, apply_delta, dumps, encode_delta, snapshot_json
 from rag.nlp import search, rag_tokenizer
 from rag.utils.doc_store_conn import OrderByExpr
 from rag.utils.redis_conn import REDIS_CONN
@@ -33,6 +36,15 @@ GRAPH_FIELD_SEP = "<SEP>"
 ErrorHandlerFn = Callable[[BaseException | None, str | None, dict | None], None]
 
 chat_limiter = trio.CapacityLimiter(int(os.environ.get('MAX_CONCURRENT_CHATS', 10)))
+embed_limiter = trio.CapacityLimiter(int(os.environ.get('MAX_CONCURRENT_EMBEDDINGS', 4)))
+
+# Texts per embd_mdl.encode call when indexing graph changes
+EMBED_BATCH_SIZE = int(os.environ.get('GRAPHRAG_EMBED_BATCH_SIZE', 32))
+# Bulk writes are cut at whichever limit is reached first
+BULK_MAX_DOCS = int(os.environ.get('GRAPHRAG_BULK_MAX_DOCS', 512))
+BULK_MAX_BYTES = int(os.environ.get('GRAPHRAG_BULK_MAX_BYTES', 8 * 1024 * 1024))
+# Graph log records appended after a snapshot before it is compacted
+GRAPH_COMPACT_EVERY = int(os.environ.get('GRAPHRAG_COMPACT_EVERY', 16))
 
 @dataclasses.dataclass
 class GraphChange:
@@ -90,51 +102,62 @@ def dict_has_keys_with_types(
     return True
 
 
-def get_llm_cache(llmnm, txt, history, genconf):
-    hasher = xxhash.xxh64()
-    hasher.update(str(llmnm).encode("utf-8"))
-    hasher.update(str(txt).encode("utf-8"))
-    hasher.update(str(history).encode("utf-8"))
-    hasher.update(str(genconf).encode("utf-8"))
+_cache = None
+_cache_lock = threading.Lock()
 
-    k = hasher.hexdigest()
-    bin = REDIS_CONN.get(k)
-    if not bin:
-        return
-    return bin
 
+def get_cache() -> KVCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = cache_from_env(REDIS_CONN)
+    return _cache
 
-def set_llm_cache(llmnm, txt, v, history, genconf):
+
+def llm_cache_key(llmnm, txt, history, genconf):
     hasher = xxhash.xxh64()
     hasher.update(str(llmnm).encode("utf-8"))
     hasher.update(str(txt).encode("utf-8"))
     hasher.update(str(history).encode("utf-8"))
     hasher.update(str(genconf).encode("utf-8"))
-
-    k = hasher.hexdigest()
-    REDIS_CONN.set(k, v.encode("utf-8"), 24*3600)
+    return hasher.hexdigest()
 
 
-def get_embed_cache(llmnm, txt):
+def embed_cache_key(llmnm, txt):
     hasher = xxhash.xxh64()
     hasher.update(str(llmnm).encode("utf-8"))
     hasher.update(str(txt).encode("utf-8"))
+    return hasher.hexdigest()
 
-    k = hasher.hexdigest()
-    bin = REDIS_CONN.get(k)
+
+def get_llm_cache(llmnm, txt, history, genconf):
+    bin = get_cache().get(llm_cache_key(llmnm, txt, history, genconf), 24*3600)
     if not bin:
         return
-    return np.array(json.loads(bin))
+    return bin.decode("utf-8")
+
+
+def set_llm_cache(llmnm, txt, v, history, genconf):
+    get_cache().set(llm_cache_key(llmnm, txt, history, genconf), v.encode("utf-8"), 24*3600)
+
+
+def get_embed_cache(llmnm, txt):
+    return decode_embedding(get_cache().get(embed_cache_key(llmnm, txt), 24*3600))
 
 
 def set_embed_cache(llmnm, txt, arr):
-    hasher = xxhash.xxh64()
-    hasher.update(str(llmnm).encode("utf-8"))
-    hasher.update(str(txt).encode("utf-8"))
+    get_cache().set(embed_cache_key(llmnm, txt), encode_embedding(arr), 24*3600)
+
+
+def get_embed_cache_many(llmnm, txts):
+    """Cached embeddings for txts in one round-trip, None for misses"""
+    bins = get_cache().mget([embed_cache_key(llmnm, txt) for txt in txts], 24*3600)
+    return [decode_embedding(bin) for bin in bins]
 
-    k = hasher.hexdigest()
-    arr = json.dumps(arr.tolist() if isinstance(arr, np.ndarray) else arr)
-    REDIS_CONN.set(k, arr.encode("utf-8"), 24*3600)
+
+def set_embed_cache_many(llmnm, embeddings: dict):
+    get_cache().mset({embed_cache_key(llmnm, txt): encode_embedding(arr) for txt, arr in embeddings.items()}, 24*3600)
 
 
 def get_tags_from_cache(kb_ids):
@@ -142,10 +165,10 @@ def get_tags_from_cache(kb_ids):
     hasher.update(str(kb_ids).encode("utf-8"))
 
     k = hasher.hexdigest()
-    bin = REDIS_CONN.get(k)
+    bin = get_cache().get(k, 600)
     if not bin:
         return
-    return bin
+    return bin.decode("utf-8")
 
 
 def set_tags_to_cache(kb_ids, tags):
@@ -153,11 +176,12 @@ def set_tags_to_cache(kb_ids, tags):
     hasher.update(str(kb_ids).encode("utf-8"))
 
     k = hasher.hexdigest()
-    REDIS_CONN.set(k, json.dumps(tags).encode("utf-8"), 600)
+    get_cache().set(k, json.dumps(tags).encode("utf-8"), 600)
 
-def tidy_graph(graph: nx.Graph, callback):
+def tidy_graph(graph: nx.Graph, callback, change: GraphChange | None = None):
     """
     Ensure all nodes and edges in the graph have some essential attribute.
+    What is purged or patched is recorded in change, if given.
     """
     def is_valid_node(node_attrs: dict) -> bool:
         valid_node = True
@@ -171,6 +195,10 @@ def tidy_graph(graph: nx.Graph, callback):
         if not is_valid_node(node_attrs):
             purged_nodes.append(node)
     for node in purged_nodes:
+        if change is not None:
+            change.removed_nodes.add(node)
+            change.added_updated_nodes.discard(node)
+            change.removed_edges.update(get_from_to(node, neighbor) for neighbor in graph.neighbors(node))
         graph.remove_node(node)
     if purged_nodes and callback:
         callback(msg=f"Purged {len(purged_nodes)} nodes from graph due to missing essential attributes.")
@@ -179,10 +207,15 @@ def tidy_graph(graph: nx.Graph, callback):
     for source, target, attr in graph.edges(data=True):
         if not is_valid_node(attr):
             purged_edges.append((source, target))
-        if "keywords" not in attr:
+        elif "keywords" not in attr:
             attr["keywords"] = []
+            if change is not None:
+                change.added_updated_edges.add(get_from_to(source, target))
     for source, target in purged_edges:
         graph.remove_edge(source, target)
+        if change is not None:
+            change.removed_edges.add(get_from_to(source, target))
+            change.added_updated_edges.discard(get_from_to(source, target))
     if purged_edges and callback:
         callback(msg=f"Purged {len(purged_edges)} edges from graph due to missing essential attributes.")
 
@@ -297,7 +330,8 @@ def chunk_id(chunk):
     return xxhash.xxh64((chunk["content_with_weight"] + chunk["kb_id"]).encode("utf-8")).hexdigest()
 
 
-async def graph_node_to_chunk(kb_id, embd_mdl, ent_name, meta, chunks):
+def graph_node_chunk(kb_id, ent_name, meta):
+    """Entity chunk without its embedding; returns it with the embedding cache key and text"""
     chunk = {
         "id": get_uuid(),
         "important_kwd": [ent_name],
@@ -312,12 +346,12 @@ async def graph_node_to_chunk(kb_id, embd_mdl, ent_name, meta, chunks):
         "available_int": 0
     }
     chunk["content_sm_ltks"] = rag_tokenizer.fine_grained_tokenize(chunk["content_ltks"])
-    ebd = get_embed_cache(embd_mdl.llm_name, ent_name)
-    if ebd is None:
-        ebd, _ = await trio.to_thread.run_sync(lambda: embd_mdl.encode([ent_name]))
-        ebd = ebd[0]
-        set_embed_cache(embd_mdl.llm_name, ent_name, ebd)
-    assert ebd is not None
+    return chunk, ent_name, ent_name
+
+
+async def graph_node_to_chunk(kb_id, embd_mdl, ent_name, meta, chunks):
+    chunk, key, txt = graph_node_chunk(kb_id, ent_name, meta)
+    ebd = (await embed_with_cache(embd_mdl, {key: txt}))[key]
     chunk["q_%d_vec" % len(ebd)] = ebd
     chunks.append(chunk)
 
@@ -349,7 +383,8 @@ def get_relation(tenant_id, kb_id, from_ent_name, to_ent_name, size=1):
     return res
 
 
-async def graph_edge_to_chunk(kb_id, embd_mdl, from_ent_name, to_ent_name, meta, chunks):
+def graph_edge_chunk(kb_id, from_ent_name, to_ent_name, meta):
+    """Relation chunk without its embedding; returns it with the embedding cache key and text"""
     chunk = {
         "id": get_uuid(),
         "from_entity_kwd": from_ent_name,
@@ -365,98 +400,285 @@ async def graph_edge_to_chunk(kb_id, embd_mdl, from_ent_name, to_ent_name, meta,
     }
     chunk["content_sm_ltks"] = rag_tokenizer.fine_grained_tokenize(chunk["content_ltks"])
     txt = f"{from_ent_name}->{to_ent_name}"
-    ebd = get_embed_cache(embd_mdl.llm_name, txt)
-    if ebd is None:
-        ebd, _ = await trio.to_thread.run_sync(lambda: embd_mdl.encode([txt+f": {meta['description']}"]))
-        ebd = ebd[0]
-        set_embed_cache(embd_mdl.llm_name, txt, ebd)
-    assert ebd is not None
+    return chunk, txt, txt + f": {meta['description']}"
+
+
+async def graph_edge_to_chunk(kb_id, embd_mdl, from_ent_name, to_ent_name, meta, chunks):
+    chunk, key, txt = graph_edge_chunk(kb_id, from_ent_name, to_ent_name, meta)
+    ebd = (await embed_with_cache(embd_mdl, {key: txt}))[key]
     chunk["q_%d_vec" % len(ebd)] = ebd
     chunks.append(chunk)
 
+
+async def embed_with_cache(embd_mdl, texts: dict[str, str], batch_size: int | None = None) -> dict[str, Any]:
+    """Embeddings of {cache key: text}, encoding only cache misses, batch_size texts per call"""
+    batch_size = batch_size or EMBED_BATCH_SIZE
+    keys = list(texts)
+    cached = await trio.to_thread.run_sync(lambda: get_embed_cache_many(embd_mdl.llm_name, keys))
+    res = {k: ebd for k, ebd in zip(keys, cached) if ebd is not None}
+    misses = [k for k in keys if k not in res]
+
+    async def encode(batch):
+        async with embed_limiter:
+            ebds, _ = await trio.to_thread.run_sync(lambda: embd_mdl.encode([texts[k] for k in batch]))
+        assert len(ebds) == len(batch)
+        ebds = dict(zip(batch, ebds))
+        await trio.to_thread.run_sync(lambda: set_embed_cache_many(embd_mdl.llm_name, ebds))
+        res.update(ebds)
+
+    async with trio.open_nursery() as nursery:
+        for i in range(0, len(misses), batch_size):
+            nursery.start_soon(encode, misses[i:i + batch_size])
+    return res
+
+
+def chunk_bytes(chunk) -> int:
+    """Rough serialized size of a chunk, for sizing bulk writes"""
+    size = 0
+    for v in chunk.values():
+        if isinstance(v, str):
+            size += len(v.encode("utf-8"))
+        elif isinstance(v, (list, np.ndarray)):
+            size += 20 * len(v)
+        else:
+            size += 16
+    return size
+
+
+async def bulk_insert(chunks, tenant_id, kb_id, max_docs=None, max_bytes=None) -> int:
+    """Insert chunks in batches bounded by document count and payload size; returns the number of batches"""
+    max_docs = max_docs or BULK_MAX_DOCS
+    max_bytes = max_bytes or BULK_MAX_BYTES
+    batches, batch, size = [], [], 0
+    for chunk in chunks:
+        n = chunk_bytes(chunk)
+        if batch and (len(batch) >= max_docs or size + n > max_bytes):
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(chunk)
+        size += n
+    if batch:
+        batches.append(batch)
+
+    for batch in batches:
+        doc_store_result = await trio.to_thread.run_sync(lambda: settings.docStoreConn.insert(batch, search.index_name(tenant_id), kb_id))
+        if doc_store_result:
+            error_message = f"Insert chunk error: {doc_store_result}, please check log file and Elasticsearch/Infinity status!"
+            raise Exception(error_message)
+    return len(batches)
+
+
+async def get_graph_records(tenant_id, kb_id, kinds, fields, order_by, limit=1024, **conds):
+    """Graph snapshot/log records of a knowledge base, weight_int holding their sequence number"""
+    res = []
+    bs = min(limit, 256)
+    for i in range(0, limit, bs):
+        es_res = await trio.to_thread.run_sync(lambda: settings.docStoreConn.search(fields, [],
+                                 {"kb_id": kb_id, "knowledge_graph_kwd": kinds, **conds},
+                                 [],
+                                 order_by,
+                                 i, min(bs, limit - i), search.index_name(tenant_id), [kb_id]
+                                 ))
+        es_res = settings.docStoreConn.getFields(es_res, fields)
+        for id, d in es_res.items():
+            d["id"] = id
+            d["weight_int"] = int(d.get("weight_int") or 0)
+            res.append(d)
+        if len(es_res) < bs:
+            break
+    return res
+
+
+async def get_graph_seq(tenant_id, kb_id, kinds=("graph", "graph_delta")):
+    """Sequence number of the newest record, None if there is none"""
+    res = await get_graph_records(tenant_id, kb_id, list(kinds), ["weight_int"], OrderByExpr().desc("weight_int"), 1)
+    return res[0]["weight_int"] if res else None
+
+
+async def get_graph_sources(tenant_id, kb_id) -> list[str]:
+    """source_id of the live graph: its snapshot, or the newest log record after it"""
+    snapshots = await get_graph_records(tenant_id, kb_id, ["graph"], ["source_id", "removed_kwd", "weight_int"], OrderByExpr().desc("weight_int"), 1)
+    if not snapshots or snapshots[0]["removed_kwd"] != "N":
+        return []
+    deltas = await get_graph_records(tenant_id, kb_id, ["graph_delta"], ["source_id", "weight_int"], OrderByExpr().desc("weight_int"), 1)
+    if deltas and deltas[0]["weight_int"] > snapshots[0]["weight_int"]:
+        return deltas[0]["source_id"]
+    return snapshots[0]["source_id"]
+
+
 async def does_graph_contains(tenant_id, kb_id, doc_id):
-    # Get doc_ids of graph
-    fields = ["source_id"]
-    condition = {
-        "knowledge_graph_kwd": ["graph"],
-        "removed_kwd": "N",
-    }
-    res = await trio.to_thread.run_sync(lambda: settings.docStoreConn.search(fields, [], condition, [], OrderByExpr(), 0, 1, search.index_name(tenant_id), [kb_id]))
-    fields2 = settings.docStoreConn.getFields(res, fields)
-    graph_doc_ids = set()
-    for chunk_id in fields2.keys():
-        graph_doc_ids = set(fields2[chunk_id]["source_id"])
-    return doc_id in graph_doc_ids
+    return doc_id in set(await get_graph_sources(tenant_id, kb_id))
+
 
 async def get_graph_doc_ids(tenant_id, kb_id) -> list[str]:
-    conds = {
-        "fields": ["source_id"],
-        "removed_kwd": "N",
-        "size": 1,
-        "knowledge_graph_kwd": ["graph"]
-    }
-    res = await trio.to_thread.run_sync(lambda: settings.retrievaler.search(conds, search.index_name(tenant_id), [kb_id]))
-    doc_ids = []
-    if res.total == 0:
-        return doc_ids
-    for id in res.ids:
-        doc_ids = res.field[id]["source_id"]
-    return doc_ids
+    return await get_graph_sources(tenant_id, kb_id)
 
 
 async def get_graph(tenant_id, kb_id, exclude_rebuild=None):
-    conds = {
-        "fields": ["content_with_weight", "removed_kwd", "source_id"],
-        "size": 1,
-        "knowledge_graph_kwd": ["graph"]
-    }
-    res = await trio.to_thread.run_sync(lambda: settings.retrievaler.search(conds, search.index_name(tenant_id), [kb_id]))
-    if not res.total == 0:
-        for id in res.ids:
-            try:
-                if res.field[id]["removed_kwd"] == "N":
-                    g = json_graph.node_link_graph(json.loads(res.field[id]["content_with_weight"]), edges="edges")
-                    if "source_id" not in g.graph:
-                        g.graph["source_id"] = res.field[id]["source_id"]
-                else:
-                    g = await rebuild_graph(tenant_id, kb_id, exclude_rebuild)
-                return g
-            except Exception:
+    """The snapshot with the graph log replayed on it; graph.graph[STORE_SEQ] is the last record applied.
+    A log that does not replay to the nodes it was written from is discarded for a graph rebuilt from subgraphs."""
+    for _ in range(3):
+        snapshots = await get_graph_records(tenant_id, kb_id, ["graph"], ["content_with_weight", "removed_kwd", "source_id", "weight_int"], OrderByExpr().desc("weight_int"), 1)
+        if not snapshots:
+            return None
+        snapshot = snapshots[0]
+        if snapshot["removed_kwd"] != "N":
+            return await rebuild_graph(tenant_id, kb_id, exclude_rebuild)
+        try:
+            g = json_graph.node_link_graph(json.loads(snapshot["content_with_weight"]), edges="edges")
+        except Exception:
+            logging.exception(f"[GRAPH]: cannot load the graph snapshot of kb {kb_id}")
+            return None
+        if "source_id" not in g.graph:
+            g.graph["source_id"] = snapshot["source_id"]
+
+        seq = snapshot["weight_int"]
+        deltas = await get_graph_records(tenant_id, kb_id, ["graph_delta"], ["content_with_weight", "weight_int"], OrderByExpr().asc("weight_int"), 1024 * 256)
+        for d in deltas:
+            if d["weight_int"] <= seq:
                 continue
-    result = None
-    return result
+            if d["weight_int"] != seq + 1:
+                # Compacted while reading; read the newer snapshot
+                break
+            if not apply_delta(g, json.loads(d["content_with_weight"])):
+                # The log missed a change; a rebuilt graph has no STORE_SEQ, so the next set_graph writes a snapshot
+                logging.error(f"[GRAPH]: scores of graph record {d['weight_int']} in kb {kb_id} do not match its nodes, rebuilding the graph")
+                return await rebuild_graph(tenant_id, kb_id, exclude_rebuild)
+            seq = d["weight_int"]
+        else:
+            g.graph[STORE_SEQ] = seq
+            return g
+    raise Exception(f"Graph log of kb {kb_id} kept changing while it was read.")
 
 
-async def set_graph(tenant_id: str, kb_id: str, embd_mdl, graph: nx.Graph, change: GraphChange, callback):
+async def compact_graph(tenant_id, kb_id):
+    """Fold the graph log into a new snapshot"""
+    graph = await get_graph(tenant_id, kb_id)
+    if graph is None or STORE_SEQ not in graph.graph:
+        return
+    seq = graph.graph[STORE_SEQ]
+    old = await get_graph_records(tenant_id, kb_id, ["graph", "graph_delta"], ["knowledge_graph_kwd", "weight_int"], OrderByExpr().asc("weight_int"), 1024 * 256)
+    old = [d for d in old if d["weight_int"] <= seq]
+    if not any(d["knowledge_graph_kwd"] == "graph_delta" for d in old):
+        return
     start = trio.current_time()
+    chunk = graph_snapshot_chunk(kb_id, graph, seq)
+    await trio.to_thread.run_sync(lambda: settings.docStoreConn.insert([chunk], search.index_name(tenant_id), kb_id))
+    # Older snapshots go before the records they cover so readers never see a gap after a snapshot
+    for kind in ("graph", "graph_delta"):
+        ids = [d["id"] for d in old if d["knowledge_graph_kwd"] == kind]
+        if ids:
+            await trio.to_thread.run_sync(lambda: settings.docStoreConn.delete({"id": ids}, search.index_name(tenant_id), kb_id))
+    logging.info(f"[GRAPH]: compacted {len(old)} graph records of kb {kb_id} up to {seq} in {trio.current_time() - start:.2f}s")
 
-    await trio.to_thread.run_sync(lambda: settings.docStoreConn.delete({"knowledge_graph_kwd": ["graph", "subgraph"]}, search.index_name(tenant_id), kb_id))
 
-    if change.removed_nodes:
-        await trio.to_thread.run_sync(lambda: settings.docStoreConn.delete({"knowledge_graph_kwd": ["entity"], "entity_kwd": sorted(change.removed_nodes)}, search.index_name(tenant_id), kb_id))
+_compacting = set()
+_compacting_lock = threading.Lock()
 
-    if change.removed_edges:
-        async with trio.open_nursery() as nursery:
-            for from_node, to_node in change.removed_edges:
-                 nursery.start_soon(lambda from_node=from_node, to_node=to_node: trio.to_thread.run_sync(lambda: settings.docStoreConn.delete({"knowledge_graph_kwd": ["relation"], "from_entity_kwd": from_node, "to_entity_kwd": to_node}, search.index_name(tenant_id), kb_id)))
-    now = trio.current_time()
-    if callback:
-        callback(msg=f"set_graph removed {len(change.removed_nodes)} nodes and {len(change.removed_edges)} edges from index in {now - start:.2f}s.")
-    start = now
 
-    chunks = [{
+def start_graph_compaction(tenant_id, kb_id):
+    """compact_graph in a background thread, once at a time per knowledge base"""
+    with _compacting_lock:
+        if kb_id in _compacting:
+            return
+        _compacting.add(kb_id)
+
+    def run():
+        try:
+            trio.run(compact_graph, tenant_id, kb_id)
+        except Exception:
+            logging.exception(f"[GRAPH]: compaction of kb {kb_id} failed")
+        finally:
+            with _compacting_lock:
+                _compacting.discard(kb_id)
+
+    threading.Thread(target=run, name=f"graph-compaction-{kb_id}", daemon=True).start()
+
+
+def graph_snapshot_chunk(kb_id, graph: nx.Graph, seq):
+    return {
         "id": get_uuid(),
-        "content_with_weight": json.dumps(nx.node_link_data(graph, edges="edges"), ensure_ascii=False),
+        "content_with_weight": snapshot_json(graph),
         "knowledge_graph_kwd": "graph",
         "kb_id": kb_id,
         "source_id": graph.graph.get("source_id", []),
+        "weight_int": seq,
         "available_int": 0,
         "removed_kwd": "N"
-    }]
-    
-    # generate updated subgraphs
+    }
+
+
+async def graph_record_chunk(tenant_id, kb_id, graph: nx.Graph, change: GraphChange):
+    """The chunk persisting graph: a log record of the change if graph was loaded from the newest record, else a
+    snapshot replacing the stored graph. Returns it with whether the log is due for compaction."""
+    seq = await get_graph_seq(tenant_id, kb_id)
+    if seq is not None and graph.graph.get(STORE_SEQ) == seq:
+        chunk = {
+            "id": get_uuid(),
+            "content_with_weight": dumps(encode_delta(graph, change)),
+            "knowledge_graph_kwd": "graph_delta",
+            "kb_id": kb_id,
+            "source_id": graph.graph.get("source_id", []),
+            "weight_int": seq + 1,
+            "available_int": 0,
+            "removed_kwd": "N"
+        }
+        base_seq = await get_graph_seq(tenant_id, kb_id, ["graph"])
+        return chunk, seq + 1 - (base_seq or 0) >= GRAPH_COMPACT_EVERY
+
+    await trio.to_thread.run_sync(lambda: settings.docStoreConn.delete({"knowledge_graph_kwd": ["graph", "graph_delta"]}, search.index_name(tenant_id), kb_id))
+    return graph_snapshot_chunk(kb_id, graph, 0 if seq is None else seq + 1), False
+
+
+def touched_sources(graph: nx.Graph, change: GraphChange) -> set[str]:
+    """Documents whose subgraph differs after the change.
+
+    A subgraph holds the nodes listing its document and the edges between them,
+    so changed nodes touch all their sources and changed edges the sources
+    shared by both ends. Removed nodes are merged into a survivor that inherits
+    their sources."""
+    sources = set()
+    for node in change.added_updated_nodes:
+        if graph.has_node(node):
+            sources.update(graph.nodes[node]["source_id"])
+    for from_node, to_node in change.added_updated_edges | change.removed_edges:
+        if graph.has_node(from_node) and graph.has_node(to_node):
+            sources.update(set(graph.nodes[from_node]["source_id"]) & set(graph.nodes[to_node]["source_id"]))
+    return sources
+
+
+async def get_subgraph_sources(tenant_id, kb_id) -> set[str]:
+    """Documents that have a subgraph chunk in the index"""
+    sources = set()
+    flds = ["source_id"]
+    bs = 1024
+    for i in range(0, 1024 * bs, bs):
+        es_res = await trio.to_thread.run_sync(lambda: settings.docStoreConn.search(flds, [],
+                                 {"kb_id": kb_id, "knowledge_graph_kwd": ["subgraph"]},
+                                 [],
+                                 OrderByExpr(),
+                                 i, bs, search.index_name(tenant_id), [kb_id]
+                                 ))
+        es_res = settings.docStoreConn.getFields(es_res, flds)
+        for d in es_res.values():
+            sources.update(d["source_id"])
+        if len(es_res) < bs:
+            break
+    return sources
+
+
+def subgraph_chunks(kb_id, graph: nx.Graph, sources: set[str]):
+    members = defaultdict(list)
+    for n, attrs in graph.nodes(data=True):
+        for source in attrs["source_id"]:
+            if source in sources:
+                members[source].append(n)
+    chunks = []
     for source in graph.graph["source_id"]:
-        subgraph = graph.subgraph([n for n in graph.nodes if source in graph.nodes[n]["source_id"]]).copy()
+        if source not in sources:
+            continue
+        subgraph = graph.subgraph(members[source]).copy()
+        subgraph.graph.pop(STORE_SEQ, None)
         subgraph.graph["source_id"] = [source]
         for n in subgraph.nodes:
             subgraph.nodes[n]["source_id"] = [source]
@@ -469,31 +691,80 @@ async def set_graph(tenant_id: str, kb_id: str, embd_mdl, graph: nx.Graph, chang
             "available_int": 0,
             "removed_kwd": "N"
         })
-    
-    async with trio.open_nursery() as nursery:
-        for node in change.added_updated_nodes:
-            node_attrs = graph.nodes[node]
-            nursery.start_soon(graph_node_to_chunk, kb_id, embd_mdl, node, node_attrs, chunks)
-        for from_node, to_node in change.added_updated_edges:
+    return chunks
+
+
+async def set_graph(tenant_id: str, kb_id: str, embd_mdl, graph: nx.Graph, change: GraphChange, callback):
+    start = trio.current_time()
+
+    # Subgraphs are rebuilt for touched documents, documents without one yet, and dropped for documents no longer in the graph
+    graph_sources = set(graph.graph["source_id"])
+    stored_sources = await get_subgraph_sources(tenant_id, kb_id)
+    rebuild_sources = touched_sources(graph, change) & graph_sources | (graph_sources - stored_sources)
+    stale_sources = stored_sources - graph_sources
+
+    graph_chunk, compact = await graph_record_chunk(tenant_id, kb_id, graph, change)
+    if rebuild_sources | stale_sources:
+        await trio.to_thread.run_sync(lambda: settings.docStoreConn.delete({"knowledge_graph_kwd": ["subgraph"], "source_id": sorted(rebuild_sources | stale_sources)}, search.index_name(tenant_id), kb_id))
+
+    if change.removed_nodes:
+        await trio.to_thread.run_sync(lambda: settings.docStoreConn.delete({"knowledge_graph_kwd": ["entity"], "entity_kwd": sorted(change.removed_nodes)}, search.index_name(tenant_id), kb_id))
+
+    if change.removed_edges:
+        removed_edges = defaultdict(list)
+        for from_node, to_node in change.removed_edges:
+            removed_edges[from_node].append(to_node)
+        async with trio.open_nursery() as nursery:
+            for from_node, to_nodes in removed_edges.items():
+                nursery.start_soon(lambda from_node=from_node, to_nodes=sorted(to_nodes): trio.to_thread.run_sync(lambda: settings.docStoreConn.delete({"knowledge_graph_kwd": ["relation"], "from_entity_kwd": from_node, "to_entity_kwd": to_nodes}, search.index_name(tenant_id), kb_id)))
+    now = trio.current_time()
+    if callback:
+        callback(msg=f"set_graph removed {len(change.removed_nodes)} nodes and {len(change.removed_edges)} edges from index in {now - start:.2f}s.")
+    start = now
+
+    chunks = [graph_chunk]
+    chunks.extend(subgraph_chunks(kb_id, graph, rebuild_sources))
+    now = trio.current_time()
+    if callback:
+        callback(msg=f"set_graph rebuilt {len(rebuild_sources)} of {len(graph_sources)} subgraphs in {now - start:.2f}s.")
+    start = now
+
+    def to_chunks():
+        res = []
+        for node in sorted(change.added_updated_nodes):
+            res.append(graph_node_chunk(kb_id, node, graph.nodes[node]))
+        for from_node, to_node in sorted(change.added_updated_edges):
             edge_attrs = graph.get_edge_data(from_node, to_node)
             if not edge_attrs:
                 # added_updated_edges could record a non-existing edge if both from_node and to_node participate in nodes merging.
                 continue
-            nursery.start_soon(graph_edge_to_chunk, kb_id, embd_mdl, from_node, to_node, edge_attrs, chunks)
+            res.append(graph_edge_chunk(kb_id, from_node, to_node, edge_attrs))
+        return res
+
+    ent_rel_chunks = await trio.to_thread.run_sync(to_chunks)
     now = trio.current_time()
     if callback:
-        callback(msg=f"set_graph converted graph change to {len(chunks)} chunks in {now - start:.2f}s.")
+        callback(msg=f"set_graph converted graph change to {len(ent_rel_chunks)} chunks in {now - start:.2f}s.")
     start = now
 
-    es_bulk_size = 4
-    for b in range(0, len(chunks), es_bulk_size):
-        doc_store_result = await trio.to_thread.run_sync(lambda: settings.docStoreConn.insert(chunks[b:b + es_bulk_size], search.index_name(tenant_id), kb_id))
-        if doc_store_result:
-            error_message = f"Insert chunk error: {doc_store_result}, please check log file and Elasticsearch/Infinity status!"
-            raise Exception(error_message)
+    ebds = await embed_with_cache(embd_mdl, {key: txt for _, key, txt in ent_rel_chunks})
+    for chunk, key, _ in ent_rel_chunks:
+        ebd = ebds[key]
+        assert ebd is not None
+        chunk["q_%d_vec" % len(ebd)] = ebd
+        chunks.append(chunk)
+    now = trio.current_time()
+    if callback:
+        callback(msg=f"set_graph embedded {len(ebds)} texts in {now - start:.2f}s.")
+    start = now
+
+    batches = await bulk_insert(chunks, tenant_id, kb_id)
+    graph.graph[STORE_SEQ] = graph_chunk["weight_int"]
+    if compact:
+        start_graph_compaction(tenant_id, kb_id)
     now = trio.current_time()
     if callback:
-        callback(msg=f"set_graph added/updated {len(change.added_updated_nodes)} nodes and {len(change.added_updated_edges)} edges from index in {now - start:.2f}s.")
+        callback(msg=f"set_graph added/updated {len(change.added_updated_nodes)} nodes and {len(change.added_updated_edges)} edges from index in {batches} bulk writes in {now - start:.2f}s.")
 
 
 def is_continuous_subsequence(subseq, seq):
@@ -610,5 +881,6 @@ async def rebuild_graph(tenant_id, kb_id, exclude_rebuild=None):
 
     if len(graph.nodes) == 0:
         return None
+    graph.graph.pop(STORE_SEQ, None)
     graph.graph["source_id"] = sorted(graph.graph["source_id"])
     return graph
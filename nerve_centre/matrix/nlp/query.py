@@ -227,18 +227,39 @@ class FulltextQueryer:
         return np.array(sims[0]) * vtweight + np.array(tksim) * tkweight, tksim, sims[0]
 
     def token_similarity(self, atks, btkss):
-        def toDict(tks):
+        # similarity() only weights the query side, so a candidate is just the set of
+        # query tokens it contains. Accumulating from 1e-9 in query token order keeps
+        # every score equal to the per-candidate loop.
+        import numpy as np
+
+        if isinstance(atks, str):
+            atks = atks.split()
+        qtwt = defaultdict(int)
+        for t, c in self.tw.weights(atks, preprocess=False):
+            qtwt[t] += c
+        vocab = {t: i for i, t in enumerate(qtwt)}
+        qw = np.array(list(qtwt.values()), dtype=np.float64)
+
+        rows, cols = [], []
+        for r, tks in enumerate(btkss):
             if isinstance(tks, str):
                 tks = tks.split()
-            d = defaultdict(int)
-            wts = self.tw.weights(tks, preprocess=False)
-            for i, (t, c) in enumerate(wts):
-                d[t] += c
-            return d
-
-        atks = toDict(atks)
-        btkss = [toDict(tks) for tks in btkss]
-        return [self.similarity(atks, btks) for btks in btkss]
+            ids = set(map(vocab.get, tks))
+            ids.discard(None)
+            rows.extend([r] * len(ids))
+            cols.extend(ids)
+
+        n = len(btkss)
+        rows = np.array(rows, dtype=np.int64)
+        cols = np.array(cols, dtype=np.int64)
+        order = np.argsort(cols, kind="stable")
+        s = np.bincount(np.concatenate([np.arange(n), rows[order]]),
+                        weights=np.concatenate([np.full(n, 1e-9), qw[cols[order]]]),
+                        minlength=n)
+        q = 1e-9
+        for v in qtwt.values():
+            q += v
+        return (s / q).tolist()
 
     def similarity(self, qtwt, dtwt):
         if isinstance(dtwt, type("")):
@@ -15,25 +15,41 @@
 #
 
 import logging
-import copy
 import datrie
 import math
 import os
 import re
 import string
 import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from hanziconv import HanziConv
 from nltk import word_tokenize
 from nltk.stem import PorterStemmer, WordNetLemmatizer
 from api.utils.file_utils import get_project_base_directory
 
 
+@lru_cache(maxsize=1 << 18)
+def _trie_key(line):
+    return str(line.lower().encode("utf-8"))[2:-1]
+
+
+@lru_cache(maxsize=1 << 18)
+def _trie_rkey(line):
+    return str(("DD" + (line[::-1].lower())).encode("utf-8"))[2:-1]
+
+
 class RagTokenizer:
+    # dfs_ appends a catch-all token for the rest of the text after this many tokens
+    MAX_DFS_DEPTH = 10
+
     def key_(self, line):
-        return str(line.lower().encode("utf-8"))[2:-1]
+        return _trie_key(line)
 
     def rkey_(self, line):
-        return str(("DD" + (line[::-1].lower())).encode("utf-8"))[2:-1]
+        return _trie_rkey(line)
 
     def loadDict_(self, fnm):
         logging.info(f"[HUQIE]:Build trie from {fnm}")
@@ -58,15 +74,24 @@ class RagTokenizer:
         except Exception:
             logging.exception(f"[HUQIE]:Build trie {fnm} failed")
 
-    def __init__(self, debug=False):
+    def __init__(self, debug=False, cache_size=100000):
         self.DEBUG = debug
         self.DENOMINATOR = 1000000
         self.DIR_ = os.path.join(get_project_base_directory(), "rag/res", "huqie")
 
+        # LRU of recent (method, text) -> tokens results, cleared when the dictionary changes
+        self.cache_size = cache_size
+        self.cache_ = OrderedDict()
+        self.cache_lock_ = threading.Lock()
+        self.pool_ = None
+        # Bumped on every dictionary change so dependents (term weights) can drop derived data
+        self.dict_version_ = 0
+
         self.stemmer = PorterStemmer()
         self.lemmatizer = WordNetLemmatizer()
 
         self.SPLIT_CHAR = r"([ ,\.<>/?;:'\[\]\\`!@#$%^&*\(\)\{\}\|_+=《》，。？、；‘’：“”【】~！￥%……（）——-]+|[a-zA-Z0-9,\.-]+)"
+        self.SPLIT_RE_ = re.compile(self.SPLIT_CHAR)
 
         trie_file_name = self.DIR_ + ".txt.trie"
         # check if trie file existence
@@ -88,6 +113,7 @@ class RagTokenizer:
         self.loadDict_(self.DIR_ + ".txt")
 
     def loadUserDict(self, fnm):
+        self.dictChanged_()
         try:
             self.trie_ = datrie.Trie.load(fnm + ".trie")
             return
@@ -96,8 +122,47 @@ class RagTokenizer:
         self.loadDict_(fnm)
 
     def addUserDict(self, fnm):
+        self.dictChanged_()
         self.loadDict_(fnm)
 
+    def dictChanged_(self):
+        # Cached results and worker processes hold the old dictionary
+        self.dict_version_ += 1
+        self.clearCache()
+        self.closePool()
+
+    def clearCache(self):
+        with self.cache_lock_:
+            self.cache_.clear()
+
+    def cacheGet_(self, key):
+        with self.cache_lock_:
+            res = self.cache_.get(key)
+            if res is not None:
+                self.cache_.move_to_end(key)
+            return res
+
+    def cachePut_(self, key, res):
+        if not self.cache_size:
+            return
+        with self.cache_lock_:
+            self.cache_[key] = res
+            self.cache_.move_to_end(key)
+            while len(self.cache_) > self.cache_size:
+                self.cache_.popitem(last=False)
+
+    def __getstate__(self):
+        # Sent to spawned tokenize_many workers: no lock, cache or pool
+        state = self.__dict__.copy()
+        state["cache_"] = OrderedDict()
+        state["cache_lock_"] = None
+        state["pool_"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.cache_lock_ = threading.Lock()
+
     def _strQ2B(self, ustring):
         """Convert full-width characters to half-width characters"""
         rstring = ""
@@ -116,51 +181,27 @@ class RagTokenizer:
     def _tradi2simp(self, line):
         return HanziConv.toSimplified(line)
 
-    def dfs_(self, chars, s, preTks, tkslist, _depth=0, _memo=None):
-        if _memo is None:
-            _memo = {}
-        MAX_DEPTH = 10
-        if _depth > MAX_DEPTH:
+    def dfs_(self, chars, s, preTks, tkslist, _depth=0):
+        # Enumerates every candidate segmentation into tkslist. preTks is used as a
+        # stack (append before recursing, pop after) and only copied for finished paths.
+        if _depth > self.MAX_DFS_DEPTH:
             if s < len(chars):
-                copy_pretks = copy.deepcopy(preTks)
-                remaining = "".join(chars[s:])
-                copy_pretks.append((remaining, (-12, '')))
-                tkslist.append(copy_pretks)
+                tkslist.append(preTks + [("".join(chars[s:]), (-12, ''))])
             return s
-    
-        state_key = (s, tuple(tk[0] for tk in preTks)) if preTks else (s, None)
-        if state_key in _memo:
-            return _memo[state_key]
-        
+
         res = s
         if s >= len(chars):
-            tkslist.append(preTks)
-            _memo[state_key] = s
+            tkslist.append(list(preTks))
             return s
         if s < len(chars) - 4:
-            is_repetitive = True
-            char_to_check = chars[s]
-            for i in range(1, 5):
-                if s + i >= len(chars) or chars[s + i] != char_to_check:
-                    is_repetitive = False
-                    break
-            if is_repetitive:
-                end = s
-                while end < len(chars) and chars[end] == char_to_check:
-                    end += 1
-                mid = s + min(10, end - s)
+            mid = self.repetitiveEnd_(chars, s)
+            if mid:
                 t = "".join(chars[s:mid])
-                k = self.key_(t)
-                copy_pretks = copy.deepcopy(preTks)
-                if k in self.trie_:
-                    copy_pretks.append((t, self.trie_[k]))
-                else:
-                    copy_pretks.append((t, (-12, '')))
-                next_res = self.dfs_(chars, mid, copy_pretks, tkslist, _depth + 1, _memo)
-                res = max(res, next_res)
-                _memo[state_key] = res
-                return res
-    
+                preTks.append((t, self.entry_(t)))
+                next_res = self.dfs_(chars, mid, preTks, tkslist, _depth + 1)
+                preTks.pop()
+                return max(res, next_res)
+
         S = s + 1
         if s + 2 <= len(chars):
             t1 = "".join(chars[s:s + 1])
@@ -171,31 +212,146 @@ class RagTokenizer:
             t1 = preTks[-1][0] + "".join(chars[s:s + 1])
             if self.trie_.has_keys_with_prefix(self.key_(t1)):
                 S = s + 2
-    
+
         for e in range(S, len(chars) + 1):
             t = "".join(chars[s:e])
             k = self.key_(t)
             if e > s + 1 and not self.trie_.has_keys_with_prefix(k):
                 break
             if k in self.trie_:
-                pretks = copy.deepcopy(preTks)
-                pretks.append((t, self.trie_[k]))
-                res = max(res, self.dfs_(chars, e, pretks, tkslist, _depth + 1, _memo))
-        
+                preTks.append((t, self.trie_[k]))
+                res = max(res, self.dfs_(chars, e, preTks, tkslist, _depth + 1))
+                preTks.pop()
+
         if res > s:
-            _memo[state_key] = res
             return res
-    
+
         t = "".join(chars[s:s + 1])
+        preTks.append((t, self.entry_(t)))
+        result = self.dfs_(chars, s + 1, preTks, tkslist, _depth + 1)
+        preTks.pop()
+        return result
+
+    def entry_(self, t):
         k = self.key_(t)
-        copy_pretks = copy.deepcopy(preTks)
         if k in self.trie_:
-            copy_pretks.append((t, self.trie_[k]))
-        else:
-            copy_pretks.append((t, (-12, '')))
-        result = self.dfs_(chars, s + 1, copy_pretks, tkslist, _depth + 1, _memo)
-        _memo[state_key] = result
-        return result
+            return self.trie_[k]
+        return (-12, '')
+
+    @staticmethod
+    def repetitiveEnd_(chars, s):
+        # End of a token covering a run of 5+ identical chars (capped at 10), or 0
+        c = chars[s]
+        for i in range(1, 5):
+            if s + i >= len(chars) or chars[s + i] != c:
+                return 0
+        end = s + 5
+        while end < len(chars) and chars[end] == c:
+            end += 1
+        return s + min(10, end - s)
+
+    def dictMatches_(self, chars, s):
+        # (end, trie entry) of dictionary words starting at s, in the order dfs_ tries them
+        matches = []
+        for e in range(s + 1, len(chars) + 1):
+            k = self.key_(chars[s:e])
+            if e > s + 1 and not self.trie_.has_keys_with_prefix(k):
+                break
+            if k in self.trie_:
+                matches.append((e, self.trie_[k]))
+        return matches
+
+    def bestSegment_(self, chars):
+        """
+        Highest-scoring segmentation among those dfs_ enumerates, without enumerating them.
+
+        score_ is B/n + L/n + F for n tokens of which L have 2+ chars, so for every
+        (n, L) only the path with the largest F can win. Each DP state (position,
+        depth, trailing single-char tokens) keeps, per (n, L) of its suffix, the best
+        F and a back pointer; branches are visited in dfs_ order and only replaced on
+        a strictly larger F, which reproduces sortTks_'s stable tie-breaking.
+        """
+        n = len(chars)
+        matches, memo = {}, {}
+
+        def has_prefix(t):
+            return self.trie_.has_keys_with_prefix(self.key_(t))
+
+        def extend(best, child_key, end, entry, tk_len):
+            long_tk = 1 if tk_len >= 2 else 0
+            for (cnt, lng), (F, _, _, _) in memo[child_key].items():
+                group = (cnt + 1, lng + long_tk)
+                F += entry[0]
+                if group not in best or F > best[group][0]:
+                    best[group] = (F, end, entry, child_key)
+
+        def solve(s, depth, singles):
+            key = (s, depth, singles)
+            if key in memo:
+                return key
+            best = {}
+            if depth > self.MAX_DFS_DEPTH:
+                if s < n:
+                    best[(1, 1 if n - s >= 2 else 0)] = (-12, n, (-12, ''), None)
+                memo[key] = best
+                return key
+            if s >= n:
+                best[(0, 0)] = (0, None, None, None)
+                memo[key] = best
+                return key
+
+            branches = None
+            if s < n - 4:
+                mid = self.repetitiveEnd_(chars, s)
+                if mid:
+                    branches = [(mid, self.entry_(chars[s:mid]))]
+            if branches is None:
+                S = s + 1
+                if s + 2 <= n and has_prefix(chars[s]) and not has_prefix(chars[s:s + 2]):
+                    S = s + 2
+                if singles >= 3 and has_prefix(chars[s - 1:s + 1]):
+                    S = s + 2
+                if s not in matches:
+                    matches[s] = self.dictMatches_(chars, s)
+                branches = [(e, entry) for e, entry in matches[s] if e >= S]
+                if not branches:
+                    branches = [(s + 1, self.entry_(chars[s]))]
+
+            for e, entry in branches:
+                tk_len = e - s
+                child_key = solve(e, depth + 1, min(singles + 1, 3) if tk_len == 1 else 0)
+                extend(best, child_key, e, entry, tk_len)
+            memo[key] = best
+            return key
+
+        root = solve(0, 0, 0)
+
+        def tokens(group):
+            key, tks = root, []
+            while True:
+                F, end, entry, child_key = memo[key][group]
+                if end is None:
+                    return tks
+                tks.append(chars[key[0]:end])
+                group = (group[0] - 1, group[1] - (1 if end - key[0] >= 2 else 0))
+                if child_key is None:
+                    return tks
+                key = child_key
+
+        best, best_score, best_ends = None, None, None
+        for group, (F, _, _, _) in memo[root].items():
+            cnt, lng = group
+            score = 30 / cnt + lng / cnt + F
+            if best is not None and score < best_score:
+                continue
+            tks = tokens(group)
+            ends = [len("".join(tks[:i + 1])) for i in range(len(tks))]
+            if best is None or score > best_score or ends < best_ends:
+                best, best_score, best_ends = tks, score, ends
+        if best is None:
+            # Every dfs_ path was dropped at the depth limit; fall back to max forward matching
+            return self.maxForward_(chars)[0]
+        return best
 
     def freq(self, tk):
         k = self.key_(tk)
@@ -239,7 +395,7 @@ class RagTokenizer:
             E = s + 1
             for e in range(s + 2, min(len(tks) + 2, s + 6)):
                 tk = "".join(tks[s:e])
-                if re.search(self.SPLIT_CHAR, tk) and self.freq(tk):
+                if self.SPLIT_RE_.search(tk) and self.freq(tk):
                     E = e
             res.append("".join(tks[s:E]))
             s = E
@@ -298,7 +454,7 @@ class RagTokenizer:
 
     def _split_by_lang(self, line):
         txt_lang_pairs = []
-        arr = re.split(self.SPLIT_CHAR, line)
+        arr = self.SPLIT_RE_.split(line)
         for a in arr:
             if not a:
                 continue
@@ -320,6 +476,13 @@ class RagTokenizer:
         return txt_lang_pairs
 
     def tokenize(self, line):
+        res = self.cacheGet_(("tks", line))
+        if res is None:
+            res = self.tokenize_(line)
+            self.cachePut_(("tks", line), res)
+        return res
+
+    def tokenize_(self, line):
         line = re.sub(r"\W+", " ", line)
         line = self._strQ2B(line).lower()
         line = self._tradi2simp(line)
@@ -367,9 +530,7 @@ class RagTokenizer:
                     j += 1
                     continue
                 # backward tokens from_i to i are different from forward tokens from _j to j.
-                tkslist = []
-                self.dfs_("".join(tks[_j:j]), 0, [], tkslist)
-                res.append(" ".join(self.sortTks_(tkslist)[0][0]))
+                res.append(" ".join(self.bestSegment_("".join(tks[_j:j]))))
 
                 same = 1
                 while i + same < len(tks1) and j + same < len(tks) and tks1[i + same] == tks[j + same]:
@@ -383,15 +544,65 @@ class RagTokenizer:
             if _i < len(tks1):
                 assert _j < len(tks)
                 assert "".join(tks1[_i:]) == "".join(tks[_j:])
-                tkslist = []
-                self.dfs_("".join(tks[_j:]), 0, [], tkslist)
-                res.append(" ".join(self.sortTks_(tkslist)[0][0]))
+                res.append(" ".join(self.bestSegment_("".join(tks[_j:]))))
 
         res = " ".join(res)
         logging.debug("[TKS] {}".format(self.merge_(res)))
         return self.merge_(res)
 
     def fine_grained_tokenize(self, tks):
+        res = self.cacheGet_(("fine", tks))
+        if res is None:
+            res = self.fine_grained_tokenize_(tks)
+            self.cachePut_(("fine", tks), res)
+        return res
+
+    def tokenize_many(self, lines, processes=None, chunksize=256):
+        """tokenize() for a batch of texts, spread over a process pool"""
+        return self.mapMany_("tokenize", lines, processes, chunksize)
+
+    def fine_grained_tokenize_many(self, tks_list, processes=None, chunksize=256):
+        """fine_grained_tokenize() for a batch of tokenize() outputs"""
+        return self.mapMany_("fine_grained_tokenize", tks_list, processes, chunksize)
+
+    def mapMany_(self, method, texts, processes, chunksize):
+        kind = "tks" if method == "tokenize" else "fine"
+        texts = list(texts)
+        results = [None] * len(texts)
+        todo = OrderedDict()
+        for i, txt in enumerate(texts):
+            res = self.cacheGet_((kind, txt))
+            if res is not None:
+                results[i] = res
+            else:
+                todo.setdefault(txt, []).append(i)
+
+        unique = list(todo)
+        if processes == 1 or len(unique) <= chunksize:
+            outputs = [getattr(self, method)(txt) for txt in unique]
+        else:
+            pool = self.getPool_(processes)
+            chunks = [(method, unique[i:i + chunksize]) for i in range(0, len(unique), chunksize)]
+            outputs = [res for chunk in pool.map(_tokenize_chunk, chunks) for res in chunk]
+
+        for txt, res in zip(unique, outputs):
+            self.cachePut_((kind, txt), res)
+            for i in todo[txt]:
+                results[i] = res
+        return results
+
+    def getPool_(self, processes=None):
+        if self.pool_ is None:
+            self.pool_ = ProcessPoolExecutor(max_workers=processes or os.cpu_count(),
+                                             initializer=_init_worker, initargs=(self,))
+        return self.pool_
+
+    def closePool(self):
+        if self.pool_ is not None:
+            self.pool_.shutdown(wait=False)
+            self.pool_ = None
+
+    def fine_grained_tokenize_(self, tks):
         tks = tks.split()
         zh_num = len([1 for c in tks if c and is_chinese(c[0])])
         if zh_num < len(tks) * 0.2:
@@ -432,6 +643,21 @@ class RagTokenizer:
         return " ".join(self.english_normalize_(res))
 
 
+_worker_tokenizer = None
+
+
+def _init_worker(tknzr):
+    global _worker_tokenizer
+    _worker_tokenizer = tknzr
+    # Workers never fan out again
+    _worker_tokenizer.pool_ = None
+
+
+def _tokenize_chunk(args):
+    method, texts = args
+    return [getattr(_worker_tokenizer, method)(txt) for txt in texts]
+
+
 def is_chinese(s):
     if s >= u'\u4e00' and s <= u'\u9fa5':
         return True
@@ -467,6 +693,8 @@ def naiveQie(txt):
 tokenizer = RagTokenizer()
 tokenize = tokenizer.tokenize
 fine_grained_tokenize = tokenizer.fine_grained_tokenize
+tokenize_many = tokenizer.tokenize_many
+fine_grained_tokenize_many = tokenizer.fine_grained_tokenize_many
 tag = tokenizer.tag
 freq = tokenizer.freq
 loadUserDict = tokenizer.loadUserDict
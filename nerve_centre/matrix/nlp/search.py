@@ -277,21 +277,29 @@ class Dealer:
                 rank_fea.append(nor/np.sqrt(denor)/q_denor)
         return np.array(rank_fea)*10. + pageranks
 
+    @staticmethod
+    def embedding_matrix(sres):
+        # Stored vectors are float32 values, so one contiguous float32 matrix holds them exactly
+        vector_size = len(sres.query_vector)
+        vector_column = f"q_{vector_size}_vec"
+        ins_embd = np.zeros((len(sres.ids), vector_size), dtype=np.float32)
+        for i, chunk_id in enumerate(sres.ids):
+            vector = sres.field[chunk_id].get(vector_column)
+            if vector is None:
+                continue
+            if isinstance(vector, str):
+                parsed = np.fromstring(vector, dtype=np.float32, sep="\t")
+                vector = parsed if len(parsed) == vector_size else [get_float(v) for v in vector.split("\t")]
+            ins_embd[i] = vector
+        return ins_embd
+
     def rerank(self, sres, query, tkweight=0.3,
                vtweight=0.7, cfield="content_ltks",
                rank_feature: dict | None = None
                ):
         _, keywords = self.qryr.question(query)
-        vector_size = len(sres.query_vector)
-        vector_column = f"q_{vector_size}_vec"
-        zero_vector = [0.0] * vector_size
-        ins_embd = []
-        for chunk_id in sres.ids:
-            vector = sres.field[chunk_id].get(vector_column, zero_vector)
-            if isinstance(vector, str):
-                vector = [get_float(v) for v in vector.split("\t")]
-            ins_embd.append(vector)
-        if not ins_embd:
+        ins_embd = self.embedding_matrix(sres)
+        if not len(ins_embd):
             return [], [], []
 
         for i in sres.ids:
@@ -19,13 +19,28 @@ import math
 import json
 import re
 import os
+import tempfile
+import threading
+from hashlib import md5
 import numpy as np
 from rag.nlp import rag_tokenizer
 from api.utils.file_utils import get_project_base_directory
 
+NER_WEIGHTS = {"toxic": 2, "func": 1, "corp": 3, "loca": 3, "sch": 3, "stock": 3,
+               "firstnm": 1}
+
+# Static factor table persisted next to the dictionaries it is built from
+INDEX_NAME = "term_weight.idx"
+INDEX_SOURCES = ["ner.json", "term.freq", "huqie.txt"]
+# Where the table goes when rag/res is read-only, named by the signature of its sources
+INDEX_CACHE_DIR = os.environ.get("TERM_WEIGHT_INDEX_DIR", os.path.join(tempfile.gettempdir(), "term_weight"))
+
+
+def idf(s, N): return math.log10(10 + ((N - s + 0.5) / (s + 0.5)))
+
 
 class Dealer:
-    def __init__(self):
+    def __init__(self, build_index=True, memo_size=200000):
         self.stop_words = set(["请问",
                                "您",
                                "你",
@@ -89,6 +104,15 @@ class Dealer:
         except Exception:
             logging.warning("Load term.freq FAIL!")
 
+        self.fnm_ = fnm
+        self.lock_ = threading.Lock()
+        self.memo_size = memo_size
+        self.dict_version_ = rag_tokenizer.tokenizer.dict_version_
+        self.index_, self.table_ = {}, np.empty((0, 4), dtype=np.float64)
+        self.clearMemo_()
+        if build_index:
+            self.loadIndex_()
+
     def pretoken(self, txt, num=False, stpwd=True):
         patt = [
             r"[~—\t @#%!<>,\.\?\":;'\{\}\[\]_=\(\)\|，。？》•●○↓《；‘’：“”【¥ 】…￥！、·（）×`&\\/「」\\]"
@@ -159,86 +183,208 @@ class Dealer:
                 tks.append(t)
         return tks
 
-    def weights(self, tks, preprocess=True):
-        def skill(t):
-            if t not in self.sk:
-                return 1
-            return 6
-
-        def ner(t):
-            if re.match(r"[0-9,.]{2,}$", t):
-                return 2
-            if re.match(r"[a-z]{1,2}$", t):
-                return 0.01
-            if not self.ne or t not in self.ne:
-                return 1
-            m = {"toxic": 2, "func": 1, "corp": 3, "loca": 3, "sch": 3, "stock": 3,
-                 "firstnm": 1}
-            return m[self.ne[t]]
-
-        def postag(t):
-            t = rag_tokenizer.tag(t)
-            if t in set(["r", "c", "d"]):
-                return 0.3
-            if t in set(["ns", "nt"]):
-                return 3
-            if t in set(["n"]):
-                return 2
-            if re.match(r"[0-9-]+", t):
-                return 2
+    def nerWeight_(self, t):
+        if re.match(r"[0-9,.]{2,}$", t):
+            return 2
+        if re.match(r"[a-z]{1,2}$", t):
+            return 0.01
+        if not self.ne or t not in self.ne:
             return 1
+        return NER_WEIGHTS[self.ne[t]]
+
+    def postagWeight_(self, t):
+        t = rag_tokenizer.tag(t)
+        if t in set(["r", "c", "d"]):
+            return 0.3
+        if t in set(["ns", "nt"]):
+            return 3
+        if t in set(["n"]):
+            return 2
+        if re.match(r"[0-9-]+", t):
+            return 2
+        return 1
 
-        def freq(t):
-            if re.match(r"[0-9. -]{2,}$", t):
-                return 3
-            s = rag_tokenizer.freq(t)
-            if not s and re.match(r"[a-z. -]+$", t):
-                return 300
-            if not s:
+    def freq_(self, t):
+        if re.match(r"[0-9. -]{2,}$", t):
+            return 3
+        s = rag_tokenizer.freq(t)
+        if not s and re.match(r"[a-z. -]+$", t):
+            return 300
+        if not s:
+            s = 0
+
+        if not s and len(t) >= 4:
+            s = [tt for tt in rag_tokenizer.fine_grained_tokenize(t).split() if len(tt) > 1]
+            if len(s) > 1:
+                s = np.min([self.freq_(tt) for tt in s]) / 6.
+            else:
                 s = 0
 
-            if not s and len(t) >= 4:
-                s = [tt for tt in rag_tokenizer.fine_grained_tokenize(t).split() if len(tt) > 1]
-                if len(s) > 1:
-                    s = np.min([freq(tt) for tt in s]) / 6.
-                else:
-                    s = 0
-
-            return max(s, 10)
-
-        def df(t):
-            if re.match(r"[0-9. -]{2,}$", t):
-                return 5
-            if t in self.df:
-                return self.df[t] + 3
-            elif re.match(r"[a-z. -]+$", t):
-                return 300
-            elif len(t) >= 4:
-                s = [tt for tt in rag_tokenizer.fine_grained_tokenize(t).split() if len(tt) > 1]
-                if len(s) > 1:
-                    return max(3, np.min([df(tt) for tt in s]) / 6.)
+        return max(s, 10)
 
-            return 3
+    def df_(self, t):
+        if re.match(r"[0-9. -]{2,}$", t):
+            return 5
+        if t in self.df:
+            return self.df[t] + 3
+        elif re.match(r"[a-z. -]+$", t):
+            return 300
+        elif len(t) >= 4:
+            s = [tt for tt in rag_tokenizer.fine_grained_tokenize(t).split() if len(tt) > 1]
+            if len(s) > 1:
+                return max(3, np.min([self.df_(tt) for tt in s]) / 6.)
+
+        return 3
+
+    def termFactors_(self, t):
+        """idf1, idf2, ner and postag factors of one token"""
+        return (idf(self.freq_(t), 10000000), idf(self.df_(t), 1000000000),
+                self.nerWeight_(t), self.postagWeight_(t))
+
+    def indexSignature_(self):
+        sig = []
+        for fnm in INDEX_SOURCES:
+            path = os.path.join(self.fnm_, fnm)
+            if os.path.exists(path):
+                st = os.stat(path)
+                sig.append([fnm, st.st_size, st.st_mtime_ns])
+        return sig
 
-        def idf(s, N): return math.log10(10 + ((N - s + 0.5) / (s + 0.5)))
-
-        tw = []
-        if not preprocess:
-            idf1 = np.array([idf(freq(t), 10000000) for t in tks])
-            idf2 = np.array([idf(df(t), 1000000000) for t in tks])
-            wts = (0.3 * idf1 + 0.7 * idf2) * \
-                np.array([ner(t) * postag(t) for t in tks])
-            wts = [s for s in wts]
-            tw = list(zip(tks, wts))
-        else:
-            for tk in tks:
-                tt = self.tokenMerge(self.pretoken(tk, True))
-                idf1 = np.array([idf(freq(t), 10000000) for t in tt])
-                idf2 = np.array([idf(df(t), 1000000000) for t in tt])
-                wts = (0.3 * idf1 + 0.7 * idf2) * \
-                    np.array([ner(t) * postag(t) for t in tt])
-                wts = [s for s in wts]
-                tw.extend(zip(tt, wts))
-
-        S = np.sum([s for _, s in tw])
-        return [(t, s / S) for t, s in tw]
+    def indexPaths_(self, sig):
+        """Index next to its sources, then in the cache dir keyed by signature"""
+        key = md5(json.dumps([os.path.abspath(self.fnm_), sig]).encode("utf-8")).hexdigest()
+        return [os.path.join(self.fnm_, INDEX_NAME),
+                os.path.join(INDEX_CACHE_DIR, "%s.%s" % (INDEX_NAME, key))]
+
+    def loadIndex_(self):
+        """Map the static factor table built from ner.json, term.freq and huqie.txt,
+        rebuilding it when any of those files changed"""
+        sig = self.indexSignature_()
+        paths = self.indexPaths_(sig)
+        for path in paths:
+            try:
+                with open(path + ".json", "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                table = np.load(path + ".npy", mmap_mode="r")
+                if meta["signature"] == sig and len(meta["vocab"]) == table.shape[0]:
+                    self.setIndex_(meta["vocab"], table)
+                    return
+                logging.info("[TERM_WEIGHT]:Index %s is stale", path)
+            except Exception:
+                logging.info("[TERM_WEIGHT]:Index %s not found", path)
+
+        vocab, table = self.buildIndex_()
+        self.setIndex_(vocab, table)
+        for path in paths:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = "%s.%d.tmp" % (path, os.getpid())
+                with open(tmp + ".npy", "wb") as f:
+                    np.save(f, table)
+                with open(tmp + ".json", "w", encoding="utf-8") as f:
+                    json.dump({"signature": sig, "vocab": vocab}, f, ensure_ascii=False)
+                os.replace(tmp + ".npy", path + ".npy")
+                os.replace(tmp + ".json", path + ".json")
+                return
+            except Exception as e:
+                logging.warning("[TERM_WEIGHT]:Save index %s failed: %s", path, e)
+        logging.error("[TERM_WEIGHT]:Index not saved, it is rebuilt on every start; set TERM_WEIGHT_INDEX_DIR to a writable dir")
+
+    def buildIndex_(self):
+        vocab = set(self.df) | set(self.ne)
+        try:
+            with open(os.path.join(self.fnm_, "huqie.txt"), "r", encoding="utf-8") as f:
+                for line in f:
+                    vocab.add(re.split(r"[ \t]", line.strip())[0])
+        except Exception:
+            logging.warning("Load huqie.txt FAIL!")
+        vocab = sorted(t for t in vocab if t and "\n" not in t)
+        logging.info("[TERM_WEIGHT]:Build index of %d terms", len(vocab))
+        terms, rows = [], []
+        for t in vocab:
+            try:
+                rows.append(self.termFactors_(t))
+                terms.append(t)
+            except Exception:
+                # Left to the memo path, which raises where weights() always did
+                logging.warning("[TERM_WEIGHT]:Skip %s in index", t)
+        return terms, np.array(rows, dtype=np.float64).reshape(-1, 4)
+
+    def setIndex_(self, vocab, table):
+        with self.lock_:
+            self.index_ = {t: i for i, t in enumerate(vocab)}
+            # Plain ndarray view of the memmap, indexing a memmap subclass is slower
+            self.table_ = np.asarray(table)
+            self.clearMemo_()
+
+    def clearMemo_(self):
+        # Tokens outside the index get ids after the static rows
+        self.memo_ = {}
+        self.memoTable_ = np.empty((64, 4), dtype=np.float64)
+
+    def checkDictVersion_(self):
+        version = rag_tokenizer.tokenizer.dict_version_
+        if version == self.dict_version_:
+            return
+        # A user dictionary changed tags and frequencies; the persisted index no longer applies
+        logging.info("[TERM_WEIGHT]:Tokenizer dictionary changed, drop term weight index")
+        self.setIndex_([], np.empty((0, 4), dtype=np.float64))
+        self.dict_version_ = version
+
+    def remember_(self, t, row):
+        # Caller holds lock_
+        n = len(self.memo_)
+        if n == self.memoTable_.shape[0]:
+            grown = np.empty((2 * n, 4), dtype=np.float64)
+            grown[:n] = self.memoTable_
+            self.memoTable_ = grown
+        self.memoTable_[n] = row
+        self.memo_[t] = self.table_.shape[0] + n
+        return self.memo_[t]
+
+    def lookup_(self, tks):
+        # Caller holds lock_; None for tokens neither indexed nor memoized
+        return list(map(self.memo_.get, tks, map(self.index_.get, tks)))
+
+    def factors(self, tks):
+        """(len(tks), 4) array of idf1, idf2, ner and postag factors, gathered from
+        the static index and the memo of tokens outside it"""
+        self.checkDictVersion_()
+        with self.lock_:
+            ids = self.lookup_(tks)
+            table, dynamic = self.table_, self.memoTable_
+        if None in ids:
+            rows = {}
+            for t, i in zip(tks, ids):
+                if i is None and t not in rows:
+                    rows[t] = self.termFactors_(t)
+            with self.lock_:
+                if len(self.memo_) + len(rows) > self.memo_size:
+                    self.clearMemo_()
+                for t, row in rows.items():
+                    if t not in self.memo_:
+                        self.remember_(t, row)
+                ids = self.lookup_(tks)
+                if None in ids:
+                    # Memoized before a concurrent reset
+                    ids = [i if i is not None else self.memo_[t] if t in self.memo_
+                           else self.remember_(t, self.termFactors_(t)) for t, i in zip(tks, ids)]
+                table, dynamic = self.table_, self.memoTable_
+
+        ids = np.array(ids, dtype=np.int64)
+        N = table.shape[0]
+        isStatic = ids < N
+        if isStatic.all():
+            return table[ids]
+        res = np.empty((len(ids), 4), dtype=np.float64)
+        res[isStatic] = table[ids[isStatic]]
+        res[~isStatic] = dynamic[ids[~isStatic] - N]
+        return res
+
+    def weights(self, tks, preprocess=True):
+        if preprocess:
+            tks = [t for tk in tks for t in self.tokenMerge(self.pretoken(tk, True))]
+        F = self.factors(tks)
+        wts = (0.3 * F[:, 0] + 0.7 * F[:, 1]) * (F[:, 2] * F[:, 3])
+        S = np.sum(wts)
+        return list(zip(tks, wts / S))
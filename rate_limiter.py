@@ -1,7 +1,7 @@
 import time
 import asyncio
 import logging
-from collections import defaultdict, deque
+from collections import OrderedDict, defaultdict, deque
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Any, Callable
 import threading
@@ -396,5 +396,95 @@ class IntelligentRateLimiter:
         except Exception as e:
             self.logger.error(f"Failed to save fallback data: {e}")
 
+class SlidingWindowCounterLimiter:
+    """
+    Per-client sliding window counter with fixed memory per key.
+
+    Each key keeps only the request counts of the current and previous fixed
+    windows; the sliding count is the previous count weighted by how much of it
+    still overlaps the window, plus the current count. Keys are sharded across
+    independently locked LRU maps, and keys idle for two full windows are
+    evicted from the front of their shard as new requests arrive.
+    """
+    
+    def __init__(self, limit: int, window_seconds: float, shards: int = 16, max_keys: int = 100000):
+        self.limit = limit
+        self.window = float(window_seconds)
+        self.shard_count = shards
+        self.max_keys_per_shard = max(1, max_keys // shards)
+        # key -> [window_index, current_count, previous_count]
+        self.shards = [OrderedDict() for _ in range(shards)]
+        self.locks = [threading.Lock() for _ in range(shards)]
+        # Counters are kept per shard so they are updated under the shard lock
+        self.allowed = [0] * shards
+        self.limited = [0] * shards
+        self.evicted = [0] * shards
+    
+    def hit(self, key: str, now: Optional[float] = None):
+        """Count a request for `key`; returns (allowed, remaining, retry_after_seconds)"""
+        now = time.time() if now is None else now
+        window_index = int(now // self.window)
+        elapsed_fraction = (now - window_index * self.window) / self.window
+        shard_id = hash(key) % self.shard_count
+        shard = self.shards[shard_id]
+        
+        with self.locks[shard_id]:
+            state = shard.get(key)
+            if state is None:
+                state = [window_index, 0, 0]
+                shard[key] = state
+            else:
+                shard.move_to_end(key)
+                if state[0] != window_index:
+                    # Roll forward: the old current window becomes "previous" only if adjacent
+                    state[2] = state[1] if state[0] == window_index - 1 else 0
+                    state[1] = 0
+                    state[0] = window_index
+            
+            self._evict_idle(shard_id, window_index)
+            
+            estimated = state[2] * (1.0 - elapsed_fraction) + state[1]
+            if estimated >= self.limit:
+                self.limited[shard_id] += 1
+                # Time until enough of the previous window has slid out
+                if state[2] and state[1] < self.limit:
+                    needed = (estimated - self.limit + 1) / state[2] * self.window
+                    retry_after = min(needed, (1.0 - elapsed_fraction) * self.window)
+                else:
+                    retry_after = (1.0 - elapsed_fraction) * self.window
+                return False, 0, max(retry_after, 0.0)
+            
+            state[1] += 1
+            self.allowed[shard_id] += 1
+            return True, max(0, int(self.limit - estimated - 1)), 0.0
+    
+    def _evict_idle(self, shard_id: int, window_index: int):
+        """Drop least recently used keys that no longer count toward any window"""
+        shard = self.shards[shard_id]
+        while shard:
+            oldest_key, oldest_state = next(iter(shard.items()))
+            if oldest_state[0] < window_index - 1 or len(shard) > self.max_keys_per_shard:
+                del shard[oldest_key]
+                self.evicted[shard_id] += 1
+            else:
+                break
+    
+    def reset(self, key: str):
+        """Forget a key's counters"""
+        shard_id = hash(key) % self.shard_count
+        with self.locks[shard_id]:
+            self.shards[shard_id].pop(key, None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Tracked keys and decision counters"""
+        return {
+            'limit': self.limit,
+            'window_seconds': self.window,
+            'tracked_keys': sum(len(shard) for shard in self.shards),
+            'allowed': sum(self.allowed),
+            'limited': sum(self.limited),
+            'evicted': sum(self.evicted)
+        }
+
 # Global rate limiter instance
 rate_limiter = IntelligentRateLimiter()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Realtime Channels - Coalescing, Delta-Encoded WebSocket Channel State
+Keeps the last snapshot per channel, merges producer updates between broadcast
+ticks and turns each tick into one message per channel containing only the
+fields that changed. backend_api.py emits each message once to the channel's
+SocketIO room instead of once per subscribed client.
+"""
+
+import copy
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+ROOM_PREFIX = 'channel:'
+
+
+def channel_room(channel: str) -> str:
+    """SocketIO room name for a data channel"""
+    return ROOM_PREFIX + channel
+
+
+def diff_payload(old: Any, new: Any) -> Tuple[Any, List[List[str]]]:
+    """
+    Changes needed to turn `old` into `new`.
+    Returns (changed, removed): `changed` is a partial copy of `new` holding only
+    differing fields (nested dicts are diffed recursively) and `removed` lists
+    key paths that no longer exist. Non-dict values are compared as a whole.
+    """
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return (None, []) if old == new else (new, [])
+
+    changed: Dict[str, Any] = {}
+    removed: List[List[str]] = [[key] for key in old if key not in new]
+    for key, value in new.items():
+        if key not in old:
+            changed[key] = value
+            continue
+        if isinstance(old[key], dict) and isinstance(value, dict):
+            sub_changed, sub_removed = diff_payload(old[key], value)
+            if sub_changed:
+                changed[key] = sub_changed
+            removed.extend([key] + path for path in sub_removed)
+        elif old[key] != value:
+            changed[key] = value
+    return changed, removed
+
+
+def apply_delta(snapshot: Any, changed: Any, removed: Iterable[List[str]] = ()) -> Any:
+    """Inverse of diff_payload: apply a delta to a snapshot and return the result"""
+    if not isinstance(snapshot, dict) or not isinstance(changed, dict):
+        return copy.deepcopy(changed) if changed is not None else snapshot
+    result = copy.deepcopy(snapshot)
+    for path in removed:
+        target = result
+        for key in path[:-1]:
+            target = target.get(key, {})
+        if isinstance(target, dict):
+            target.pop(path[-1], None)
+
+    def merge(target: Dict[str, Any], updates: Dict[str, Any]):
+        for key, value in updates.items():
+            if isinstance(value, dict) and isinstance(target.get(key), dict):
+                merge(target[key], value)
+            else:
+                target[key] = copy.deepcopy(value)
+
+    merge(result, changed)
+    return result
+
+
+class ChannelHub:
+    """
+    Thread-safe channel state shared by producers and the broadcast loop.
+
+    Producers call `publish` as often as they like; only the latest value per
+    channel survives until the next `collect_updates`, which returns one
+    delta message per channel that has subscribers and actually changed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshots: Dict[str, Any] = {}
+        self.versions: Dict[str, int] = {}
+        self.pending: Dict[str, Any] = {}
+        self.members: Dict[str, Set[str]] = {}
+        self.client_channels: Dict[str, Set[str]] = {}
+
+        # Counters
+        self.published = 0
+        self.coalesced = 0
+        self.messages_built = 0
+        self.full_messages = 0
+        self.unchanged_skipped = 0
+
+    # --- subscriptions ---
+
+    def subscribe(self, client_id: str, channels: Iterable[str]) -> Tuple[Set[str], Set[str]]:
+        """
+        Replace a client's channel set; returns (joined, left) so the caller
+        can update SocketIO room membership.
+        """
+        wanted = set(channels)
+        with self.lock:
+            current = self.client_channels.get(client_id, set())
+            joined, left = wanted - current, current - wanted
+            for channel in joined:
+                self.members.setdefault(channel, set()).add(client_id)
+            for channel in left:
+                self._remove_member(channel, client_id)
+            self.client_channels[client_id] = wanted
+        return joined, left
+
+    def remove_client(self, client_id: str) -> Set[str]:
+        """Forget a disconnected client; returns the channels it was in"""
+        with self.lock:
+            channels = self.client_channels.pop(client_id, set())
+            for channel in channels:
+                self._remove_member(channel, client_id)
+        return channels
+
+    def _remove_member(self, channel: str, client_id: str):
+        members = self.members.get(channel)
+        if members is not None:
+            members.discard(client_id)
+            if not members:
+                del self.members[channel]
+
+    def subscriber_count(self, channel: str) -> int:
+        with self.lock:
+            return len(self.members.get(channel, ()))
+
+    def channels_of(self, client_id: str) -> Set[str]:
+        with self.lock:
+            return set(self.client_channels.get(client_id, ()))
+
+    # --- producer side ---
+
+    def publish(self, channel: str, payload: Any):
+        """Queue the latest value for a channel; replaces any unsent value"""
+        with self.lock:
+            if channel in self.pending:
+                self.coalesced += 1
+            self.pending[channel] = payload
+            self.published += 1
+
+    def seed(self, channel: str, payload: Any):
+        """Set an initial snapshot if the channel has none yet"""
+        with self.lock:
+            if channel not in self.snapshots and payload is not None:
+                self.snapshots[channel] = copy.deepcopy(payload)
+                self.versions[channel] = 1
+
+    def snapshot(self, channel: str) -> Optional[Dict[str, Any]]:
+        """Full message for a channel, sent to new subscribers"""
+        with self.lock:
+            if channel not in self.snapshots:
+                return None
+            return {
+                'type': channel,
+                'payload': copy.deepcopy(self.snapshots[channel]),
+                'version': self.versions[channel],
+                'delta': False,
+            }
+
+    # --- broadcast side ---
+
+    def collect_updates(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Fold pending values into the snapshots and return (room, message)
+        pairs for subscribed channels that changed since the last tick.
+        """
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            messages = []
+            for channel, payload in pending.items():
+                previous = self.snapshots.get(channel)
+                has_previous = channel in self.snapshots
+                self.snapshots[channel] = copy.deepcopy(payload)
+
+                if has_previous:
+                    changed, removed = diff_payload(previous, payload)
+                    if changed is None or (not changed and not removed):
+                        self.unchanged_skipped += 1
+                        continue
+                base_version = self.versions.get(channel, 0)
+                self.versions[channel] = base_version + 1
+
+                if not self.members.get(channel):
+                    continue
+
+                message = {'type': channel, 'version': base_version + 1}
+                if has_previous and isinstance(payload, dict) and isinstance(previous, dict):
+                    message.update({'payload': changed, 'delta': True, 'base_version': base_version})
+                    if removed:
+                        message['removed'] = removed
+                else:
+                    message.update({'payload': copy.deepcopy(payload), 'delta': False})
+                    self.full_messages += 1
+                self.messages_built += 1
+                messages.append((channel_room(channel), message))
+            return messages
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Subscription and coalescing counters"""
+        with self.lock:
+            return {
+                'clients': len(self.client_channels),
+                'channels': {channel: len(members) for channel, members in self.members.items()},
+                'published': self.published,
+                'coalesced': self.coalesced,
+                'messages_built': self.messages_built,
+                'full_messages': self.full_messages,
+                'unchanged_skipped': self.unchanged_skipped,
+            }
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Response Cache - TTL Cache for Read-Only Dashboard Endpoints
+Stores serialized GET responses keyed by path and query string, with per-entry
+TTLs, ETags, tag-based invalidation for write endpoints and single-flight
+computation so concurrent misses for the same key run the handler once.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+
+@dataclass
+class CachedResponse:
+    """A serialized response body with its metadata"""
+    body: bytes
+    status: int
+    content_type: str
+    etag: str
+    expires_at: float
+    tags: Tuple[str, ...] = field(default_factory=tuple)
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag for a response body"""
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+class ResponseCache:
+    """Thread-safe LRU response cache with TTLs and tag invalidation."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.lock = threading.Lock()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._generations: Dict[str, int] = {}
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(path: str, query_args: Iterable[Tuple[str, str]]) -> str:
+        """Cache key from the path plus order-independent query arguments"""
+        query = '&'.join(f'{k}={v}' for k, v in sorted(query_args))
+        return f'{path}?{query}' if query else path
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Return a fresh entry, counting the lookup as a hit or miss"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.expires_at > time.time():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def _generation(self, tags: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def get_or_compute(self, key: str, ttl: float, tags: Tuple[str, ...],
+                       compute: Callable[[], Optional[CachedResponse]]) -> Tuple[Optional[CachedResponse], bool]:
+        """
+        Return (entry, hit). On a miss only one caller runs `compute`; others
+        wait for it and reuse the stored entry. `compute` returns None for
+        responses that must not be cached.
+        """
+        while True:
+            entry = self.get(key)
+            if entry is not None:
+                return entry, True
+
+            with self.lock:
+                event = self._inflight.get(key)
+                if event is None:
+                    event = self._inflight[key] = threading.Event()
+                    generation = self._generation(tags)
+                    owner = True
+                else:
+                    owner = False
+
+            if not owner:
+                event.wait(timeout=30)
+                with self.lock:
+                    entry = self.entries.get(key)
+                    if entry is not None and entry.expires_at > time.time():
+                        # Served by another request's computation
+                        self.misses -= 1
+                        self.hits += 1
+                        return entry, True
+                continue
+
+            try:
+                entry = compute()
+                if entry is not None:
+                    entry.expires_at = time.time() + ttl
+                    entry.tags = tags
+                    self._store(key, entry, generation)
+                return entry, False
+            finally:
+                with self.lock:
+                    self._inflight.pop(key, None)
+                event.set()
+
+    def _store(self, key: str, entry: CachedResponse, generation: Tuple[int, ...]):
+        with self.lock:
+            # Skip results computed across an invalidation of any of their tags
+            if self._generation(entry.tags) != generation:
+                return
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *tags: str) -> int:
+        """Drop every entry carrying any of the given tags"""
+        with self.lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            stale = [key for key, entry in self.entries.items() if set(entry.tags) & set(tags)]
+            for key in stale:
+                del self.entries[key]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def record_not_modified(self):
+        with self.lock:
+            self.not_modified += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'not_modified': self.not_modified,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions,
+            }
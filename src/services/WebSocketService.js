@@ -11,6 +11,7 @@ class WebSocketService {
         this.reconnectDelay = 1000;
         this.subscriptions = new Map();
         this.messageHandlers = new Map();
+        this.snapshots = new Map();
         this.isReconnecting = false;
     }
 
@@ -160,13 +161,18 @@ class WebSocketService {
     handleMessage(channel, data) {
         try {
             const message = JSON.parse(data);
-            const { type, payload, timestamp } = message;
+            const { type, timestamp } = message;
 
             // Handle heartbeat responses
             if (type === 'heartbeat') {
                 return;
             }
 
+            const payload = this.resolvePayload(channel, message);
+            if (payload === undefined) {
+                return;
+            }
+
             // Route message to appropriate handler
             const handlers = this.messageHandlers.get(channel);
             if (handlers && handlers.has(type)) {
@@ -182,6 +188,59 @@ class WebSocketService {
         }
     }
 
+    /**
+     * Rebuild the full payload from a snapshot or a delta against the last snapshot.
+     * Returns undefined when a delta does not follow the version we hold.
+     */
+    resolvePayload(channel, message) {
+        const { type, payload, delta, version, base_version: baseVersion, removed = [] } = message;
+        const key = `${channel}:${type}`;
+
+        if (!delta) {
+            if (version !== undefined) {
+                this.snapshots.set(key, { version, payload });
+            }
+            return payload;
+        }
+
+        const current = this.snapshots.get(key);
+        if (!current || current.version !== baseVersion) {
+            // Missed an update; wait for the next full snapshot on resubscribe
+            const ws = this.connections.get(channel);
+            if (ws) this.sendSubscriptionRequest(channel, ws);
+            return undefined;
+        }
+
+        const merged = this.applyDelta(current.payload, payload, removed);
+        this.snapshots.set(key, { version, payload: merged });
+        return merged;
+    }
+
+    /**
+     * Apply changed fields and removed key paths to a snapshot
+     */
+    applyDelta(snapshot, changed, removed) {
+        const result = JSON.parse(JSON.stringify(snapshot));
+        removed.forEach(path => {
+            let target = result;
+            path.slice(0, -1).forEach(key => { target = target && target[key]; });
+            if (target) delete target[path[path.length - 1]];
+        });
+
+        const merge = (target, updates) => {
+            Object.entries(updates).forEach(([key, value]) => {
+                if (value && typeof value === 'object' && !Array.isArray(value)
+                    && target[key] && typeof target[key] === 'object' && !Array.isArray(target[key])) {
+                    merge(target[key], value);
+                } else {
+                    target[key] = value;
+                }
+            });
+        };
+        merge(result, changed);
+        return result;
+    }
+
     /**
      * Send subscription request to server
      */
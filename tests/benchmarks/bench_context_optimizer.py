@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Context Optimizer Benchmark
+Optimizes a stream of 10k-item contexts (a few items change between calls,
+as in a conversation) with the original ContextOptimizer behaviour (len(json)
+// 4 re-estimated for every item in every strategy, md5 of the full sorted
+JSON as cache key, unbounded dict cache) and with the current one (memoized
+per-item counts, density packer, LRU cache with size accounting), reporting
+time per call, peak allocation per call and memory retained after a run of
+distinct contexts (the cached results, plus the token count memo).
+Also times BPETokenCounter with a vocabulary trained here on the benchmark
+text and loaded from a local ranks file.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'nerve_centre'))
+
+from llm_abstraction.algorithms.context_window_optimization import ContextOptimizer
+from llm_abstraction.algorithms.token_counting import PRETOKENIZE, BPETokenCounter
+
+WORDS = ("analysis data report revenue region customer churn pricing inventory forecast model "
+         "quarter growth margin critical important process review dataset records the of and to "
+         "in for with on is are was system config requirement constraint").split()
+
+
+class OriginalContextOptimizer(ContextOptimizer):
+    """The previous estimate, cache key, cache and per-item re-estimation, kept as the baseline"""
+
+    def __init__(self, max_tokens):
+        super().__init__(max_tokens)
+        self.context_cache = {}
+
+    def _estimate_tokens(self, data):
+        content = json.dumps(data, default=str) if isinstance(data, dict) else str(data)
+        return len(content) // 4
+
+    def _original_counts(self, context):
+        return {key: self._estimate_tokens({key: value}) for key, value in context.items()}
+
+    def optimize_context_window(self, context, prompt, strategy="relevance"):
+        strategies = {"relevance": self._original_relevance, "importance": self._original_importance,
+                      "hybrid": self._original_hybrid}
+        cache_key = hashlib.md5(json.dumps({"context": context, "prompt": prompt, "strategy": strategy,
+                                            "max_tokens": self.max_tokens},
+                                           sort_keys=True, default=str).encode()).hexdigest()
+        if cache_key in self.context_cache:
+            return self.context_cache[cache_key]
+        optimized = self._original_enforce(strategies[strategy](context, prompt))
+        self.context_cache[cache_key] = optimized
+        self._estimate_tokens(context), self._estimate_tokens(optimized)  # logged
+        return optimized
+
+    def _original_score(self, content, keywords):
+        direct = len(set(content.lower().split()).intersection(set(kw.lower() for kw in keywords)))
+        return direct * 2 + self._calculate_semantic_similarity(content, keywords)
+
+    def _original_relevance(self, context, prompt):
+        keywords = self._extract_keywords(prompt)
+        scored = []
+        for key, value in context.items():
+            tokens = self._estimate_tokens({key: value})
+            scored.append((key, value, self._original_score(str(value), keywords) / max(tokens, 1), tokens))
+        scored.sort(key=lambda x: x[2], reverse=True)
+        optimized, total = {}, 0
+        for key, value, _, tokens in scored:
+            if total + tokens <= self.max_tokens:
+                optimized[key] = value
+                total += tokens
+            else:
+                if self.max_tokens - total > 50:
+                    optimized[f"{key}_partial"] = self._truncate_content(str(value), self.max_tokens - total)
+                break
+        return optimized
+
+    def _original_importance(self, context, prompt):
+        return self._optimize_by_importance(context, prompt, self._original_counts(context))
+
+    def _original_hybrid(self, context, prompt):
+        relevant = self._original_relevance(context, prompt)
+        return self._original_importance({k: self._compress_content(str(v)) for k, v in relevant.items()}, prompt)
+
+    def _original_enforce(self, context):
+        if self._estimate_tokens(context) <= self.max_tokens:
+            return context
+        return self._enforce_token_limit(context, self._original_counts(context))
+
+
+def make_context(items, rng):
+    return {f"doc_{i}": " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 120))) for i in range(items)}
+
+
+def variant(context, rng, changed=20):
+    context = dict(context)
+    for key in rng.sample(list(context), changed):
+        context[key] = " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 120)))
+    return context
+
+
+def train_ranks(texts, merges):
+    """A small byte-level BPE vocabulary: all bytes, then the most frequent pair merges"""
+    words = Counter(piece.encode() for text in texts for piece in PRETOKENIZE.findall(text))
+    split = {word: [word[i:i + 1] for i in range(len(word))] for word in words}
+    ranks = {bytes([b]): b for b in range(256)}
+    for _ in range(merges):
+        pairs = Counter()
+        for word, parts in split.items():
+            for pair in zip(parts, parts[1:]):
+                pairs[pair] += words[word]
+        if not pairs:
+            break
+        (a, b), _ = pairs.most_common(1)[0]
+        ranks[a + b] = len(ranks)
+        for parts in split.values():
+            i = 0
+            while i < len(parts) - 1:
+                if parts[i] == a and parts[i + 1] == b:
+                    parts[i:i + 2] = [a + b]
+                i += 1
+    return ranks
+
+
+def run(make_optimizer, contexts, strategy, prompt):
+    optimizer = make_optimizer()
+    started = time.perf_counter()
+    for context in contexts:
+        optimizer.optimize_context_window(context, prompt, strategy)
+    elapsed = (time.perf_counter() - started) / len(contexts)
+    # Peak allocation of one more call, measured separately since tracing slows everything down
+    optimizer = make_optimizer()
+    tracemalloc.start()
+    optimizer.optimize_context_window(contexts[0], prompt, strategy)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def retained(make_optimizer, contexts, strategy, prompt):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    optimizer = make_optimizer()
+    for context in contexts:
+        optimizer.optimize_context_window(context, prompt, strategy)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, len(optimizer.context_cache)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=10_000)
+    parser.add_argument('--calls', type=int, default=20)
+    parser.add_argument('--cached-calls', type=int, default=200, help="distinct contexts for the cache memory run")
+    parser.add_argument('--max-tokens', type=int, default=4000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    rng = random.Random(11)
+    prompt = "Analyze the revenue data and forecast churn for each region"
+    base = make_context(args.items, rng)
+    contexts = [variant(base, rng) for _ in range(args.calls)]
+    print(f"{args.calls} contexts of {args.items:,} items "
+          f"({len(json.dumps(base)) / 1e6:.1f} MB each), max_tokens {args.max_tokens}")
+
+    for strategy in ("relevance", "importance", "hybrid"):
+        print(f"strategy {strategy}")
+        for label, make in (("original", lambda: OriginalContextOptimizer(args.max_tokens)),
+                            ("current", lambda: ContextOptimizer(args.max_tokens))):
+            elapsed, peak = run(make, contexts, strategy, prompt)
+            print(f"  {label:<10} {elapsed * 1000:9.1f} ms/call   peak {peak / 1e6:7.1f} MB")
+
+    variants = [variant(base, rng) for _ in range(args.cached_calls)]
+    print(f"cache after {args.cached_calls} distinct {args.items:,}-item contexts (relevance strategy)")
+    for label, make in (("original", lambda: OriginalContextOptimizer(args.max_tokens)),
+                        ("current", lambda: ContextOptimizer(args.max_tokens))):
+        size, entries = retained(make, variants, "relevance", prompt)
+        print(f"  {label:<10} {entries:5d} entries  retained {size / 1e6:7.1f} MB")
+
+    fd, path = tempfile.mkstemp(suffix=".tiktoken")
+    with os.fdopen(fd, 'w') as f:
+        for token, rank in train_ranks(list(base.values())[:500], 300).items():
+            f.write(f"{base64.b64encode(token).decode()} {rank}\n")
+    print("BPE token counts of one context (vocabulary trained on the benchmark text)")
+    texts = [json.dumps({k: v}) for k, v in contexts[0].items()]
+    counter = BPETokenCounter.from_file(path)
+    started = time.perf_counter()
+    total = sum(counter.count(text) for text in texts)
+    print(f"  {'first pass':<22} {(time.perf_counter() - started) * 1000:9.1f} ms  {total:,} tokens "
+          f"(len // 4: {sum(len(t) // 4 for t in texts):,})")
+    started = time.perf_counter()
+    sum(counter.count(text) for text in texts)
+    print(f"  {'memoized':<22} {(time.perf_counter() - started) * 1000:9.1f} ms")
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
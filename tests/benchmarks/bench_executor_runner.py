@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Executor Runner Benchmark
+Per-call overhead of running a trivial main() through the executor_manager.
+Original: the per-request chain of execute_code (mkdir, tar czf, tar xzf, the
+run under `timeout`, two rm -rf), six process spawns per call. Runner: one
+warm supervisor per sandbox, a framed request over its stdin and a forked
+child per run.
+
+Without --container both run locally (the chain without its `docker exec`
+prefix, the supervisor on LocalBackend); with --container NAME both run in
+that sandbox container through docker exec / DockerBackend.
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'nerve_centre' / 'matrix' / 'executor_manager'))
+
+from models.enums import SupportLanguage
+from services.runner import DockerBackend, LocalBackend, Runner
+from utils.common import async_run_command
+
+CODE = "def main(n):\n    return sum(range(n))\n"
+RUNNER = """import json
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+from main import main
+if __name__ == "__main__":
+    args = json.loads(sys.argv[1])
+    result = main(**args)
+    if result is not None:
+        print(result)
+"""
+
+
+async def exec_chain(prefix, workspace, python):
+    """The steps execute_code takes for one Python request"""
+    task_id = str(uuid.uuid4())
+    workdir = tempfile.mkdtemp(prefix="sandbox_")
+    with open(os.path.join(workdir, "main.py"), "w") as f:
+        f.write(CODE)
+    with open(os.path.join(workdir, "runner.py"), "w") as f:
+        f.write(RUNNER)
+    target = f"{workspace}/{task_id}"
+    try:
+        await async_run_command(*prefix, "mkdir", "-p", target)
+        tar = await asyncio.create_subprocess_exec("tar", "czf", "-", "-C", workdir, "main.py", "runner.py", stdout=asyncio.subprocess.PIPE)
+        archive, _ = await tar.communicate()
+        untar_prefix = ["docker", "exec", "-i", *prefix[2:]] if prefix else []
+        untar = await asyncio.create_subprocess_exec(*untar_prefix, "tar", "xzf", "-", "-C", target, stdin=asyncio.subprocess.PIPE)
+        await untar.communicate(input=archive)
+        run_prefix = ["docker", "exec", "--workdir", target, *prefix[2:]] if prefix else []
+        args = ["timeout", "10", python, "-I", "-B", "runner.py", '{"n": 1000}']
+        if prefix:
+            returncode, stdout, _ = await async_run_command(*run_prefix, *args, timeout=15)
+        else:
+            proc = await asyncio.create_subprocess_exec(*args, cwd=target, stdout=asyncio.subprocess.PIPE)
+            stdout, _ = await proc.communicate()
+            returncode, stdout = proc.returncode, stdout.decode()
+        assert returncode == 0 and stdout == "499500\n", stdout
+    finally:
+        await asyncio.gather(async_run_command(*prefix, "rm", "-rf", target), async_run_command("rm", "-rf", workdir), return_exceptions=True)
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"  {label:<22} mean {statistics.mean(samples) * 1000:8.1f} ms   p50 {statistics.median(samples) * 1000:8.1f} ms   "
+          f"p95 {p95 * 1000:8.1f} ms   {len(samples) / sum(samples):7.1f} calls/s")
+    return statistics.mean(samples)
+
+
+async def bench(args):
+    if args.container:
+        prefix, workspace, python = ["docker", "exec", args.container], "/workspace", "python"
+        backend = DockerBackend(args.container)
+    else:
+        workspace = tempfile.mkdtemp(prefix="bench_runner_")
+        prefix, python = [], sys.executable
+        backend = LocalBackend(workspace)
+
+    print(f"{args.calls} calls of a trivial main(), {'container ' + args.container if args.container else 'local'}")
+    chain = []
+    for _ in range(args.calls):
+        started = time.perf_counter()
+        await exec_chain(prefix, workspace, python)
+        chain.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    runner = await Runner(backend, SupportLanguage.PYTHON).start()
+    startup = time.perf_counter() - started
+    code_b64 = base64.b64encode(CODE.encode()).decode()
+    warm = []
+    try:
+        for _ in range(args.calls):
+            started = time.perf_counter()
+            result = await runner.run(code_b64, {"n": 1000}, 10)
+            warm.append(time.perf_counter() - started)
+            assert result.exit_code == 0 and result.stdout == "499500\n", result
+    finally:
+        await runner.close()
+        if not args.container:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    before = report("exec chain", chain)
+    after = report("warm runner", warm)
+    print(f"  supervisor startup {startup * 1000:.0f} ms (once per sandbox); per-call speedup {before / after:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--container', default=None, help="sandbox container to run in, e.g. sandbox_python_0")
+    asyncio.run(bench(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Graph Store Benchmark
+Grows a knowledge base one document at a time against an in-memory doc store.
+Each step loads the graph, merges the document with graph_merge (every few
+documents also merging two entities, as entity resolution does), refreshes
+the graph-wide scores and persists it. Compares the original persistence (the
+whole graph as node-link JSON, rewritten and parsed on every step) with the
+graph log (a columnar record of the GraphChange, replayed on a snapshot,
+compacted every GRAPHRAG_COMPACT_EVERY records). Reports bytes written and
+write/read times per step, and checks both load back the same graph.
+
+Scores use degree centrality instead of nx.pagerank to keep the run short;
+like pagerank, they change on every node each step.
+
+Runs inside the RAGFlow environment (graphrag, api and rag importable); the
+doc store is replaced in-process.
+"""
+
+import argparse
+import json
+import random
+import time
+
+import networkx as nx
+import trio
+from networkx.readwrite import json_graph
+
+from bench_set_graph import MemoryDocStore, document_graph
+from graphrag import utils
+from graphrag.graph_store import STORE_SEQ
+from graphrag.utils import GraphChange, get_from_to, graph_merge
+
+TENANT, KB = "bench", "kb"
+
+
+def resolve(graph, change, rng):
+    """Merge one entity into another of the same type, recording the change like EntityResolution"""
+    names = list(graph.nodes)
+    for _ in range(100):
+        a, b = rng.sample(names, 2)
+        if graph.nodes[a]["entity_type"] == graph.nodes[b]["entity_type"]:
+            break
+    node0 = graph.nodes[a]
+    node0["description"] += utils.GRAPH_FIELD_SEP + graph.nodes[b]["description"]
+    node0["source_id"] += graph.nodes[b]["source_id"]
+    for n in list(graph.neighbors(b)):
+        attrs = dict(graph.edges[b, n])
+        change.removed_edges.add(get_from_to(b, n))
+        if n == a:
+            continue
+        if graph.has_edge(a, n):
+            graph.edges[a, n]["weight"] += attrs["weight"]
+        else:
+            graph.add_edge(a, n, **attrs)
+        change.added_updated_edges.add(get_from_to(a, n))
+    graph.remove_node(b)
+    change.removed_nodes.add(b)
+    change.added_updated_nodes.add(a)
+
+
+def score(graph):
+    n = max(graph.number_of_nodes() - 1, 1)
+    for node, degree in graph.degree:
+        graph.nodes[node]["pagerank"] = degree / n
+
+
+def same_graph(g1, g2):
+    assert list(g1.nodes) == list(g2.nodes), "node order differs"
+    assert all(g1.nodes[n] == g2.nodes[n] for n in g1.nodes), "node attributes differ"
+    assert {get_from_to(u, v): a for u, v, a in g1.edges(data=True)} == \
+        {get_from_to(u, v): a for u, v, a in g2.edges(data=True)}, "edges differ"
+    strip = lambda g: {k: v for k, v in g.graph.items() if k != STORE_SEQ}
+    assert strip(g1) == strip(g2), "graph attributes differ"
+
+
+async def persist(graph, change):
+    chunk, compact = await utils.graph_record_chunk(TENANT, KB, graph, change)
+    utils.settings.docStoreConn.insert([chunk], "", KB)
+    graph.graph[STORE_SEQ] = chunk["weight_int"]
+    return len(chunk["content_with_weight"].encode("utf-8")), compact
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--docs', type=int, default=200)
+    parser.add_argument('--nodes', type=int, default=60, help="entities per document")
+    parser.add_argument('--resolve-every', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    entities = ["公司%d" % i for i in range(args.nodes * args.docs // 4)]
+    store = MemoryDocStore()
+    utils.settings.docStoreConn = store
+
+    legacy_blob = None
+    stats = {k: [] for k in ("legacy_bytes", "legacy_write", "legacy_read", "log_bytes", "log_write", "log_read")}
+    compactions = []
+    for d in range(args.docs):
+        doc_graph = document_graph(f"doc-{d}", entities, args.nodes, rng)
+        doc_graph.graph["source_id"] = [f"doc-{d}"]
+        state = rng.getstate()
+
+        # Original: parse the whole graph, merge, dump the whole graph
+        started = time.perf_counter()
+        legacy = json_graph.node_link_graph(json.loads(legacy_blob), edges="edges") if legacy_blob else None
+        stats["legacy_read"].append(time.perf_counter() - started)
+        change = GraphChange()
+        legacy = graph_merge(legacy, doc_graph.copy(), change) if legacy is not None else doc_graph.copy()
+        if d and d % args.resolve_every == 0:
+            resolve(legacy, change, rng)
+        score(legacy)
+        started = time.perf_counter()
+        legacy_blob = json.dumps(nx.node_link_data(legacy, edges="edges"), ensure_ascii=False)
+        stats["legacy_write"].append(time.perf_counter() - started)
+        stats["legacy_bytes"].append(len(legacy_blob.encode("utf-8")))
+
+        # Graph log: snapshot plus replayed records, only the change written
+        rng.setstate(state)
+        started = time.perf_counter()
+        graph = trio.run(utils.get_graph, TENANT, KB)
+        stats["log_read"].append(time.perf_counter() - started)
+        change = GraphChange()
+        if graph is None:
+            graph = doc_graph.copy()
+            change.added_updated_nodes = set(graph.nodes)
+            change.added_updated_edges = set(graph.edges)
+        else:
+            graph = graph_merge(graph, doc_graph.copy(), change)
+        if d and d % args.resolve_every == 0:
+            resolve(graph, change, rng)
+        score(graph)
+        same_graph(legacy, graph)
+        started = time.perf_counter()
+        size, compact = trio.run(persist, graph, change)
+        stats["log_write"].append(time.perf_counter() - started)
+        stats["log_bytes"].append(size)
+        if compact:
+            started = time.perf_counter()
+            trio.run(utils.compact_graph, TENANT, KB)
+            compactions.append(time.perf_counter() - started)
+
+    same_graph(legacy, trio.run(utils.get_graph, TENANT, KB))
+    print(f"{args.docs} documents merged: {legacy.number_of_nodes()} nodes, {legacy.number_of_edges()} edges")
+    tail = max(args.docs // 10, 1)
+    print(f"Per step over the last {tail} documents:")
+    for label, key in (("node-link rewrite", "legacy"), ("graph log", "log")):
+        print(f"  {label:<18} write {sum(stats[key + '_bytes'][-tail:]) / tail / 1024:9.1f} KB "
+              f"{sum(stats[key + '_write'][-tail:]) / tail * 1000:8.1f} ms   "
+              f"read {sum(stats[key + '_read'][-tail:]) / tail * 1000:8.1f} ms")
+    print(f"Total written: node-link {sum(stats['legacy_bytes']) / 2 ** 20:.1f} MB, "
+          f"graph log {sum(stats['log_bytes']) / 2 ** 20:.1f} MB")
+    if compactions:
+        print(f"{len(compactions)} compactions, {sum(compactions) / len(compactions) * 1000:.0f} ms each (off the write path)")
+
+    print("Graphs loaded from the log identical to the node-link round-trip")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+GraphRAG Cache Benchmark
+Serialization: JSON text of arr.tolist() (the original embedding cache format)
+against float32 bytes, for encoding, decoding and stored size.
+Round-trip: one get/set per key against mget/mset batches, on the SQLite
+backend and, with --redis-url, on Redis. Also times reads served by the
+in-process LRU tier.
+
+graphrag.cache only needs numpy (and redis for --redis-url).
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'nerve_centre' / 'matrix'))
+
+from graphrag.cache import KVCache, RedisBackend, SQLiteBackend, decode_embedding, encode_embedding
+
+
+def timed(label, fn, count):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<34} {elapsed * 1000:9.1f} ms  {count / elapsed:12,.0f} vectors/s")
+    return result
+
+
+def serialization(vectors):
+    print(f"Serialization: {len(vectors)} vectors, dim {vectors.shape[1]}")
+    as_json = timed("json encode", lambda: [json.dumps(v.tolist()).encode("utf-8") for v in vectors], len(vectors))
+    as_f32 = timed("float32 encode", lambda: [encode_embedding(v) for v in vectors], len(vectors))
+    from_json = timed("json decode", lambda: [np.array(json.loads(b)) for b in as_json], len(vectors))
+    from_f32 = timed("float32 decode", lambda: [decode_embedding(b) for b in as_f32], len(vectors))
+    assert all(np.array_equal(a, b) for a, b in zip(from_json, from_f32)), "decoded vectors differ"
+    print(f"  stored bytes per vector: json {sum(map(len, as_json)) / len(vectors):,.0f}, "
+          f"float32 {sum(map(len, as_f32)) / len(vectors):,.0f}")
+    return as_json, as_f32
+
+
+def round_trip(label, backend, keys, values):
+    print(f"Round-trip, {label}: {len(keys)} keys")
+    timed("per-key set", lambda: [backend.mset({k: v}, 600) for k, v in zip(keys, values)], len(keys))
+    got = timed("per-key get", lambda: [backend.mget([k])[0] for k in keys], len(keys))
+    assert got == values
+    timed("mset", lambda: backend.mset(dict(zip(keys, values)), 600), len(keys))
+    got = timed("mget", lambda: backend.mget(keys), len(keys))
+    assert got == values
+    cache = KVCache(backend)
+    cache.mget(keys)
+    got = timed("mget, LRU tier warm", lambda: cache.mget(keys), len(keys))
+    assert got == values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--vectors', type=int, default=5000)
+    parser.add_argument('--dim', type=int, default=1024)
+    parser.add_argument('--redis-url', default=None, help="e.g. redis://localhost:6379/15")
+    args = parser.parse_args()
+
+    vectors = np.random.default_rng(0).standard_normal((args.vectors, args.dim)).astype(np.float32)
+    _, as_f32 = serialization(vectors)
+    keys = [f"bench-{i}" for i in range(len(vectors))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        round_trip("SQLite", SQLiteBackend(os.path.join(tmp, "cache.db")), keys, as_f32)
+
+    if args.redis_url:
+        import redis
+        client = redis.Redis.from_url(args.redis_url)
+        round_trip("Redis", RedisBackend(client), keys, as_f32)
+        client.delete(*keys)
+
+
+if __name__ == '__main__':
+    main()
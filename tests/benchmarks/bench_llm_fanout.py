@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Multi-Provider Fan-Out Benchmark
+Runs LLMOrchestrator.run(use_multiple_providers=True) against stub providers
+with injected latency and compares the previous sequential loop with the
+concurrent fan-out, with and without a "first N good responses" early return.
+"""
+
+import argparse
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'nerve_centre'))
+
+from llm_abstraction.llm_abstraction import LLMOrchestrator, LLMProviderBase, LLMRequest, LLMResponse
+
+logging.disable(logging.WARNING)
+
+ANSWER = ("According to recent research, the analysis shows three clear drivers. "
+          "Evidence indicates demand is rising. In summary, the outlook is positive.")
+
+
+class StubProvider(LLMProviderBase):
+    """Provider that sleeps for a fixed latency, optionally failing"""
+
+    def __init__(self, name, latency, fail=False):
+        super().__init__({'name': name})
+        self.latency = latency
+        self.fail = fail
+
+    def query(self, request):
+        started = time.time()
+        time.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError(f"{self.name} unavailable")
+        return LLMResponse(content=ANSWER, provider=self.name, timestamp=time.time(),
+                           processing_time=time.time() - started)
+
+    def get_metadata(self):
+        return {'name': self.name, 'latency': self.latency}
+
+
+def sequential(orchestrator, request):
+    """The original _run_multiple_providers loop"""
+    responses = []
+    for provider in orchestrator.providers:
+        try:
+            responses.append(provider.query(request))
+        except Exception:
+            pass
+    return orchestrator.output_processor.process(responses, request)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--providers', type=int, default=6)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--min-latency', type=float, default=0.05)
+    parser.add_argument('--max-latency', type=float, default=0.6)
+    parser.add_argument('--timeout', type=float, default=0.5)
+    parser.add_argument('--first', type=int, default=2)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    providers = [StubProvider(f'stub-{i}', rng.uniform(args.min_latency, args.max_latency), fail=(i == 0))
+                 for i in range(args.providers)]
+    orchestrator = LLMOrchestrator(providers, provider_timeout=args.timeout)
+    prompt = "Analyze the demand drivers for the next quarter"
+    print("Latencies: " + ", ".join(f"{p.name}={p.latency * 1000:.0f}ms{' (fails)' if p.fail else ''}"
+                                    for p in providers))
+
+    def timed(label, fn):
+        durations, counts = [], []
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            results = fn()
+            durations.append(time.perf_counter() - started)
+            counts.append(len(results))
+        print(f"{label:<32} {sum(durations) / len(durations) * 1000:8.1f} ms/round   "
+              f"{sum(counts) / len(counts):.1f} responses")
+
+    timed("sequential", lambda: sequential(orchestrator, LLMRequest(prompt=prompt)))
+    timed(f"concurrent (timeout {args.timeout}s)",
+          lambda: orchestrator.run(prompt, use_multiple_providers=True))
+    timed(f"concurrent, first {args.first} good",
+          lambda: orchestrator.run(prompt, use_multiple_providers=True, min_responses=args.first))
+    orchestrator.shutdown()
+
+
+if __name__ == '__main__':
+    main()
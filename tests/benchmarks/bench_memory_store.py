@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+MCP Memory Store Benchmark
+Loads N memories (default 1M) into the original memory_store table (one
+INSERT OR REPLACE and commit per key) and into MemoryStore (put_many batches),
+then compares search_memory: `value LIKE '%query%'` over the JSON column
+against the FTS5 index ranked with BM25, with and without a category filter.
+Also times a TTL sweep of the expired share of the store.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'nerve_centre' / 'llm_abstraction' / 'mcp' / 'server'))
+
+from memory_store import MemoryStore
+
+CATEGORIES = ["general", "project", "research", "customer", "ops"]
+
+
+def vocabulary(size, rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+
+def memories(count, words, rng):
+    cum_weights = list(itertools.accumulate(1 / (i + 1) for i in range(len(words))))
+    for i in range(count):
+        text = " ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(8, 24)))
+        value = text if i % 3 else {"summary": text, "tags": rng.sample(words[:200], 3), "score": i % 100}
+        yield {"key": f"mem-{i}", "value": value, "category": CATEGORIES[i % len(CATEGORIES)],
+               "ttl": 60 if i % 10 == 0 else None}
+
+
+def legacy_store(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS memory_store (
+            key TEXT PRIMARY KEY,
+            value TEXT,
+            category TEXT DEFAULT 'general',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP,
+            metadata TEXT
+        )
+    """)
+    return conn
+
+
+def legacy_put(conn, item):
+    expires_at = datetime.now() + timedelta(seconds=item["ttl"]) if item["ttl"] else None
+    conn.execute("INSERT OR REPLACE INTO memory_store (key, value, category, expires_at) VALUES (?, ?, ?, ?)",
+                 (item["key"], json.dumps(item["value"]), item["category"], expires_at))
+    conn.commit()
+
+
+def legacy_search(conn, query, category=None, limit=10):
+    if category:
+        rows = conn.execute("SELECT key, value, category FROM memory_store WHERE value LIKE ? AND category = ? LIMIT ?",
+                            (f"%{query}%", category, limit)).fetchall()
+    else:
+        rows = conn.execute("SELECT key, value, category FROM memory_store WHERE value LIKE ? LIMIT ?",
+                            (f"%{query}%", limit)).fetchall()
+    return [{"key": k, "value": json.loads(v), "category": c} for k, v, c in rows]
+
+
+def timed(label, fn, count=1):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - started) / count
+    print(f"  {label:<44} {elapsed * 1000:10.2f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--memories', type=int, default=1_000_000)
+    parser.add_argument('--batch', type=int, default=10_000, help="put_many batch size")
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--disk', action='store_true', help="on-disk databases (WAL for MemoryStore)")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    words = vocabulary(20_000, rng)
+    tmp = tempfile.mkdtemp(prefix="bench_memory_")
+    legacy_path = os.path.join(tmp, "legacy.db") if args.disk else ":memory:"
+    store_path = os.path.join(tmp, "store.db") if args.disk else ":memory:"
+
+    print(f"Loading {args.memories:,} memories ({'disk' if args.disk else 'in-memory'})")
+    legacy = legacy_store(legacy_path)
+    started = time.perf_counter()
+    for item in memories(args.memories, words, random.Random(1)):
+        legacy_put(legacy, item)
+    print(f"  {'original: store_memory per key':<44} {time.perf_counter() - started:10.2f} s")
+
+    store = MemoryStore(store_path, sweep_interval=None)
+    started = time.perf_counter()
+    batch = []
+    for item in memories(args.memories, words, random.Random(1)):
+        batch.append(item)
+        if len(batch) == args.batch:
+            store.put_many(batch)
+            batch = []
+    store.put_many(batch)
+    print(f"  {'MemoryStore.put_many':<44} {time.perf_counter() - started:10.2f} s")
+
+    # LIKE stops at `limit` matches, so frequent words favour it; rare words scan the whole table
+    for label, ranks in (("frequent", range(50, 2000)), ("rare", range(15_000, 20_000))):
+        queries = [words[i] for i in rng.sample(ranks, args.queries)]
+        n = len(queries)
+        print(f"search_memory, {label} words, per query ({n} queries, limit 10)")
+        timed("original LIKE", lambda: [legacy_search(legacy, q) for q in queries], n)
+        timed("original LIKE, category", lambda: [legacy_search(legacy, q, "research") for q in queries], n)
+        results = timed("FTS5 + BM25", lambda: [store.search(q) for q in queries], n)
+        timed("FTS5 + BM25, category", lambda: [store.search(q, "research") for q in queries], n)
+        timed("FTS5 + BM25, two words", lambda: [store.search(f"{q} {words[0]}") for q in queries], n)
+        for q, hits in zip(queries, results):
+            assert all(q in json.dumps(hit["value"]) for hit in hits), q
+
+    expired = store.conn.execute("SELECT COUNT(*) FROM memory_store WHERE expires_at IS NOT NULL").fetchone()[0]
+    print(f"TTL sweep of {expired:,} expired memories")
+    timed("MemoryStore.sweep", lambda: store.sweep(now=time.time() + 120))
+    assert store.count() == args.memories - expired
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
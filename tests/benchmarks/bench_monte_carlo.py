@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo Benchmark
+Simulates FinancialModelingAgent's three profit scenarios over 1M paths with
+the original loop (one np.random.choice and one np.random.normal per path,
+then np.percentile per confidence level) and with MonteCarloEngine, in
+process and on the process pool, single-factor and with two correlated
+factors. Also reports how long the event loop stalls while a simulation
+runs inside a coroutine, as the agent does.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from finance.monte_carlo import MonteCarloEngine
+
+PROFITS = [600000, 400000, 150000]
+REVENUES = [1500000, 1200000, 900000]
+COSTS = [900000, 800000, 750000]
+PROBABILITIES = [0.25, 0.50, 0.25]
+LEVELS = (0.95, 0.90, 0.80)
+
+
+def original_simulation(paths, volatility=0.20):
+    """The previous _run_monte_carlo_simulation loop and VaR, kept as the baseline"""
+    names = ['optimistic', 'base_case', 'pessimistic']
+    profits = dict(zip(names, PROFITS))
+    results = []
+    for _ in range(paths):
+        scenario = np.random.choice(names, p=PROBABILITIES)
+        results.append(profits[scenario] * np.random.normal(1, volatility))
+    results = np.array(results)
+    return {f"{level:.0%}": np.percentile(results, (1 - level) * 100) for level in LEVELS}
+
+
+async def original_run(paths):
+    """The original simulation inside a coroutine, as the agent ran it"""
+    return original_simulation(paths)
+
+
+async def max_stall(simulation):
+    """Longest gap between ticks of a 1 ms ticker while simulation() is awaited"""
+    stalls = []
+
+    async def ticker():
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            stalls.append(now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    await simulation()
+    await asyncio.sleep(0.01)  # let the ticker record the gap that ends here
+    task.cancel()
+    return max(stalls)
+
+
+def timed(label, fn, paths):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<32} {elapsed * 1000:10.1f} ms  {paths / elapsed / 1e6:8.2f} M paths/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--paths', type=int, default=1_000_000)
+    parser.add_argument('--baseline-paths', type=int, default=100_000,
+                        help="paths for the original loop (scaled up to --paths in the report)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    print(f"{args.paths:,} paths, {args.workers} pool workers")
+    started = time.perf_counter()
+    baseline = original_simulation(args.baseline_paths)
+    elapsed = (time.perf_counter() - started) * args.paths / args.baseline_paths
+    print(f"  {'original loop (extrapolated)':<32} {elapsed * 1000:10.1f} ms  "
+          f"{args.paths / elapsed / 1e6:8.2f} M paths/s")
+
+    engine = MonteCarloEngine(seed=1, parallel_threshold=args.paths + 1)
+    pooled = MonteCarloEngine(seed=1, parallel_threshold=1, max_workers=max(args.workers, 2))
+    pooled.simulate(PROFITS, PROBABILITIES, [0.20], pooled.batch_size * 2)  # start the workers
+    single = ([[p] for p in PROFITS], PROBABILITIES, [0.20], args.paths)
+    two_factor = ([[r, -c] for r, c in zip(REVENUES, COSTS)], PROBABILITIES, [0.15, 0.05], args.paths)
+    result = timed("engine, 1 factor", lambda: engine.simulate(*single, seed=3), args.paths)
+    timed("engine, 2 correlated factors",
+          lambda: engine.simulate(*two_factor, correlation=[[1, 0.6], [0.6, 1]], seed=3), args.paths)
+    pooled_result = timed("process pool, 1 factor", lambda: pooled.simulate(*single, seed=3), args.paths)
+    assert np.array_equal(result.outcomes, pooled_result.outcomes)
+    pooled.close()
+
+    print("VaR (original loop on its paths / engine)")
+    for label, value in baseline.items():
+        print(f"  {label:<4} {value:12,.0f} / {result.value_at_risk[label]:12,.0f}   "
+              f"CVaR {result.conditional_value_at_risk[label]:12,.0f}")
+
+    print("longest event loop stall while simulating")
+    stall = asyncio.run(max_stall(lambda: original_run(args.baseline_paths)))
+    print(f"  {'original loop (extrapolated)':<32} {stall * args.paths / args.baseline_paths * 1000:10.1f} ms")
+    stall = asyncio.run(max_stall(lambda: engine.run(*single)))
+    print(f"  {'engine.run':<32} {stall * 1000:10.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
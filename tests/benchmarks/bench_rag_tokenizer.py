@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+RagTokenizer Benchmark
+Checks that the DP segmentation (bestSegment_) gives exactly the same
+tokenize() and fine_grained_tokenize() output as the original deepcopy DFS on
+a synthetic mixed Chinese/English corpus, then reports throughput for the
+legacy path, the DP path, the LRU cache and tokenize_many across processes.
+
+Runs inside the RAGFlow environment (rag.nlp importable, huqie dictionary
+under rag/res).
+"""
+
+import argparse
+import copy
+import random
+import time
+
+from rag.nlp.rag_tokenizer import RagTokenizer
+
+SAMPLES = [
+    "公开征求意见稿提出，境外投资者可使用自有人民币或外汇投资。使用外汇投资的，可通过债券持有人在香港人民币业务清算行"
+    "及香港地区经批准可进入境内银行间外汇市场进行交易的境外人民币业务参加行办理外汇资金兑换。",
+    "多校划片就是一个小区对应多个小学初中，让买了学区房的家庭也不确定到底能上哪个学校。目的是通过这种方式为学区房降温，"
+    "把就近入学落到实处。南京市长江大桥",
+    "实际上当时他们已经将业务中心偏移到安全部门和针对政府企业的部门 Scripts are compiled and cached aaaaaaaaa",
+    "虽然我不怎么玩，蓝月亮如何在外资夹击中生存,那是全宇宙最有意思的",
+    "涡轮增压发动机num最大功率,不像别的共享买车锁电子化的手段,我们接过来是否有意义,黄黄爱美食,不过，今天阿奇要讲到的"
+    "这家农贸市场，说实话，还真蛮有特色的！不仅环境好，还打出了",
+    "这周日你去吗？这周日你有空吗？哈哈哈哈哈哈哈哈哈哈哈哈",
+    "Unity3D开发经验 测试开发工程师 c++双11双11 985 211 ",
+    "数据分析项目经理|数据分析挖掘|数据分析方向|商品数据分析|搜索数据分析 sql python hive tableau Cocos2d-",
+    "季度营收同比增长百分之十二，主要来自企业客户续约和海外市场扩张 revenue growth driven by enterprise renewals",
+    "供应链风险评估显示原材料价格波动加剧，建议提前锁定长期采购合同并建立安全库存",
+]
+
+
+class LegacyRagTokenizer(RagTokenizer):
+    """The original recursive DFS with deepcopy per branch, kept as the reference"""
+
+    def dfs_(self, chars, s, preTks, tkslist, _depth=0, _memo=None):
+        if _memo is None:
+            _memo = {}
+        MAX_DEPTH = 10
+        if _depth > MAX_DEPTH:
+            if s < len(chars):
+                copy_pretks = copy.deepcopy(preTks)
+                remaining = "".join(chars[s:])
+                copy_pretks.append((remaining, (-12, '')))
+                tkslist.append(copy_pretks)
+            return s
+
+        state_key = (s, tuple(tk[0] for tk in preTks)) if preTks else (s, None)
+        if state_key in _memo:
+            return _memo[state_key]
+
+        res = s
+        if s >= len(chars):
+            tkslist.append(preTks)
+            _memo[state_key] = s
+            return s
+        if s < len(chars) - 4:
+            is_repetitive = True
+            char_to_check = chars[s]
+            for i in range(1, 5):
+                if s + i >= len(chars) or chars[s + i] != char_to_check:
+                    is_repetitive = False
+                    break
+            if is_repetitive:
+                end = s
+                while end < len(chars) and chars[end] == char_to_check:
+                    end += 1
+                mid = s + min(10, end - s)
+                t = "".join(chars[s:mid])
+                k = self.key_(t)
+                copy_pretks = copy.deepcopy(preTks)
+                if k in self.trie_:
+                    copy_pretks.append((t, self.trie_[k]))
+                else:
+                    copy_pretks.append((t, (-12, '')))
+                next_res = self.dfs_(chars, mid, copy_pretks, tkslist, _depth + 1, _memo)
+                res = max(res, next_res)
+                _memo[state_key] = res
+                return res
+
+        S = s + 1
+        if s + 2 <= len(chars):
+            t1 = "".join(chars[s:s + 1])
+            t2 = "".join(chars[s:s + 2])
+            if self.trie_.has_keys_with_prefix(self.key_(t1)) and not self.trie_.has_keys_with_prefix(self.key_(t2)):
+                S = s + 2
+        if len(preTks) > 2 and len(preTks[-1][0]) == 1 and len(preTks[-2][0]) == 1 and len(preTks[-3][0]) == 1:
+            t1 = preTks[-1][0] + "".join(chars[s:s + 1])
+            if self.trie_.has_keys_with_prefix(self.key_(t1)):
+                S = s + 2
+
+        for e in range(S, len(chars) + 1):
+            t = "".join(chars[s:e])
+            k = self.key_(t)
+            if e > s + 1 and not self.trie_.has_keys_with_prefix(k):
+                break
+            if k in self.trie_:
+                pretks = copy.deepcopy(preTks)
+                pretks.append((t, self.trie_[k]))
+                res = max(res, self.dfs_(chars, e, pretks, tkslist, _depth + 1, _memo))
+
+        if res > s:
+            _memo[state_key] = res
+            return res
+
+        t = "".join(chars[s:s + 1])
+        k = self.key_(t)
+        copy_pretks = copy.deepcopy(preTks)
+        if k in self.trie_:
+            copy_pretks.append((t, self.trie_[k]))
+        else:
+            copy_pretks.append((t, (-12, '')))
+        result = self.dfs_(chars, s + 1, copy_pretks, tkslist, _depth + 1, _memo)
+        _memo[state_key] = result
+        return result
+
+    def bestSegment_(self, chars):
+        tkslist = []
+        self.dfs_(chars, 0, [], tkslist)
+        return self.sortTks_(tkslist)[0][0]
+
+
+def build_corpus(lines, seed=42):
+    """Lines made of shuffled clauses from SAMPLES, like chunk titles and sentences"""
+    rng = random.Random(seed)
+    clauses = [c for sample in SAMPLES for c in
+               sample.replace("。", "，").replace("！", "，").replace("？", "，").split("，") if c]
+    return ["，".join(rng.sample(clauses, rng.randint(1, 4))) for _ in range(lines)]
+
+
+def timed(label, fn, count):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<34} {elapsed:8.2f}s  {count / elapsed:10.0f} items/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=5000)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--joined', type=int, default=500, help="joined-span segmentations to time")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.lines)
+    legacy = LegacyRagTokenizer(cache_size=0)
+    dp = RagTokenizer(cache_size=0)
+    cached = RagTokenizer()
+    print(f"Corpus: {len(corpus)} lines, {len(set(corpus))} distinct, {sum(map(len, corpus))} chars")
+
+    # Record the ambiguous spans tokenize() hands to the segmenter
+    spans = []
+    legacy_segment = legacy.bestSegment_
+    legacy.bestSegment_ = lambda chars: spans.append(chars) or legacy_segment(chars)
+    expected = timed("legacy DFS tokenize", lambda: [legacy.tokenize(line) for line in corpus], len(corpus))
+    legacy.bestSegment_ = legacy_segment
+    got = timed("DP tokenize", lambda: [dp.tokenize(line) for line in corpus], len(corpus))
+    assert got == expected, "tokenize output differs from the legacy implementation"
+
+    # Segmentation alone, on the recorded spans and on pairs of them joined (longer ambiguous runs)
+    rng = random.Random(7)
+    joined = ["".join(rng.sample(spans, 2)) for _ in range(min(len(spans), args.joined))]
+    for label, batch in (("spans", spans), ("joined spans", joined)):
+        reference = timed(f"legacy DFS segment, {label}", lambda: [legacy_segment(c) for c in batch], len(batch))
+        result = timed(f"DP segment, {label}", lambda: [dp.bestSegment_(c) for c in batch], len(batch))
+        assert result == reference, f"bestSegment_ differs from the legacy DFS on {label}"
+
+    expected_fine = timed("legacy fine_grained_tokenize",
+                          lambda: [legacy.fine_grained_tokenize(t) for t in expected], len(corpus))
+    got_fine = timed("fine_grained_tokenize", lambda: [dp.fine_grained_tokenize(t) for t in got], len(corpus))
+    assert got_fine == expected_fine, "fine_grained_tokenize output differs from the legacy implementation"
+
+    timed("DP tokenize, LRU cache (cold)", lambda: [cached.tokenize(line) for line in corpus], len(corpus))
+    timed("DP tokenize, LRU cache (warm)", lambda: [cached.tokenize(line) for line in corpus], len(corpus))
+
+    pooled = RagTokenizer(cache_size=0)
+    many = timed(f"tokenize_many, {args.processes} processes",
+                 lambda: pooled.tokenize_many(corpus, processes=args.processes, chunksize=64), len(corpus))
+    pooled.closePool()
+    assert many == expected, "tokenize_many output differs from the legacy implementation"
+    print("Outputs identical to the legacy implementation")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Client Rate Limiter Benchmark
+Compares the original per-IP timestamp-list limiter from backend_api.rate_limit
+with SlidingWindowCounterLimiter at 10k distinct clients: time per request and
+memory held after the run.
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from rate_limiter import SlidingWindowCounterLimiter
+
+
+class TimestampListLimiter:
+    """The previous backend_api implementation, kept as the baseline"""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.request_counts = {}
+
+    def hit(self, client_ip, now):
+        self.request_counts[client_ip] = [req_time for req_time in self.request_counts.get(client_ip, [])
+                                          if now - req_time < self.window]
+        if len(self.request_counts.get(client_ip, [])) >= self.limit:
+            return False
+        self.request_counts.setdefault(client_ip, []).append(now)
+        return True
+
+
+def run(limiter, hit, clients, requests, duration):
+    rng = random.Random(42)
+    ips = [f"10.{i // 65536}.{(i // 256) % 256}.{i % 256}" for i in range(clients)]
+    # Zipf-ish traffic: a few heavy clients, a long tail of light ones
+    weights = [1.0 / (rank + 1) for rank in range(clients)]
+    sequence = rng.choices(ips, weights=weights, k=requests)
+    step = duration / requests
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    allowed = 0
+    for index, ip in enumerate(sequence):
+        allowed += bool(hit(limiter, ip, index * step))
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, current, allowed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=500_000)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--window", type=float, default=900.0)
+    parser.add_argument("--duration", type=float, default=1800.0,
+                        help="Simulated seconds the requests are spread over")
+    args = parser.parse_args()
+
+    candidates = [
+        ("timestamp lists (old)", TimestampListLimiter(args.limit, args.window),
+         lambda limiter, ip, now: limiter.hit(ip, now)),
+        ("sliding window counter", SlidingWindowCounterLimiter(args.limit, args.window),
+         lambda limiter, ip, now: limiter.hit(ip, now)[0]),
+    ]
+
+    print(f"{args.requests:,} requests from {args.clients:,} clients, "
+          f"limit {args.limit}/{args.window:.0f}s over {args.duration:.0f}s simulated")
+    for name, limiter, hit in candidates:
+        elapsed, memory, allowed = run(limiter, hit, args.clients, args.requests, args.duration)
+        print(f"{name:<24} {elapsed / args.requests * 1e6:8.2f} us/request  "
+              f"{memory / 1024 / 1024:8.2f} MiB held  {allowed:,} allowed")
+
+
+if __name__ == "__main__":
+    main()
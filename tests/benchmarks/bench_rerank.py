@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Rerank Benchmark
+Times search.Dealer.rerank over synthetic 1024-candidate search results with
+the original per-candidate loops (a weighted dict per candidate, Python key
+loop in similarity(), get_float per vector component) and with the sparse
+token-overlap kernel and float32 embedding matrix. Checks that term
+similarities, hybrid scores and rankings are identical.
+
+Runs inside the RAGFlow environment (rag.nlp importable, dictionaries under
+rag/res).
+"""
+
+import argparse
+import random
+import re
+import time
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+from rag.nlp import rag_tokenizer
+from rag.nlp.query import FulltextQueryer
+from rag.nlp.search import Dealer
+from rag.utils import get_float
+
+SAMPLES = [
+    "公开征求意见稿提出，境外投资者可使用自有人民币或外汇投资。使用外汇投资的，可通过债券持有人在香港人民币业务清算行"
+    "及香港地区经批准可进入境内银行间外汇市场进行交易的境外人民币业务参加行办理外汇资金兑换。",
+    "多校划片就是一个小区对应多个小学初中，让买了学区房的家庭也不确定到底能上哪个学校。目的是通过这种方式为学区房降温，"
+    "把就近入学落到实处。南京市长江大桥",
+    "季度营收同比增长百分之十二，主要来自企业客户续约和海外市场扩张 revenue growth driven by enterprise renewals 2024.3",
+    "供应链风险评估显示原材料价格波动加剧，建议提前锁定长期采购合同并建立安全库存，库存周转天数下降至45.6天",
+    "数据分析项目经理|数据分析挖掘|商品数据分析 sql python hive tableau 测试开发工程师",
+]
+
+QUERIES = ["境外投资者如何办理外汇资金兑换", "企业客户续约带来的营收增长", "原材料价格波动下的供应链风险"]
+
+
+class LegacyQueryer(FulltextQueryer):
+    """The original token_similarity(), kept as the reference"""
+
+    def token_similarity(self, atks, btkss):
+        def toDict(tks):
+            if isinstance(tks, str):
+                tks = tks.split()
+            d = defaultdict(int)
+            wts = self.tw.weights(tks, preprocess=False)
+            for i, (t, c) in enumerate(wts):
+                d[t] += c
+            return d
+
+        atks = toDict(atks)
+        btkss = [toDict(tks) for tks in btkss]
+        return [self.similarity(atks, btks) for btks in btkss]
+
+
+class LegacyDealer(Dealer):
+    """The original per-candidate embedding parsing, kept as the reference"""
+
+    def __init__(self):
+        super().__init__(None)
+        self.qryr = LegacyQueryer()
+
+    def rerank(self, sres, query, tkweight=0.3,
+               vtweight=0.7, cfield="content_ltks",
+               rank_feature=None):
+        _, keywords = self.qryr.question(query)
+        vector_size = len(sres.query_vector)
+        vector_column = f"q_{vector_size}_vec"
+        zero_vector = [0.0] * vector_size
+        ins_embd = []
+        for chunk_id in sres.ids:
+            vector = sres.field[chunk_id].get(vector_column, zero_vector)
+            if isinstance(vector, str):
+                vector = [get_float(v) for v in vector.split("\t")]
+            ins_embd.append(vector)
+        if not ins_embd:
+            return [], [], []
+
+        ins_tw = []
+        for i in sres.ids:
+            content_ltks = list(OrderedDict.fromkeys(sres.field[i][cfield].split()))
+            title_tks = [t for t in sres.field[i].get("title_tks", "").split() if t]
+            question_tks = [t for t in sres.field[i].get("question_tks", "").split() if t]
+            important_kwd = sres.field[i].get("important_kwd", [])
+            tks = content_ltks + title_tks * 2 + important_kwd * 5 + question_tks * 6
+            ins_tw.append(tks)
+
+        rank_fea = self._rank_feature_scores(rank_feature, sres)
+        sim, tksim, vtsim = self.qryr.hybrid_similarity(sres.query_vector, ins_embd, keywords,
+                                                        ins_tw, tkweight, vtweight)
+        return sim + rank_fea, tksim, vtsim
+
+
+def build_result(candidates, dim, seed):
+    """Search result shaped like the doc store's: vectors are float32 values returned either as
+    JSON float lists or tab-separated strings"""
+    rng = random.Random(seed)
+    nrng = np.random.default_rng(seed)
+    clauses = [c for sample in SAMPLES for c in re.split(r"[，。,|]", sample) if c.strip()]
+    topic = nrng.standard_normal(dim)
+    query_vector = (topic + nrng.standard_normal(dim)).astype(np.float32).tolist()
+    ids, field = [], {}
+    for i in range(candidates):
+        vector = (topic * rng.random() + nrng.standard_normal(dim)).astype(np.float32).tolist()
+        chunk_id = f"chunk-{i}"
+        ids.append(chunk_id)
+        field[chunk_id] = {
+            "content_ltks": rag_tokenizer.tokenize("，".join(rng.sample(clauses, rng.randint(4, 12)))),
+            "title_tks": rag_tokenizer.tokenize(rng.choice(clauses)),
+            "question_tks": rag_tokenizer.tokenize(rng.choice(clauses)) if i % 3 == 0 else "",
+            "important_kwd": rng.sample(["外汇", "学区房", "供应链", "营收"], rng.randint(0, 2)),
+            f"q_{dim}_vec": "\t".join(str(v) for v in vector) if i % 2 else vector,
+        }
+    return Dealer.SearchResult(total=candidates, ids=ids, query_vector=query_vector, field=field)
+
+
+def timed(label, fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"{label:<40} {elapsed * 1000:9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--candidates', type=int, default=1024)
+    parser.add_argument('--dim', type=int, default=1024)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    legacy, dealer = LegacyDealer(), Dealer(None)
+    for n, query in enumerate(QUERIES):
+        sres = build_result(args.candidates, args.dim, seed=n)
+        print(f"Query {n + 1}: {args.candidates} candidates, dim {args.dim}")
+        expected = timed("  legacy rerank", lambda: legacy.rerank(sres, query), args.repeat)
+        got = timed("  vectorized rerank", lambda: dealer.rerank(sres, query), args.repeat)
+        assert got[1] == expected[1], "term similarities differ"
+        assert np.array_equal(got[2], expected[2]), "vector similarities differ"
+        assert np.array_equal(got[0], expected[0]), "hybrid scores differ"
+        assert np.array_equal(np.argsort(got[0] * -1), np.argsort(expected[0] * -1)), "rankings differ"
+
+        _, keywords = dealer.qryr.question(query)
+        ins_tw = [sres.field[i]["content_ltks"].split() for i in sres.ids]
+        timed("  legacy token_similarity", lambda: legacy.qryr.token_similarity(keywords, ins_tw), args.repeat)
+        timed("  sparse token_similarity", lambda: dealer.qryr.token_similarity(keywords, ins_tw), args.repeat)
+        timed("  legacy embedding parse", lambda: [
+            [get_float(v) for v in vector.split("\t")] if isinstance(vector, str) else vector
+            for vector in (sres.field[i][f"q_{args.dim}_vec"] for i in sres.ids)], args.repeat)
+        timed("  float32 embedding matrix", lambda: Dealer.embedding_matrix(sres), args.repeat)
+    print("Scores and rankings identical to the legacy implementation")
+
+
+if __name__ == '__main__':
+    main()
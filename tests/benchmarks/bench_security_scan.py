@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Security Scan Benchmark
+Throughput of SecurityValidator content checks on 1 MB inputs: the original
+per-pattern `re.search(pattern, text, re.IGNORECASE)` loops (and json.dumps of
+the whole context) against ContentScanner. Covers a clean prompt (every
+pattern scans the full text), a prompt with PII near the end, a clean
+response, and a context dict of many small values.
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'nerve_centre'))
+
+from llm_abstraction.security import SecurityValidator
+
+WORDS = ("the model should summarise quarterly revenue for each region and compare it with last year "
+         "while the analyst prepares a short report on customer churn pricing and inventory levels "
+         "system update server token input output data user pass order 42 step 7 version 3").split()
+
+
+class OriginalChecks:
+    """The previous SecurityValidator scanning code, kept as the baseline"""
+
+    def __init__(self, validator):
+        self.blocked_patterns = validator.blocked_patterns
+        self.pii_patterns = validator.pii_patterns
+        self.leak_patterns = validator.leak_patterns
+
+    def content(self, prompt):
+        for pattern in self.blocked_patterns:
+            if re.search(pattern, prompt, re.IGNORECASE):
+                return False
+        return not self.pii(prompt)
+
+    def pii(self, text):
+        for pattern in self.pii_patterns:
+            if re.search(pattern, text, re.IGNORECASE):
+                return True
+        return False
+
+    def response(self, text):
+        for pattern in self.leak_patterns:
+            if re.search(pattern, text, re.IGNORECASE):
+                return False
+        return True
+
+    def context(self, context):
+        context_str = json.dumps(context, default=str)
+        return not self.pii(context_str), len(context_str)
+
+
+def new_checks(validator):
+    scanner = validator.scanner
+    return {
+        'content': lambda prompt: not scanner.scan(prompt, ('blocked', 'pii')).matches,
+        'response': lambda text: 'leak' not in scanner.scan(text, ('leak',)),
+        'context': lambda context: (lambda found: ('pii' not in found, found.length))(
+            scanner.scan_chunks(json.JSONEncoder(default=str).iterencode(context), ('pii',))),
+    }
+
+
+def text_of(size, rng):
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+
+def timed(label, fn, arg, size, repeat):
+    fn(arg)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(arg)
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"  {label:<22} {elapsed * 1000:9.2f} ms  {size / elapsed / 1e6:8.1f} MB/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=1 << 20, help="input size in bytes")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    validator = SecurityValidator({})
+    original = OriginalChecks(validator)
+    new = new_checks(validator)
+
+    clean = text_of(args.size, rng)
+    with_pii = clean[:-200] + " reach me at jane.doe@example.com "
+    context = {f"doc_{i}": {"title": text_of(40, rng), "body": text_of(400, rng), "rank": i}
+               for i in range(args.size // 480)}
+    cases = [
+        ("clean prompt", 'content', clean),
+        ("prompt, PII at end", 'content', with_pii),
+        ("clean response", 'response', clean),
+        ("context dict", 'context', context),
+    ]
+    for label, check, arg in cases:
+        size = len(json.dumps(arg)) if check == 'context' else len(arg)
+        print(f"{label} ({size / 1e6:.2f} MB)")
+        expected = timed("original", getattr(original, check), arg, size, args.repeat)
+        result = timed("ContentScanner", new[check], arg, size, args.repeat)
+        assert result == expected, (label, result, expected)
+
+
+if __name__ == '__main__':
+    main()
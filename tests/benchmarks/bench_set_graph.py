@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+GraphRAG set_graph Benchmark
+Indexes a synthetic knowledge graph with graphrag.utils.set_graph against an
+in-memory doc store, an LRU-only cache and an embedding model stand-in: a full
+index of every node and edge, then an incremental merge of one new document.
+Compares the original pipeline (one encode call per text, bulk size 4, every
+subgraph regenerated) with batched embedding, size-bounded bulk writes and
+touched-only subgraph rebuilds. Reports per-stage timings from the set_graph
+callback, encode and insert call counts, and checks both leave the same
+entity, relation and subgraph documents in the store.
+
+Runs inside the RAGFlow environment (graphrag, api and rag importable); the
+doc store, cache and embedding model are replaced in-process.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+import networkx as nx
+import numpy as np
+import trio
+
+from graphrag import utils
+from graphrag.cache import KVCache
+from graphrag.graph_store import STORE_SEQ
+from graphrag.utils import GraphChange, get_embed_cache, set_embed_cache
+from rag.nlp import search
+
+WORDS = ["供应链", "原材料", "价格", "波动", "企业", "客户", "续约", "营收", "增长", "海外", "市场", "扩张",
+         "外汇", "投资者", "人民币", "清算", "银行", "债券", "学区房", "小学", "初中", "政府", "部门", "安全",
+         "supply", "chain", "revenue", "growth", "renewal", "market", "risk", "contract"]
+TYPES = ["person", "organization", "geo", "event", "category"]
+
+
+class MemoryDocStore:
+    """The docStoreConn calls set_graph makes, over a dict of documents"""
+
+    def __init__(self):
+        self.docs = {}
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def match(doc, condition):
+        for k, v in condition.items():
+            values = set(v) if isinstance(v, list) else {v}
+            field = doc.get(k)
+            field = set(field) if isinstance(field, list) else {field}
+            if not values & field:
+                return False
+        return True
+
+    def insert(self, chunks, index_name, kb_id):
+        with self.lock:
+            self.calls["insert"] += 1
+            for chunk in chunks:
+                self.docs[chunk["id"]] = dict(chunk)
+        return []
+
+    def delete(self, condition, index_name, kb_id):
+        with self.lock:
+            self.calls["delete"] += 1
+            ids = [i for i, d in self.docs.items() if self.match(d, condition)]
+            for i in ids:
+                del self.docs[i]
+        return len(ids)
+
+    def search(self, fields, highlight, condition, match_exprs, order_by, offset, limit, index_names, kb_ids):
+        with self.lock:
+            self.calls["search"] += 1
+            docs = [d for d in self.docs.values() if self.match(d, condition)]
+            for field, desc in reversed(order_by.fields):
+                present = sorted((d for d in docs if d.get(field) is not None), key=lambda d: d[field], reverse=bool(desc))
+                docs = present + [d for d in docs if d.get(field) is None]
+            return docs[offset:offset + limit]
+
+    def getFields(self, res, fields):
+        return {d["id"]: {f: d.get(f) for f in fields} for d in res}
+
+    def snapshot(self):
+        """Entity, relation and subgraph documents without their generated ids, comparable across stores"""
+        res = []
+        for d in self.docs.values():
+            if d["knowledge_graph_kwd"] in ("graph", "graph_delta"):
+                continue
+            d = {k: (np.asarray(v).tolist() if k.endswith("_vec") else v) for k, v in d.items() if k != "id"}
+            res.append(json.dumps(d, sort_keys=True, ensure_ascii=False))
+        return Counter(res)
+
+
+class FakeEmbedding:
+    """Embedding API with a fixed per-request latency plus a per-text cost"""
+
+    def __init__(self, dim, latency, per_text):
+        self.llm_name = "bench-embedding"
+        self.dim = dim
+        self.latency = latency
+        self.per_text = per_text
+        self.calls = 0
+        self.texts = 0
+        self.lock = threading.Lock()
+
+    def encode(self, texts):
+        with self.lock:
+            self.calls += 1
+            self.texts += len(texts)
+        time.sleep(self.latency + self.per_text * len(texts))
+        vecs = []
+        for txt in texts:
+            rng = np.random.default_rng(abs(hash(txt)) % (1 << 32))
+            vecs.append(rng.standard_normal(self.dim).astype(np.float32))
+        return np.array(vecs), sum(len(t) for t in texts)
+
+
+async def legacy_node_to_chunk(kb_id, embd_mdl, ent_name, meta, chunks):
+    chunk, _, _ = utils.graph_node_chunk(kb_id, ent_name, meta)
+    ebd = get_embed_cache(embd_mdl.llm_name, ent_name)
+    if ebd is None:
+        ebd, _ = await trio.to_thread.run_sync(lambda: embd_mdl.encode([ent_name]))
+        ebd = ebd[0]
+        set_embed_cache(embd_mdl.llm_name, ent_name, ebd)
+    chunk["q_%d_vec" % len(ebd)] = ebd
+    chunks.append(chunk)
+
+
+async def legacy_edge_to_chunk(kb_id, embd_mdl, from_ent_name, to_ent_name, meta, chunks):
+    chunk, txt, _ = utils.graph_edge_chunk(kb_id, from_ent_name, to_ent_name, meta)
+    ebd = get_embed_cache(embd_mdl.llm_name, txt)
+    if ebd is None:
+        ebd, _ = await trio.to_thread.run_sync(lambda: embd_mdl.encode([txt + f": {meta['description']}"]))
+        ebd = ebd[0]
+        set_embed_cache(embd_mdl.llm_name, txt, ebd)
+    chunk["q_%d_vec" % len(ebd)] = ebd
+    chunks.append(chunk)
+
+
+async def legacy_set_graph(tenant_id, kb_id, embd_mdl, graph, change, callback):
+    """The original set_graph, kept as the reference"""
+    settings = utils.settings
+    start = trio.current_time()
+    await trio.to_thread.run_sync(lambda: settings.docStoreConn.delete({"knowledge_graph_kwd": ["graph", "subgraph"]}, search.index_name(tenant_id), kb_id))
+    if change.removed_nodes:
+        await trio.to_thread.run_sync(lambda: settings.docStoreConn.delete({"knowledge_graph_kwd": ["entity"], "entity_kwd": sorted(change.removed_nodes)}, search.index_name(tenant_id), kb_id))
+    if change.removed_edges:
+        async with trio.open_nursery() as nursery:
+            for from_node, to_node in change.removed_edges:
+                nursery.start_soon(lambda from_node=from_node, to_node=to_node: trio.to_thread.run_sync(lambda: settings.docStoreConn.delete({"knowledge_graph_kwd": ["relation"], "from_entity_kwd": from_node, "to_entity_kwd": to_node}, search.index_name(tenant_id), kb_id)))
+    now = trio.current_time()
+    callback(msg=f"set_graph removed {len(change.removed_nodes)} nodes and {len(change.removed_edges)} edges from index in {now - start:.2f}s.")
+    start = now
+
+    chunks = [{
+        "id": utils.get_uuid(),
+        "content_with_weight": json.dumps(nx.node_link_data(graph, edges="edges"), ensure_ascii=False),
+        "knowledge_graph_kwd": "graph",
+        "kb_id": kb_id,
+        "source_id": graph.graph.get("source_id", []),
+        "available_int": 0,
+        "removed_kwd": "N"
+    }]
+    for source in graph.graph["source_id"]:
+        subgraph = graph.subgraph([n for n in graph.nodes if source in graph.nodes[n]["source_id"]]).copy()
+        subgraph.graph["source_id"] = [source]
+        for n in subgraph.nodes:
+            subgraph.nodes[n]["source_id"] = [source]
+        chunks.append({
+            "id": utils.get_uuid(),
+            "content_with_weight": json.dumps(nx.node_link_data(subgraph, edges="edges"), ensure_ascii=False),
+            "knowledge_graph_kwd": "subgraph",
+            "kb_id": kb_id,
+            "source_id": [source],
+            "available_int": 0,
+            "removed_kwd": "N"
+        })
+    async with trio.open_nursery() as nursery:
+        for node in change.added_updated_nodes:
+            nursery.start_soon(legacy_node_to_chunk, kb_id, embd_mdl, node, graph.nodes[node], chunks)
+        for from_node, to_node in change.added_updated_edges:
+            edge_attrs = graph.get_edge_data(from_node, to_node)
+            if not edge_attrs:
+                continue
+            nursery.start_soon(legacy_edge_to_chunk, kb_id, embd_mdl, from_node, to_node, edge_attrs, chunks)
+    now = trio.current_time()
+    callback(msg=f"set_graph converted graph change to {len(chunks)} chunks in {now - start:.2f}s.")
+    start = now
+
+    es_bulk_size = 4
+    for b in range(0, len(chunks), es_bulk_size):
+        doc_store_result = await trio.to_thread.run_sync(lambda: settings.docStoreConn.insert(chunks[b:b + es_bulk_size], search.index_name(tenant_id), kb_id))
+        if doc_store_result:
+            raise Exception(f"Insert chunk error: {doc_store_result}")
+    now = trio.current_time()
+    callback(msg=f"set_graph added/updated {len(change.added_updated_nodes)} nodes and {len(change.added_updated_edges)} edges from index in {now - start:.2f}s.")
+
+
+def description(rng):
+    return "".join(rng.choice(WORDS) for _ in range(rng.randint(8, 30)))
+
+
+def document_graph(doc_id, entities, nodes, rng):
+    """Entities and relations extracted from one document, sharing names with earlier documents"""
+    graph = nx.Graph()
+    for _ in range(nodes):
+        name = rng.choice(entities) if rng.random() < 0.1 else "实体%d" % rng.randrange(10 ** 7)
+        graph.add_node(name, entity_type=rng.choice(TYPES), description=description(rng), source_id=[doc_id])
+    names = list(graph.nodes)
+    for _ in range(nodes * 2):
+        a, b = rng.sample(names, 2)
+        graph.add_edge(a, b, description=description(rng), keywords=rng.sample(WORDS, 2),
+                       weight=rng.randint(1, 10), source_id=[doc_id])
+    return graph
+
+
+def merge(graph, doc_graph, change):
+    """What graph_merge records for a fresh document, without the LLM description summaries"""
+    for node, attrs in doc_graph.nodes(data=True):
+        if graph.has_node(node):
+            node0 = graph.nodes[node]
+            node0["description"] += utils.GRAPH_FIELD_SEP + attrs["description"]
+            node0["source_id"] = sorted(set(node0["source_id"] + attrs["source_id"]))
+        else:
+            graph.add_node(node, **dict(attrs, source_id=list(attrs["source_id"])))
+        change.added_updated_nodes.add(node)
+    for a, b, attrs in doc_graph.edges(data=True):
+        if graph.has_edge(a, b):
+            edge0 = graph.edges[a, b]
+            edge0["description"] += utils.GRAPH_FIELD_SEP + attrs["description"]
+            edge0["weight"] += attrs["weight"]
+            edge0["source_id"] = sorted(set(edge0["source_id"] + attrs["source_id"]))
+        else:
+            graph.add_edge(a, b, **dict(attrs, source_id=list(attrs["source_id"])))
+        change.added_updated_edges.add((a, b))
+    graph.graph.setdefault("source_id", []).extend(doc_graph.graph.get("source_id", []))
+
+
+def build_graph(docs, nodes_per_doc, seed):
+    rng = random.Random(seed)
+    entities = ["公司%d" % i for i in range(nodes_per_doc * docs // 4)]
+    graph, change = nx.Graph(), GraphChange()
+    for d in range(docs):
+        doc_graph = document_graph(f"doc-{d}", entities, nodes_per_doc, rng)
+        doc_graph.graph["source_id"] = [f"doc-{d}"]
+        merge(graph, doc_graph, change)
+    return graph, change, entities, rng
+
+
+def run(label, fn, graph, change, store, cache, embd):
+    utils.settings.docStoreConn = store
+    utils._cache = cache
+    stages = []
+    store.calls.clear()
+    calls0 = embd.calls
+    # The legacy pipeline copies graph attributes into subgraphs; keep the graph log position away from it
+    seq = graph.graph.pop(STORE_SEQ, None) if fn is legacy_set_graph else None
+    started = time.perf_counter()
+    trio.run(fn, "bench", "kb", embd, graph, change, lambda msg: stages.append(msg))
+    elapsed = time.perf_counter() - started
+    if seq is not None:
+        graph.graph[STORE_SEQ] = seq
+    print(f"  {label:<10} {elapsed:7.2f}s  encode calls {embd.calls - calls0:>6}  "
+          f"inserts {store.calls['insert']:>5}  deletes {store.calls['delete']:>5}")
+    for msg in stages:
+        print(f"    {msg}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--docs', type=int, default=40)
+    parser.add_argument('--nodes', type=int, default=60, help="entities per document")
+    parser.add_argument('--dim', type=int, default=1024)
+    parser.add_argument('--latency', type=float, default=0.03, help="seconds per embedding request")
+    parser.add_argument('--per-text', type=float, default=0.0005, help="seconds per embedded text")
+    args = parser.parse_args()
+
+    graph, change, entities, rng = build_graph(args.docs, args.nodes, seed=7)
+    print(f"Full index: {args.docs} documents, {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges")
+    stores = {"legacy": MemoryDocStore(), "batched": MemoryDocStore()}
+    caches = {"legacy": KVCache(), "batched": KVCache()}
+    embds = {k: FakeEmbedding(args.dim, args.latency, args.per_text) for k in stores}
+    fns = {"legacy": legacy_set_graph, "batched": utils.set_graph}
+    times = {k: run(k, fns[k], graph, change, stores[k], caches[k], embds[k]) for k in stores}
+    assert stores["legacy"].snapshot() == stores["batched"].snapshot(), "full index differs from the legacy pipeline"
+    print(f"  speedup {times['legacy'] / times['batched']:.1f}x")
+
+    doc_id = f"doc-{args.docs}"
+    doc_graph = document_graph(doc_id, entities, args.nodes, rng)
+    doc_graph.graph["source_id"] = [doc_id]
+    change = GraphChange()
+    merge(graph, doc_graph, change)
+    touched = utils.touched_sources(graph, change)
+    print(f"Incremental merge of {doc_id}: {len(change.added_updated_nodes)} nodes, "
+          f"{len(change.added_updated_edges)} edges, {len(touched)} of {len(graph.graph['source_id'])} subgraphs touched")
+    times = {k: run(k, fns[k], graph, change, stores[k], caches[k], embds[k]) for k in stores}
+    assert stores["legacy"].snapshot() == stores["batched"].snapshot(), "incremental index differs from the legacy pipeline"
+    print(f"  speedup {times['legacy'] / times['batched']:.1f}x")
+    kinds = defaultdict(int)
+    for d in stores["batched"].docs.values():
+        kinds[d["knowledge_graph_kwd"]] += 1
+    print(f"Entity, relation and subgraph documents identical to the legacy pipeline: {dict(kinds)}")
+
+
+if __name__ == '__main__':
+    main()
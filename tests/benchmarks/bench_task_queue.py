@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Task Queue Benchmark
+Fills TaskSchedulingAgent with 1M scheduled tasks (most with deadlines over
+the next three days), then runs heavy churn: schedule, cancel, reprioritize
+and dequeue in a 40/20/20/20 mix, plus a scheduling strategy pass. The
+original agent (a raw heapq list of (-score, task_id), cancel by filtering
+and re-heapifying the whole list, reprioritize as cancel + re-add, strategies
+rebuilding the heap from every task) is kept inline as the baseline; its
+churn is timed on fewer operations since each cancel is O(n). Also times
+dequeueing from a queue left a day behind, where every deadline score that
+surfaces is stale and gets re-scored on the way.
+"""
+
+import argparse
+import asyncio
+import heapq
+import logging
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'legion'))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from automation.task_scheduling_agent import Priority, ScheduledTask, TaskSchedulingAgent, TaskStatus
+
+
+class OriginalTaskSchedulingAgent(TaskSchedulingAgent):
+    """The previous heapq list queue, kept as the baseline"""
+
+    def __init__(self):
+        super().__init__()
+        self.task_queue = []
+
+    async def _add_to_queue(self, scheduled_task):
+        priority_score = self._calculate_priority_score(scheduled_task)
+        heapq.heappush(self.task_queue, (-priority_score, scheduled_task.task_id))
+        scheduled_task.status = TaskStatus.SCHEDULED
+
+    async def _cancel_task(self, params):
+        task_id = params.get('task_id')
+        if task_id in self.scheduled_tasks:
+            self.scheduled_tasks[task_id].status = TaskStatus.CANCELLED
+            self.task_queue = [(p, tid) for p, tid in self.task_queue if tid != task_id]
+            heapq.heapify(self.task_queue)
+            return {"status": "success", "cancelled_task": task_id}
+        return {"status": "error", "message": "Task not found"}
+
+    async def _reprioritize_task(self, params):
+        # No update path: cancel and re-add
+        task = self.scheduled_tasks[params['task_id']]
+        await self._cancel_task(params)
+        task.priority = Priority(params['priority'])
+        await self._add_to_queue(task)
+        return {"status": "success"}
+
+    async def _next_task(self):
+        while self.task_queue:
+            _, task_id = heapq.heappop(self.task_queue)
+            task = self.scheduled_tasks[task_id]
+            if task.status == TaskStatus.SCHEDULED:
+                task.status = TaskStatus.RUNNING
+                self.running_tasks[task_id] = task
+                return task
+        return None
+
+    async def _priority_first_scheduling(self):
+        sorted_tasks = sorted(
+            [task for task in self.scheduled_tasks.values() if task.status == TaskStatus.SCHEDULED],
+            key=lambda t: t.priority.value
+        )
+        self.task_queue.clear()
+        for task in sorted_tasks:
+            priority_score = self._calculate_priority_score(task)
+            heapq.heappush(self.task_queue, (-priority_score, task.task_id))
+        return {"reordered_tasks": len(sorted_tasks), "optimization_type": "priority_first"}
+
+
+def make_task(rng, task_id, now):
+    deadline = now + timedelta(hours=rng.uniform(0, 72)) if rng.random() < 0.8 else None
+    return ScheduledTask(task_id=task_id, agent_id=f"agent_{rng.randrange(50)}", task_type="general",
+                         description="benchmark task", priority=Priority(rng.randint(1, 4)),
+                         scheduled_time=now, deadline=deadline, dependencies=["dep"] * rng.randrange(3))
+
+
+async def fill(agent, tasks):
+    for task in tasks:
+        agent.scheduled_tasks[task.task_id] = task
+        await agent._add_to_queue(task)
+
+
+async def churn(agent, operations, rng, prefix):
+    """Runs the op mix; returns seconds spent per op type and counts"""
+    spent = {"schedule": 0.0, "cancel": 0.0, "reprioritize": 0.0, "dequeue": 0.0}
+    counts = dict.fromkeys(spent, 0)
+    ids = list(agent.scheduled_tasks)
+    now = datetime.now()
+    for i in range(operations):
+        op = rng.random()
+        if op < 0.4:
+            kind = "schedule"
+            task = make_task(rng, f"{prefix}{i}", now)
+            ids.append(task.task_id)
+            started = time.perf_counter()
+            agent.scheduled_tasks[task.task_id] = task
+            await agent._add_to_queue(task)
+        elif op < 0.6:
+            kind = "cancel"
+            task_id = ids[rng.randrange(len(ids))]
+            started = time.perf_counter()
+            await agent._cancel_task({"task_id": task_id})
+        elif op < 0.8:
+            kind = "reprioritize"
+            task_id = ids[rng.randrange(len(ids))]
+            while agent.scheduled_tasks[task_id].status != TaskStatus.SCHEDULED:
+                task_id = ids[rng.randrange(len(ids))]
+            started = time.perf_counter()
+            await agent._reprioritize_task({"task_id": task_id, "priority": rng.randint(1, 4)})
+        else:
+            kind = "dequeue"
+            started = time.perf_counter()
+            await agent._next_task()
+        spent[kind] += time.perf_counter() - started
+        counts[kind] += 1
+    return spent, counts
+
+
+def report(label, fill_time, spent, counts, strategy_time, tasks):
+    ops = sum(counts.values())
+    per_op = sum(spent.values()) / ops
+    print(f"  {label}")
+    print(f"    fill {tasks:,} tasks {fill_time:8.2f} s")
+    for kind, seconds in spent.items():
+        print(f"    {kind:<14} {seconds / max(counts[kind], 1) * 1e6:12.1f} us/op")
+    print(f"    churn          {per_op * 1e6:12.1f} us/op  ({1 / per_op:,.0f} ops/s)")
+    print(f"    strategy pass  {strategy_time * 1000:12.1f} ms")
+
+
+async def run(make_agent, tasks, operations, seed, label):
+    agent = make_agent()
+    started = time.perf_counter()
+    await fill(agent, tasks)
+    fill_time = time.perf_counter() - started
+    spent, counts = await churn(agent, operations, random.Random(seed), "churn_")
+    started = time.perf_counter()
+    await agent._priority_first_scheduling()
+    strategy_time = time.perf_counter() - started
+    report(label, fill_time, spent, counts, strategy_time, len(tasks))
+    return agent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=1_000_000)
+    parser.add_argument('--operations', type=int, default=200_000)
+    parser.add_argument('--baseline-operations', type=int, default=200)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    now = datetime.now()
+    print(f"{args.tasks:,} scheduled tasks")
+
+    rng = random.Random(1)
+    tasks = [make_task(rng, f"task_{i}", now) for i in range(args.tasks)]
+    asyncio.run(run(OriginalTaskSchedulingAgent, tasks, args.baseline_operations, 2,
+                    f"original, {args.baseline_operations:,} churn ops"))
+
+    rng = random.Random(1)
+    tasks = [make_task(rng, f"task_{i}", now) for i in range(args.tasks)]
+    agent = asyncio.run(run(TaskSchedulingAgent, tasks, args.operations, 2,
+                            f"indexed queue, {args.operations:,} churn ops"))
+
+    queue = agent.task_queue
+    print("dequeue a day later (stale scores re-scored as they surface)")
+    later = datetime.now() + timedelta(days=1)
+    for count in (1, 1000, 100_000):
+        rescored = queue.rescored
+        started = time.perf_counter()
+        for _ in range(count):
+            queue.pop(later)
+        elapsed = time.perf_counter() - started
+        print(f"  {count:>7,} pops {elapsed * 1000:9.1f} ms  ({elapsed / count * 1e6:8.1f} us/pop), "
+              f"{queue.rescored - rescored:,} re-scored")
+
+if __name__ == '__main__':
+    main()
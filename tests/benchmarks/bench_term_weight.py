@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Term Weight Benchmark
+Runs the FulltextQueryer.token_similarity workload (weights for one query and
+every candidate chunk) over a synthetic 10k-chunk corpus with the original
+per-token regex/dictionary term weighting and with the precomputed index, and
+checks both give identical weights.
+
+Runs inside the RAGFlow environment (rag.nlp importable, huqie.txt, term.freq
+and ner.json under rag/res). The first run builds rag/res/term_weight.idx.*.
+"""
+
+import argparse
+import math
+import random
+import re
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from rag.nlp import rag_tokenizer
+from rag.nlp.term_weight import Dealer
+
+SAMPLES = [
+    "公开征求意见稿提出，境外投资者可使用自有人民币或外汇投资。使用外汇投资的，可通过债券持有人在香港人民币业务清算行"
+    "及香港地区经批准可进入境内银行间外汇市场进行交易的境外人民币业务参加行办理外汇资金兑换。",
+    "多校划片就是一个小区对应多个小学初中，让买了学区房的家庭也不确定到底能上哪个学校。目的是通过这种方式为学区房降温，"
+    "把就近入学落到实处。南京市长江大桥",
+    "实际上当时他们已经将业务中心偏移到安全部门和针对政府企业的部门 Scripts are compiled and cached",
+    "涡轮增压发动机最大功率,不像别的共享买车锁电子化的手段,我们接过来是否有意义,今天要讲到的这家农贸市场，说实话，还真蛮有特色的",
+    "Unity3D开发经验 测试开发工程师 c++双11双11 985 211 数据分析项目经理|数据分析挖掘|商品数据分析 sql python hive tableau",
+    "季度营收同比增长百分之十二，主要来自企业客户续约和海外市场扩张 revenue growth driven by enterprise renewals 2024.3",
+    "供应链风险评估显示原材料价格波动加剧，建议提前锁定长期采购合同并建立安全库存，库存周转天数下降至45.6天",
+]
+
+QUERIES = ["境外投资者外汇资金兑换", "学区房降温 就近入学", "企业客户续约 revenue growth",
+           "供应链风险 原材料价格", "数据分析项目经理 python", "发动机最大功率"]
+
+
+class LegacyDealer(Dealer):
+    """The original per-token weights(), kept as the reference"""
+
+    def weights(self, tks, preprocess=True):
+        def ner(t):
+            if re.match(r"[0-9,.]{2,}$", t):
+                return 2
+            if re.match(r"[a-z]{1,2}$", t):
+                return 0.01
+            if not self.ne or t not in self.ne:
+                return 1
+            m = {"toxic": 2, "func": 1, "corp": 3, "loca": 3, "sch": 3, "stock": 3,
+                 "firstnm": 1}
+            return m[self.ne[t]]
+
+        def postag(t):
+            t = rag_tokenizer.tag(t)
+            if t in set(["r", "c", "d"]):
+                return 0.3
+            if t in set(["ns", "nt"]):
+                return 3
+            if t in set(["n"]):
+                return 2
+            if re.match(r"[0-9-]+", t):
+                return 2
+            return 1
+
+        def freq(t):
+            if re.match(r"[0-9. -]{2,}$", t):
+                return 3
+            s = rag_tokenizer.freq(t)
+            if not s and re.match(r"[a-z. -]+$", t):
+                return 300
+            if not s:
+                s = 0
+
+            if not s and len(t) >= 4:
+                s = [tt for tt in rag_tokenizer.fine_grained_tokenize(t).split() if len(tt) > 1]
+                if len(s) > 1:
+                    s = np.min([freq(tt) for tt in s]) / 6.
+                else:
+                    s = 0
+
+            return max(s, 10)
+
+        def df(t):
+            if re.match(r"[0-9. -]{2,}$", t):
+                return 5
+            if t in self.df:
+                return self.df[t] + 3
+            elif re.match(r"[a-z. -]+$", t):
+                return 300
+            elif len(t) >= 4:
+                s = [tt for tt in rag_tokenizer.fine_grained_tokenize(t).split() if len(tt) > 1]
+                if len(s) > 1:
+                    return max(3, np.min([df(tt) for tt in s]) / 6.)
+
+            return 3
+
+        def idf(s, N): return math.log10(10 + ((N - s + 0.5) / (s + 0.5)))
+
+        tw = []
+        if not preprocess:
+            idf1 = np.array([idf(freq(t), 10000000) for t in tks])
+            idf2 = np.array([idf(df(t), 1000000000) for t in tks])
+            wts = (0.3 * idf1 + 0.7 * idf2) * \
+                np.array([ner(t) * postag(t) for t in tks])
+            wts = [s for s in wts]
+            tw = list(zip(tks, wts))
+        else:
+            for tk in tks:
+                tt = self.tokenMerge(self.pretoken(tk, True))
+                idf1 = np.array([idf(freq(t), 10000000) for t in tt])
+                idf2 = np.array([idf(df(t), 1000000000) for t in tt])
+                wts = (0.3 * idf1 + 0.7 * idf2) * \
+                    np.array([ner(t) * postag(t) for t in tt])
+                wts = [s for s in wts]
+                tw.extend(zip(tt, wts))
+
+        S = np.sum([s for _, s in tw])
+        return [(t, s / S) for t, s in tw]
+
+
+def build_chunks(count, seed=42):
+    """Tokenized chunks of 4-12 shuffled clauses, like content_ltks of indexed chunks"""
+    rng = random.Random(seed)
+    clauses = [c for sample in SAMPLES for c in re.split(r"[，。,|]", sample) if c.strip()]
+    distinct = [rag_tokenizer.tokenize("，".join(rng.sample(clauses, rng.randint(4, 12))) + " %d" % i)
+                for i in range(min(count, 2000))]
+    return [distinct[i % len(distinct)] for i in range(count)]
+
+
+def rerank(dealer, query_tks, chunks):
+    """FulltextQueryer.token_similarity"""
+    def toDict(tks):
+        d = defaultdict(int)
+        for t, c in dealer.weights(tks.split(), preprocess=False):
+            d[t] += c
+        return d
+
+    return toDict(query_tks), [toDict(tks) for tks in chunks]
+
+
+def timed(label, fn, count):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<36} {elapsed:8.2f}s  {count / elapsed:10.0f} chunks/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chunks', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=3)
+    args = parser.parse_args()
+
+    chunks = build_chunks(args.chunks)
+    queries = [rag_tokenizer.tokenize(q) for q in QUERIES[:args.queries]]
+    tokens = sum(len(c.split()) for c in chunks)
+    print(f"Corpus: {len(chunks)} chunks, {tokens} tokens, {len(set(' '.join(chunks).split()))} distinct")
+
+    started = time.perf_counter()
+    indexed = Dealer()
+    print(f"Dealer() with index: {time.perf_counter() - started:.2f}s, {len(indexed.index_)} indexed terms")
+    legacy = LegacyDealer(build_index=False)
+    memo_only = Dealer(build_index=False)
+
+    expected = timed("legacy weights, query 1", lambda: rerank(legacy, queries[0], chunks), len(chunks))
+    got = timed("memo only, query 1", lambda: rerank(memo_only, queries[0], chunks), len(chunks))
+    assert got == expected, "memoized weights differ from the legacy implementation"
+    got = timed("index + memo, query 1", lambda: rerank(indexed, queries[0], chunks), len(chunks))
+    assert got == expected, "indexed weights differ from the legacy implementation"
+    print(f"memo holds {len(indexed.memo_)} tokens outside the index")
+
+    for i, q in enumerate(queries[1:], 2):
+        timed(f"index + memo, query {i}", lambda: rerank(indexed, q, chunks), len(chunks))
+
+    # Preprocessed weights (the query side of FulltextQueryer.question)
+    texts = [c.replace(" ", "") for c in chunks[:500]]
+    expected = timed("legacy weights, preprocess", lambda: [legacy.weights([t]) for t in texts], len(texts))
+    got = timed("index + memo, preprocess", lambda: [indexed.weights([t]) for t in texts], len(texts))
+    assert got == expected, "preprocessed weights differ from the legacy implementation"
+    print("Weights identical to the legacy implementation")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Tests for context window optimization: token counters, density packing and the bounded cache"""
+
+import base64
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'nerve_centre'))
+
+from llm_abstraction.algorithms.context_window_optimization import (
+    ContextOptimizer, OptimizationCache, pack_by_density
+)
+from llm_abstraction.algorithms.token_counting import BPETokenCounter, CharTokenCounter
+
+
+def write_ranks(path, merges):
+    ranks = {bytes([b]): b for b in range(256)}
+    for token in merges:
+        ranks[token] = len(ranks)
+    path.write_text("".join(f"{base64.b64encode(t).decode()} {r}\n" for t, r in ranks.items()))
+    return path
+
+
+def test_bpe_counter_from_file(tmp_path):
+    path = write_ranks(tmp_path / "vocab.tiktoken", [b"lo", b"low", b" l", b" low", b"er", b"es", b"est"])
+    counter = BPETokenCounter.from_file(str(path))
+    assert counter._merge(b"lowest") == [b"low", b"est"]
+    # "low" | " lower" -> " low" "er" | " newest" -> " " "n" "e" "w" "est"
+    assert counter.count("low lower newest") == 1 + 2 + 5
+    assert counter.count("low lower newest") == 8 and counter.hits == 1
+    assert counter.count("") == 0
+    assert CharTokenCounter().count("x" * 41) == 10
+
+
+def test_pack_by_density():
+    items = [("a", 10.0, 10), ("b", 9.0, 3), ("c", 1.0, 1), ("d", 6.0, 5)]
+    # b (3.0/token), d (1.2), c (1.0), a (1.0 - does not fit after the others)
+    assert pack_by_density(items, 10) == (["b", "d", "c"], ["a"])
+    # One heavy item beats the greedy picks
+    assert pack_by_density([("x", 1.0, 1), ("y", 50.0, 100)], 100) == (["y"], ["x"])
+    assert pack_by_density([("x", 1.0, 500)], 100) == ([], ["x"])
+
+
+def test_cache_is_bounded_by_entries_and_bytes():
+    cache = OptimizationCache(max_entries=3, max_bytes=100)
+    for i in range(4):
+        cache.set(f"k{i}", {"i": i}, 10)
+    assert "k0" not in cache and len(cache) == 3 and cache.size_bytes == 30
+    assert cache.get("k1") == {"i": 1}
+    cache.set("big", {}, 80)  # over both bounds: evicts least recently used entries until it fits
+    assert list(cache.entries) == ["k3", "k1", "big"] and cache.size_bytes == 100
+    cache.set("k3", {}, 15)
+    assert list(cache.entries) == ["big", "k3"] and cache.size_bytes == 95
+    cache.set("huge", {}, 101)
+    assert "huge" not in cache
+    assert cache.evictions == 3 and cache.hits == 1
+
+
+def test_optimizer_respects_budget_and_caches(tmp_path):
+    context = {f"doc_{i}": f"analysis of revenue data item {i} " * (i % 5 + 1) for i in range(200)}
+    context["system_config"] = "critical requirement " * 5
+    path = write_ranks(tmp_path / "vocab.tiktoken", [b"an", b"al", b"ys", b"is", b"re", b"ve", b"nu", b"ue"])
+    for counter in (CharTokenCounter(), BPETokenCounter.from_file(str(path))):
+        optimizer = ContextOptimizer(max_tokens=300, token_counter=counter, cache_max_entries=2)
+        for strategy in ("relevance", "recency", "importance", "compression", "hybrid"):
+            optimized = optimizer.optimize_context_window(context, "analyze revenue", strategy)
+            assert optimized
+            assert sum(counter.count(json.dumps({k: v})) for k, v in optimized.items()) <= 300
+        assert optimizer.optimize_context_window(context, "analyze revenue", "hybrid") is optimized
+        stats = optimizer.get_cache_stats()
+        assert stats["cache_size"] == 2 and stats["cache_hits"] == 1 and stats["cache_evictions"] == 3
+        assert stats["cache_bytes"] == optimizer.context_cache.size_bytes > 0
+    assert "system_config" in optimizer.optimize_context_window(context, "", "importance")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Tests for the bounded SQLite connection pool"""
+
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database_pool import DatabasePool, PoolTimeoutError
+
+
+def test_pragmas_and_reuse(tmp_path):
+    pool = DatabasePool(str(tmp_path / "pool.db"), max_size=2)
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        first = conn
+    with pool.connection() as conn:
+        assert conn is first
+
+    metrics = pool.get_metrics()
+    assert metrics['created'] == 1
+    assert metrics['checkouts'] == 2
+    assert metrics['in_use'] == 0
+
+
+def test_hard_max_with_wait_timeout(tmp_path):
+    pool = DatabasePool(str(tmp_path / "pool.db"), max_size=1, wait_timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+
+    # A waiter is woken as soon as the connection is released
+    threading.Timer(0.05, pool.release, args=(held,)).start()
+    conn = pool.acquire(timeout=2.0)
+    pool.release(conn)
+
+    metrics = pool.get_metrics()
+    assert metrics['timeouts'] == 1
+    assert metrics['created'] == 1
+    assert metrics['max_wait_ms'] > 0
+
+
+def test_recycles_on_error_and_use_count(tmp_path):
+    pool = DatabasePool(str(tmp_path / "pool.db"), max_size=2, max_uses=2)
+    with pytest.raises(sqlite3.ProgrammingError):
+        with pool.connection() as conn:
+            conn.close()
+            conn.execute("SELECT 1")
+    assert pool.get_metrics()['recycled'] == 1
+
+    with pool.connection():
+        pass
+    with pool.connection():
+        pass
+    with pool.connection():
+        pass
+    metrics = pool.get_metrics()
+    assert metrics['recycled'] == 2
+    assert metrics['created'] == 3
+
+
+def test_uncommitted_work_is_rolled_back(tmp_path):
+    pool = DatabasePool(str(tmp_path / "pool.db"), max_size=1)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE items (id INTEGER)")
+        conn.commit()
+        conn.execute("INSERT INTO items VALUES (1)")
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Tests for the executor_manager asyncio container pool, on a fake sandbox backend"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'nerve_centre' / 'matrix' / 'executor_manager'))
+
+from core.container import ContainerPool, SandboxBackend
+from models.enums import SupportLanguage
+from services import runner as runners
+
+
+class FakeSandboxBackend(SandboxBackend):
+    def __init__(self, create_delay=0.01, fail_creates=0):
+        self.create_delay = create_delay
+        self.fail_creates = fail_creates
+        self.running = set()
+        self.creates = []
+        self.destroyed = []
+
+    async def create(self, name, language):
+        self.creates.append(name)
+        await asyncio.sleep(self.create_delay)
+        if self.fail_creates:
+            self.fail_creates -= 1
+            return False
+        self.running.add(name)
+        return True
+
+    async def destroy(self, name):
+        self.destroyed.append(name)
+        self.running.discard(name)
+
+    async def is_running(self, name):
+        return name in self.running
+
+
+def make_pool(backend, **options):
+    return ContainerPool(SupportLanguage.PYTHON, backend, check_interval=3600, **options)
+
+
+def test_waiters_are_served_in_order():
+    async def scenario():
+        pool = make_pool(FakeSandboxBackend(), min_size=1)
+        assert await pool.start() == 1
+        first = await pool.acquire()
+        order = []
+
+        async def worker(i):
+            name = await pool.acquire(timeout=5)
+            order.append(i)
+            await asyncio.sleep(0)
+            await pool.release(name)
+
+        tasks = [asyncio.create_task(worker(i)) for i in range(5)]
+        await asyncio.sleep(0.01)
+        await pool.release(first)
+        await asyncio.gather(*tasks)
+        metrics = pool.get_metrics()
+        await pool.close()
+        return order, metrics
+
+    order, metrics = asyncio.run(scenario())
+    assert order == [0, 1, 2, 3, 4]
+    assert metrics["checkouts"] == 6 and metrics["size"] == 1 and metrics["created"] == 1
+    assert metrics["max_wait_ms"] > 0
+
+
+def test_wait_deadline():
+    async def scenario():
+        pool = make_pool(FakeSandboxBackend(), min_size=1, wait_timeout=0.05)
+        await pool.start()
+        held = await pool.acquire()
+        busy = await pool.acquire()
+        await pool.release(held)
+        again = await pool.acquire()
+        metrics = pool.get_metrics()
+        await pool.close()
+        return held, busy, again, metrics
+
+    held, busy, again, metrics = asyncio.run(scenario())
+    assert busy == ""
+    assert again == held
+    assert metrics["timeouts"] == 1 and metrics["waiting"] == 0
+
+
+def test_grows_to_max_and_shrinks_after_idle_ttl():
+    async def scenario():
+        backend = FakeSandboxBackend()
+        pool = make_pool(backend, min_size=1, max_size=3, idle_ttl=0.05)
+        await pool.start()
+        names = await asyncio.gather(*(pool.acquire(timeout=1) for _ in range(4)))
+        grown = pool.get_metrics()
+        for name in names:
+            if name:
+                await pool.release(name)
+        await asyncio.sleep(0.1)
+        await pool.maintain()
+        await asyncio.sleep(0.01)
+        shrunk = pool.get_metrics()
+        await pool.close()
+        return names, grown, shrunk, backend
+
+    names, grown, shrunk, backend = asyncio.run(scenario())
+    assert sorted(n for n in names if n) == ["sandbox_python_0", "sandbox_python_1", "sandbox_python_2"]
+    assert names.count("") == 1
+    assert grown["size"] == 3 and grown["utilization"] == 1.0
+    assert shrunk["size"] == 1 and shrunk["idle"] == 1
+    assert len(backend.destroyed) >= 2
+
+
+def test_recycles_after_max_uses_and_on_error():
+    async def scenario():
+        backend = FakeSandboxBackend()
+        pool = make_pool(backend, min_size=1, max_uses=2)
+        await pool.start()
+        for _ in range(2):
+            await pool.release(await pool.acquire())
+        await asyncio.sleep(0.05)
+        after_uses = list(backend.destroyed)
+        name = await pool.acquire(timeout=1)
+        await pool.release(name, failed=True)
+        name = await pool.acquire(timeout=1)
+        backend.running.discard(name)  # crashed while running
+        await pool.release(name)
+        name = await pool.acquire(timeout=1)
+        metrics = pool.get_metrics()
+        await pool.close()
+        return after_uses, name, metrics
+
+    after_uses, name, metrics = asyncio.run(scenario())
+    assert after_uses == ["sandbox_python_0"]
+    # Recycled sandboxes keep their slot
+    assert name == "sandbox_python_0"
+    assert metrics["recycled"] == 3 and metrics["created"] == 4 and metrics["size"] == 1
+
+
+def test_destroyed_sandboxes_drop_their_runners(tmp_path):
+    async def start_runner(name):
+        runner = await runners.Runner(runners.LocalBackend(str(tmp_path)), SupportLanguage.PYTHON).start()
+        runners._RUNNERS[name] = runner
+        return runner
+
+    async def scenario():
+        pool = make_pool(FakeSandboxBackend(), min_size=1)
+        await pool.start()
+        name = await pool.acquire()
+        recycled = await start_runner(name)
+        await pool.release(name, failed=True)
+        await asyncio.sleep(0.05)
+        # The replacement has the same name but no runner yet
+        assert await pool.acquire(timeout=1) == name and name not in runners._RUNNERS
+        closed = await start_runner(name)
+        await pool.close()
+        return recycled, closed
+
+    recycled, closed = asyncio.run(scenario())
+    assert recycled.proc.returncode is not None and closed.proc.returncode is not None
+    assert not runners._RUNNERS
+
+
+def test_health_check_and_prewarming():
+    async def scenario():
+        backend = FakeSandboxBackend()
+        pool = make_pool(backend, min_size=1, max_size=4, min_idle=1)
+        await pool.start()
+        name = await pool.acquire()
+        await asyncio.sleep(0.05)
+        prewarmed = pool.get_metrics()
+        idle = next(n for n in backend.running if n != name)
+        backend.running.discard(idle)
+        await pool.maintain()
+        await asyncio.sleep(0.05)
+        healed = pool.get_metrics()
+        restarted = idle in backend.running
+        await pool.close()
+        return prewarmed, healed, restarted
+
+    prewarmed, healed, restarted = asyncio.run(scenario())
+    assert prewarmed["idle"] == 1 and prewarmed["in_use"] == 1
+    assert healed["recycled"] == 1 and healed["idle"] == 1
+    assert restarted
+
+
+def test_failed_creates_free_their_slot():
+    async def scenario():
+        backend = FakeSandboxBackend(fail_creates=1)
+        pool = make_pool(backend, min_size=1, wait_timeout=0.5)
+        assert await pool.start() == 0
+        name = await pool.acquire()
+        metrics = pool.get_metrics()
+        await pool.close()
+        return name, metrics
+
+    name, metrics = asyncio.run(scenario())
+    assert name == "sandbox_python_0"
+    assert metrics["failed_creates"] == 1 and metrics["created"] == 1
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Tests for the executor_manager warm runner supervisors, on the local backend"""
+
+import asyncio
+import base64
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'nerve_centre' / 'matrix' / 'executor_manager'))
+
+from models.enums import SupportLanguage
+from services.runner import LocalBackend, Runner, RunnerError
+
+
+def b64(code):
+    return base64.b64encode(code.encode()).decode()
+
+
+def run_all(language, calls, tmp_path):
+    """Start one supervisor and send it (code, arguments, timeout) calls in turn"""
+    async def scenario():
+        runner = await Runner(LocalBackend(str(tmp_path)), language).start()
+        try:
+            return [await runner.run(b64(code), args, timeout) for code, args, timeout in calls]
+        finally:
+            await runner.close()
+
+    return asyncio.run(scenario())
+
+
+def test_python_runs_are_isolated_forks(tmp_path):
+    code = (
+        "import os\n"
+        "COUNT = []\n"
+        "def main(name):\n"
+        "    COUNT.append(name)\n"
+        "    print('hello', name)\n"
+        "    return f'{len(COUNT)} {os.getcwd()}'\n"
+    )
+    first, second = run_all(SupportLanguage.PYTHON, [(code, {"name": "a"}, 5), (code, {"name": "b"}, 5)], tmp_path)
+    assert first.exit_code == 0 and second.exit_code == 0
+    assert first.stdout.startswith("hello a\n1 ")
+    assert second.stdout.startswith("hello b\n1 ")
+    # Each run had its own workdir, removed afterwards
+    assert first.stdout.split()[-1] != second.stdout.split()[-1]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_python_errors_and_exit_codes(tmp_path):
+    failing, exiting, timing_out, after = run_all(SupportLanguage.PYTHON, [
+        ("def main():\n    raise ValueError('boom')\n", {}, 5),
+        ("import sys\ndef main():\n    sys.exit(3)\n", {}, 5),
+        ("import time\ndef main():\n    print('started', flush=True)\n    time.sleep(30)\n", {}, 0.5),
+        ("def main():\n    return 'still warm'\n", {}, 5),
+    ], tmp_path)
+    assert failing.exit_code == 1 and "ValueError: boom" in failing.stderr
+    assert exiting.exit_code == 3
+    assert timing_out.exit_code == 124 and timing_out.stdout == "started\n"
+    assert timing_out.time_used_ms < 5000
+    assert after.exit_code == 0 and after.stdout == "still warm\n"
+
+
+def test_python_signalled_run(tmp_path):
+    code = "import os, signal\ndef main():\n    os.kill(os.getpid(), signal.SIGKILL)\n"
+    result, = run_all(SupportLanguage.PYTHON, [(code, {}, 5)], tmp_path)
+    assert result.exit_code == 137
+
+
+def test_large_output_is_streamed(tmp_path):
+    code = "import sys\ndef main():\n    sys.stdout.write('x' * 3_000_000)\n"
+    result, = run_all(SupportLanguage.PYTHON, [(code, {}, 10)], tmp_path)
+    assert result.exit_code == 0 and len(result.stdout) == 3_000_000
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_nodejs_runs(tmp_path):
+    code = "async function main({ name }) { return `hi ${name}`; }\nmodule.exports = { main };\n"
+    hang = "async function main() { await new Promise(() => setInterval(() => {}, 1000)); }\nmodule.exports = { main };\n"
+    ok, timing_out, again = run_all(SupportLanguage.NODEJS, [(code, {"name": "n"}, 5), (hang, {}, 0.5), (code, {"name": "m"}, 5)], tmp_path)
+    assert ok.exit_code == 0 and ok.stdout == "hi n\n"
+    assert timing_out.exit_code == 124
+    assert again.stdout == "hi m\n"
+
+
+def test_dead_supervisor_is_reported(tmp_path):
+    async def scenario():
+        runner = await Runner(LocalBackend(str(tmp_path)), SupportLanguage.PYTHON).start()
+        runner.proc.terminate()
+        await runner.proc.wait()
+        assert not runner.alive
+        with pytest.raises(RunnerError):
+            await runner.run(b64("def main():\n    pass\n"), {}, 5)
+
+    asyncio.run(scenario())
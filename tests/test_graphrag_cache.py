@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Tests for the graphrag key/value cache"""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'nerve_centre' / 'matrix'))
+
+from graphrag.cache import (EMBED_MAGIC, KVCache, LRUTier, RedisBackend, SQLiteBackend,
+                            decode_embedding, encode_embedding)
+
+
+class CountingBackend:
+    def __init__(self):
+        self.data = {}
+        self.mget_calls = 0
+
+    def mget(self, keys):
+        self.mget_calls += 1
+        return [self.data.get(k) for k in keys]
+
+    def mset(self, items, ttl):
+        self.data.update(items)
+
+
+class FakeRedisClient:
+    """The slice of redis.Redis that RedisBackend uses"""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def mget(self, keys):
+        return [self.data.get(k) for k in keys]
+
+    def pipeline(self, transaction=True):
+        client = self
+
+        class Pipeline:
+            def __init__(self):
+                self.ops = []
+
+            def set(self, k, v, ex=None):
+                self.ops.append((k, v, ex))
+
+            def execute(self):
+                for k, v, ex in self.ops:
+                    client.data[k] = v
+                    client.ttls[k] = ex
+
+        return Pipeline()
+
+
+def test_embedding_round_trip():
+    vec = np.random.default_rng(0).standard_normal(768).astype(np.float32)
+    bin = encode_embedding(vec)
+    assert bin.startswith(EMBED_MAGIC)
+    assert len(bin) == len(EMBED_MAGIC) + 768 * 4
+    out = decode_embedding(bin)
+    assert out.dtype == np.float32
+    assert np.array_equal(out, vec)
+    assert decode_embedding(None) is None
+
+
+def test_reads_legacy_json_embeddings():
+    vec = [0.25, -1.5, 3.0]
+    assert np.array_equal(decode_embedding(json.dumps(vec).encode("utf-8")), vec)
+    assert np.array_equal(decode_embedding(json.dumps(vec)), vec)
+
+
+def test_lru_bounded_by_bytes_and_expiry():
+    lru = LRUTier(max_bytes=10)
+    lru.set("a", b"aaaa", expire_at=100)
+    lru.set("b", b"bbbb", expire_at=100)
+    assert lru.get("a", now=0) == b"aaaa"  # a is now most recent
+    lru.set("c", b"cccc", expire_at=100)
+    assert lru.get("b", now=0) is None
+    assert lru.get("a", now=0) == b"aaaa"
+    assert lru.size == 8
+    assert lru.get("c", now=100) is None
+    assert lru.size == 4
+    lru.set("big", b"x" * 11, expire_at=100)
+    assert lru.get("big", now=0) is None
+
+
+def test_sqlite_backend_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer, reader = SQLiteBackend(path), SQLiteBackend(path)
+    items = {f"k{i}": bytes([i % 256]) * 8 for i in range(1200)}
+    writer.mset(items, ttl=60)
+    keys = list(items) + ["missing"]
+    assert reader.mget(keys) == list(items.values()) + [None]
+    writer.mset({"k0": b"new"}, ttl=60)
+    assert reader.mget(["k0"]) == [b"new"]
+    writer.mset({"gone": b"x"}, ttl=-1)
+    assert reader.mget(["gone"]) == [None]
+
+
+def test_backend_hits_fill_lru():
+    backend = CountingBackend()
+    backend.data = {"a": b"1", "b": b"2"}
+    cache = KVCache(backend)
+    assert cache.mget(["a", "b", "c"]) == [b"1", b"2", None]
+    assert backend.mget_calls == 1
+    assert cache.mget(["a", "b"]) == [b"1", b"2"]
+    assert backend.mget_calls == 1
+    cache.mset({"c": b"3"}, ttl=60)
+    assert backend.data["c"] == b"3"
+    assert cache.get("c") == b"3"
+    assert backend.mget_calls == 1
+
+
+def test_memory_only_cache():
+    cache = KVCache()
+    assert cache.get("k") is None
+    cache.set("k", b"v", ttl=60)
+    assert cache.get("k") == b"v"
+
+
+def test_redis_backend_batches_with_ttl():
+    client = FakeRedisClient()
+    cache = KVCache(RedisBackend(client))
+    cache.mset({"a": encode_embedding([1.0, 2.0]), "b": b"text"}, ttl=600)
+    assert client.ttls == {"a": 600, "b": 600}
+    cache.lru.clear()
+    a, b = cache.mget(["a", "b"])
+    assert np.array_equal(decode_embedding(a), [1.0, 2.0])
+    assert b == b"text"
+
+
+def test_redis_errors_are_misses():
+    class Broken:
+        def mget(self, keys):
+            raise ConnectionError("down")
+
+        def pipeline(self, transaction=True):
+            raise ConnectionError("down")
+
+    cache = KVCache(RedisBackend(Broken()))
+    cache.set("a", b"1", ttl=60)
+    assert cache.get("a") == b"1"
+    assert cache.get("b") is None
+
+
+@pytest.mark.parametrize("value", [b"", None])
+def test_empty_values_are_misses(value):
+    assert decode_embedding(value) is None
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Tests for the columnar graph log records"""
+
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pytest
+
+nx = pytest.importorskip('networkx')
+pytest.importorskip('xxhash')
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'nerve_centre' / 'matrix'))
+
+from graphrag.graph_store import (STORE_SEQ, apply_delta, columns, dumps, encode_delta, rows,
+                                  snapshot_json)
+
+
+@dataclass
+class Change:
+    """Same fields as graphrag.utils.GraphChange"""
+    removed_nodes: set = field(default_factory=set)
+    added_updated_nodes: set = field(default_factory=set)
+    removed_edges: set = field(default_factory=set)
+    added_updated_edges: set = field(default_factory=set)
+
+
+def base_graph():
+    g = nx.Graph(source_id=["doc-1"])
+    g.add_node("A", entity_type="org", description="a", source_id=["doc-1"], pagerank=0.5, rank=2)
+    g.add_node("B", entity_type="person", description="b", source_id=["doc-1"], pagerank=0.25, rank=1)
+    g.add_node("C", entity_type="person", description="c", source_id=["doc-1"], pagerank=0.25, rank=1)
+    g.add_edge("A", "B", description="ab", keywords=["k"], weight=1, source_id=["doc-1"])
+    g.add_edge("A", "C", description="ac", keywords=[], weight=2, source_id=["doc-1"])
+    return g
+
+
+def replay(snapshot, delta):
+    g = nx.node_link_graph(json.loads(snapshot), edges="edges")
+    ok = apply_delta(g, json.loads(dumps(delta)))
+    return g, ok
+
+
+def assert_same(g1, g2):
+    assert list(g1.nodes) == list(g2.nodes)
+    assert dict(g1.nodes(data=True)) == dict(g2.nodes(data=True))
+    key = lambda u, v: tuple(sorted((u, v)))
+    assert {key(u, v): a for u, v, a in g1.edges(data=True)} == {key(u, v): a for u, v, a in g2.edges(data=True)}
+    assert {k: v for k, v in g1.graph.items() if k != STORE_SEQ} == {k: v for k, v in g2.graph.items() if k != STORE_SEQ}
+
+
+def test_columns_round_trip_with_absent_attributes():
+    records = [{"a": 1, "b": None}, {"b": [2]}, {"a": 3, "c": "x"}]
+    table = json.loads(dumps(columns(records)))
+    assert table["absent"] == {"a": [1], "b": [2], "c": [0, 1]}
+    assert rows(table, 3) == records
+
+
+def test_delta_replays_merge():
+    g = base_graph()
+    snapshot = snapshot_json(g)
+    change = Change()
+    g.nodes["B"]["description"] += "<SEP>b2"
+    g.nodes["B"]["source_id"].append("doc-2")
+    g.add_node("D", entity_type="geo", description="d", source_id=["doc-2"])
+    g.add_edge("B", "D", description="bd", keywords=[], weight=1, source_id=["doc-2"])
+    g.edges["A", "B"]["weight"] += 3
+    g.graph["source_id"].append("doc-2")
+    for n, degree in g.degree:
+        g.nodes[n]["rank"] = degree
+        g.nodes[n]["pagerank"] = degree / 6
+    change.added_updated_nodes |= {"B", "D"}
+    change.added_updated_edges |= {("B", "D"), ("A", "B")}
+
+    delta = encode_delta(g, change)
+    assert delta["nodes"]["names"] == ["B", "D"]
+    assert "pagerank" not in delta["nodes"]["cols"]
+    loaded, ok = replay(snapshot, delta)
+    assert ok
+    assert_same(g, loaded)
+    assert isinstance(loaded.nodes["D"]["rank"], int)
+
+
+def test_delta_replays_entity_resolution():
+    g = base_graph()
+    snapshot = snapshot_json(g)
+    change = Change()
+    # C merged into B
+    g.nodes["B"]["description"] += "<SEP>c"
+    g.remove_node("C")
+    g.add_edge("A", "B", description="ab", keywords=["k"], weight=3, source_id=["doc-1"])
+    change.removed_nodes.add("C")
+    change.removed_edges.add(("A", "C"))
+    change.added_updated_nodes.add("B")
+    change.added_updated_edges.add(("A", "B"))
+
+    loaded, ok = replay(snapshot, encode_delta(g, change))
+    assert ok
+    assert_same(g, loaded)
+
+
+def test_delta_replays_purged_node():
+    g = base_graph()
+    del g.nodes["C"]["description"]
+    snapshot = snapshot_json(g)
+    # What tidy_graph records when it purges C before a merge
+    g.remove_node("C")
+    change = Change(removed_nodes={"C"}, removed_edges={("A", "C")})
+    for n, degree in g.degree:
+        g.nodes[n]["rank"] = degree
+    loaded, ok = replay(snapshot, encode_delta(g, change))
+    assert ok
+    assert_same(g, loaded)
+    # Unrecorded, the purged node comes back and its scores do not match
+    assert not replay(snapshot, encode_delta(g, Change()))[1]
+
+
+def test_tidy_graph_records_purges_before_merge():
+    utils = pytest.importorskip('graphrag.utils', exc_type=ImportError)
+    old_graph = base_graph()
+    del old_graph.nodes["C"]["description"]
+    del old_graph.edges["A", "B"]["keywords"]
+    snapshot = snapshot_json(old_graph)
+
+    subgraph = nx.Graph(source_id=["doc-2"])
+    subgraph.add_node("D", entity_type="geo", description="d", source_id=["doc-2"])
+    subgraph.add_node("A", entity_type="org", description="a2", source_id=["doc-2"])
+    subgraph.add_edge("A", "D", description="ad", keywords=[], weight=1, source_id=["doc-2"])
+    change = utils.GraphChange()
+    utils.tidy_graph(old_graph, None, change)
+    new_graph = utils.graph_merge(old_graph, subgraph, change)
+    for n, pagerank in nx.pagerank(new_graph).items():
+        new_graph.nodes[n]["pagerank"] = pagerank
+
+    assert change.removed_nodes == {"C"} and ("A", "C") in change.removed_edges
+    assert ("A", "B") in change.added_updated_edges
+    loaded, ok = replay(snapshot, encode_delta(new_graph, change))
+    assert ok
+    assert_same(new_graph, loaded)
+
+
+def test_scores_absent_on_new_graph_nodes():
+    g = base_graph()
+    snapshot = snapshot_json(g)
+    g.add_node("E", entity_type="geo", description="e", source_id=["doc-1"])
+    change = Change(added_updated_nodes={"E"})
+    loaded, ok = replay(snapshot, encode_delta(g, change))
+    assert ok
+    assert "pagerank" not in loaded.nodes["E"]
+    assert_same(g, loaded)
+
+
+def test_mismatched_scores_are_reported():
+    g = base_graph()
+    delta = encode_delta(g, Change())
+    other = base_graph()
+    other.add_node("Z", description="z", source_id=[])
+    assert not apply_delta(other, json.loads(dumps(delta)))
+    assert "pagerank" not in other.nodes["Z"]
+
+
+def test_snapshot_drops_store_position():
+    g = base_graph()
+    g.graph[STORE_SEQ] = 7
+    data = json.loads(snapshot_json(g))
+    assert data["graph"] == {"source_id": ["doc-1"]}
+    assert g.graph[STORE_SEQ] == 7
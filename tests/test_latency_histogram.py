@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Tests for the log-bucketed latency histograms"""
+
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from latency_histogram import (BUCKET_COUNT, LatencyHistogram, RollingLatencyHistogram,
+                               bucket_bounds, bucket_index)
+
+
+def test_bucket_bounds_contain_values():
+    for value in [0, 1, 15, 16, 17, 31, 32, 1000, 123456, 2 ** 31, 2 ** 32 - 1]:
+        index = bucket_index(value)
+        low, high = bucket_bounds(index)
+        assert low <= value < high
+        assert index < BUCKET_COUNT
+
+
+def test_percentiles_within_relative_error():
+    rng = random.Random(7)
+    samples = [rng.lognormvariate(-4, 1.0) for _ in range(50000)]
+    histogram = LatencyHistogram()
+    for sample in samples:
+        histogram.record(sample)
+
+    ordered = sorted(samples)
+    for quantile, value in histogram.percentiles([0.5, 0.9, 0.99, 0.999]).items():
+        exact = ordered[int(quantile * len(ordered)) - 1]
+        assert abs(value - exact) / exact < 0.07
+    assert histogram.total_count == 50000
+    assert abs(histogram.mean - sum(samples) / len(samples)) < 1e-9
+
+
+def test_rolling_window_expires_old_slots():
+    rolling = RollingLatencyHistogram(slots=3, slot_seconds=10)
+    rolling.record(0.5, now=0)
+    rolling.record(0.01, now=15)
+    assert rolling.window(now=20).total_count == 2
+    # The slot from t=0 has left the 30s window
+    window = rolling.window(now=35)
+    assert window.total_count == 1
+    assert window.percentile(0.99) < 0.02
+    # Reusing a slot resets it; the cumulative histogram keeps everything
+    rolling.record(0.2, now=30)
+    assert rolling.window(now=30).total_count == 2
+    assert rolling.cumulative.total_count == 3
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Tests for concurrent multi-provider fan-out in LLMOrchestrator"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'nerve_centre'))
+
+llm_abstraction = pytest.importorskip('llm_abstraction.llm_abstraction')
+LLMOrchestrator = llm_abstraction.LLMOrchestrator
+
+ANSWER = ("According to research, the analysis of demand is clear. "
+          "Evidence shows growth. In summary, demand drivers are strong.")
+
+
+class StubProvider(llm_abstraction.LLMProviderBase):
+    def __init__(self, name, latency, fail=False):
+        super().__init__({'name': name})
+        self.latency = latency
+        self.fail = fail
+
+    def query(self, request):
+        time.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError('down')
+        return llm_abstraction.LLMResponse(content=ANSWER, provider=self.name,
+                                           timestamp=time.time(), processing_time=self.latency)
+
+    def get_metadata(self):
+        return {'name': self.name}
+
+
+PROMPT = "Analyze the demand drivers"
+
+
+def test_providers_run_concurrently_with_timeout():
+    providers = [StubProvider('a', 0.2), StubProvider('b', 0.2), StubProvider('c', 0.2, fail=True),
+                 StubProvider('slow', 2.0)]
+    orchestrator = LLMOrchestrator(providers, provider_timeout=0.5)
+    started = time.perf_counter()
+    results = orchestrator.run(PROMPT, use_multiple_providers=True)
+    elapsed = time.perf_counter() - started
+    orchestrator.shutdown()
+
+    assert elapsed < 1.0
+    assert sorted(r.provider for r in results) == ['a', 'b']
+    status = orchestrator.get_provider_status()
+    assert status['slow']['timeouts'] == 1
+    assert status['c']['success_rate'] == 0
+
+
+def test_first_n_good_responses_cancels_stragglers():
+    providers = [StubProvider('fast', 0.05), StubProvider('medium', 0.1), StubProvider('slow', 1.0)]
+    orchestrator = LLMOrchestrator(providers, provider_timeouts={'slow': 5.0})
+    started = time.perf_counter()
+    results = orchestrator.run(PROMPT, use_multiple_providers=True, min_responses=2)
+    elapsed = time.perf_counter() - started
+    orchestrator.shutdown()
+
+    assert elapsed < 0.5
+    assert sorted(r.provider for r in results) == ['fast', 'medium']
+    assert orchestrator.get_provider_status()['slow']['cancelled'] == 1
+
+
+def test_overall_deadline_and_all_failed():
+    orchestrator = LLMOrchestrator([StubProvider('a', 1.0), StubProvider('b', 1.0)])
+    with pytest.raises(RuntimeError):
+        orchestrator.run(PROMPT, use_multiple_providers=True, deadline=0.1)
+    orchestrator.shutdown()
+
+
+def test_provider_timeout_starts_when_call_runs():
+    orchestrator = LLMOrchestrator([StubProvider('a', 0.2), StubProvider('b', 0.2)], provider_timeout=0.3)
+    executor = orchestrator._get_executor()
+    # Occupy every worker so both calls wait in the queue first
+    for _ in range(executor._max_workers):
+        executor.submit(time.sleep, 0.3)
+    results = orchestrator.run(PROMPT, use_multiple_providers=True)
+    orchestrator.shutdown()
+
+    assert sorted(r.provider for r in results) == ['a', 'b']
+    assert orchestrator.get_provider_status()['a']['timeouts'] == 0
+
+
+def test_stragglers_do_not_saturate_the_pool():
+    orchestrator = LLMOrchestrator([StubProvider('fast', 0.05), StubProvider('slow', 1.5)], provider_timeout=0.2)
+    for _ in range(6):  # more runs than the pool has workers
+        started = time.perf_counter()
+        results = orchestrator.run(PROMPT, use_multiple_providers=True)
+        assert time.perf_counter() - started < 0.5
+        assert [r.provider for r in results] == ['fast']
+    status = orchestrator.get_provider_status()
+    assert status['slow']['timeouts'] == 1 and status['slow']['skipped'] == 5
+
+    # Once the straggler returns the provider is queried again
+    time.sleep(1.5)
+    orchestrator.run(PROMPT, use_multiple_providers=True, min_responses=2)
+    orchestrator.shutdown()
+    assert orchestrator.get_provider_status()['slow']['timeouts'] == 2
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Tests for token-bucket rate limiting of LLM providers"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'nerve_centre'))
+
+rate_limiting = pytest.importorskip('llm_abstraction.rate_limiting')
+base = pytest.importorskip('llm_abstraction.base')
+ProviderRateLimiter = rate_limiting.ProviderRateLimiter
+
+
+def test_burst_then_steady_rate():
+    limiter = ProviderRateLimiter(requests_per_minute=600, request_burst=5)  # 10 req/s
+    waits = [limiter._reserve(0, None) for _ in range(7)]
+    assert waits[:5] == [0.0] * 5
+    assert waits[5] == pytest.approx(0.1, abs=0.01)
+    assert waits[6] == pytest.approx(0.2, abs=0.01)
+    metrics = limiter.get_metrics()
+    assert metrics['throttled'] == 2 and metrics['max_wait_ms'] == pytest.approx(200, abs=10)
+
+
+def test_token_budget_and_timeout():
+    limiter = ProviderRateLimiter(requests_per_minute=6000, tokens_per_minute=6000)  # 100 tokens/s
+    assert limiter.acquire(tokens=6000) == 0.0
+    with pytest.raises(rate_limiting.RateLimitExceeded):
+        limiter.acquire(tokens=500, timeout=1.0)
+    # The rejected reservation was refunded
+    assert limiter.get_metrics()['rejected'] == 1
+    assert limiter._reserve(10, None) == pytest.approx(0.1, abs=0.02)
+
+    # Responses that used fewer tokens than estimated return budget
+    limiter.reconcile_tokens(estimated=500, actual=100)
+    assert limiter.get_metrics()['available_tokens'] > 300
+
+
+def test_thread_safe_shared_budget():
+    limiter = ProviderRateLimiter(requests_per_minute=60, request_burst=50)
+    waits = []
+
+    def worker():
+        for _ in range(10):
+            waits.append(limiter._reserve(0, None))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(1 for w in waits if w == 0) == 50
+    assert max(waits) == pytest.approx(30.0, abs=0.1)
+
+
+def test_async_acquire_does_not_block_loop():
+    limiter = ProviderRateLimiter(requests_per_minute=600, request_burst=1)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        await asyncio.gather(*(limiter.acquire_async() for _ in range(4)))
+        elapsed = time.perf_counter() - started
+        task.cancel()
+        return elapsed, ticks
+
+    elapsed, ticks = asyncio.run(main())
+    assert elapsed == pytest.approx(0.3, abs=0.1)
+    assert ticks >= 15
+
+
+class _Provider(base.LLMProviderBase):
+    def query(self, request):
+        self._rate_limit_check(request)
+        return base.LLMResponse(content='ok', provider=self.name, timestamp=time.time())
+
+    def get_metadata(self):
+        return {}
+
+
+def test_providers_with_same_name_share_a_limiter():
+    a = _Provider({'name': 'shared-test', 'rate_limit': 120, 'token_rate_limit': 10000})
+    b = _Provider({'name': 'shared-test', 'rate_limit': 120, 'token_rate_limit': 10000})
+    a.query(base.LLMRequest(prompt='x' * 400, max_tokens=100))
+    b.query(base.LLMRequest(prompt='x' * 400, max_tokens=100))
+    assert a._get_rate_limiter() is b._get_rate_limiter()
+    metrics = a.get_rate_limit_metrics()
+    assert metrics['acquired'] == 2
+    assert metrics['tokens_reserved'] == 400
+    assert _Provider({'name': 'unlimited', 'rate_limit': 0}).get_rate_limit_metrics() is None
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Tests for the tiered LLM response cache"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'nerve_centre'))
+
+llm_abstraction = pytest.importorskip('llm_abstraction.llm_abstraction')
+from llm_abstraction.response_cache import LLMResponseCache, make_cache_key, make_namespace
+
+ANSWER = ("According to research, the quarterly revenue analysis is clear. "
+          "Evidence shows growth. In summary, revenue is rising.")
+
+
+def response(provider='stub', latency=0.5):
+    return llm_abstraction.LLMResponse(content=ANSWER, provider=provider, timestamp=time.time(),
+                                       processing_time=latency)
+
+
+def test_key_normalization():
+    namespace = make_namespace('openai', 'gpt-4', {'temperature': 0.2})
+    assert make_cache_key(namespace, "Summarize  the\nreport ") == make_cache_key(namespace, "Summarize the report")
+    assert make_cache_key(namespace, "x", {'a': 1, 'b': 2}) == make_cache_key(namespace, "x", {'b': 2, 'a': 1})
+    assert make_cache_key(namespace, "x") != make_cache_key(make_namespace('openai', 'gpt-4'), "x")
+
+
+def test_memory_and_disk_tiers(tmp_path):
+    db_path = str(tmp_path / 'cache.db')
+    cache = LLMResponseCache(memory_entries=1, db_path=db_path, ttl=60)
+    assert cache.get('openai', 'gpt-4', 'q1') is None
+    cache.put('openai', 'gpt-4', 'q1', [response()])
+    cache.put('openai', 'gpt-4', 'q2', [response()])
+
+    # q1 was evicted from the one-entry LRU but is still on disk
+    [hit] = cache.get('openai', 'gpt-4', 'q1')
+    assert hit.content == ANSWER and hit.metadata['cache'] == 'disk'
+    assert cache.get('openai', 'gpt-4', 'q1')[0].metadata['cache'] == 'memory'
+
+    # A second process sees the same entries
+    other = LLMResponseCache(db_path=db_path)
+    assert other.get('openai', 'gpt-4', 'q2')[0].metadata['cache'] == 'disk'
+
+    stats = cache.get_stats()
+    assert stats['hits'] == 2 and stats['misses'] == 1
+    assert stats['saved_latency_seconds'] == pytest.approx(1.0)
+    assert stats['by_provider']['openai']['hits'] == 2
+
+
+def test_ttl_expiry(tmp_path):
+    cache = LLMResponseCache(db_path=str(tmp_path / 'cache.db'))
+    cache.put('openai', 'gpt-4', 'q', [response()], ttl=-1)
+    assert cache.get('openai', 'gpt-4', 'q') is None
+
+
+def test_semantic_tier_threshold():
+    vectors = {'revenue report q3': [1.0, 0.0, 0.1], 'q3 revenue report': [1.0, 0.0, 0.12],
+               'hiring plan': [0.0, 1.0, 0.0]}
+    cache = LLMResponseCache(embedder=lambda text: vectors[text], similarity_threshold=0.98)
+    cache.put('openai', 'gpt-4', 'revenue report q3', [response()])
+
+    [hit] = cache.get('openai', 'gpt-4', 'q3 revenue report')
+    assert hit.metadata['cache'] == 'semantic' and hit.metadata['cache_similarity'] >= 0.98
+    assert cache.get('openai', 'gpt-4', 'hiring plan') is None
+    # Different model never matches
+    assert cache.get('anthropic', 'claude', 'q3 revenue report') is None
+
+
+def test_embedder_runs_outside_the_lock():
+    def embedder(text):
+        # Another thread must be able to take the lock while we embed
+        acquired = []
+
+        def probe():
+            acquired.append(cache.lock.acquire(blocking=False))
+            if acquired[0]:
+                cache.lock.release()
+
+        thread = threading.Thread(target=probe)
+        thread.start()
+        thread.join()
+        assert acquired == [True]
+        return [1.0, 0.0]
+
+    cache = LLMResponseCache(embedder=embedder)
+    cache.put('openai', 'gpt-4', 'revenue', [response()])
+    assert cache.get('openai', 'gpt-4', 'revenue ') is not None
+    assert cache.get('openai', 'gpt-4', 'revenue?')[0].metadata['cache'] == 'semantic'
+
+
+class CountingProvider(llm_abstraction.LLMProviderBase):
+    def __init__(self):
+        super().__init__({'name': 'counting'})
+        self.calls = 0
+
+    def query(self, request):
+        self.calls += 1
+        return response('counting', latency=0.2)
+
+    def get_metadata(self):
+        return {'name': self.name}
+
+
+def test_orchestrator_reports_cache_stats():
+    provider = CountingProvider()
+    orchestrator = llm_abstraction.LLMOrchestrator([provider], response_cache=LLMResponseCache())
+    first = orchestrator.run("Analyze quarterly revenue", temperature=0)
+    second = orchestrator.run("Analyze   quarterly revenue", temperature=0)
+    assert provider.calls == 1
+    assert second.content == first.content and second.metadata['cache'] == 'memory'
+
+    stats = orchestrator.get_provider_status()['response_cache']
+    assert stats['hit_ratio'] == 0.5
+    assert stats['saved_latency_seconds'] == pytest.approx(0.2)
+
+    # Sampled requests are never served from the cache
+    orchestrator.run("Analyze quarterly revenue", temperature=0.7)
+    orchestrator.run("Analyze quarterly revenue")
+    assert provider.calls == 3 and orchestrator.response_cache.stores == 1
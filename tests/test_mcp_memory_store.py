@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Tests for the MCP server memory store"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'nerve_centre' / 'llm_abstraction' / 'mcp' / 'server'))
+
+from memory_store import MemoryStore, match_expression, searchable_text
+
+
+def make_store(tmp_path=None):
+    return MemoryStore(str(tmp_path / "memory.db") if tmp_path else ":memory:", sweep_interval=None)
+
+
+def test_put_get_and_overwrite():
+    store = make_store()
+    store.put("k", {"notes": ["quarterly revenue"], "n": 3})
+    assert store.get("k") == {"notes": ["quarterly revenue"], "n": 3}
+    assert store.get("k", category="other") is None
+    store.put("k", "replaced", category="other")
+    assert store.get("k", category="other") == "replaced"
+    assert store.search("quarterly") == []
+    assert store.count() == 1
+
+
+def test_search_ranks_with_bm25():
+    store = make_store()
+    store.put_many([
+        {"key": "a", "value": "revenue report for the board"},
+        {"key": "b", "value": "revenue revenue revenue forecast"},
+        {"key": "c", "value": {"topic": "hiring plan"}, "category": "hr"},
+        {"key": "d", "value": "unrelated"},
+    ])
+    results = store.search("revenue")
+    assert [r["key"] for r in results] == ["b", "a"]
+    assert results[0]["score"] > results[1]["score"]
+    # Every word must match, each as a prefix
+    assert [r["key"] for r in store.search("rev board")] == ["a"]
+    assert [r["key"] for r in store.search("topic hir", category="hr")] == ["c"]
+    assert store.search("hiring", category="general") == []
+    assert store.search("revenue", limit=1)[0]["key"] == "b"
+    # FTS syntax in the query is treated as words
+    assert store.search('revenue"* (') == store.search("revenue")
+    assert store.search("!!!") == []
+
+
+def test_expired_memories_are_hidden_and_swept():
+    store = make_store()
+    store.put("short", "expiring soon", ttl=60)
+    store.put("long", "expiring later", ttl=3600)
+    store.put("forever", "expiring never")
+    assert store.get("short") == "expiring soon"
+    store.sweep_batch = 1
+    assert store.sweep(now=time.time() + 120) == 1
+    assert store.get("short") is None
+    assert {r["key"] for r in store.search("expiring")} == {"long", "forever"}
+    assert store.count() == 2
+    # FTS index stays in step with deletes
+    assert store.conn.execute("SELECT COUNT(*) FROM memory_fts WHERE memory_fts MATCH 'soon'").fetchone()[0] == 0
+
+
+def test_background_sweeper():
+    store = MemoryStore(sweep_interval=0.05)
+    store.put("k", "v", ttl=0.01)
+    deadline = time.time() + 2
+    while store.count() and time.time() < deadline:
+        time.sleep(0.02)
+    assert store.count() == 0 and store.swept == 1
+    store.close()
+
+
+def test_persists_with_wal(tmp_path):
+    store = make_store(tmp_path)
+    store.put_many({"key": f"k{i}", "value": f"note {i}"} for i in range(100))
+    store.close()
+    reopened = make_store(tmp_path)
+    assert reopened.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert reopened.count() == 100
+    assert reopened.get("k42") == "note 42"
+    assert {r["key"] for r in reopened.search("note", limit=200)} == {f"k{i}" for i in range(100)}
+    reopened.close()
+
+
+def test_helpers():
+    assert searchable_text({"a": [1, "x"], "b": None}) == "a 1 x b "
+    assert match_expression("C++ rocks") == '"C"* "rocks"*'
+    assert match_expression("  ") is None
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""Tests for the MCP tool call planner against a local stub MCP server"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'nerve_centre' / 'llm_abstraction' / 'mcp'))
+
+from tool_planner import ToolCallPlanner, plan_tool_calls, resolve_references
+
+
+class StubMCPServer:
+    """Line-delimited JSON-RPC tools/call server; each tool sleeps `delay` seconds and echoes its arguments"""
+
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle(self, reader, writer):
+        line = await reader.readline()
+        request = json.loads(line)
+        name, arguments = request['params']['name'], request['params']['arguments']
+        self.calls.append((name, arguments))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(arguments.get('delay', self.delay))
+        except asyncio.CancelledError:
+            # Client gave up and the server is shutting down
+            return
+        finally:
+            self.in_flight -= 1
+        if name == 'fail_tool':
+            response = {'jsonrpc': '2.0', 'id': request['id'], 'error': {'message': 'tool failed'}}
+        else:
+            response = {'jsonrpc': '2.0', 'id': request['id'], 'result': {'tool': name, 'echo': arguments}}
+        writer.write(json.dumps(response).encode() + b'\n')
+        await writer.drain()
+        writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def execute(self, function_name, arguments):
+        # One connection per call, like independent client sessions
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        try:
+            request = {'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+                       'params': {'name': function_name, 'arguments': arguments}}
+            writer.write(json.dumps(request).encode() + b'\n')
+            response = json.loads(await reader.readline())
+        finally:
+            writer.close()
+        if 'error' in response:
+            raise RuntimeError(response['error']['message'])
+        return response['result']
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+def run_batch(tool_calls, planner=None, delay=0.1, server_of=lambda name: 'stub', runnable=None):
+    async def scenario():
+        stub = StubMCPServer(delay)
+        await stub.start()
+        planned = plan_tool_calls(tool_calls, server_of)
+        started = time.perf_counter()
+        outcomes = await (planner or ToolCallPlanner()).run(planned, stub.execute, runnable)
+        elapsed = time.perf_counter() - started
+        await stub.close()
+        return planned, outcomes, elapsed, stub
+
+    return asyncio.run(scenario())
+
+
+def test_independent_calls_run_concurrently():
+    calls = [{'function_name': 'read_file', 'arguments': {'path': f'/tmp/{i}'}} for i in range(5)]
+    planned, outcomes, elapsed, stub = run_batch(calls, ToolCallPlanner(max_concurrency_per_server=8))
+    assert elapsed < 0.3  # sequential would be 0.5s
+    assert stub.max_in_flight == 5
+    assert all(o.error is None and o.execution_time >= 0.1 for o in outcomes.values())
+    assert outcomes['call_3'].result['echo'] == {'path': '/tmp/3'}
+
+
+def test_per_server_concurrency_cap():
+    calls = [{'function_name': f'tool_{i % 2}', 'arguments': {'i': i}} for i in range(6)]
+    planned, outcomes, elapsed, stub = run_batch(
+        calls, ToolCallPlanner(max_concurrency_per_server=1), delay=0.05,
+        server_of=lambda name: 'server_' + name[-1])
+    # Two servers, one call each at a time
+    assert stub.max_in_flight == 2
+    assert 0.15 <= elapsed < 0.3
+    assert max(o.queue_time for o in outcomes.values()) >= 0.1
+
+
+def test_references_order_dependent_calls():
+    calls = [
+        {'function_name': 'search_files', 'arguments': {'pattern': '*.py'}, 'call_id': 'find'},
+        {'function_name': 'read_file', 'arguments': {'path': '{{find.echo.pattern}}', 'note': 'from {{find.tool}}'}},
+        {'function_name': 'get_status', 'arguments': {}},
+    ]
+    planned, outcomes, elapsed, stub = run_batch(calls)
+    assert planned[1].depends_on == {'find'}
+    assert outcomes['call_1'].result['echo'] == {'path': '*.py', 'note': 'from search_files'}
+    assert [name for name, _ in stub.calls].index('read_file') > [name for name, _ in stub.calls].index('search_files')
+    # get_status ran alongside search_files; read_file waited for it
+    assert outcomes['call_2'].queue_time < 0.05 and outcomes['call_1'].queue_time >= 0.1
+    assert 0.2 <= elapsed < 0.3
+
+
+def test_identical_calls_run_once():
+    calls = [{'function_name': 'read_file', 'arguments': {'path': '/a', 'mode': 'r'}},
+             {'function_name': 'read_file', 'arguments': {'mode': 'r', 'path': '/a'}},
+             {'function_name': 'read_file', 'arguments': {'path': '/b'}}]
+    planned, outcomes, elapsed, stub = run_batch(calls)
+    assert len(stub.calls) == 2
+    assert outcomes['call_1'].deduplicated_from == 'call_0'
+    assert outcomes['call_1'].result == outcomes['call_0'].result
+    assert outcomes['call_1'].execution_time is None
+
+
+def test_references_to_a_duplicate_resolve():
+    calls = [{'function_name': 'f', 'arguments': {'x': 1}},
+             {'function_name': 'f', 'arguments': {'x': 1}},
+             {'function_name': 'g', 'arguments': {'y': '{{call_1}}'}}]
+    planned, outcomes, elapsed, stub = run_batch(calls, delay=0.01)
+    assert planned[1].duplicate_of == 'call_0' and planned[2].depends_on == {'call_1'}
+    assert outcomes['call_2'].error is None
+    assert stub.calls[-1] == ('g', {'y': outcomes['call_0'].result})
+
+
+def test_deadlines_and_failures():
+    calls = [
+        {'function_name': 'slow_tool', 'arguments': {'delay': 1.0}},
+        {'function_name': 'fail_tool', 'arguments': {}},
+        {'function_name': 'read_file', 'arguments': {'path': '{{call_1.path}}'}},
+        {'function_name': 'read_file', 'arguments': {'path': '{{call_4}}'}},
+        {'function_name': 'read_file', 'arguments': {'path': '{{call_3}}'}},
+        {'function_name': 'write_file', 'arguments': {}},
+        {'function_name': 'read_file', 'arguments': {'path': '{{call_5}}'}},
+    ]
+    runnable = {f'call_{i}' for i in range(7)} - {'call_5'}
+    planned, outcomes, elapsed, stub = run_batch(
+        calls, ToolCallPlanner(call_timeout=0.2, batch_timeout=5), delay=0.01, runnable=runnable)
+    assert outcomes['call_0'].error.startswith('Timed out')
+    assert outcomes['call_1'].error == 'tool failed'
+    assert outcomes['call_2'].error == 'Depends on failed calls: call_1'
+    assert outcomes['call_3'].error == outcomes['call_4'].error == 'Circular reference between tool calls'
+    assert 'call_5' not in outcomes
+    assert outcomes['call_6'].error == 'Depends on calls that were not executed: call_5'
+    assert elapsed < 0.5
+
+    planned, outcomes, elapsed, stub = run_batch(
+        [{'function_name': 'slow_tool', 'arguments': {'delay': 1.0}},
+         {'function_name': 'read_file', 'arguments': {'path': '{{call_0}}'}}],
+        ToolCallPlanner(call_timeout=5, batch_timeout=0.2))
+    # Either the call's own deadline (capped at the batch's) or the batch cancel fires first
+    assert outcomes['call_0'].error.startswith(('Timed out', 'Batch deadline'))
+    assert outcomes['call_1'].error is not None
+    assert elapsed < 0.5
+
+
+def test_resolve_references():
+    results = {'a': {'items': [{'name': 'x'}], 'n': 2}}
+    assert resolve_references({'v': '{{a.items.0}}', 'w': ['n={{a.n}}', '{{b}}']}, results) == \
+        {'v': {'name': 'x'}, 'w': ['n=2', '{{b}}']}
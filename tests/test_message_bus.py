@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Tests for the sharded agent message bus"""
+
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'legion'))
+
+from core_framework import AgentMessage
+from message_bus import InboxFullError, ShardedMessageBus
+
+
+def make_message(recipient_id, priority=5, sequence=0):
+    return AgentMessage(
+        message_id=f"msg_{sequence}",
+        sender_id="tester",
+        recipient_id=recipient_id,
+        message_type="test",
+        content={"sequence": sequence},
+        timestamp=datetime.now(),
+        priority=priority
+    )
+
+
+def test_priority_order_within_inbox():
+    async def scenario():
+        bus = ShardedMessageBus()
+        received = []
+
+        async def handler(message):
+            received.append(message.content["sequence"])
+
+        bus.register("agent_a", handler)
+        # Queue before starting so ordering is decided by priority alone
+        await bus.publish(make_message("agent_a", priority=5, sequence=1))
+        await bus.publish(make_message("agent_a", priority=1, sequence=2))
+        await bus.publish(make_message("agent_a", priority=5, sequence=3))
+        bus.start()
+        await bus.drain()
+        await bus.stop()
+        return received
+
+    assert asyncio.run(scenario()) == [2, 1, 3]
+
+
+def test_slow_agent_does_not_block_others():
+    async def scenario():
+        bus = ShardedMessageBus()
+        release = asyncio.Event()
+        fast_received = []
+
+        async def slow_handler(message):
+            await release.wait()
+
+        async def fast_handler(message):
+            fast_received.append(message.message_id)
+
+        bus.register("slow", slow_handler)
+        bus.register("fast", fast_handler)
+        bus.start()
+        await bus.publish(make_message("slow"))
+        for i in range(10):
+            await bus.publish(make_message("fast", sequence=i))
+        await asyncio.wait_for(bus.inboxes["fast"].queue.join(), timeout=1.0)
+        release.set()
+        await bus.drain()
+        metrics = bus.get_metrics()
+        await bus.stop()
+        return fast_received, metrics
+
+    fast_received, metrics = asyncio.run(scenario())
+    assert len(fast_received) == 10
+    assert metrics['agents']['fast']['delivered'] == 10
+    assert metrics['total_delivered'] == 11
+
+
+def test_backpressure_when_inbox_full():
+    async def scenario():
+        bus = ShardedMessageBus(inbox_size=2, put_timeout=0.05)
+        bus.register("agent_a", lambda message: asyncio.sleep(0))
+        assert bus.publish_nowait(make_message("agent_a", sequence=1))
+        assert bus.publish_nowait(make_message("agent_a", sequence=2))
+        assert not bus.publish_nowait(make_message("agent_a", sequence=3))
+        with pytest.raises(InboxFullError):
+            await bus.publish(make_message("agent_a", sequence=4))
+        assert not await bus.publish(make_message("unknown"))
+        return bus.get_metrics()
+
+    metrics = asyncio.run(scenario())
+    assert metrics['agents']['agent_a']['rejected'] == 2
+    assert metrics['agents']['agent_a']['queue_depth'] == 2
+    assert metrics['undeliverable'] == 1
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Tests for the incrementally maintained message metrics rollups"""
+
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / 'legion'))
+
+from core_framework import AgentMessage, AgentTask
+from message_metrics_store import MessageMetricsStore, priority_label
+
+
+def make_message(sender, recipient, message_type="status_update", priority=5):
+    return AgentMessage(
+        message_id=f"{sender}->{recipient}",
+        sender_id=sender,
+        recipient_id=recipient,
+        message_type=message_type,
+        content={"value": 1},
+        timestamp=datetime.now(),
+        priority=priority
+    )
+
+
+def test_rollups_update_incrementally(tmp_path):
+    departments = {"fin_agent": "finance", "mkt_agent": "marketing"}
+    store = MessageMetricsStore(str(tmp_path / "metrics.db"), department_resolver=departments.get)
+
+    store.record_message(make_message("fin_agent", "mkt_agent", priority=1), processing_time_ms=50)
+    store.record_message(make_message("fin_agent", "mkt_agent"), processing_time_ms=700)
+    store.record_message(make_message("mkt_agent", "fin_agent", "data_request"), delivery_status="failed")
+
+    since = time.time() - 3600
+    for granularity in ("minute", "hour", "day"):
+        rows = store.get_message_rollups(granularity, since - 86400, ("sender_department", "receiver_department"))
+        pairs = {(r["sender_department"], r["receiver_department"]): r for r in rows}
+        assert pairs[("finance", "marketing")]["message_count"] == 2
+        assert pairs[("marketing", "finance")]["failed_count"] == 1
+
+    # A later insert adds to the existing bucket rather than recomputing
+    store.record_message(make_message("fin_agent", "mkt_agent"), processing_time_ms=10)
+    totals = store.get_message_rollups("hour", since)[0]
+    assert totals["message_count"] == 4
+    assert totals["priority_critical"] == 1
+    assert totals["latency_under_100ms"] == 2
+    assert totals["latency_500ms_1s"] == 1
+
+    recent = store.get_recent_messages(10)
+    assert len(recent) == 4
+    assert recent[0]["sender"]["department"] == "finance"
+    assert len(store.get_agent_messages("mkt_agent")) == 4
+    store.close()
+
+
+def test_task_rollups_and_ingest(tmp_path):
+    store = MessageMetricsStore(str(tmp_path / "metrics.db"))
+    task = AgentTask(task_id="t1", agent_id="fin_agent", task_type="analysis",
+                     description="", parameters={})
+    store.record_task(task, department="finance")
+    task.started_at = datetime.now()
+    task.completed_at = datetime.now()
+    task.status = "completed"
+    store.record_task(task, department="finance")
+
+    recorded = store.ingest({
+        "messages": [{"sender_id": "a", "recipient_id": "b", "sender_department": "legal",
+                      "receiver_department": "finance", "message_type": "alert", "priority": "high"}],
+        "tasks": [{"agent_id": "a", "department": "legal", "task_type": "review", "status": "failed"}]
+    })
+    assert recorded == {"messages": 1, "tasks": 1}
+
+    rows = {r["department"]: r for r in store.get_task_rollups("day", time.time() - 86400, ("department",))}
+    assert rows["finance"]["created_count"] == 1
+    assert rows["finance"]["completed_count"] == 1
+    assert rows["legal"]["failed_count"] == 1
+    assert priority_label("high") == "high"
+    assert priority_label(9) == "low"
+    store.close()
+
+
+def test_recording_without_auto_flush_never_waits_on_the_database(tmp_path):
+    store = MessageMetricsStore(str(tmp_path / "metrics.db"), flush_threshold=1, flush_interval=0, auto_flush=False)
+    store.record_message(make_message("fin_agent", "mkt_agent"))
+    with store.db_lock:
+        count = store.connection.execute("SELECT COUNT(*) FROM message_log").fetchone()[0]
+    assert count == 0 and store._pending_events == 1
+
+    # A flush holding the connection in another thread doesn't block recording
+    done = threading.Event()
+    with store.db_lock:
+        threading.Thread(target=lambda: (store.record_message(make_message("mkt_agent", "fin_agent")),
+                                         done.set())).start()
+        assert done.wait(2)
+    store.flush()
+    assert len(store.get_recent_messages(10)) == 2
+    store.close()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Tests for the batched Monte Carlo engine behind FinancialModelingAgent"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'legion'))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from finance.financial_modeling_agent import FinancialModelingAgent
+from finance.monte_carlo import MonteCarloEngine, tail_risk
+
+
+def make_agent():
+    agent = FinancialModelingAgent()
+    agent._create_default_models()
+    agent._create_base_scenarios()
+    return agent
+
+
+def test_tail_risk_matches_percentile():
+    rng = np.random.default_rng(3)
+    for n in (1, 7, 1000, 100_001):
+        outcomes = rng.normal(size=n)
+        risk = tail_risk(outcomes, [0.95, 0.90, 0.999])
+        assert list(risk['value_at_risk']) == ['95%', '90%', '99.9%']
+        for level, label in ((0.95, '95%'), (0.90, '90%'), (0.999, '99.9%')):
+            assert risk['value_at_risk'][label] == pytest.approx(np.percentile(outcomes, (1 - level) * 100))
+            worst = max(1, int(np.ceil((1 - level) * n)))
+            assert risk['conditional_value_at_risk'][label] == pytest.approx(np.sort(outcomes)[:worst].mean())
+    with pytest.raises(ValueError):
+        tail_risk(np.array([]), [0.95])
+
+
+def test_seeded_runs_match_in_process_and_on_pool():
+    args = ([[600000], [400000], [150000]], [0.25, 0.5, 0.25], [0.2], 10_001)
+    local = MonteCarloEngine(batch_size=2048).simulate(*args, seed=42)
+    pooled_engine = MonteCarloEngine(batch_size=2048, parallel_threshold=1, max_workers=2)
+    try:
+        pooled = pooled_engine.simulate(*args, seed=42)
+        assert pooled_engine.pool is not None
+    finally:
+        pooled_engine.close()
+    assert np.array_equal(local.outcomes, pooled.outcomes) and len(local.outcomes) == 10_001
+    assert local.value_at_risk == pooled.value_at_risk
+    assert not np.array_equal(local.outcomes, MonteCarloEngine(batch_size=2048).simulate(*args, seed=43).outcomes)
+    # Unseeded runs of a seeded engine are reproducible as a sequence
+    first, second = MonteCarloEngine(seed=7), MonteCarloEngine(seed=7)
+    assert np.array_equal(first.simulate(*args).outcomes, second.simulate(*args).outcomes)
+    assert not np.array_equal(first.simulate(*args).outcomes, first.simulate(*args).outcomes)
+
+
+def test_correlated_factor_shocks():
+    engine = MonteCarloEngine(seed=1)
+    # Outcome 2 + s1 + s2 with std 0.1 and 0.2: variance 0.05 + 2 * rho * 0.02
+    for rho, variance in ((0.0, 0.05), (0.5, 0.07), (-0.5, 0.03)):
+        result = engine.simulate([[1.0, 1.0]], [1.0], [0.1, 0.2], 200_000,
+                                 correlation=[[1, rho], [rho, 1]])
+        assert result.mean == pytest.approx(2.0, abs=0.002)
+        assert result.std ** 2 == pytest.approx(variance, rel=0.02)
+    # Scenarios are drawn by probability
+    result = engine.simulate([10.0, 20.0], [0.2, 0.8], [0.0], 100_000)
+    assert np.mean(result.outcomes == 10.0) == pytest.approx(0.2, abs=0.01)
+    with pytest.raises(ValueError):
+        engine.simulate([[1.0, 1.0]], [1.0], [0.1], 10)
+    with pytest.raises(np.linalg.LinAlgError):
+        engine.simulate([[1.0, 1.0]], [1.0], [0.1, 0.2], 10, correlation=[[1, 2], [2, 1]])
+
+
+def test_agent_projections():
+    agent = make_agent()
+    agent.models['risk_model']['parameters']['seed'] = 5
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+        projections = await agent._generate_comprehensive_projections(14)
+        task.cancel()
+        return projections, ticks
+
+    projections, ticks = asyncio.run(scenario())
+    assert ticks > 0  # The event loop kept running during the simulation
+    risk = projections['risk_analysis']
+    assert set(risk['value_at_risk']) == {'95%', '90%', '80%'}
+    assert risk['conditional_value_at_risk']['95%'] < risk['value_at_risk']['95%'] < risk['value_at_risk']['80%']
+    assert risk == asyncio.run(agent._generate_risk_projections())  # Seeded
+
+    seasonal = agent.models['budget_model']['parameters']['seasonal_factors']
+    revenue = projections['revenue_projections']['optimistic']
+    expected = [120000 * (1 + 0.15 / 12) ** m * seasonal[(m - 1) % 12] for m in range(1, 15)]
+    assert [r['revenue'] for r in revenue['monthly_projections']] == pytest.approx(expected)
+    assert revenue['total_projected'] == pytest.approx(sum(expected))
+
+    cash_flow = projections['cash_flow_projections']
+    assert [cf['period'] for cf in cash_flow] == [f"Month_{m}" for m in range(1, 15)]
+    assert cash_flow[-1]['cumulative_cash_flow'] == pytest.approx(sum(cf['net_cash_flow'] for cf in cash_flow))
+
+    # Revenue and costs shocked as two correlated factors
+    agent.models['risk_model']['parameters'].update(
+        factor_volatilities={'revenue': 0.15, 'costs': 0.05}, factor_correlation=[[1, 0.6], [0.6, 1]])
+    result = asyncio.run(agent._run_monte_carlo_simulation())
+    expected_mean = sum(s.probability * s.projected_profit for s in agent.scenarios.values())
+    assert result.paths == 10000 and result.mean == pytest.approx(expected_mean, rel=0.02)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Tests for coalescing, delta-encoded WebSocket channels"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from realtime_channels import ChannelHub, apply_delta, channel_room, diff_payload
+
+
+def test_diff_round_trip():
+    old = {'overall': 'ok', 'services': {'db': {'status': 'ok', 'ms': 12}, 'api': {'rpm': 10}}, 'gone': 1}
+    new = {'overall': 'ok', 'services': {'db': {'status': 'ok', 'ms': 15}, 'api': {'rpm': 10}}}
+    changed, removed = diff_payload(old, new)
+    assert changed == {'services': {'db': {'ms': 15}}}
+    assert removed == [['gone']]
+    assert apply_delta(old, changed, removed) == new
+
+
+def test_rooms_and_subscriptions():
+    hub = ChannelHub()
+    joined, left = hub.subscribe('a', ['cpu_usage', 'memory_usage'])
+    assert joined == {'cpu_usage', 'memory_usage'} and not left
+    joined, left = hub.subscribe('a', ['cpu_usage'])
+    assert not joined and left == {'memory_usage'}
+    hub.subscribe('b', ['cpu_usage'])
+    assert hub.subscriber_count('cpu_usage') == 2
+    assert hub.remove_client('a') == {'cpu_usage'}
+    assert hub.subscriber_count('cpu_usage') == 1
+    assert channel_room('cpu_usage') == 'channel:cpu_usage'
+
+
+def test_one_coalesced_delta_per_channel():
+    hub = ChannelHub()
+    for client in range(100):
+        hub.subscribe(f'client-{client}', ['network_io'])
+
+    hub.publish('network_io', {'inbound': 1, 'outbound': 2})
+    [(room, first)] = hub.collect_updates()
+    assert room == 'channel:network_io'
+    assert first['delta'] is False and first['version'] == 1
+
+    # Several producer updates within one tick collapse into the latest value
+    hub.publish('network_io', {'inbound': 5, 'outbound': 2})
+    hub.publish('network_io', {'inbound': 7, 'outbound': 2})
+    [(_, message)] = hub.collect_updates()
+    assert message == {'type': 'network_io', 'version': 2, 'payload': {'inbound': 7},
+                       'delta': True, 'base_version': 1}
+    assert hub.get_stats()['coalesced'] == 1
+
+    # Unchanged values and unsubscribed channels produce nothing
+    hub.publish('network_io', {'inbound': 7, 'outbound': 2})
+    hub.publish('cpu_usage', {'value': 50})
+    assert hub.collect_updates() == []
+    assert hub.snapshot('cpu_usage')['payload'] == {'value': 50}
+
+
+def test_non_dict_payloads_are_sent_whole():
+    hub = ChannelHub()
+    hub.subscribe('a', ['system_alert'])
+    hub.seed('system_alert', [])
+    hub.publish('system_alert', [{'level': 'warning'}])
+    [(_, message)] = hub.collect_updates()
+    assert message['delta'] is False and message['payload'] == [{'level': 'warning'}]
+    assert message['version'] == 2
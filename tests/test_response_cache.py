@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Tests for the dashboard response cache"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from response_cache import CachedResponse, ResponseCache, compute_etag
+
+
+def make_entry(body=b'{"value": 1}'):
+    return CachedResponse(body=body, status=200, content_type='application/json',
+                          etag=compute_etag(body), expires_at=0)
+
+
+def test_key_ignores_query_order():
+    assert (ResponseCache.make_key('/api/x', [('b', '2'), ('a', '1')]) ==
+            ResponseCache.make_key('/api/x', [('a', '1'), ('b', '2')]))
+    assert ResponseCache.make_key('/api/x', []) == '/api/x'
+
+
+def test_ttl_hits_and_invalidation():
+    cache = ResponseCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return make_entry()
+
+    entry, hit = cache.get_or_compute('/api/kpis', 60, ('objectives',), compute)
+    assert not hit
+    entry, hit = cache.get_or_compute('/api/kpis', 60, ('objectives',), compute)
+    assert hit and len(calls) == 1
+
+    assert cache.invalidate('objectives') == 1
+    cache.get_or_compute('/api/kpis', 60, ('objectives',), compute)
+    assert len(calls) == 2
+
+    cache.get_or_compute('/api/short', 0.01, (), compute)
+    time.sleep(0.02)
+    cache.get_or_compute('/api/short', 0.01, (), compute)
+    assert len(calls) == 4
+
+    stats = cache.get_stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 4
+    assert stats['invalidations'] == 1
+
+
+def test_uncacheable_and_stale_results_are_not_stored():
+    cache = ResponseCache()
+    entry, hit = cache.get_or_compute('/api/error', 60, (), lambda: None)
+    assert entry is None and not hit
+    assert cache.get_stats()['entries'] == 0
+
+    # A result computed while its tag is invalidated must not be cached
+    def compute_during_write():
+        cache.invalidate('workflows')
+        return make_entry()
+
+    cache.get_or_compute('/api/workflows', 60, ('workflows',), compute_during_write)
+    assert cache.get_stats()['entries'] == 0
+
+
+def test_concurrent_misses_compute_once():
+    cache = ResponseCache()
+    calls = []
+    started = threading.Event()
+
+    def slow_compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return make_entry()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        cache.get_or_compute('/api/overview', 60, (), slow_compute))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len({entry.etag for entry, _ in results}) == 1
+    assert cache.get_stats()['hits'] == 7
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_entries=2)
+    for key in ('/a', '/b', '/c'):
+        cache.get_or_compute(key, 60, (), make_entry)
+    assert cache.get('/a') is None
+    assert cache.get('/c') is not None
+    assert cache.get_stats()['evictions'] == 1
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Tests for the fixed-memory sliding window client rate limiter"""
+
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from rate_limiter import SlidingWindowCounterLimiter
+
+
+def test_limit_within_window():
+    limiter = SlidingWindowCounterLimiter(limit=5, window_seconds=60, shards=1)
+    results = [limiter.hit("10.0.0.1", now=1000.0 + i) for i in range(6)]
+    assert [allowed for allowed, _, _ in results] == [True] * 5 + [False]
+    assert results[0][1] == 4
+    assert results[-1][2] > 0
+    # Other clients are unaffected
+    assert limiter.hit("10.0.0.2", now=1006.0)[0]
+
+
+def test_previous_window_slides_out():
+    limiter = SlidingWindowCounterLimiter(limit=10, window_seconds=60, shards=1)
+    for _ in range(10):
+        assert limiter.hit("client", now=60.0)[0]
+    # At the start of the next window the previous count still weighs fully
+    assert not limiter.hit("client", now=120.0)[0]
+    # Half way through, half of the previous window's requests remain
+    allowed = sum(limiter.hit("client", now=150.0)[0] for _ in range(10))
+    assert allowed == 5
+
+
+def test_idle_keys_are_evicted():
+    limiter = SlidingWindowCounterLimiter(limit=10, window_seconds=60, shards=1)
+    for i in range(1000):
+        limiter.hit(f"client-{i}", now=0.0)
+    assert limiter.get_stats()['tracked_keys'] == 1000
+    limiter.hit("late-client", now=200.0)
+    stats = limiter.get_stats()
+    assert stats['tracked_keys'] == 1
+    assert stats['evicted'] == 1000
+
+
+def test_max_keys_bound():
+    limiter = SlidingWindowCounterLimiter(limit=10, window_seconds=60, shards=4, max_keys=100)
+    for i in range(10000):
+        limiter.hit(f"client-{i}", now=0.0)
+    assert limiter.get_stats()['tracked_keys'] <= 100
+
+
+def test_thread_safety():
+    limiter = SlidingWindowCounterLimiter(limit=1000, window_seconds=60)
+
+    def worker():
+        for _ in range(500):
+            limiter.hit("shared", now=30.0)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = limiter.get_stats()
+    assert stats['allowed'] == 1000
+    assert stats['limited'] == 3000
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Tests for the indexed task queue behind TaskSchedulingAgent"""
+
+import asyncio
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'legion'))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from automation.task_queue import IndexedTaskQueue
+from automation.task_scheduling_agent import Priority, ScheduledTask, TaskSchedulingAgent, TaskStatus
+
+START = datetime(2026, 1, 5, 9, 0)
+
+
+def make_task(task_id, priority=3, deadline=None, dependencies=None, agent_id="agent_a"):
+    return ScheduledTask(task_id=task_id, agent_id=agent_id, task_type="general", description=task_id,
+                         priority=Priority(priority), scheduled_time=START, deadline=deadline,
+                         dependencies=dependencies)
+
+
+def test_pop_order_update_and_remove():
+    queue = IndexedTaskQueue(lambda item, now: item)
+    for key, score in (("b", 5), ("a", 5), ("c", 9), ("d", 1)):
+        queue.push(key, score, START)
+    assert queue.remove("c") and not queue.remove("c") and "c" not in queue
+    queue.update("d", 7, START)
+    queue.update("a", 5, START)  # same score and key as the entry it replaces
+    assert len(queue) == 3 and queue.peek(START) == ("d", 7, 7)
+    assert [queue.pop(START)[0] for _ in range(3)] == ["d", "a", "b"]  # ties pop in key order
+    assert queue.pop(START) is None and queue.dead == 0
+
+
+def test_matches_rescored_sort_under_churn():
+    agent = TaskSchedulingAgent()
+    score = agent._calculate_priority_score
+    queue = IndexedTaskQueue(score, agent._score_settles_at, bucket=timedelta(minutes=5))
+    rng = random.Random(4)
+    tasks, now = {}, START
+    for step in range(20000):
+        now += timedelta(seconds=rng.randrange(0, 40))
+        op = rng.random()
+        if op < 0.5 or not tasks:
+            task_id = f"t{step}"
+            deadline = now + timedelta(hours=rng.uniform(-1, 30)) if rng.random() < 0.7 else None
+            tasks[task_id] = make_task(task_id, rng.randint(1, 4), deadline, ["x"] * rng.randrange(3))
+            queue.push(task_id, tasks[task_id], now)
+        elif op < 0.7:
+            task_id = rng.choice(list(tasks))
+            assert queue.remove(task_id)
+            del tasks[task_id]
+        elif op < 0.9:
+            task = tasks[rng.choice(list(tasks))]
+            task.priority = Priority(rng.randint(1, 4))
+            task.deadline = now + timedelta(hours=rng.uniform(0, 26))
+            queue.update(task.task_id, task, now)
+        else:
+            task_id, task, _ = queue.pop(now)
+            assert tasks.pop(task_id) is task
+    assert sorted(tasks) == sorted(queue) and queue.rescored
+    # Stored scores are upper bounds; in a fresh bucket every pop is exact
+    now += timedelta(minutes=5)
+    for task_id, task, stored in queue.items():
+        assert stored >= score(task, now)
+    expected = [(task_id, score(tasks[task_id], now)) for task_id in
+                sorted(tasks, key=lambda task_id: (-score(tasks[task_id], now), task_id))]
+    assert [queue.pop(now)[::2] for _ in range(len(tasks))] == expected
+
+
+def test_scores_age_as_deadline_approaches():
+    agent = TaskSchedulingAgent()
+    queue = IndexedTaskQueue(agent._calculate_priority_score, agent._score_settles_at)
+    queue.push("due", make_task("due", 1, START + timedelta(hours=30)), START)
+    queue.push("plain", make_task("plain", 2), START)
+    queue.push("late", make_task("late", 4, START - timedelta(hours=1)), START)
+    assert queue.peek(START)[::2] == ("due", 9.0)  # 9.0 against 8.0 and 6 * 0.1
+    assert queue.peek(START + timedelta(hours=5, minutes=59))[::2] == ("due", 9.0)  # window opens at 6h
+    assert queue.rescored == 0
+    opened = START + timedelta(hours=6, minutes=30)
+    key, _, score = queue.peek(opened)
+    assert key == "due" and score == agent._calculate_priority_score(queue._entries["due"][3], opened) < 9.0
+    later = START + timedelta(hours=20)
+    assert queue.peek(later)[::2] == ("plain", 8.0) and queue.rescored == 2
+    assert queue.pop(START + timedelta(days=3))[::2] == ("plain", 8.0)
+    assert queue.pop(START + timedelta(days=3))[::2] == ("due", 0.9)
+    assert queue.rescored == 3 and queue.pop(START)[0] == "late" and not queue
+
+def test_agent_cancel_reprioritize_and_strategies():
+    agent = TaskSchedulingAgent()
+    deadline = (datetime.now() + timedelta(hours=2)).isoformat()
+
+    async def scenario():
+        for task_id, priority, task_deadline in (("a", 3, None), ("b", 2, None), ("c", 4, deadline)):
+            await agent.process_task({"action": "schedule", "task_id": task_id, "priority": priority,
+                                      "deadline": task_deadline})
+        assert (await agent.process_task({"action": "cancel", "task_id": "b"}))["status"] == "success"
+        result = await agent.process_task({"action": "reprioritize", "task_id": "c", "priority": 1,
+                                           "deadline": None})
+        assert result["status"] == "success" and result["priority_score"] == 9.0
+        assert (await agent.process_task({"action": "reprioritize", "task_id": "zz"}))["status"] == "error"
+        assert (await agent.process_task({"action": "reprioritize", "task_id": "a", "priority": 9}))["status"] == "error"
+        # A rejected field leaves the other one, and the queued score, as they were
+        for bad_deadline in ("tomorrow", 1700000000):
+            result = await agent.process_task({"action": "reprioritize", "task_id": "a", "priority": 1,
+                                               "deadline": bad_deadline})
+            assert result["status"] == "error"
+        task_a = agent.scheduled_tasks["a"]
+        assert task_a.priority == Priority(3) and task_a.deadline is None
+        assert dict((key, score) for key, _, score in agent.task_queue.items())["a"] == \
+            agent._calculate_priority_score(task_a)
+        assert (await agent._get_schedule({}))["queue_length"] == 2
+
+        assert (await agent._earliest_deadline_first())["reordered_tasks"] == 0
+        assert len(agent.task_queue) == 0
+        assert (await agent._priority_first_scheduling())["reordered_tasks"] == 2
+        assert (await agent._round_robin_scheduling())["reordered_tasks"] == 2
+        first = await agent._next_task()
+        assert first.task_id == "c" and first.status == TaskStatus.RUNNING and "c" in agent.running_tasks
+        assert (await agent._priority_first_scheduling())["reordered_tasks"] == 1
+        assert (await agent._next_task()).task_id == "a" and await agent._next_task() is None
+        assert agent.scheduled_tasks["b"].status == TaskStatus.CANCELLED
+
+    asyncio.run(scenario())